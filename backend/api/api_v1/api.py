@@ -15,6 +15,7 @@ from api.api_v1.endpoints import (
     comments,
     notifications,
     creator,
+    profiling,
 )
 
 api_router = APIRouter()
@@ -68,3 +69,6 @@ api_router.include_router(analytics.router, prefix="/analytics", tags=["analytic
 
 # Creator tools
 api_router.include_router(creator.router, prefix="/creator", tags=["creator"])
+
+# Operations
+api_router.include_router(profiling.router, prefix="/admin/profiles", tags=["admin"])
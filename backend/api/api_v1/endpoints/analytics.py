@@ -8,6 +8,7 @@ from fastapi import APIRouter, HTTPException, Depends, Query
 from datetime import datetime, timedelta
 from models.user import User
 from api.deps import get_current_user
+from core.responses import ORJSONResponse
 from services.analytics_service import get_analytics_service
 
 router = APIRouter(prefix="/analytics", tags=["Analytics"])
@@ -41,12 +42,12 @@ async def get_dashboard_overview(
             end_date=end_date
         )
         
-        return {
+        return ORJSONResponse({
             "success": True,
             "data": dashboard_data,
             "period": period,
             "generated_at": datetime.utcnow().isoformat()
-        }
+        })
         
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Failed to get dashboard analytics: {str(e)}")
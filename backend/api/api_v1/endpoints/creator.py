@@ -11,6 +11,7 @@ from models.biolinks import (
 )
 from crud.biolinks import biolink_crud, template_crud, content_crud
 from api.deps import get_current_user
+from core.responses import ModelResponse, ORJSONResponse
 from models.user import User
 
 router = APIRouter(prefix="/creator", tags=["Creator Bundle"])
@@ -33,7 +34,7 @@ async def create_bio_page(
 @router.get("/bio-pages", response_model=List[BioLinkPage])
 async def get_my_bio_pages(current_user: User = Depends(get_current_user)):
     """Get current user's bio pages"""
-    return await biolink_crud.get_user_bio_pages(str(current_user.id))
+    return ModelResponse(await biolink_crud.get_user_bio_pages(str(current_user.id)))
 
 
 @router.get("/bio-pages/{page_id}", response_model=BioLinkPage)
@@ -50,7 +51,7 @@ async def get_bio_page(
     if bio_page.user_id != str(current_user.id) and not current_user.is_superuser:
         raise HTTPException(status_code=403, detail="Access forbidden")
     
-    return bio_page
+    return ModelResponse(bio_page)
 
 
 @router.put("/bio-pages/{page_id}", response_model=BioLinkPage)
@@ -108,7 +109,7 @@ async def get_public_bio_page(slug: str, request: Request):
     referrer = request.headers.get("referer")
     await biolink_crud.track_page_view(str(bio_page.id), referrer)
     
-    return bio_page
+    return ModelResponse(bio_page)
 
 
 @router.post("/p/{slug}/click/{button_id}")
@@ -310,7 +311,7 @@ async def get_creator_dashboard(current_user: User = Depends(get_current_user)):
     total_clicks = sum(page.total_clicks for page in bio_pages)
     published_content = len([post for post in content_posts if post.status == "published"])
     
-    return {
+    return ORJSONResponse({
         "bio_pages": {
             "total": len(bio_pages),
             "published": len([page for page in bio_pages if page.is_published]),
@@ -324,4 +325,4 @@ async def get_creator_dashboard(current_user: User = Depends(get_current_user)):
         },
         "recent_bio_pages": bio_pages[:5],  # Recent 5
         "recent_content": content_posts[:5]  # Recent 5
-    }
\ No newline at end of file
+    })
\ No newline at end of file
@@ -14,6 +14,8 @@ from crud.ecommerce import (
     order_crud, vendor_crud
 )
 from api.deps import get_current_user
+from core.responses import ModelResponse, ORJSONResponse
+from core.rows import parse_fields
 from models.user import User
 
 router = APIRouter(prefix="/ecommerce", tags=["E-commerce"])
@@ -39,18 +41,35 @@ async def get_products(
     limit: int = 100,
     category_id: Optional[str] = None,
     bundle_type: Optional[str] = None,
-    search: Optional[str] = None
+    search: Optional[str] = None,
+    fields: Optional[str] = None
 ):
-    """Get products with optional filtering"""
+    """Get products with optional filtering; ``fields`` (comma-separated) returns only those fields"""
+    if fields:
+        try:
+            if search:
+                rows = await product_crud.search_product_rows(search, parse_fields(fields), limit)
+            else:
+                rows = await product_crud.get_product_rows(
+                    parse_fields(fields),
+                    skip=skip,
+                    limit=limit,
+                    category_id=category_id,
+                    bundle_type=bundle_type
+                )
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=str(e))
+        return ORJSONResponse(rows)
+    
     if search:
-        return await product_crud.search_products(search, limit)
+        return ModelResponse(await product_crud.search_products(search, limit))
     
-    return await product_crud.get_products(
+    return ModelResponse(await product_crud.get_products(
         skip=skip,
         limit=limit,
         category_id=category_id,
         bundle_type=bundle_type
-    )
+    ))
 
 
 @router.get("/products/{product_id}", response_model=Product)
@@ -59,7 +78,7 @@ async def get_product(product_id: str):
     product = await product_crud.get_product(product_id)
     if not product:
         raise HTTPException(status_code=404, detail="Product not found")
-    return product
+    return ModelResponse(product)
 
 
 @router.put("/products/{product_id}", response_model=Product)
@@ -251,7 +270,7 @@ async def get_bundle_products(bundle_type: str):
     if bundle_type not in valid_bundles:
         raise HTTPException(status_code=400, detail="Invalid bundle type")
     
-    return await product_crud.get_products(bundle_type=bundle_type)
+    return ModelResponse(await product_crud.get_products(bundle_type=bundle_type))
 
 
 @router.get("/dashboard/vendor-stats")
@@ -267,11 +286,11 @@ async def get_vendor_dashboard(current_user: User = Depends(get_current_user)):
     # Get vendor orders (would need to implement this query)
     # orders = await order_crud.get_vendor_orders(str(vendor.id))
     
-    return {
+    return ORJSONResponse({
         "vendor": vendor,
         "total_products": len(products),
         "active_products": len([p for p in products if p.is_active]),
         "products": products[:10]  # Recent products
         # "recent_orders": orders[:10],
         # "monthly_sales": calculate_monthly_sales(orders)
-    }
\ No newline at end of file
+    })
\ No newline at end of file
@@ -10,6 +10,8 @@ from models.user import User
 from models.notifications import Notification, NotificationCreate, NotificationUpdate
 from api.deps import get_current_user
 from crud.notifications import notification_crud
+from core.responses import ORJSONResponse
+from core.rows import parse_fields
 
 router = APIRouter(prefix="/notifications", tags=["Notifications"])
 
@@ -20,9 +22,26 @@ async def get_user_notifications(
     limit: int = Query(20, ge=1, le=100, description="Items per page"),
     unread_only: bool = Query(False, description="Show only unread notifications"),
     type_filter: Optional[str] = Query(None, description="Filter by notification type"),
+    fields: Optional[str] = Query(None, description="Comma-separated fields to return"),
     current_user: User = Depends(get_current_user)
 ):
     """Get notifications for the current user"""
+    if fields:
+        try:
+            rows = await notification_crud.get_user_notification_rows(
+                user_id=str(current_user.id),
+                fields=parse_fields(fields),
+                page=page,
+                limit=limit,
+                unread_only=unread_only,
+                type_filter=type_filter
+            )
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=str(e))
+        except Exception as e:
+            raise HTTPException(status_code=500, detail=f"Failed to get notifications: {str(e)}")
+        return ORJSONResponse(rows)
+    
     try:
         notifications = await notification_crud.get_user_notifications(
             user_id=str(current_user.id),
@@ -0,0 +1,67 @@
+"""
+Request Profiling Endpoints for MEWAYZ V2
+Admin access to captured profiles: every worker's when they share a profile directory, else this worker's
+"""
+
+import time
+from typing import Any
+
+from fastapi import APIRouter, Depends, HTTPException
+
+import models
+from api import deps
+from core.config import settings
+from core.profiling import PROFILE_HEADER, get_request_profiler, sign_profile_token
+
+router = APIRouter()
+
+
+@router.post("/token")
+async def create_profile_token(
+    *,
+    ttl_seconds: int = settings.PROFILING_TOKEN_TTL_SECONDS,
+    current_user: models.User = Depends(deps.get_current_active_superuser),
+) -> Any:
+    """
+    Sign an X-Profile header value; requests sent with it are profiled until it expires.
+    """
+    expires_at = int(time.time()) + min(ttl_seconds, settings.PROFILING_TOKEN_TTL_SECONDS)
+    return {"header": PROFILE_HEADER, "value": sign_profile_token(expires_at), "expires_at": expires_at}
+
+
+@router.get("/")
+async def list_profiles(
+    *,
+    limit: int = 50,
+    current_user: models.User = Depends(deps.get_current_active_superuser),
+) -> Any:
+    """
+    Most recent profiles, newest first.
+    """
+    return {"success": True, "profiles": get_request_profiler().recent(limit)}
+
+
+@router.get("/{profile_id}")
+async def read_profile(
+    *,
+    profile_id: str,
+    current_user: models.User = Depends(deps.get_current_active_superuser),
+) -> Any:
+    """
+    One profile with its call tree and MongoDB commands.
+    """
+    profile = get_request_profiler().get(profile_id)
+    if profile is None:
+        raise HTTPException(status_code=404, detail="Profile not found")
+    return {"success": True, "profile": profile}
+
+
+@router.delete("/")
+async def clear_profiles(
+    *,
+    current_user: models.User = Depends(deps.get_current_active_superuser),
+) -> Any:
+    """
+    Delete the stored profiles and empty this worker's buffer.
+    """
+    return {"success": True, "cleared": get_request_profiler().clear()}
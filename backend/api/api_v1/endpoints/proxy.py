@@ -1,10 +1,11 @@
 from typing import Any
 from pydantic import AnyHttpUrl
-from fastapi import APIRouter, Depends, HTTPException, Request, Response
+from fastapi import APIRouter, Depends, HTTPException, Request
 import httpx
 
 import models
 from api import deps
+from core.proxy_client import ProxyResponseTooLarge, ProxyStreamingResponse, get_proxy_client
 
 
 router = APIRouter()
@@ -12,9 +13,31 @@ router = APIRouter()
 """
 A proxy for the frontend client when hitting cors issues with axios requests. Adjust as required. This version has
 a user-login dependency to reduce the risk of leaking the server as a random proxy.
+
+Both directions stream through the shared pooled client from `core.proxy_client`, so a proxied call
+reuses an open upstream connection and never holds a whole body in memory. A response whose Content-Length is over
+PROXY_MAX_RESPONSE_BYTES is refused with a 502 before anything is sent; one without a Content-Length that grows past
+the cap can only be cut off mid-stream, so the client sees an aborted response rather than a status code.
 """
 
 
+async def _relay(method: str, path: AnyHttpUrl, request: Request, headers: dict) -> ProxyStreamingResponse:
+    try:
+        upstream = await get_proxy_client().open(
+            method,
+            f"{path}",
+            headers={k: v for k, v in headers.items() if v is not None},
+            content=request.stream() if method == "POST" else None,
+        )
+    except ProxyResponseTooLarge as e:
+        raise HTTPException(status_code=502, detail=str(e))
+    except httpx.TimeoutException as e:
+        raise HTTPException(status_code=504, detail=str(e) or "Upstream timed out")
+    except Exception as e:
+        raise HTTPException(status_code=403, detail=str(e))
+    return ProxyStreamingResponse(upstream)
+
+
 @router.post("/{path:path}")
 async def proxy_post_request(
     *,
@@ -26,18 +49,12 @@ async def proxy_post_request(
     # https://www.python-httpx.org/quickstart/
     # https://github.com/tiangolo/fastapi/issues/1788#issuecomment-698698884
     # https://fastapi.tiangolo.com/tutorial/path-params/#__code_13
-    try:
-        data = await request.json()
-        headers = {
-            "Content-Type": request.headers.get("Content-Type"),
-            "Authorization": request.headers.get("Authorization"),
-        }
-        async with httpx.AsyncClient() as client:
-            proxy = await client.post(f"{path}", headers=headers, data=data)
-        response = Response(content=proxy.content, status_code=proxy.status_code)
-        return response
-    except Exception as e:
-        raise HTTPException(status_code=403, detail=str(e))
+    headers = {
+        "Content-Type": request.headers.get("Content-Type"),
+        "Content-Length": request.headers.get("Content-Length"),
+        "Authorization": request.headers.get("Authorization"),
+    }
+    return await _relay("POST", path, request, headers)
 
 
 @router.get("/{path:path}")
@@ -47,14 +64,8 @@ async def proxy_get_request(
     request: Request,
     current_user: models.User = Depends(deps.get_current_active_user),
 ) -> Any:
-    try:
-        headers = {
-            "Content-Type": request.headers.get("Content-Type", "application/x-www-form-urlencoded"),
-            "Authorization": request.headers.get("Authorization"),
-        }
-        async with httpx.AsyncClient() as client:
-            proxy = await client.get(f"{path}", headers=headers)
-        response = Response(content=proxy.content, status_code=proxy.status_code)
-        return response
-    except Exception as e:
-        raise HTTPException(status_code=403, detail=str(e))
+    headers = {
+        "Content-Type": request.headers.get("Content-Type", "application/x-www-form-urlencoded"),
+        "Authorization": request.headers.get("Authorization"),
+    }
+    return await _relay("GET", path, request, headers)
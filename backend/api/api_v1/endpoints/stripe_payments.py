@@ -7,12 +7,18 @@ from pydantic import BaseModel
 from typing import List, Optional
 import stripe
 import os
-from api.deps import get_current_user
+import logging
+from api.deps import get_current_user, get_current_active_superuser
+from core.stripe_gateway import get_stripe_gateway
+from services.stripe_price_catalog_service import get_stripe_price_catalog_service
 
 # Configure Stripe
 stripe.api_key = os.getenv('STRIPE_SECRET_KEY')
+stripe_gateway = get_stripe_gateway()
+price_catalog = get_stripe_price_catalog_service()
 
 router = APIRouter()
+logger = logging.getLogger(__name__)
 
 class SubscriptionRequest(BaseModel):
     payment_method_id: str
@@ -33,44 +39,21 @@ async def create_subscription(
 ):
     """Create a Stripe subscription for selected bundles"""
     try:
-        # Bundle pricing (in cents) - Updated to match MEWAYZ V2 Smart Launch Strategy
-        bundle_prices = {
-            'free_starter': {'monthly': 0, 'yearly': 0},         # Free forever
-            'creator': {'monthly': 1900, 'yearly': 19000},       # $19/month, $190/year
-            'ecommerce': {'monthly': 2400, 'yearly': 24000},     # $24/month, $240/year
-            'social_media': {'monthly': 2900, 'yearly': 29000},  # $29/month, $290/year
-            'education': {'monthly': 2900, 'yearly': 29000},     # $29/month, $290/year
-            'business': {'monthly': 3900, 'yearly': 39000},      # $39/month, $390/year
-            'operations': {'monthly': 2400, 'yearly': 24000}     # $24/month, $240/year
-        }
-
-        # Calculate total amount
-        total_amount = 0
-        for bundle_id in request.bundles:
-            if bundle_id in bundle_prices:
-                total_amount += bundle_prices[bundle_id][request.payment_interval]
-
-        # Apply multi-bundle discount
-        bundle_count = len(request.bundles)
-        discount_rate = 0
-        if bundle_count >= 4:
-            discount_rate = 0.40  # 40% discount
-        elif bundle_count == 3:
-            discount_rate = 0.30  # 30% discount
-        elif bundle_count == 2:
-            discount_rate = 0.20  # 20% discount
-
-        discounted_amount = int(total_amount * (1 - discount_rate))
+        # Bundle pricing and multi-bundle discount from the shared price catalog
+        pricing = price_catalog.calculate_pricing(request.bundles, request.payment_interval)
+        discount_rate = pricing['discount_rate']
+        discounted_amount = pricing['discounted_amount']
 
         # Create or retrieve customer
         try:
             # Try to find existing customer by email
-            customers = stripe.Customer.list(email=request.customer_info['email'], limit=1)
+            customers = await stripe_gateway.request("Customer.list", email=request.customer_info['email'], limit=1)
             if customers.data:
                 customer = customers.data[0]
             else:
                 # Create new customer
-                customer = stripe.Customer.create(
+                customer = await stripe_gateway.request(
+                    "Customer.create",
                     email=request.customer_info['email'],
                     name=request.customer_info.get('name', ''),
                     metadata={
@@ -83,13 +66,15 @@ async def create_subscription(
 
         # Attach payment method to customer and save for future use
         try:
-            stripe.PaymentMethod.attach(
+            await stripe_gateway.request(
+                "PaymentMethod.attach",
                 request.payment_method_id,
                 customer=customer.id,
             )
             
             # Set this as the default payment method for the customer
-            stripe.Customer.modify(
+            await stripe_gateway.request(
+                "Customer.modify",
                 customer.id,
                 invoice_settings={
                     'default_payment_method': request.payment_method_id,
@@ -98,33 +83,19 @@ async def create_subscription(
         except Exception as e:
             raise HTTPException(status_code=400, detail=f"Payment method attachment failed: {str(e)}")
 
-        # Create price object for the subscription
+        # Reuse the catalog price for the subscription
         try:
-            price = stripe.Price.create(
-                currency='usd',
-                unit_amount=discounted_amount,
-                recurring={
-                    'interval': 'month' if request.payment_interval == 'monthly' else 'year'
-                },
-                product_data={
-                    'name': f"MEWAYZ V2 - {', '.join([bundle.title() for bundle in request.bundles])} Bundle(s)"
-                },
-                metadata={
-                    'bundles': ','.join(request.bundles),
-                    'original_amount': str(total_amount),
-                    'discount_rate': str(discount_rate),
-                    'bundle_count': str(bundle_count)
-                }
-            )
+            price = await price_catalog.get_price_id(request.bundles, request.payment_interval)
         except Exception as e:
             raise HTTPException(status_code=400, detail=f"Price creation failed: {str(e)}")
 
         # Create subscription
         try:
-            subscription = stripe.Subscription.create(
+            subscription = await stripe_gateway.request(
+                "Subscription.create",
                 customer=customer.id,
                 items=[{
-                    'price': price.id,
+                    'price': price['price_id'],
                 }],
                 default_payment_method=request.payment_method_id,
                 expand=['latest_invoice.payment_intent'],
@@ -186,7 +157,8 @@ async def create_payment_intent(
 ):
     """Create a one-time payment intent"""
     try:
-        intent = stripe.PaymentIntent.create(
+        intent = await stripe_gateway.request(
+            "PaymentIntent.create",
             amount=request.amount,
             currency=request.currency,
             payment_method=request.payment_method_id,
@@ -217,7 +189,7 @@ async def get_subscription_status(
 ):
     """Get the status of a subscription"""
     try:
-        subscription = stripe.Subscription.retrieve(subscription_id)
+        subscription = await stripe_gateway.request("Subscription.retrieve", subscription_id)
         return {
             'subscription_id': subscription.id,
             'status': subscription.status,
@@ -235,7 +207,8 @@ async def cancel_subscription(
 ):
     """Cancel a subscription"""
     try:
-        subscription = stripe.Subscription.modify(
+        subscription = await stripe_gateway.request(
+            "Subscription.modify",
             subscription_id,
             cancel_at_period_end=True
         )
@@ -253,7 +226,8 @@ async def get_customer_payment_methods(current_user=Depends(get_current_user)):
     """Get all saved payment methods for the current user"""
     try:
         # Find customer by email
-        customers = stripe.Customer.list(
+        customers = await stripe_gateway.request(
+            "Customer.list",
             email=current_user.email,
             limit=1
         )
@@ -262,7 +236,8 @@ async def get_customer_payment_methods(current_user=Depends(get_current_user)):
             return {'payment_methods': []}
         
         customer = customers.data[0]
-        payment_methods = stripe.PaymentMethod.list(
+        payment_methods = await stripe_gateway.request(
+            "PaymentMethod.list",
             customer=customer.id,
             type="card"
         )
@@ -296,54 +271,25 @@ async def create_subscription_with_saved_card(
         bundles = request.get('bundles', [])
         payment_interval = request.get('payment_interval', 'monthly')
         
-        # Bundle pricing (in cents) - Updated to match MEWAYZ V2 Smart Launch Strategy
-        bundle_prices = {
-            'free_starter': {'monthly': 0, 'yearly': 0},         # Free forever
-            'creator': {'monthly': 1900, 'yearly': 19000},       # $19/month, $190/year
-            'ecommerce': {'monthly': 2400, 'yearly': 24000},     # $24/month, $240/year
-            'social_media': {'monthly': 2900, 'yearly': 29000},  # $29/month, $290/year
-            'education': {'monthly': 2900, 'yearly': 29000},     # $29/month, $290/year
-            'business': {'monthly': 3900, 'yearly': 39000},      # $39/month, $390/year
-            'operations': {'monthly': 2400, 'yearly': 24000}     # $24/month, $240/year
-        }
-
-        # Calculate total amount with discount
-        total_amount = sum(bundle_prices[bundle_id][payment_interval] 
-                          for bundle_id in bundles if bundle_id in bundle_prices)
-        
-        bundle_count = len(bundles)
-        discount_rate = 0
-        if bundle_count >= 4:
-            discount_rate = 0.40
-        elif bundle_count == 3:
-            discount_rate = 0.30
-        elif bundle_count == 2:
-            discount_rate = 0.20
-
-        discounted_amount = int(total_amount * (1 - discount_rate))
+        # Bundle pricing and multi-bundle discount from the shared price catalog
+        pricing = price_catalog.calculate_pricing(bundles, payment_interval)
+        discount_rate = pricing['discount_rate']
+        discounted_amount = pricing['discounted_amount']
 
         # Find customer by email
-        customers = stripe.Customer.list(email=current_user.email, limit=1)
+        customers = await stripe_gateway.request("Customer.list", email=current_user.email, limit=1)
         if not customers.data:
             raise HTTPException(status_code=400, detail="No customer found for this user")
         
         customer = customers.data[0]
 
-        # Create price and subscription
-        price = stripe.Price.create(
-            currency='usd',
-            unit_amount=discounted_amount,
-            recurring={
-                'interval': 'month' if payment_interval == 'monthly' else 'year'
-            },
-            product_data={
-                'name': f"MEWAYZ V2 - {', '.join([bundle.title() for bundle in bundles])} Bundle(s)"
-            }
-        )
+        # Reuse the catalog price and create the subscription
+        price = await price_catalog.get_price_id(bundles, payment_interval)
 
-        subscription = stripe.Subscription.create(
+        subscription = await stripe_gateway.request(
+            "Subscription.create",
             customer=customer.id,
-            items=[{'price': price.id}],
+            items=[{'price': price['price_id']}],
             default_payment_method=payment_method_id,
             expand=['latest_invoice.payment_intent'],
             metadata={
@@ -385,12 +331,13 @@ async def save_card_and_customer(
     try:
         # Create or retrieve customer
         try:
-            customers = stripe.Customer.list(email=request.customer_info['email'], limit=1)
+            customers = await stripe_gateway.request("Customer.list", email=request.customer_info['email'], limit=1)
             if customers.data:
                 customer = customers.data[0]
-                print(f"Found existing customer: {customer.id}")
+                logger.info(f"Found existing customer: {customer.id}")
             else:
-                customer = stripe.Customer.create(
+                customer = await stripe_gateway.request(
+                    "Customer.create",
                     email=request.customer_info['email'],
                     name=request.customer_info.get('name', ''),
                     metadata={
@@ -398,55 +345,35 @@ async def save_card_and_customer(
                         'bundles': ','.join(request.bundles)
                     }
                 )
-                print(f"Created new customer: {customer.id}")
+                logger.info(f"Created new customer: {customer.id}")
         except Exception as e:
             raise HTTPException(status_code=400, detail=f"Customer creation failed: {str(e)}")
 
         # Attach payment method to customer
         try:
-            stripe.PaymentMethod.attach(
+            await stripe_gateway.request(
+                "PaymentMethod.attach",
                 request.payment_method_id,
                 customer=customer.id,
             )
             
             # Set as default payment method
-            stripe.Customer.modify(
+            await stripe_gateway.request(
+                "Customer.modify",
                 customer.id,
                 invoice_settings={
                     'default_payment_method': request.payment_method_id,
                 }
             )
-            print(f"Payment method {request.payment_method_id} attached to customer {customer.id}")
+            logger.info(f"Payment method {request.payment_method_id} attached to customer {customer.id}")
         except Exception as e:
             raise HTTPException(status_code=400, detail=f"Payment method attachment failed: {str(e)}")
 
-        # Calculate pricing
-        bundle_prices = {
-            'free_starter': {'monthly': 0, 'yearly': 0},         # Free forever
-            'creator': {'monthly': 1900, 'yearly': 19000},
-            'ecommerce': {'monthly': 2400, 'yearly': 24000},
-            'social_media': {'monthly': 2900, 'yearly': 29000},
-            'education': {'monthly': 2900, 'yearly': 29000},
-            'business': {'monthly': 3900, 'yearly': 39000},
-            'operations': {'monthly': 2400, 'yearly': 24000}
-        }
-
-        total_amount = 0
-        for bundle_id in request.bundles:
-            if bundle_id in bundle_prices:
-                total_amount += bundle_prices[bundle_id][request.payment_interval]
-
-        # Apply multi-bundle discount
-        bundle_count = len(request.bundles)
-        discount_rate = 0
-        if bundle_count >= 4:
-            discount_rate = 0.40
-        elif bundle_count == 3:
-            discount_rate = 0.30
-        elif bundle_count == 2:
-            discount_rate = 0.20
-
-        discounted_amount = int(total_amount * (1 - discount_rate))
+        # Bundle pricing and multi-bundle discount from the shared price catalog
+        pricing = price_catalog.calculate_pricing(request.bundles, request.payment_interval)
+        total_amount = pricing['total_amount']
+        discount_rate = pricing['discount_rate']
+        discounted_amount = pricing['discounted_amount']
 
         # Return saved payment info for step 2
         return {
@@ -476,73 +403,37 @@ async def process_saved_payment(
         # Parse saved payment ID
         customer_id, payment_method_id = request.saved_payment_id.split(':')
         
-        print(f"Processing payment for customer: {customer_id}, payment method: {payment_method_id}")
+        logger.info(f"Processing payment for customer: {customer_id}, payment method: {payment_method_id}")
         
         # Get customer info (already exists from Step 1)
-        customer = stripe.Customer.retrieve(customer_id)
-        print(f"Retrieved customer: {customer.email}")
+        customer = await stripe_gateway.request("Customer.retrieve", customer_id)
+        logger.info(f"Retrieved customer: {customer.email}")
         
         # Extract bundle info from customer metadata
         bundles = customer.metadata.get('bundles', '').split(',')
-        print(f"Bundles from metadata: {bundles}")
+        logger.info(f"Bundles from metadata: {bundles}")
         
-        # Calculate pricing (same logic as step 1)
-        bundle_prices = {
-            'free_starter': {'monthly': 0, 'yearly': 0},         # Free forever
-            'creator': {'monthly': 1900, 'yearly': 19000},
-            'ecommerce': {'monthly': 2400, 'yearly': 24000},
-            'social_media': {'monthly': 2900, 'yearly': 29000},
-            'education': {'monthly': 2900, 'yearly': 29000},
-            'business': {'monthly': 3900, 'yearly': 39000},
-            'operations': {'monthly': 2400, 'yearly': 24000}
-        }
-
-        total_amount = 0
         payment_interval = 'monthly'  # Default, could be stored in metadata
-        for bundle_id in bundles:
-            if bundle_id in bundle_prices:
-                total_amount += bundle_prices[bundle_id][payment_interval]
-
-        bundle_count = len(bundles)
-        discount_rate = 0
-        if bundle_count >= 4:
-            discount_rate = 0.40
-        elif bundle_count == 3:
-            discount_rate = 0.30
-        elif bundle_count == 2:
-            discount_rate = 0.20
-
-        discounted_amount = int(total_amount * (1 - discount_rate))
-        print(f"Calculated amount: ${discounted_amount/100:.2f} (discount: {discount_rate*100}%)")
-
-        # Create price object
+        # Bundle pricing and multi-bundle discount from the shared price catalog
+        pricing = price_catalog.calculate_pricing(bundles, payment_interval)
+        discount_rate = pricing['discount_rate']
+        discounted_amount = pricing['discounted_amount']
+        logger.info(f"Calculated amount: ${discounted_amount/100:.2f} (discount: {discount_rate*100}%)")
+
+        # Reuse the catalog price for this bundle set
         try:
-            price = stripe.Price.create(
-                currency='usd',
-                unit_amount=discounted_amount,
-                recurring={
-                    'interval': 'month' if payment_interval == 'monthly' else 'year'
-                },
-                product_data={
-                    'name': f"MEWAYZ V2 - {', '.join([bundle.title() for bundle in bundles])} Bundle(s)"
-                },
-                metadata={
-                    'bundles': ','.join(bundles),
-                    'original_amount': str(total_amount),
-                    'discount_rate': str(discount_rate),
-                    'bundle_count': str(bundle_count)
-                }
-            )
-            print(f"Created price: {price.id}")
+            price = await price_catalog.get_price_id(bundles, payment_interval)
+            logger.info(f"Using price: {price['price_id']} (cached: {price['cached']})")
         except Exception as e:
             raise HTTPException(status_code=400, detail=f"Price creation failed: {str(e)}")
 
         # Create subscription using the ALREADY SAVED payment method
         try:
-            subscription = stripe.Subscription.create(
+            subscription = await stripe_gateway.request(
+                "Subscription.create",
                 customer=customer_id,
                 items=[{
-                    'price': price.id,
+                    'price': price['price_id'],
                 }],
                 default_payment_method=payment_method_id,  # Use the already saved payment method
                 expand=['latest_invoice.payment_intent'],
@@ -552,17 +443,16 @@ async def process_saved_payment(
                     'payment_interval': payment_interval
                 }
             )
-            print(f"Created subscription: {subscription.id} using saved payment method")
+            logger.info(f"Created subscription: {subscription.id} using saved payment method")
         except Exception as e:
             raise HTTPException(status_code=400, detail=f"Subscription creation failed: {str(e)}")
 
         # Check payment status
-        print(f"Subscription status: {subscription.status}")
-        print(f"Subscription ID: {subscription.id}")
+        logger.info(f"Subscription {subscription.id} status: {subscription.status}")
         
         # Check if subscription is active (most common case for successful payments)
         if subscription.status == 'active':
-            print("✅ Subscription is active - payment successful!")
+            logger.info("Subscription is active - payment successful!")
             return {
                 'subscription_id': subscription.id,
                 'status': 'success',
@@ -577,7 +467,7 @@ async def process_saved_payment(
             latest_invoice = subscription.latest_invoice
             if hasattr(latest_invoice, 'payment_intent') and latest_invoice.payment_intent:
                 payment_intent = latest_invoice.payment_intent
-                print(f"Payment intent status: {payment_intent.status}")
+                logger.info(f"Payment intent status: {payment_intent.status}")
                 
                 if payment_intent.status == 'requires_action':
                     return {
@@ -588,7 +478,7 @@ async def process_saved_payment(
                         'status': 'requires_action'
                     }
                 elif payment_intent.status == 'succeeded':
-                    print("✅ Payment intent succeeded!")
+                    logger.info("Payment intent succeeded!")
                     return {
                         'subscription_id': subscription.id,
                         'status': 'success',
@@ -598,7 +488,7 @@ async def process_saved_payment(
                         'bundles': bundles
                     }
                 else:
-                    print(f"Unexpected payment intent status: {payment_intent.status}")
+                    logger.warning(f"Unexpected payment intent status: {payment_intent.status}")
                     # Still return success if subscription is created
                     return {
                         'subscription_id': subscription.id,
@@ -610,7 +500,7 @@ async def process_saved_payment(
                         'note': f'Subscription created but payment_intent status is {payment_intent.status}'
                     }
             else:
-                print("No payment_intent found, but subscription created successfully")
+                logger.info("No payment_intent found, but subscription created successfully")
                 return {
                     'subscription_id': subscription.id,
                     'status': 'success',
@@ -620,7 +510,7 @@ async def process_saved_payment(
                     'bundles': bundles
                 }
         except Exception as payment_intent_error:
-            print(f"Error accessing payment_intent: {payment_intent_error}")
+            logger.warning(f"Error accessing payment_intent: {payment_intent_error}")
             # If we can't access payment_intent but subscription was created, still return success
             return {
                 'subscription_id': subscription.id,
@@ -635,10 +525,10 @@ async def process_saved_payment(
     except HTTPException:
         raise
     except stripe.error.StripeError as e:
-        print(f"Stripe error: {str(e)}")
+        logger.error(f"Stripe error: {str(e)}")
         raise HTTPException(status_code=400, detail=f"Stripe error: {str(e)}")
     except Exception as e:
-        print(f"Payment processing error: {str(e)}")
+        logger.error(f"Payment processing error: {str(e)}")
         raise HTTPException(status_code=500, detail=f"Payment processing failed: {str(e)}")
 
 @router.post("/create-customer-portal-session")
@@ -649,7 +539,8 @@ async def create_customer_portal_session(
     """Create a customer portal session for subscription management"""
     try:
         # Find customer by email
-        customers = stripe.Customer.list(
+        customers = await stripe_gateway.request(
+            "Customer.list",
             email=current_user.email,
             limit=1
         )
@@ -660,7 +551,8 @@ async def create_customer_portal_session(
         customer = customers.data[0]
         
         # Create portal session
-        session = stripe.billing_portal.Session.create(
+        session = await stripe_gateway.request(
+            "billing_portal.Session.create",
             customer=customer.id,
             return_url=return_url,
         )
@@ -677,7 +569,8 @@ async def get_customer_subscriptions(current_user=Depends(get_current_user)):
     """Get all subscriptions for the current user"""
     try:
         # Find customer by email
-        customers = stripe.Customer.list(
+        customers = await stripe_gateway.request(
+            "Customer.list",
             email=current_user.email,
             limit=1
         )
@@ -686,7 +579,8 @@ async def get_customer_subscriptions(current_user=Depends(get_current_user)):
             return {'subscriptions': []}
         
         customer = customers.data[0]
-        subscriptions = stripe.Subscription.list(
+        subscriptions = await stripe_gateway.request(
+            "Subscription.list",
             customer=customer.id,
             status='all'
         )
@@ -704,4 +598,9 @@ async def get_customer_subscriptions(current_user=Depends(get_current_user)):
             ]
         }
     except Exception as e:
-        raise HTTPException(status_code=500, detail=f"Error fetching subscriptions: {str(e)}")
\ No newline at end of file
+        raise HTTPException(status_code=500, detail=f"Error fetching subscriptions: {str(e)}")
+
+@router.get("/gateway-metrics")
+async def get_gateway_metrics(current_user=Depends(get_current_active_superuser)):
+    """Per-operation Stripe call counts and latencies for this worker"""
+    return stripe_gateway.get_metrics()
@@ -9,6 +9,7 @@ import stripe
 import os
 import logging
 from api.deps import get_current_user
+from services.stripe_webhook_inbox_service import get_stripe_webhook_inbox_service
 
 # Configure Stripe
 stripe.api_key = os.getenv('STRIPE_SECRET_KEY')
@@ -22,7 +23,7 @@ async def stripe_webhook(
     request: Request,
     stripe_signature: Optional[str] = Header(None, alias="stripe-signature")
 ):
-    """Handle Stripe webhook events"""
+    """Verify a Stripe webhook and store it in the inbox for asynchronous processing"""
     try:
         payload = await request.body()
         
@@ -39,27 +40,14 @@ async def stripe_webhook(
         except stripe.error.SignatureVerificationError:
             raise HTTPException(status_code=400, detail="Invalid signature")
         
-        # Handle different event types
-        event_type = event['type']
-        data = event['data']['object']
+        # Persist the verified event and acknowledge; handlers run from the inbox queue
+        inbox = get_stripe_webhook_inbox_service()
+        queued = await inbox.enqueue(event.to_dict())
         
-        if event_type == 'customer.subscription.created':
-            await handle_subscription_created(data)
-        elif event_type == 'customer.subscription.updated':
-            await handle_subscription_updated(data)
-        elif event_type == 'customer.subscription.deleted':
-            await handle_subscription_deleted(data)
-        elif event_type == 'invoice.payment_succeeded':
-            await handle_payment_succeeded(data)
-        elif event_type == 'invoice.payment_failed':
-            await handle_payment_failed(data)
-        elif event_type == 'customer.subscription.trial_will_end':
-            await handle_trial_ending(data)
-        else:
-            logger.info(f"Unhandled event type: {event_type}")
-        
-        return {"status": "success"}
+        return {"status": "queued" if queued else "duplicate"}
         
+    except HTTPException:
+        raise
     except Exception as e:
         logger.error(f"Webhook error: {str(e)}")
         raise HTTPException(status_code=500, detail=str(e))
@@ -115,9 +103,41 @@ async def handle_payment_failed(invoice):
         # TODO: Implement grace period logic
         pass
 
+async def handle_payment_intent_succeeded(payment_intent):
+    """Record a template marketplace purchase; other payments carry no template metadata"""
+    metadata = payment_intent.get('metadata') or {}
+    if not metadata.get('template_id'):
+        return
+    
+    from services.template_sales_service import get_template_sales_service
+    # The payment intent id is the sale id, so a redelivered event records the sale once
+    result = await get_template_sales_service().record_sale({
+        "sale_id": payment_intent['id'],
+        "template_id": metadata['template_id'],
+        "seller_id": metadata.get('seller_id'),
+        "workspace_id": metadata.get('workspace_id'),
+        "buyer_id": metadata.get('buyer_id') or metadata.get('user_id'),
+        "amount": (payment_intent.get('amount_received') or payment_intent.get('amount') or 0) / 100,
+        "currency": (payment_intent.get('currency') or 'usd').upper()
+    })
+    if not result.get("success"):
+        raise RuntimeError(f"Template sale not recorded: {result.get('error')}")
+
 async def handle_trial_ending(subscription):
     """Handle trial period ending"""
     logger.info(f"Trial ending for subscription: {subscription['id']}")
     
     # TODO: Send trial ending notification
-    pass
\ No newline at end of file
+    pass
+
+
+# Handlers run by the webhook inbox, keyed by Stripe event type
+EVENT_HANDLERS = {
+    'customer.subscription.created': handle_subscription_created,
+    'customer.subscription.updated': handle_subscription_updated,
+    'customer.subscription.deleted': handle_subscription_deleted,
+    'invoice.payment_succeeded': handle_payment_succeeded,
+    'invoice.payment_failed': handle_payment_failed,
+    'payment_intent.succeeded': handle_payment_intent_succeeded,
+    'customer.subscription.trial_will_end': handle_trial_ending,
+}
@@ -10,37 +10,19 @@ from typing import List, Optional, Dict, Any
 from datetime import datetime
 
 from api.deps import get_current_user
-from core.bundle_manager import get_bundle_manager
-from services.complete_link_in_bio_service import get_complete_link_in_bio_service
-from services.complete_ecommerce_service import get_complete_ecommerce_service
-from services.crm_service import get_crm_service
-from services.form_service import get_form_service
-from services.template_service import get_template_service
-from services.marketing_service import get_marketing_service
+from core.services import get_service, service_dependency
 
 router = APIRouter(prefix="/api/bundle-services", tags=["Bundle Services"])
 
-# Get service dependencies
-def get_bio_link_service():
-    return get_complete_link_in_bio_service()
-
-def get_ecommerce_service():
-    return get_complete_ecommerce_service()
-
-def get_crm_service_dep():
-    return get_crm_service()
-
-def get_form_service_dep():
-    return get_form_service()
-
-def get_template_service_dep():
-    return get_template_service()
-
-def get_marketing_service_dep():
-    return get_marketing_service()
-
-def get_bundle_manager_dep():
-    return get_bundle_manager()
+# Service dependencies, imported and built on first request
+get_bio_link_service = service_dependency("complete_link_in_bio_service")
+get_ecommerce_service = service_dependency("complete_ecommerce_service")
+get_crm_service_dep = service_dependency("crm_service")
+get_form_service_dep = service_dependency("form_service")
+get_template_service_dep = service_dependency("template_service")
+get_template_sales_service_dep = service_dependency("template_sales_service")
+get_marketing_service_dep = service_dependency("marketing_service")
+get_bundle_manager_dep = service_dependency("bundle_manager")
 
 # Helper function to check bundle access
 async def check_bundle_access(user_id: str, service_name: str, bundle_manager):
@@ -223,6 +205,72 @@ async def get_bio_link(
             detail=f"Bio link retrieval failed: {str(e)}"
         )
 
+@router.get("/creator/templates", summary="Browse Template Marketplace")
+async def list_marketplace_templates(
+    category: Optional[str] = None,
+    limit: int = 24,
+    offset: int = 0,
+    current_user: dict = Depends(get_current_user),
+    template_service = Depends(get_template_service_dep)
+):
+    """Active marketplace templates, best sellers first"""
+    try:
+        result = await template_service.list_marketplace(category=category, limit=limit, offset=offset)
+        
+        if result.get("success"):
+            return JSONResponse(status_code=status.HTTP_200_OK, content=result)
+        else:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail=result.get("error", "Retrieval failed")
+            )
+            
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"Marketplace retrieval failed: {str(e)}"
+        )
+
+@router.get("/creator/templates/{template_id}", summary="Get Marketplace Template")
+async def get_marketplace_template(
+    template_id: str,
+    current_user: dict = Depends(get_current_user),
+    template_service = Depends(get_template_service_dep),
+    template_sales = Depends(get_template_sales_service_dep)
+):
+    """Get a marketplace template; views by anyone but the seller count toward its conversion rate"""
+    try:
+        result = await template_service.get_item(template_id)
+        
+        if not result.get("success"):
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND,
+                detail="Template not found"
+            )
+        
+        template = result.get("data", {})
+        seller_id = template.get("user_id")
+        if seller_id and seller_id != str(current_user.id):
+            await template_sales.record_view(template_id, seller_id, template.get("workspace_id"))
+        
+        return JSONResponse(
+            status_code=status.HTTP_200_OK,
+            content={
+                "success": True,
+                "data": template
+            }
+        )
+            
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"Template retrieval failed: {str(e)}"
+        )
+
 # =============================================================================
 # E-COMMERCE BUNDLE SERVICES  
 # =============================================================================
@@ -430,9 +478,9 @@ async def bundle_services_health():
         
         # Check each service
         services = [
-            ("bio_link", get_complete_link_in_bio_service()),
-            ("ecommerce", get_complete_ecommerce_service()),
-            ("crm", get_crm_service()),
+            ("bio_link", get_service("complete_link_in_bio_service")),
+            ("ecommerce", get_service("complete_ecommerce_service")),
+            ("crm", get_service("crm_service")),
         ]
         
         for service_name, service in services:
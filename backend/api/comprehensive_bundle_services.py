@@ -12,57 +12,6 @@ from datetime import datetime
 from api.deps import get_current_user
 from core.bundle_manager import get_bundle_manager
 
-# Import all merged services
-try:
-    from services.ai_content_generation_service import get_ai_content_generation_service
-except ImportError:
-    ai_content_generation_service = None
-    
-try:
-    from services.social_media_service import get_social_media_service
-except ImportError:
-    social_media_service = None
-
-try:
-    from services.email_marketing_service import get_email_marketing_service
-except ImportError:
-    email_marketing_service = None
-    
-try:
-    from services.booking_service import get_booking_service
-except ImportError:
-    booking_service = None
-
-try:
-    from services.analytics_service import get_analytics_service
-except ImportError:
-    analytics_service = None
-
-try:
-    from services.workflow_automation_service import get_workflow_automation_service
-except ImportError:
-    workflow_automation_service = None
-
-try:
-    from services.survey_service import get_survey_service
-except ImportError:
-    survey_service = None
-
-try:
-    from services.complete_course_community_service import get_complete_course_community_service
-except ImportError:
-    course_community_service = None
-
-try:
-    from services.complete_financial_service import get_complete_financial_service
-except ImportError:
-    financial_service = None
-
-try:
-    from services.multi_vendor_marketplace_service import get_multi_vendor_marketplace_service
-except ImportError:
-    marketplace_service = None
-
 router = APIRouter(prefix="/api/comprehensive-services", tags=["Comprehensive Bundle Services"])
 
 # Helper function for bundle access control
@@ -8,9 +8,17 @@ import logging
 from typing import Dict, List, Optional, Any
 from datetime import datetime, timedelta
 from enum import Enum
+from pymongo import ASCENDING, IndexModel
+from core.indexes import declare_indexes
 
 logger = logging.getLogger(__name__)
 
+declare_indexes(
+    "user_bundles",
+    IndexModel([("user_id", ASCENDING), ("status", ASCENDING), ("bundle_type", ASCENDING)]),
+    IndexModel([("status", ASCENDING), ("bundle_type", ASCENDING)]),
+)
+
 class BundleType(str, Enum):
     """Available bundle types"""
     FREE_STARTER = "free_starter"
@@ -28,7 +36,8 @@ class BundleManager:
     Handles bundle activation, permissions, pricing, and feature access
     """
     
-    # Bundle Configuration - Maps bundles to services and features
+    # Bundle Configuration - Maps bundles to services and features.
+    # These are the defaults; core.plan_catalog lays admin plan edits over them
     BUNDLE_CONFIGURATIONS = {
         BundleType.FREE_STARTER: {
             "name": "Free Starter",
@@ -242,14 +251,17 @@ class BundleManager:
     def get_bundle_configuration(self, bundle_type: BundleType) -> Dict[str, Any]:
         """Get configuration for a specific bundle"""
         try:
-            return self.BUNDLE_CONFIGURATIONS.get(bundle_type, {})
+            from core.plan_catalog import get_plan_catalog
+            return dict(get_plan_catalog().get(bundle_type) or {})
         except Exception as e:
             logger.error(f"Error getting bundle configuration: {e}")
             return {}
     
     def get_all_bundles(self) -> Dict[str, Any]:
         """Get all available bundle configurations"""
-        return self.BUNDLE_CONFIGURATIONS
+        from core.plan_catalog import get_plan_catalog
+        catalog = get_plan_catalog()
+        return {bundle_type: dict(catalog.get(bundle_type)) for bundle_type in self.BUNDLE_CONFIGURATIONS}
     
     def calculate_bundle_pricing(self, 
                                 bundles: List[BundleType], 
@@ -0,0 +1,127 @@
+"""
+Read-through caches for MEWAYZ V2
+Short-lived in-process snapshots of expensive reads, dropped when the collections behind them change
+"""
+
+import asyncio
+import logging
+import time
+from typing import Any, Awaitable, Callable, Dict, Iterable, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+
+class TTLCache:
+    """
+    Async get-or-load cache whose entries expire after ``ttl`` seconds.
+
+    Concurrent misses for one key share a single load. ``collections`` names the
+    collections the cached values are computed from; writers call ``collection_changed``
+    so the next read reloads instead of waiting for the TTL. A load that was running when
+    the cache was invalidated is returned to its callers but not stored. With ``max_entries``
+    set, storing past the cap first drops expired entries, then the oldest.
+    """
+
+    def __init__(self, name: str, ttl: float, collections: Iterable[str] = (), max_entries: Optional[int] = None):
+        self.name = name
+        self.ttl = ttl
+        self.collections = tuple(collections)
+        self.max_entries = max_entries
+        self._entries: Dict[Any, Tuple[float, Any]] = {}
+        self._loading: Dict[Any, asyncio.Future] = {}
+        self._generation = 0
+        self.hits = 0
+        self.misses = 0
+        self.invalidations = 0
+
+    async def get(self, key: Any, loader: Callable[[], Awaitable[Any]]) -> Any:
+        entry = self._entries.get(key)
+        if entry is not None and entry[0] > time.monotonic():
+            self.hits += 1
+            return entry[1]
+
+        self.misses += 1
+        loading = self._loading.get(key)
+        if loading is not None:
+            return await asyncio.shield(loading)
+
+        generation = self._generation
+        loading = self._loading[key] = asyncio.get_running_loop().create_future()
+        try:
+            value = await loader()
+        except asyncio.CancelledError:
+            loading.cancel()
+            raise
+        except BaseException as e:
+            loading.set_exception(e)
+            # Waiters re-raise it; mark it retrieved so an unshared failure is not logged twice
+            loading.exception()
+            raise
+        else:
+            loading.set_result(value)
+            if generation == self._generation:
+                self._store(key, value)
+            return value
+        finally:
+            self._loading.pop(key, None)
+
+    def _store(self, key: Any, value: Any) -> None:
+        now = time.monotonic()
+        self._entries.pop(key, None)
+        if self.max_entries is not None and len(self._entries) >= self.max_entries:
+            for stale in [k for k, (expires, _) in self._entries.items() if expires <= now]:
+                del self._entries[stale]
+            while len(self._entries) >= self.max_entries:
+                # Entries are kept in insertion order, so the first one is the oldest
+                del self._entries[next(iter(self._entries))]
+        self._entries[key] = (now + self.ttl, value)
+
+    def peek(self, key: Any) -> Optional[Any]:
+        """The cached value for ``key`` if present and fresh, without loading"""
+        entry = self._entries.get(key)
+        if entry is not None and entry[0] > time.monotonic():
+            return entry[1]
+        return None
+
+    def invalidate(self, key: Any = None) -> None:
+        """Drop ``key`` (every entry when omitted); in-flight loads are not stored"""
+        self._generation += 1
+        self.invalidations += 1
+        if key is None:
+            self._entries.clear()
+        else:
+            self._entries.pop(key, None)
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {
+            "name": self.name,
+            "entries": len(self._entries),
+            "hits": self.hits,
+            "misses": self.misses,
+            "invalidations": self.invalidations,
+            "ttl": self.ttl,
+        }
+
+
+# Cache registry, one cache per name
+_caches: Dict[str, TTLCache] = {}
+
+
+def get_cache(name: str, ttl: float, collections: Iterable[str] = (),
+              max_entries: Optional[int] = None) -> TTLCache:
+    """Get the shared cache called ``name``, creating it on first use"""
+    cache = _caches.get(name)
+    if cache is None:
+        cache = _caches[name] = TTLCache(name, ttl, collections, max_entries)
+    return cache
+
+
+def collection_changed(collection_name: str) -> None:
+    """Invalidate every cache computed from ``collection_name``; call after writes to it"""
+    for cache in _caches.values():
+        if collection_name in cache.collections:
+            cache.invalidate()
+
+
+def cache_stats() -> Dict[str, Dict[str, Any]]:
+    return {name: cache.get_stats() for name, cache in _caches.items()}
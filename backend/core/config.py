@@ -89,6 +89,88 @@ class Settings(BaseSettings):
             return "mongodb://localhost:27017"  # Default fallback
         return v
 
+    # Stripe Settings
+    STRIPE_API_BASE: str | None = os.environ.get("STRIPE_API_BASE")
+    STRIPE_TIMEOUT_SECONDS: float = 30.0
+    STRIPE_MAX_NETWORK_RETRIES: int = 2
+    STRIPE_POOL_SIZE: int = 16
+
+    # Proxy Settings
+    PROXY_HTTP2: bool = True
+    PROXY_MAX_CONNECTIONS: int = 100
+    PROXY_MAX_KEEPALIVE_CONNECTIONS: int = 20
+    PROXY_KEEPALIVE_EXPIRY: float = 30.0
+    PROXY_PER_HOST_LIMIT: int = 10
+    PROXY_CONNECT_TIMEOUT: float = 5.0
+    PROXY_READ_TIMEOUT: float = 30.0
+    PROXY_MAX_RESPONSE_BYTES: int = 10 * 1024 * 1024
+
+    # Index Settings
+    # One worker at a time loads every declaring module and reconciles indexes; the lease is
+    # released when it finishes and expires after this long if the worker dies first
+    INDEX_RECONCILE_LEASE_SECONDS: int = 600
+
+    # Query Fan-out Settings
+    FANOUT_CONCURRENCY: int = 8
+    FANOUT_TIMEOUT_SECONDS: float = 10.0
+
+    # Cache Settings
+    BUNDLE_COUNTS_TTL_SECONDS: float = 30.0
+    PLAN_CATALOG_POLL_SECONDS: float = 5.0
+
+    # Metering Settings
+    METERING_FLUSH_SECONDS: float = 2.0
+    METERING_RETENTION_DAYS: int = 400
+    WORKSPACE_PLAN_TTL_SECONDS: float = 30.0
+
+    # Fee Ledger Settings
+    FEE_LEDGER_FLUSH_SECONDS: float = 1.0
+    FEE_LEDGER_BATCH_SIZE: int = 500
+    FEE_LEDGER_SWEEP_SECONDS: float = 300.0  # lines not rolled up this long after their flush are swept
+    FEE_LEDGER_REPOST_HOURS: float = 24.0  # escrow records re-posted to the ledger at startup
+    FEE_TIER_TTL_SECONDS: float = 300.0
+
+    # Payout Settings
+    PAYOUT_CONCURRENCY: int = 8
+    PAYOUT_RATE_PER_SECOND: float = 25.0  # Stripe allows 100 writes/s in live mode; leave room for checkouts
+    PAYOUT_CHECKPOINT_EVERY: int = 50
+
+    # Forecasting Settings
+    REVENUE_PROJECTION_MONTHS: int = 12
+    REVENUE_PROJECTION_METHOD: str = "trend"
+    REVENUE_PROJECTION_LEVEL: float = 0.8
+
+    # Metrics Settings
+    METRICS_ENABLED: bool = True
+    # /metrics shows per-route latency, per-collection MongoDB operations and cache stats.
+    # Scrapers send "Authorization: Bearer <METRICS_TOKEN>"; outside development the
+    # endpoint is refused while no token is set
+    METRICS_TOKEN: str | None = os.environ.get("METRICS_TOKEN")
+    METRICS_REQUIRE_TOKEN: bool = os.environ.get("ENVIRONMENT", "development") != "development"
+    # Shared by all uvicorn workers of one deploy; empty it before starting them
+    METRICS_MULTIPROC_DIR: str | None = os.environ.get("METRICS_MULTIPROC_DIR")
+    METRICS_FLUSH_SECONDS: float = 5.0
+
+    # Profiling Settings
+    PROFILING_ENABLED: bool = True
+    PROFILING_SAMPLE_RATE: float = float(os.environ.get("PROFILING_SAMPLE_RATE", "0"))
+    PROFILING_BUFFER_SIZE: int = 50
+    PROFILING_INTERVAL_SECONDS: float = 0.005
+    PROFILING_EXPLAIN_LIMIT: int = 10
+    PROFILING_TOKEN_TTL_SECONDS: int = 900
+
+    # Logging Settings
+    LOG_LEVEL: str = os.environ.get("LOG_LEVEL", "INFO")
+    LOG_FORMAT: str = os.environ.get("LOG_FORMAT", "json")  # "json" or "text"
+    LOG_FILE: str | None = os.environ.get("LOG_FILE", "mewayz.log")
+    # Worker processes of one deploy (uvicorn reads the same variable); with more than one,
+    # or with METRICS_MULTIPROC_DIR set, each worker writes and rotates LOG_FILE under its pid
+    LOG_WORKERS: int = int(os.environ.get("WEB_CONCURRENCY", "1"))
+    LOG_FILE_MAX_BYTES: int = 50 * 1024 * 1024
+    LOG_FILE_BACKUPS: int = 5
+    # Share of request-scoped INFO/DEBUG records kept; warnings and errors are always kept
+    LOG_INFO_SAMPLE_RATE: float = float(os.environ.get("LOG_INFO_SAMPLE_RATE", "1.0"))
+
     # Email Settings
     SMTP_TLS: bool = True
     SMTP_PORT: int = 587
@@ -107,6 +189,7 @@ class Settings(BaseSettings):
 
     EMAIL_RESET_TOKEN_EXPIRE_HOURS: int = 48
     EMAIL_TEMPLATES_DIR: str = "/app/backend/email-templates/build"
+    EMAIL_TEMPLATES_AUTO_RELOAD: bool = os.environ.get("ENVIRONMENT", "development") != "production"
     EMAILS_ENABLED: bool = False
 
     @field_validator("EMAILS_ENABLED", mode="before")
@@ -31,7 +31,11 @@ def get_database():
     try:
         if _sync_client is None:
             mongo_url = get_mongo_url()
-            _sync_client = MongoClient(mongo_url)
+            from core.metrics import mongo_event_listeners
+            from core.profiling import profiling_event_listeners
+            _sync_client = MongoClient(
+                mongo_url, event_listeners=mongo_event_listeners() + profiling_event_listeners()
+            )
         
         if _sync_db is None:
             db_name = get_database_name()
@@ -42,14 +46,18 @@ def get_database():
         logger.error(f"Error getting sync database: {e}")
         return None
 
-async def get_database_async():
-    """Get asynchronous database connection"""
+def get_motor_database():
+    """Get the asynchronous (Motor) database handle; the client connects on first use"""
     global _async_client, _async_db
     
     try:
         if _async_client is None:
             mongo_url = get_mongo_url()
-            _async_client = AsyncIOMotorClient(mongo_url)
+            from core.metrics import mongo_event_listeners
+            from core.profiling import profiling_event_listeners
+            _async_client = AsyncIOMotorClient(
+                mongo_url, event_listeners=mongo_event_listeners() + profiling_event_listeners()
+            )
         
         if _async_db is None:
             db_name = get_database_name()
@@ -60,6 +68,10 @@ async def get_database_async():
         logger.error(f"Error getting async database: {e}")
         return None
 
+async def get_database_async():
+    """Get asynchronous database connection"""
+    return get_motor_database()
+
 async def close_database_connections():
     """Close database connections"""
     global _async_client, _sync_client, _async_db, _sync_db
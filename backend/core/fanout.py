@@ -0,0 +1,114 @@
+"""
+Concurrent query fan-out for MEWAYZ V2
+Run a request's independent queries together under one concurrency cap and one deadline
+"""
+
+import asyncio
+import logging
+import time
+from typing import Any, Awaitable, Callable, Dict, Iterable, Optional
+
+from core.config import settings
+from core.metrics import get_metrics_registry
+
+logger = logging.getLogger(__name__)
+
+FANOUT_SECONDS = get_metrics_registry().histogram(
+    "fanout_duration_seconds", "Wall time of one request's fanned-out queries", ("label",))
+FANOUT_RUNS = get_metrics_registry().counter(
+    "fanout_runs_total", "Fan-out groups run", ("label", "outcome"))
+
+
+class FanOutTimeout(asyncio.TimeoutError):
+    """The shared deadline passed before every subquery finished"""
+
+    def __init__(self, label: str, pending: Iterable[str], timeout: float):
+        self.pending = sorted(pending)
+        super().__init__(f"{label or 'fan-out'} exceeded {timeout}s waiting for {', '.join(self.pending)}")
+
+
+class FanOutResult(dict):
+    """Subquery results by name, with per-subquery wall time in ``timings`` (milliseconds)"""
+
+    def __init__(self, values: Dict[str, Any], timings: Dict[str, float], elapsed_ms: float):
+        super().__init__(values)
+        self.timings = timings
+        self.elapsed_ms = elapsed_ms
+
+
+class FanOut:
+    """
+    Structured concurrency for independent queries of one request.
+
+    Subqueries are added as callables and only started once a slot is free, so at most
+    ``concurrency`` of them hit the database at a time. ``run`` waits for all of them
+    within one shared ``timeout``; the first failure (or the deadline) cancels whatever is
+    still running, and the failure is re-raised to the caller.
+    """
+
+    def __init__(self, concurrency: Optional[int] = None, timeout: Optional[float] = None, label: str = ""):
+        self.concurrency = concurrency or settings.FANOUT_CONCURRENCY
+        self.timeout = timeout if timeout is not None else settings.FANOUT_TIMEOUT_SECONDS
+        self.label = label
+        self.timings: Dict[str, float] = {}
+        self._calls: Dict[str, Callable[[], Awaitable[Any]]] = {}
+
+    def add(self, name: str, func: Callable[..., Awaitable[Any]], *args: Any, **kwargs: Any) -> "FanOut":
+        if name in self._calls:
+            raise ValueError(f"Duplicate subquery name: {name}")
+        self._calls[name] = lambda: func(*args, **kwargs)
+        return self
+
+    async def _timed(self, name: str, slots: asyncio.Semaphore) -> Any:
+        async with slots:
+            start = time.perf_counter()
+            try:
+                return await self._calls[name]()
+            finally:
+                self.timings[name] = (time.perf_counter() - start) * 1000
+
+    async def run(self) -> FanOutResult:
+        if not self._calls:
+            return FanOutResult({}, {}, 0.0)
+        start = time.perf_counter()
+        slots = asyncio.Semaphore(self.concurrency)
+        tasks = {asyncio.ensure_future(self._timed(name, slots)): name for name in self._calls}
+        pending = set(tasks)
+        outcome = "error"
+        try:
+            done, pending = await asyncio.wait(tasks, timeout=self.timeout or None,
+                                               return_when=asyncio.FIRST_EXCEPTION)
+            for task in done:
+                if task.exception() is not None:
+                    raise task.exception()
+            if pending:
+                outcome = "timeout"
+                raise FanOutTimeout(self.label, (tasks[task] for task in pending), self.timeout)
+            outcome = "ok"
+        finally:
+            for task in pending:
+                task.cancel()
+            if pending:
+                await asyncio.gather(*pending, return_exceptions=True)
+            FANOUT_SECONDS.observe(time.perf_counter() - start, self.label)
+            FANOUT_RUNS.inc(1, self.label, outcome)
+
+        elapsed_ms = (time.perf_counter() - start) * 1000
+        logger.debug(
+            f"{self.label or 'fan-out'} finished in {elapsed_ms:.1f}ms: "
+            + ", ".join(f"{name}={ms:.1f}ms" for name, ms in sorted(self.timings.items()))
+        )
+        return FanOutResult({tasks[task]: task.result() for task in tasks}, dict(self.timings), elapsed_ms)
+
+
+async def fan_out(
+    calls: Dict[str, Callable[[], Awaitable[Any]]],
+    concurrency: Optional[int] = None,
+    timeout: Optional[float] = None,
+    label: str = "",
+) -> FanOutResult:
+    """Run ``calls`` (name -> zero-argument coroutine function) concurrently and return results by name"""
+    group = FanOut(concurrency=concurrency, timeout=timeout, label=label)
+    for name, call in calls.items():
+        group.add(name, call)
+    return await group.run()
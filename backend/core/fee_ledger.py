@@ -0,0 +1,349 @@
+"""
+Fee ledger for MEWAYZ V2
+Append-only double-entry journal of platform fees with batched writes and monthly rollups
+"""
+
+import asyncio
+import logging
+import time
+import uuid
+from collections import defaultdict
+from datetime import datetime, timedelta
+from typing import Any, Dict, List, Optional, Tuple
+
+from pymongo import ASCENDING, IndexModel, ReplaceOne, UpdateOne
+from pymongo.errors import BulkWriteError
+
+from core.config import settings
+from core.indexes import declare_indexes
+
+logger = logging.getLogger(__name__)
+
+LEDGER_COLLECTION = "fee_ledger"
+PERIOD_COLLECTION = "fee_ledger_periods"
+
+# Accounts, from the platform's point of view
+ESCROW_HELD = "escrow_held"  # buyer money the platform is holding
+SELLER_PAYABLE = "seller_payable"  # owed to the workspace once released
+FEES_RECEIVABLE = "fees_receivable"  # platform fee assessed but not yet collected
+FEE_REVENUE = "fee_revenue"  # platform fee collected
+
+DUPLICATE_KEY = 11000
+
+declare_indexes(
+    LEDGER_COLLECTION,
+    IndexModel([("workspace_id", ASCENDING), ("accounting_period", ASCENDING)]),
+    IndexModel([("transaction_id", ASCENDING)]),
+    # Only lines still waiting for their rollup are indexed, for the sweep
+    IndexModel([("rollup_batch", ASCENDING)], partialFilterExpression={"rolled_up": False}),
+)
+
+
+class UnbalancedJournal(ValueError):
+    """A journal's debits and credits differ"""
+
+
+def accounting_period(when: Optional[datetime] = None) -> str:
+    return (when or datetime.utcnow()).strftime("%Y-%m")
+
+
+def to_cents(amount: float) -> int:
+    return int(round(amount * 100))
+
+
+def fee_assessment(amount: float, platform_fee: float) -> List[Tuple[str, int, int]]:
+    """Lines for a new escrow payment: the buyer's money splits into the seller's share and the fee"""
+    gross, fee = to_cents(amount), to_cents(platform_fee)
+    return [(ESCROW_HELD, gross, 0), (SELLER_PAYABLE, 0, gross - fee), (FEES_RECEIVABLE, 0, fee)]
+
+
+def fee_collection(platform_fee: float) -> List[Tuple[str, int, int]]:
+    """Lines for collecting an assessed fee"""
+    fee = to_cents(platform_fee)
+    return [(FEES_RECEIVABLE, fee, 0), (FEE_REVENUE, 0, fee)]
+
+
+class FeeLedger:
+    """
+    Journal lines in ``fee_ledger``, never deleted and never changed apart from their
+    ``rolled_up`` flag: a status change is a new journal. Each journal has an idempotency key
+    (the transaction and event), and its lines are keyed ``<key>:<line>``, so posting the
+    same journal twice inserts nothing.
+
+    ``post`` queues lines in memory; ``flush`` writes them with one unordered
+    ``insert_many`` and then adds the lines that were actually inserted to the
+    per-(workspace, month) debit/credit totals in ``fee_ledger_periods``, so reports read
+    one rollup document instead of summing the journal. Each flush is a rollup batch that a
+    period document records while it is being applied, so applying it again adds nothing;
+    lines still not rolled up ``sweep_after`` seconds after their flush (the rollup failed or
+    the process died) are rolled up by ``sweep``. Journals still queued when a process dies
+    are lost; ``EscrowService.repost_fee_journals`` posts them again from the escrow records.
+    """
+
+    def __init__(self, db=None, flush_interval: Optional[float] = None, batch_size: Optional[int] = None,
+                 sweep_after: Optional[float] = None):
+        self.db = db
+        self.flush_interval = flush_interval if flush_interval is not None else settings.FEE_LEDGER_FLUSH_SECONDS
+        self.batch_size = batch_size if batch_size is not None else settings.FEE_LEDGER_BATCH_SIZE
+        self.sweep_after = sweep_after if sweep_after is not None else settings.FEE_LEDGER_SWEEP_SECONDS
+        self._pending: List[Dict[str, Any]] = []
+        self._pending_keys: set = set()
+        self._task: Optional[asyncio.Task] = None
+        self.journals = 0
+        self.duplicates = 0
+        self.flushes = 0
+        self.swept = 0
+
+    async def _database(self):
+        if self.db is None:
+            from core.database import get_database_async
+            self.db = await get_database_async()
+        return self.db
+
+    async def post(self, key: str, workspace_id: str, event: str, lines: List[Tuple[str, int, int]],
+                   transaction_id: Optional[str] = None, currency: str = "USD",
+                   occurred_at: Optional[datetime] = None) -> bool:
+        """Queue a balanced journal; False when ``key`` is already queued"""
+        if sum(debit for _, debit, _ in lines) != sum(credit for _, _, credit in lines):
+            raise UnbalancedJournal(f"Journal {key} does not balance")
+        if key in self._pending_keys:
+            self.duplicates += 1
+            return False
+
+        occurred_at = occurred_at or datetime.utcnow()
+        period = accounting_period(occurred_at)
+        for line, (account, debit, credit) in enumerate(lines):
+            self._pending.append({
+                "_id": f"{key}:{line}",
+                "journal": key,
+                "event": event,
+                "workspace_id": workspace_id,
+                "transaction_id": transaction_id,
+                "account": account,
+                "debit": debit,
+                "credit": credit,
+                "currency": currency,
+                "accounting_period": period,
+                "occurred_at": occurred_at,
+            })
+        self._pending_keys.add(key)
+        self.journals += 1
+        if len(self._pending) >= self.batch_size:
+            await self.flush()
+        return True
+
+    async def flush(self) -> int:
+        """Append every queued line; returns the number of lines inserted"""
+        if not self._pending:
+            return 0
+        lines, self._pending, self._pending_keys = self._pending, [], set()
+        batch, flushed_at = uuid.uuid4().hex, datetime.utcnow()
+        for line in lines:
+            line.update(rolled_up=False, rollup_batch=batch, flushed_at=flushed_at)
+        db = await self._database()
+        try:
+            await db[LEDGER_COLLECTION].insert_many(lines, ordered=False)
+            inserted = lines
+        except BulkWriteError as e:
+            errors = e.details.get("writeErrors", [])
+            failed = {error["index"] for error in errors}
+            retry = [lines[error["index"]] for error in errors if error["code"] != DUPLICATE_KEY]
+            self.duplicates += len(failed) - len(retry)
+            inserted = [line for index, line in enumerate(lines) if index not in failed]
+            self._requeue(retry)
+        except Exception:
+            # Safe to retry whole: lines that did land come back as duplicates
+            self._requeue(lines)
+            raise
+
+        if inserted:
+            await self._roll_up(db, batch, inserted)
+        self.flushes += 1
+        return len(inserted)
+
+    def _requeue(self, lines: List[Dict[str, Any]]) -> None:
+        self._pending.extend(lines)
+        self._pending_keys.update(line["journal"] for line in lines)
+
+    async def _roll_up(self, db, batch: str, lines: List[Dict[str, Any]]) -> None:
+        """Add one flush's lines to their periods, then mark them rolled up"""
+        totals: Dict[Tuple[str, str], Dict[str, int]] = defaultdict(lambda: defaultdict(int))
+        for line in lines:
+            fields = totals[(line["workspace_id"], line["accounting_period"])]
+            fields[f"accounts.{line['account']}.debit"] += line["debit"]
+            fields[f"accounts.{line['account']}.credit"] += line["credit"]
+            if line["_id"].endswith(":0"):
+                fields[f"journals.{line['event']}"] += 1
+        now = datetime.utcnow()
+        period_ids = [f"{workspace_id}|{period}" for workspace_id, period in totals]
+        try:
+            # A period that already lists the batch fails the filter, and its upsert then hits the _id
+            await db[PERIOD_COLLECTION].bulk_write([
+                UpdateOne(
+                    {"_id": period_id, "batches": {"$ne": batch}},
+                    {"$inc": dict(fields), "$set": {"updated_at": now}, "$push": {"batches": batch},
+                     "$setOnInsert": {"workspace_id": workspace_id, "accounting_period": period}},
+                    upsert=True,
+                )
+                for period_id, ((workspace_id, period), fields) in zip(period_ids, totals.items())
+            ], ordered=False)
+        except BulkWriteError as e:
+            if any(error["code"] != DUPLICATE_KEY for error in e.details.get("writeErrors", [])):
+                raise
+        await db[LEDGER_COLLECTION].update_many(
+            {"_id": {"$in": [line["_id"] for line in lines]}}, {"$set": {"rolled_up": True}}
+        )
+        await db[PERIOD_COLLECTION].update_many({"_id": {"$in": period_ids}}, {"$pull": {"batches": batch}})
+
+    async def sweep(self) -> int:
+        """Roll up lines whose flush inserted them but did not finish the rollup; returns the lines"""
+        db = await self._database()
+        cutoff = datetime.utcnow() - timedelta(seconds=self.sweep_after)
+        batches = await db[LEDGER_COLLECTION].distinct(
+            "rollup_batch", {"rolled_up": False, "flushed_at": {"$lt": cutoff}}
+        )
+        swept = 0
+        for batch in batches:
+            # Whole batches only: the periods record a batch as applied, not each line
+            lines = await db[LEDGER_COLLECTION].find({"rollup_batch": batch, "rolled_up": False}).to_list(length=None)
+            if lines:
+                await self._roll_up(db, batch, lines)
+                swept += len(lines)
+        if swept:
+            logger.warning(f"Fee ledger swept {swept} lines left out of their rollups")
+        self.swept += swept
+        return swept
+
+    async def get_period(self, workspace_id: str, period: Optional[str] = None) -> Dict[str, Any]:
+        """Account balances and fee totals for one month, from its rollup"""
+        period = period or accounting_period()
+        db = await self._database()
+        doc = await db[PERIOD_COLLECTION].find_one({"_id": f"{workspace_id}|{period}"})
+        return summarize_period(workspace_id, period, doc)
+
+    async def get_periods(self, workspace_id: str, limit: int = 12) -> List[Dict[str, Any]]:
+        """Most recent monthly rollups, newest first"""
+        db = await self._database()
+        docs = await db[PERIOD_COLLECTION].find({"workspace_id": workspace_id}) \
+            .sort("accounting_period", -1).limit(limit).to_list(length=limit)
+        return [summarize_period(workspace_id, doc["accounting_period"], doc) for doc in docs]
+
+    async def rebuild_periods(self, workspace_id: Optional[str] = None) -> int:
+        """Recompute rollups from the journal with a server-side ``$group``; returns the lines.
+
+        Every line counts, so lines waiting for the sweep are marked rolled up first. Flushes
+        that land while it runs can be counted twice; run it while posting is quiet.
+        """
+        db = await self._database()
+        match = {"workspace_id": workspace_id} if workspace_id else {}
+        started = datetime.utcnow()
+        await db[LEDGER_COLLECTION].update_many({**match, "rolled_up": False}, {"$set": {"rolled_up": True}})
+        rows = await db[LEDGER_COLLECTION].aggregate([
+            {"$match": match},
+            {"$group": {
+                "_id": {"workspace_id": "$workspace_id", "accounting_period": "$accounting_period",
+                        "account": "$account", "event": "$event"},
+                "debit": {"$sum": "$debit"},
+                "credit": {"$sum": "$credit"},
+                # The first line of each journal counts the journal
+                "journals": {"$sum": {"$cond": [{"$regexMatch": {"input": "$_id", "regex": ":0$"}}, 1, 0]}},
+                "lines": {"$sum": 1}
+            }}
+        ], allowDiskUse=True).to_list(length=None)
+
+        periods: Dict[str, Dict[str, Any]] = {}
+        for row in rows:
+            key = row["_id"]
+            period_id = f"{key['workspace_id']}|{key['accounting_period']}"
+            doc = periods.setdefault(period_id, {
+                "_id": period_id, "workspace_id": key["workspace_id"],
+                "accounting_period": key["accounting_period"], "accounts": {}, "journals": {},
+                "updated_at": started, "rebuilt_at": started,
+            })
+            sides = doc["accounts"].setdefault(key["account"], {"debit": 0, "credit": 0})
+            sides["debit"] += row["debit"]
+            sides["credit"] += row["credit"]
+            if row["journals"]:
+                doc["journals"][key["event"]] = doc["journals"].get(key["event"], 0) + row["journals"]
+
+        if periods:
+            await db[PERIOD_COLLECTION].bulk_write(
+                [ReplaceOne({"_id": period_id}, doc, upsert=True) for period_id, doc in periods.items()],
+                ordered=False,
+            )
+        # Periods with no lines left
+        await db[PERIOD_COLLECTION].delete_many({**match, "rebuilt_at": {"$ne": started}})
+        return sum(row["lines"] for row in rows)
+
+    def start(self) -> None:
+        if self._task is None:
+            self._task = asyncio.create_task(self._flush_loop())
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+        try:
+            await self.flush()
+        except Exception as e:
+            logger.error(f"Final fee ledger flush failed: {e}")
+
+    async def _flush_loop(self) -> None:
+        next_sweep = time.monotonic()
+        while True:
+            await asyncio.sleep(self.flush_interval)
+            try:
+                await self.flush()
+                if time.monotonic() >= next_sweep:
+                    next_sweep = time.monotonic() + self.sweep_after
+                    await self.sweep()
+            except Exception as e:
+                logger.error(f"Fee ledger flush error: {e}")
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {
+            "pending_lines": len(self._pending),
+            "journals": self.journals,
+            "duplicates": self.duplicates,
+            "flushes": self.flushes,
+            "swept": self.swept,
+        }
+
+
+def summarize_period(workspace_id: str, period: str, doc: Optional[Dict[str, Any]]) -> Dict[str, Any]:
+    """Balances (debit minus credit, in cents) per account, plus the fee figures reports show"""
+    accounts = (doc or {}).get("accounts", {})
+
+    def total(account: str, side: str) -> int:
+        return accounts.get(account, {}).get(side, 0)
+
+    return {
+        "workspace_id": workspace_id,
+        "accounting_period": period,
+        "balances": {account: sides.get("debit", 0) - sides.get("credit", 0) for account, sides in accounts.items()},
+        "gross_volume": total(ESCROW_HELD, "debit") / 100,
+        "fees_assessed": total(FEES_RECEIVABLE, "credit") / 100,
+        "fees_collected": total(FEE_REVENUE, "credit") / 100,
+        "net_to_sellers": total(SELLER_PAYABLE, "credit") / 100,
+        "journals": dict((doc or {}).get("journals", {})),
+    }
+
+
+# Ledger instance
+_ledger: Optional[FeeLedger] = None
+
+
+def get_fee_ledger() -> FeeLedger:
+    """Get ledger instance"""
+    global _ledger
+    if _ledger is None:
+        _ledger = FeeLedger()
+    return _ledger
+
+
+async def close_fee_ledger() -> None:
+    global _ledger
+    if _ledger is not None:
+        await _ledger.stop()
+        _ledger = None
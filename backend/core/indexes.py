@@ -0,0 +1,206 @@
+"""
+Index registry for MEWAYZ V2
+Modules declare the indexes their queries rely on; startup reconciles them with MongoDB
+"""
+
+import asyncio
+import importlib
+import logging
+import os
+import pkgutil
+import socket
+from datetime import datetime, timedelta
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from pymongo import IndexModel, ReturnDocument
+from pymongo.errors import DuplicateKeyError, OperationFailure
+
+logger = logging.getLogger(__name__)
+
+# collection name -> index name -> declaration
+_declared: Dict[str, Dict[str, IndexModel]] = {}
+_reconcile_task: Optional[asyncio.Task] = None
+_last_report: Dict[str, Dict[str, Any]] = {}
+
+# Modules that declare indexes at import time; loaded before reconciling because the
+# app itself imports services lazily
+DECLARING_PACKAGES = ["crud", "services"]
+DECLARING_MODULES = ["core.bundle_manager"]
+
+# Lease document that picks the one worker per deploy which loads and reconciles
+LEASE_COLLECTION = "schema_migrations"
+LEASE_ID = "indexes:reconcile"
+
+
+def declare_indexes(collection_name: str, *indexes: IndexModel) -> None:
+    """Register indexes for ``collection_name``; redeclaring an index name is a no-op"""
+    declared = _declared.setdefault(collection_name, {})
+    for index in indexes:
+        declared.setdefault(index.document["name"], index)
+
+
+def declared_indexes() -> Dict[str, List[IndexModel]]:
+    return {name: list(indexes.values()) for name, indexes in _declared.items()}
+
+
+def load_declarations() -> None:
+    """Import every declaring module so the registry is complete"""
+    backend_dir = Path(__file__).resolve().parent.parent
+    modules = list(DECLARING_MODULES)
+    for package in DECLARING_PACKAGES:
+        modules.extend(f"{package}.{info.name}" for info in pkgutil.iter_modules([str(backend_dir / package)]))
+    for module in modules:
+        try:
+            importlib.import_module(module)
+        except Exception as e:
+            logger.warning(f"Skipping {module}: {e}")
+
+
+def _key(pairs: Iterable[Tuple[str, Any]]) -> Tuple[Tuple[str, Any], ...]:
+    """Normalise a key spec so declared and server-reported text indexes compare equal"""
+    pairs = list(pairs)
+    if any(direction == "text" for _, direction in pairs):
+        prefix = [(field, direction) for field, direction in pairs if direction != "text"]
+        return tuple(prefix) + (("_fts", "text"), ("_ftsx", 1))
+    return tuple((field, int(direction) if isinstance(direction, float) else direction)
+                 for field, direction in pairs)
+
+
+async def _index_usage(collection) -> Dict[str, Dict[str, Any]]:
+    try:
+        stats = await collection.aggregate([{"$indexStats": {}}]).to_list(length=None)
+    except OperationFailure as e:
+        logger.debug(f"$indexStats unavailable for {collection.name}: {e}")
+        return {}
+    return {row["name"]: row.get("accesses", {}) for row in stats}
+
+
+async def diff_indexes(db, collections: Optional[Iterable[str]] = None) -> Dict[str, Dict[str, Any]]:
+    """Compare declared indexes with what exists.
+
+    Per collection: ``missing`` declared indexes that do not exist yet, ``undeclared``
+    existing indexes no module declares, and ``unused`` existing indexes with zero
+    accesses since ``$indexStats`` started counting.
+    """
+    report: Dict[str, Dict[str, Any]] = {}
+    for collection_name in sorted(collections or _declared):
+        declared = _declared.get(collection_name, {})
+        collection = db[collection_name]
+        existing = await collection.index_information()
+        existing_keys = {_key(info["key"]): name for name, info in existing.items()}
+
+        missing = [
+            name for name, index in declared.items()
+            if name not in existing and _key(index.document["key"].items()) not in existing_keys
+        ]
+        declared_keys = {_key(index.document["key"].items()) for index in declared.values()}
+        undeclared = [
+            name for name, info in existing.items()
+            if name != "_id_" and name not in declared and _key(info["key"]) not in declared_keys
+        ]
+        usage = await _index_usage(collection) if existing else {}
+        unused = [
+            {"name": name, "since": accesses.get("since")}
+            for name, accesses in sorted(usage.items())
+            if name != "_id_" and accesses.get("ops", 0) == 0
+        ]
+        report[collection_name] = {"missing": missing, "undeclared": undeclared, "unused": unused}
+    return report
+
+
+async def reconcile_indexes(db, create: bool = True) -> Dict[str, Dict[str, Any]]:
+    """Create missing declared indexes and return the diff taken before creating them"""
+    report = await diff_indexes(db)
+    if not create:
+        return report
+    for collection_name, diff in report.items():
+        if not diff["missing"]:
+            continue
+        models = [_declared[collection_name][name] for name in diff["missing"]]
+        try:
+            created = await db[collection_name].create_indexes(models)
+            logger.info(f"Created indexes on {collection_name}: {', '.join(created)}")
+        except Exception as e:
+            diff["error"] = str(e)
+            logger.error(f"Index creation failed for {collection_name}: {e}")
+    return report
+
+
+def _lease_owner() -> str:
+    return f"{socket.gethostname()}:{os.getpid()}"
+
+
+async def _claim_reconciliation(db, lease_seconds: int) -> bool:
+    """Take the reconciliation lease unless another worker holds it"""
+    now = datetime.utcnow()
+    try:
+        lease = await db[LEASE_COLLECTION].find_one_and_update(
+            {"_id": LEASE_ID, "expires_at": {"$lte": now}},
+            {"$set": {"owner": _lease_owner(), "started_at": now,
+                      "expires_at": now + timedelta(seconds=lease_seconds)}},
+            upsert=True,
+            return_document=ReturnDocument.AFTER,
+        )
+    except DuplicateKeyError:
+        return False
+    return lease is not None
+
+
+async def _release_reconciliation(db) -> None:
+    """Expire the lease once reconciliation is over, so the next deploy reconciles right away"""
+    try:
+        await db[LEASE_COLLECTION].update_one(
+            {"_id": LEASE_ID, "owner": _lease_owner()},
+            {"$set": {"expires_at": datetime.utcnow(), "finished_at": datetime.utcnow()}},
+        )
+    except Exception as e:
+        logger.error(f"Index reconciliation lease release failed: {e}")
+
+
+async def _reconcile_in_background(db, lease_seconds: int) -> None:
+    try:
+        # Loading the declarations imports every crud and service module, so only the
+        # worker holding the lease pays for it; the others keep their lazy imports
+        if not await _claim_reconciliation(db, lease_seconds):
+            logger.info("Index reconciliation is running in another worker")
+            return
+    except Exception as e:
+        logger.error(f"Index reconciliation failed: {e}")
+        return
+    try:
+        await asyncio.to_thread(load_declarations)
+        report = await reconcile_indexes(db)
+    except Exception as e:
+        logger.error(f"Index reconciliation failed: {e}")
+        return
+    finally:
+        await _release_reconciliation(db)
+    _last_report.clear()
+    _last_report.update(report)
+    for collection_name, diff in report.items():
+        if diff["unused"]:
+            names = ", ".join(entry["name"] for entry in diff["unused"])
+            logger.info(f"Unused indexes on {collection_name}: {names}")
+        if diff["undeclared"]:
+            logger.info(f"Undeclared indexes on {collection_name}: {', '.join(diff['undeclared'])}")
+
+
+def index_stats() -> Dict[str, Dict[str, int]]:
+    """Missing, undeclared and unused index counts per collection from the last reconciliation"""
+    return {
+        collection_name: {state: len(diff[state]) for state in ("missing", "undeclared", "unused")}
+        for collection_name, diff in _last_report.items()
+    }
+
+
+def start_index_reconciliation(db, lease_seconds: int = 600) -> asyncio.Task:
+    """Reconcile in a background task so startup does not wait on index builds.
+
+    Workers that start while another worker holds the lease skip it. The lease is released
+    when reconciliation ends and expires after ``lease_seconds`` if its worker dies;
+    ``scripts/index_diff.py --apply`` reconciles on demand without the lease.
+    """
+    global _reconcile_task
+    _reconcile_task = asyncio.create_task(_reconcile_in_background(db, lease_seconds))
+    return _reconcile_task
@@ -0,0 +1,276 @@
+"""
+Usage metering for MEWAYZ V2
+Per-workspace usage counters per billing period: atomic quota reservations and batched hot counters
+"""
+
+import asyncio
+import logging
+from collections import defaultdict
+from datetime import datetime, timedelta
+from typing import Any, Dict, Iterable, Optional, Tuple
+
+from pymongo import ASCENDING, IndexModel, ReturnDocument, UpdateOne
+from pymongo.errors import DuplicateKeyError
+
+from core.config import settings
+from core.indexes import declare_indexes
+from core.plan_catalog import get_plan_catalog
+
+logger = logging.getLogger(__name__)
+
+USAGE_COLLECTION = "usage_counters"
+
+# Metered quantities and the plan limit keys that cap them, in order of preference.
+# BundleManager names some limits differently from the admin plan template.
+METRIC_LIMIT_KEYS = {
+    "ai_credits": ("ai_credits", "ai_content_generation"),
+    "websites": ("websites", "websites_created"),
+    "emails_sent": ("emails_per_month", "emails_sent"),
+    "storage_gb": ("storage_gb",),
+    "instagram_searches": ("instagram_leads", "instagram_searches"),
+    "courses": ("courses", "courses_created"),
+}
+
+declare_indexes(
+    USAGE_COLLECTION,
+    IndexModel([("workspace_id", ASCENDING), ("period", ASCENDING)]),
+    # Counters for past periods are dropped once their retention runs out
+    IndexModel([("expires_at", ASCENDING)], expireAfterSeconds=0),
+)
+
+
+class QuotaExceeded(Exception):
+    """A reservation would take a workspace past its limit for the period"""
+
+    def __init__(self, workspace_id: str, metric: str, limit: int, used: Optional[int], requested: int):
+        self.workspace_id = workspace_id
+        self.metric = metric
+        self.limit = limit
+        self.used = used
+        self.requested = requested
+        super().__init__(f"{metric} quota exceeded for workspace {workspace_id}: limit {limit}, requested {requested}")
+
+
+def billing_period(now: Optional[datetime] = None, anchor: Optional[datetime] = None) -> Tuple[str, datetime, datetime]:
+    """Key, start and end of the monthly period containing ``now``.
+
+    Periods start on the ``anchor`` day of month (the subscription start), or on the 1st.
+    A new period gets a new counter document, which is how usage resets.
+    """
+    now = now or datetime.utcnow()
+    day = anchor.day if anchor else 1
+
+    def start_of(year: int, month: int) -> datetime:
+        # Anchors past the end of a short month fall back to its last day
+        last_day = (datetime(year + month // 12, month % 12 + 1, 1) - timedelta(days=1)).day
+        return datetime(year, month, min(day, last_day))
+
+    start = start_of(now.year, now.month)
+    if start > now:
+        year, month = (now.year - 1, 12) if now.month == 1 else (now.year, now.month - 1)
+        start = start_of(year, month)
+    end = start_of(start.year + start.month // 12, start.month % 12 + 1)
+    return start.strftime("%Y-%m-%d"), start, end
+
+
+def plan_limit(bundles: Iterable[str], metric: str) -> Optional[int]:
+    """Largest limit for ``metric`` across ``bundles``; None means unlimited.
+
+    A plan without the limit key allows none of it, unless it includes every feature.
+    """
+    catalog = get_plan_catalog()
+    keys = METRIC_LIMIT_KEYS.get(metric, (metric,))
+    best = 0
+    for bundle in bundles:
+        entry = catalog.get(bundle)
+        if entry is None:
+            continue
+        if catalog.has_feature(bundle, "all"):
+            return None
+        limits = entry["limitations"]
+        value = next((limits[key] for key in keys if key in limits), 0)
+        if value == "unlimited" or value is None:
+            return None
+        best = max(best, int(value))
+    return best
+
+
+def counter_id(workspace_id: str, metric: str, period: str) -> str:
+    return f"{workspace_id}|{metric}|{period}"
+
+
+class UsageMeter:
+    """
+    Usage counters in ``usage_counters``, one document per (workspace, metric, period).
+
+    ``reserve`` enforces a limit with a single conditional ``$inc`` upsert, so concurrent
+    requests on any number of workers can never take a counter past its limit. ``record``
+    only counts: increments are summed in memory and written every ``flush_interval``
+    seconds as one unordered bulk write, for hot paths that meter without enforcing.
+    """
+
+    def __init__(self, db=None, flush_interval: Optional[float] = None, retention_days: Optional[int] = None):
+        self.db = db
+        self.flush_interval = flush_interval if flush_interval is not None else settings.METERING_FLUSH_SECONDS
+        self.retention = timedelta(days=retention_days if retention_days is not None
+                                   else settings.METERING_RETENTION_DAYS)
+        self._pending: Dict[Tuple[str, str, str], int] = defaultdict(int)
+        self._period_ends: Dict[str, datetime] = {}
+        self._task: Optional[asyncio.Task] = None
+        self.reservations = 0
+        self.rejections = 0
+        self.flushes = 0
+
+    async def _collection(self):
+        if self.db is None:
+            from core.database import get_database_async
+            self.db = await get_database_async()
+        return self.db[USAGE_COLLECTION]
+
+    def _insert_fields(self, workspace_id: str, metric: str, period: str, end: datetime) -> Dict[str, Any]:
+        return {"workspace_id": workspace_id, "metric": metric, "period": period,
+                "period_end": end, "expires_at": end + self.retention}
+
+    async def reserve(self, workspace_id: str, metric: str, amount: int = 1, limit: Optional[int] = None,
+                      anchor: Optional[datetime] = None) -> Dict[str, Any]:
+        """Add ``amount`` to this period's usage, or raise QuotaExceeded if that passes ``limit``"""
+        if amount <= 0:
+            raise ValueError(f"Reservation amount must be positive, got {amount}")
+        period, _, end = billing_period(anchor=anchor)
+        collection = await self._collection()
+        query: Dict[str, Any] = {"_id": counter_id(workspace_id, metric, period)}
+        if limit is not None:
+            if amount > limit:
+                self.rejections += 1
+                raise QuotaExceeded(workspace_id, metric, limit, None, amount)
+            query["used"] = {"$lte": limit - amount}
+        update = {"$inc": {"used": amount},
+                  "$set": {"limit": limit, "updated_at": datetime.utcnow()},
+                  "$setOnInsert": self._insert_fields(workspace_id, metric, period, end)}
+        try:
+            doc = await collection.find_one_and_update(query, update, upsert=True,
+                                                       return_document=ReturnDocument.AFTER)
+        except DuplicateKeyError:
+            # Either the counter is too close to the limit, or a concurrent first reservation
+            # inserted it between our match and insert. It exists now, so the same conditional
+            # update without upsert tells the two apart.
+            doc = await collection.find_one_and_update(query, update, return_document=ReturnDocument.AFTER)
+        if doc is None:
+            self.rejections += 1
+            current = await collection.find_one({"_id": query["_id"]}, {"used": 1})
+            raise QuotaExceeded(workspace_id, metric, limit, (current or {}).get("used"), amount)
+        self.reservations += 1
+        used = doc["used"]
+        return {"metric": metric, "period": period, "used": used, "limit": limit,
+                "remaining": None if limit is None else max(limit - used, 0)}
+
+    async def release(self, workspace_id: str, metric: str, amount: int = 1,
+                      anchor: Optional[datetime] = None) -> None:
+        """Give back a reservation whose operation failed"""
+        if amount <= 0:
+            raise ValueError(f"Release amount must be positive, got {amount}")
+        period, _, _ = billing_period(anchor=anchor)
+        collection = await self._collection()
+        await collection.update_one({"_id": counter_id(workspace_id, metric, period)},
+                                    {"$inc": {"used": -amount}})
+
+    def record(self, workspace_id: str, metric: str, amount: int = 1, anchor: Optional[datetime] = None) -> None:
+        """Count usage without enforcing a limit; written on the next flush"""
+        period, _, end = billing_period(anchor=anchor)
+        self._pending[(workspace_id, metric, period)] += amount
+        self._period_ends[period] = end
+
+    async def flush(self) -> int:
+        """Write every pending increment in one bulk write; returns the number of counters touched"""
+        if not self._pending:
+            return 0
+        pending, self._pending = self._pending, defaultdict(int)
+        now = datetime.utcnow()
+        requests = [
+            UpdateOne(
+                {"_id": counter_id(workspace_id, metric, period)},
+                {"$inc": {"used": amount}, "$set": {"updated_at": now},
+                 "$setOnInsert": self._insert_fields(workspace_id, metric, period, self._period_ends[period])},
+                upsert=True,
+            )
+            for (workspace_id, metric, period), amount in pending.items() if amount
+        ]
+        try:
+            collection = await self._collection()
+            if requests:
+                await collection.bulk_write(requests, ordered=False)
+        except Exception:
+            # Put the increments back so the next flush retries them
+            for key, amount in pending.items():
+                self._pending[key] += amount
+            raise
+        self.flushes += 1
+        return len(requests)
+
+    async def get_usage(self, workspace_id: str, metric: str, anchor: Optional[datetime] = None) -> int:
+        """This period's usage: one ``_id`` lookup plus increments not yet flushed"""
+        period, _, _ = billing_period(anchor=anchor)
+        collection = await self._collection()
+        doc = await collection.find_one({"_id": counter_id(workspace_id, metric, period)}, {"used": 1})
+        return (doc or {}).get("used", 0) + self._pending.get((workspace_id, metric, period), 0)
+
+    async def get_period_usage(self, workspace_id: str, anchor: Optional[datetime] = None) -> Dict[str, int]:
+        """Every metric's usage for the workspace in this period"""
+        period, _, _ = billing_period(anchor=anchor)
+        collection = await self._collection()
+        docs = await collection.find({"workspace_id": workspace_id, "period": period},
+                                     {"metric": 1, "used": 1}).to_list(length=None)
+        usage = {doc["metric"]: doc.get("used", 0) for doc in docs}
+        for (pending_workspace, metric, pending_period), amount in self._pending.items():
+            if pending_workspace == workspace_id and pending_period == period:
+                usage[metric] = usage.get(metric, 0) + amount
+        return usage
+
+    def start(self) -> None:
+        if self._task is None:
+            self._task = asyncio.create_task(self._flush_loop())
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+        try:
+            await self.flush()
+        except Exception as e:
+            logger.error(f"Final usage flush failed: {e}")
+
+    async def _flush_loop(self) -> None:
+        while True:
+            await asyncio.sleep(self.flush_interval)
+            try:
+                await self.flush()
+            except Exception as e:
+                logger.error(f"Usage flush error: {e}")
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {
+            "pending_counters": len(self._pending),
+            "reservations": self.reservations,
+            "rejections": self.rejections,
+            "flushes": self.flushes,
+        }
+
+
+# Meter instance
+_meter: Optional[UsageMeter] = None
+
+
+def get_usage_meter() -> UsageMeter:
+    """Get meter instance"""
+    global _meter
+    if _meter is None:
+        _meter = UsageMeter()
+    return _meter
+
+
+async def close_usage_meter() -> None:
+    global _meter
+    if _meter is not None:
+        await _meter.stop()
+        _meter = None
@@ -0,0 +1,599 @@
+"""
+Metrics registry for MEWAYZ V2
+Prometheus-style counters, gauges and histograms for requests, MongoDB, caches and queues
+"""
+
+import asyncio
+import json
+import logging
+import math
+import os
+import threading
+import time
+from bisect import bisect_left
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple
+
+from pymongo import monitoring
+
+from core.config import settings
+
+logger = logging.getLogger(__name__)
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+# Seconds; covers a cache hit through a slow aggregation
+DEFAULT_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+Labels = Tuple[str, ...]
+
+
+class _Metric:
+    """
+    A metric family whose values live in one shard per thread.
+
+    Updates only touch the calling thread's shard, so the request path and the Motor
+    executor threads (where the MongoDB listeners run) never contend on a lock; the
+    shards are summed when the registry is scraped.
+    """
+
+    kind = ""
+
+    def __init__(self, name: str, documentation: str, labelnames: Iterable[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._local = threading.local()
+        self._shards: List[Dict[Labels, Any]] = []
+        self._shards_lock = threading.Lock()
+
+    def _shard(self) -> Dict[Labels, Any]:
+        try:
+            return self._local.values
+        except AttributeError:
+            values = self._local.values = {}
+            # Once per thread, not per update
+            with self._shards_lock:
+                self._shards.append(values)
+            return values
+
+    def _merged(self) -> Dict[Labels, Any]:
+        merged: Dict[Labels, Any] = {}
+        for shard in list(self._shards):
+            for labels, value in shard.copy().items():
+                merged[labels] = _add(merged.get(labels), value)
+        return merged
+
+    def collect(self) -> "MetricFamily":
+        family = MetricFamily(self.name, self.kind, self.documentation, self.labelnames)
+        family.samples = self._merged()
+        return family
+
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def inc(self, amount: float = 1.0, *labels: str) -> None:
+        shard = self._shard()
+        shard[labels] = shard.get(labels, 0.0) + amount
+
+
+class Gauge(_Metric):
+    """Up/down gauge such as requests in flight; point-in-time values come from collectors"""
+
+    kind = "gauge"
+
+    def inc(self, amount: float = 1.0, *labels: str) -> None:
+        shard = self._shard()
+        shard[labels] = shard.get(labels, 0.0) + amount
+
+    def dec(self, amount: float = 1.0, *labels: str) -> None:
+        shard = self._shard()
+        shard[labels] = shard.get(labels, 0.0) - amount
+
+
+class Histogram(_Metric):
+    kind = "histogram"
+
+    def __init__(self, name: str, documentation: str, labelnames: Iterable[str] = (),
+                 buckets: Iterable[float] = DEFAULT_BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets))
+
+    def observe(self, value: float, *labels: str) -> None:
+        shard = self._shard()
+        cell = shard.get(labels)
+        if cell is None:
+            # Per-bucket counts (the last one is +Inf), then sum and count
+            cell = shard[labels] = [0] * (len(self.buckets) + 1) + [0.0, 0]
+        cell[bisect_left(self.buckets, value)] += 1
+        cell[-2] += value
+        cell[-1] += 1
+
+    def collect(self) -> "MetricFamily":
+        family = super().collect()
+        family.buckets = self.buckets
+        return family
+
+
+class MetricFamily:
+    """Samples of one metric, as produced by a collector or a metric at scrape time"""
+
+    def __init__(self, name: str, kind: str, documentation: str, labelnames: Iterable[str] = ()):
+        self.name = name
+        self.kind = kind
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self.buckets: Tuple[float, ...] = ()
+        self.samples: Dict[Labels, Any] = {}
+
+    def add(self, value: Any, *labels: str) -> "MetricFamily":
+        self.samples[tuple(str(label) for label in labels)] = value
+        return self
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "type": self.kind,
+            "help": self.documentation,
+            "labels": list(self.labelnames),
+            "buckets": list(self.buckets),
+            "samples": [[list(labels), value] for labels, value in self.samples.items()],
+        }
+
+    @classmethod
+    def from_dict(cls, name: str, data: Dict[str, Any]) -> "MetricFamily":
+        family = cls(name, data["type"], data["help"], data["labels"])
+        family.buckets = tuple(data.get("buckets", ()))
+        family.samples = {tuple(labels): value for labels, value in data["samples"]}
+        return family
+
+
+def _add(current: Any, value: Any) -> Any:
+    if current is None:
+        return list(value) if isinstance(value, list) else value
+    if isinstance(value, list):
+        return [a + b for a, b in zip(current, value)]
+    return current + value
+
+
+def _format_value(value: float) -> str:
+    if value == math.inf:
+        return "+Inf"
+    if isinstance(value, float) and value.is_integer():
+        return str(int(value))
+    return repr(value)
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _label_text(names: Iterable[str], values: Iterable[str], extra: str = "") -> str:
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def render_text(families: Iterable[MetricFamily]) -> str:
+    """Prometheus text exposition format 0.0.4"""
+    lines: List[str] = []
+    for family in sorted(families, key=lambda f: f.name):
+        lines.append(f"# HELP {family.name} {_escape(family.documentation)}")
+        lines.append(f"# TYPE {family.name} {family.kind}")
+        for labels, value in sorted(family.samples.items()):
+            if family.kind == "histogram":
+                cumulative = 0
+                for bound, count in zip(family.buckets + (math.inf,), value):
+                    cumulative += count
+                    le = 'le="' + _format_value(bound) + '"'
+                    lines.append(f"{family.name}_bucket{_label_text(family.labelnames, labels, le)} {cumulative}")
+            if family.kind in ("histogram", "summary"):
+                label_text = _label_text(family.labelnames, labels)
+                lines.append(f"{family.name}_sum{label_text} {_format_value(value[-2])}")
+                lines.append(f"{family.name}_count{label_text} {_format_value(value[-1])}")
+            else:
+                lines.append(f"{family.name}{_label_text(family.labelnames, labels)} {_format_value(value)}")
+    return "\n".join(lines) + "\n"
+
+
+def _pid_alive(pid: int) -> bool:
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+
+def merge_snapshots(snapshots: Iterable[Tuple[bool, Dict[str, Dict[str, Any]]]]) -> List[MetricFamily]:
+    """Sum worker snapshots; gauges only count workers that are still running"""
+    merged: Dict[str, MetricFamily] = {}
+    for alive, snapshot in snapshots:
+        for name, data in snapshot.items():
+            if data["type"] == "gauge" and not alive:
+                continue
+            family = MetricFamily.from_dict(name, data)
+            target = merged.get(name)
+            if target is None:
+                merged[name] = family
+                continue
+            for labels, value in family.samples.items():
+                target.samples[labels] = _add(target.samples.get(labels), value)
+    return list(merged.values())
+
+
+class MetricsRegistry:
+    """
+    The metrics of one worker process plus collectors that read point-in-time stats
+    (cache sizes, queue depths) from the components that already keep them.
+
+    With ``multiproc_dir`` set (several uvicorn workers), each worker writes its
+    snapshot to ``<dir>/<pid>.json`` every ``flush_interval`` seconds and whenever it
+    serves a scrape, and a scrape merges every worker's file, so any worker can answer
+    for all of them. Counters of workers that have exited are kept; their gauges are not.
+    """
+
+    def __init__(self, multiproc_dir: Optional[str] = None, flush_interval: Optional[float] = None):
+        self.multiproc_dir = multiproc_dir
+        self.flush_interval = flush_interval if flush_interval is not None else settings.METRICS_FLUSH_SECONDS
+        self._metrics: Dict[str, _Metric] = {}
+        self._collectors: Dict[str, Callable[[], Iterable[MetricFamily]]] = {}
+        self._lock = threading.Lock()
+        self._task: Optional[asyncio.Task] = None
+
+    def _register(self, metric: _Metric) -> Any:
+        with self._lock:
+            existing = self._metrics.get(metric.name)
+            if existing is not None:
+                if type(existing) is not type(metric) or existing.labelnames != metric.labelnames:
+                    raise ValueError(f"Metric {metric.name} is already registered differently")
+                return existing
+            self._metrics[metric.name] = metric
+            return metric
+
+    def counter(self, name: str, documentation: str, labelnames: Iterable[str] = ()) -> Counter:
+        return self._register(Counter(name, documentation, labelnames))
+
+    def gauge(self, name: str, documentation: str, labelnames: Iterable[str] = ()) -> Gauge:
+        return self._register(Gauge(name, documentation, labelnames))
+
+    def histogram(self, name: str, documentation: str, labelnames: Iterable[str] = (),
+                  buckets: Iterable[float] = DEFAULT_BUCKETS) -> Histogram:
+        return self._register(Histogram(name, documentation, labelnames, buckets))
+
+    def register_collector(self, name: str, collector: Callable[[], Iterable[MetricFamily]]) -> None:
+        """Call ``collector`` at every scrape; registering a name again replaces it"""
+        self._collectors[name] = collector
+
+    def collect(self) -> List[MetricFamily]:
+        families = [metric.collect() for metric in list(self._metrics.values())]
+        for name, collector in list(self._collectors.items()):
+            try:
+                families.extend(collector())
+            except Exception as e:
+                logger.debug(f"Metrics collector {name} failed: {e}")
+        return families
+
+    def snapshot(self) -> Dict[str, Dict[str, Any]]:
+        return {family.name: family.to_dict() for family in self.collect()}
+
+    def _snapshot_path(self, pid: Optional[int] = None) -> str:
+        return os.path.join(self.multiproc_dir, f"{pid or os.getpid()}.json")
+
+    def write_snapshot(self, snapshot: Optional[Dict[str, Dict[str, Any]]] = None) -> None:
+        if not self.multiproc_dir:
+            return
+        os.makedirs(self.multiproc_dir, exist_ok=True)
+        path = self._snapshot_path()
+        tmp = f"{path}.tmp"
+        with open(tmp, "w") as f:
+            json.dump(snapshot if snapshot is not None else self.snapshot(), f)
+        # Readers see the old file or the new one, never half of one
+        os.replace(tmp, path)
+
+    def _read_snapshots(self) -> List[Tuple[bool, Dict[str, Dict[str, Any]]]]:
+        snapshots = []
+        for entry in os.scandir(self.multiproc_dir):
+            pid, ext = os.path.splitext(entry.name)
+            if ext != ".json" or not pid.isdigit():
+                continue
+            try:
+                with open(entry.path) as f:
+                    snapshots.append((_pid_alive(int(pid)), json.load(f)))
+            except (OSError, ValueError) as e:
+                logger.debug(f"Skipping metrics snapshot {entry.name}: {e}")
+        return snapshots
+
+    def _export(self, snapshot: Dict[str, Dict[str, Any]]) -> str:
+        if not self.multiproc_dir:
+            return render_text(MetricFamily.from_dict(name, data) for name, data in snapshot.items())
+        self.write_snapshot(snapshot)
+        return render_text(merge_snapshots(self._read_snapshots()))
+
+    def render(self) -> str:
+        return self._export(self.snapshot())
+
+    async def render_async(self) -> str:
+        """Collect on the loop, then read, merge and format the snapshots off it"""
+        return await asyncio.to_thread(self._export, self.snapshot())
+
+    def start(self) -> None:
+        if self.multiproc_dir and self._task is None:
+            self._task = asyncio.create_task(self._flush_loop())
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+        try:
+            self.write_snapshot()
+        except Exception as e:
+            logger.error(f"Final metrics snapshot failed: {e}")
+
+    async def _flush_loop(self) -> None:
+        while True:
+            await asyncio.sleep(self.flush_interval)
+            try:
+                await asyncio.to_thread(self.write_snapshot, self.snapshot())
+            except Exception as e:
+                logger.error(f"Metrics snapshot error: {e}")
+
+
+# MongoDB
+
+def _command_target(event: monitoring.CommandStartedEvent) -> str:
+    command = event.command
+    target = command.get("collection") if event.command_name == "getMore" else command.get(event.command_name)
+    return target if isinstance(target, str) else ""
+
+
+class MongoCommandMetrics(monitoring.CommandListener):
+    """Command latency and failures per collection and command name"""
+
+    def __init__(self, registry: "MetricsRegistry"):
+        self.duration = registry.histogram(
+            "mongodb_command_duration_seconds", "MongoDB command round trip time",
+            ("collection", "command"))
+        self.failures = registry.counter(
+            "mongodb_command_failures_total", "MongoDB commands that returned an error",
+            ("collection", "command"))
+        self._targets: Dict[Tuple[Any, int], str] = {}
+
+    def started(self, event: monitoring.CommandStartedEvent) -> None:
+        self._targets[(event.connection_id, event.request_id)] = _command_target(event)
+
+    def succeeded(self, event: monitoring.CommandSucceededEvent) -> None:
+        collection = self._targets.pop((event.connection_id, event.request_id), "")
+        self.duration.observe(event.duration_micros / 1e6, collection, event.command_name)
+
+    def failed(self, event: monitoring.CommandFailedEvent) -> None:
+        collection = self._targets.pop((event.connection_id, event.request_id), "")
+        self.duration.observe(event.duration_micros / 1e6, collection, event.command_name)
+        self.failures.inc(1, collection, event.command_name)
+
+
+class MongoPoolMetrics(monitoring.ConnectionPoolListener):
+    """Time spent waiting for a pooled connection, and connections in use"""
+
+    def __init__(self, registry: "MetricsRegistry"):
+        self.wait = registry.histogram(
+            "mongodb_pool_wait_seconds", "Time to check a connection out of the MongoDB pool",
+            ("outcome",))
+        self.checked_out = registry.gauge(
+            "mongodb_pool_checked_out", "MongoDB connections currently checked out")
+        self.created = registry.counter(
+            "mongodb_pool_connections_created_total", "MongoDB connections opened")
+        # Check-out runs start to finish on the calling thread
+        self._local = threading.local()
+
+    def connection_check_out_started(self, event) -> None:
+        self._local.started = time.perf_counter()
+
+    def _waited(self, outcome: str) -> None:
+        started = getattr(self._local, "started", None)
+        if started is not None:
+            self._local.started = None
+            self.wait.observe(time.perf_counter() - started, outcome)
+
+    def connection_checked_out(self, event) -> None:
+        self._waited("ok")
+        self.checked_out.inc()
+
+    def connection_check_out_failed(self, event) -> None:
+        self._waited(event.reason)
+
+    def connection_checked_in(self, event) -> None:
+        self.checked_out.dec()
+
+    def connection_created(self, event) -> None:
+        self.created.inc()
+
+    def pool_created(self, event) -> None:
+        pass
+
+    def pool_ready(self, event) -> None:
+        pass
+
+    def pool_cleared(self, event) -> None:
+        pass
+
+    def pool_closed(self, event) -> None:
+        pass
+
+    def connection_ready(self, event) -> None:
+        pass
+
+    def connection_closed(self, event) -> None:
+        pass
+
+
+def mongo_event_listeners() -> List[Any]:
+    """Listeners to pass to ``AsyncIOMotorClient(event_listeners=...)``"""
+    if not settings.METRICS_ENABLED:
+        return []
+    registry = get_metrics_registry()
+    return [MongoCommandMetrics(registry), MongoPoolMetrics(registry)]
+
+
+# Collectors for the stats components already keep; they read the singletons
+# without creating them, so a component that never started reports nothing
+
+def _collect_caches() -> Iterable[MetricFamily]:
+    from core.cache import cache_stats
+    entries = MetricFamily("cache_entries", "gauge", "Entries held by each TTL cache", ("cache",))
+    hits = MetricFamily("cache_hits_total", "counter", "TTL cache hits", ("cache",))
+    misses = MetricFamily("cache_misses_total", "counter", "TTL cache misses", ("cache",))
+    invalidations = MetricFamily("cache_invalidations_total", "counter", "TTL cache invalidations", ("cache",))
+    for name, stats in cache_stats().items():
+        entries.add(stats["entries"], name)
+        hits.add(stats["hits"], name)
+        misses.add(stats["misses"], name)
+        invalidations.add(stats["invalidations"], name)
+    return [entries, hits, misses, invalidations]
+
+
+def _collect_email_templates() -> Iterable[MetricFamily]:
+    from utilities import email_templates
+    if email_templates._registry is None:
+        return []
+    stats = email_templates._registry.get_stats()
+    return [
+        MetricFamily("email_templates_compiled", "gauge", "Compiled email templates held in memory")
+        .add(stats["templates"]),
+        MetricFamily("email_template_compiles_total", "counter", "Email template compilations")
+        .add(stats["compiles"]),
+        MetricFamily("email_inline_template_cache_total", "counter", "Inline template cache lookups", ("result",))
+        .add(stats["inline_hits"], "hit").add(stats["inline_misses"], "miss"),
+    ]
+
+
+def _collect_stripe() -> Iterable[MetricFamily]:
+    from core import stripe_gateway
+    families = []
+    if stripe_gateway._gateway is not None:
+        operations = stripe_gateway._gateway.get_metrics()["operations"]
+        latency = MetricFamily("stripe_request_duration_seconds", "summary", "Stripe SDK calls", ("operation",))
+        errors = MetricFamily("stripe_request_errors_total", "counter", "Failed Stripe SDK calls", ("operation",))
+        for operation, stats in operations.items():
+            latency.add([stats["total_ms"] / 1000, stats["count"]], operation)
+            errors.add(stats["errors"], operation)
+        families.extend([latency, errors])
+
+    from services import stripe_price_catalog_service
+    if stripe_price_catalog_service._service_instance is not None:
+        families.append(MetricFamily("stripe_price_catalog_entries", "gauge", "Reusable Stripe prices in memory")
+                        .add(stripe_price_catalog_service._service_instance.get_stats()["entries"]))
+
+    from services import stripe_webhook_inbox_service
+    if stripe_webhook_inbox_service._service_instance is not None:
+        stats = stripe_webhook_inbox_service._service_instance.get_queue_stats()
+        families.extend([
+            MetricFamily("stripe_webhook_queued", "gauge", "Webhook events waiting for a partition worker")
+            .add(stats["queued"]),
+            MetricFamily("stripe_webhook_in_flight", "gauge", "Webhook events dispatched and not finished")
+            .add(stats["in_flight"]),
+            MetricFamily("stripe_webhook_events_total", "counter", "Webhook events handled", ("outcome",))
+            .add(stats["processed"], "processed").add(stats["retried"], "retried")
+            .add(stats["dead_lettered"], "dead_lettered"),
+        ])
+    return families
+
+
+def _collect_proxy() -> Iterable[MetricFamily]:
+    from core import proxy_client
+    if proxy_client._proxy_client is None:
+        return []
+    stats = proxy_client._proxy_client.get_stats()
+    return [
+        MetricFamily("proxy_requests_total", "counter", "Requests sent upstream").add(stats["requests"]),
+        MetricFamily("proxy_active_requests", "gauge", "Upstream requests holding a host slot")
+        .add(stats["active"]),
+        MetricFamily("proxy_upstream_hosts", "gauge", "Upstream hosts with a slot pool").add(stats["hosts"]),
+    ]
+
+
+def _collect_registries() -> Iterable[MetricFamily]:
+    from core import repository
+    from core.indexes import index_stats
+    from core.services import loaded_services
+    indexes = MetricFamily("mongodb_indexes", "gauge", "Indexes by reconciliation state at startup",
+                           ("collection", "state"))
+    for collection, counts in index_stats().items():
+        for state, count in counts.items():
+            indexes.add(count, collection, state)
+    return [
+        MetricFamily("repositories_registered", "gauge", "Collections with a shared repository")
+        .add(len(repository._repositories)),
+        MetricFamily("services_loaded", "gauge", "Services instantiated through the registry")
+        .add(len(loaded_services())),
+        indexes,
+    ]
+
+
+def _collect_queues() -> Iterable[MetricFamily]:
+    from core import fee_ledger, metering, plan_catalog
+    families = []
+    if plan_catalog._manager is not None:
+        stats = plan_catalog._manager.get_stats()
+        families.extend([
+            MetricFamily("plan_catalog_version", "gauge", "Loaded plan catalog version").add(stats["version"]),
+            MetricFamily("plan_catalog_plans", "gauge", "Plans in the loaded catalog").add(stats["plans"]),
+            MetricFamily("plan_catalog_reloads_total", "counter", "Plan catalog reloads").add(stats["reloads"]),
+        ])
+    if metering._meter is not None:
+        stats = metering._meter.get_stats()
+        families.extend([
+            MetricFamily("usage_meter_pending_counters", "gauge", "Usage counters waiting for a flush")
+            .add(stats["pending_counters"]),
+            MetricFamily("usage_meter_reservations_total", "counter", "Quota reservations", ("outcome",))
+            .add(stats["reservations"], "granted").add(stats["rejections"], "rejected"),
+            MetricFamily("usage_meter_flushes_total", "counter", "Usage counter flushes").add(stats["flushes"]),
+        ])
+    if fee_ledger._ledger is not None:
+        stats = fee_ledger._ledger.get_stats()
+        families.extend([
+            MetricFamily("fee_ledger_pending_lines", "gauge", "Journal lines waiting for a flush")
+            .add(stats["pending_lines"]),
+            MetricFamily("fee_ledger_journals_total", "counter", "Journals posted").add(stats["journals"]),
+            MetricFamily("fee_ledger_duplicates_total", "counter", "Journals skipped as already posted")
+            .add(stats["duplicates"]),
+            MetricFamily("fee_ledger_flushes_total", "counter", "Fee ledger flushes").add(stats["flushes"]),
+            MetricFamily("fee_ledger_swept_lines_total", "counter", "Journal lines rolled up by the sweep")
+            .add(stats["swept"]),
+        ])
+    return families
+
+
+APP_COLLECTORS = {
+    "caches": _collect_caches,
+    "email_templates": _collect_email_templates,
+    "stripe": _collect_stripe,
+    "proxy": _collect_proxy,
+    "registries": _collect_registries,
+    "queues": _collect_queues,
+}
+
+
+# Registry instance
+_registry: Optional[MetricsRegistry] = None
+_registry_lock = threading.Lock()
+
+
+def get_metrics_registry() -> MetricsRegistry:
+    """Get registry instance"""
+    global _registry
+    if _registry is None:
+        with _registry_lock:
+            if _registry is None:
+                registry = MetricsRegistry(multiproc_dir=settings.METRICS_MULTIPROC_DIR)
+                for name, collector in APP_COLLECTORS.items():
+                    registry.register_collector(name, collector)
+                _registry = registry
+    return _registry
+
+
+async def close_metrics_registry() -> None:
+    if _registry is not None:
+        await _registry.stop()
@@ -0,0 +1,28 @@
+"""
+ObjectId Serialization for MEWAYZ V2
+Turns the ObjectIds in stored documents into strings before services return them
+"""
+
+from typing import Any, Dict, Iterable, List, Optional
+
+from bson import ObjectId
+
+
+def serialize_objectid(value: Any) -> Any:
+    """``value`` with every ObjectId, at any depth of dicts and lists, as a string"""
+    if isinstance(value, ObjectId):
+        return str(value)
+    if isinstance(value, dict):
+        return {key: serialize_objectid(item) for key, item in value.items()}
+    if isinstance(value, (list, tuple)):
+        return [serialize_objectid(item) for item in value]
+    return value
+
+
+def safe_document_return(document: Optional[Dict[str, Any]]) -> Optional[Dict[str, Any]]:
+    """One fetched document ready to return; None stays None"""
+    return serialize_objectid(document) if document is not None else None
+
+
+def safe_documents_return(documents: Iterable[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    return [serialize_objectid(document) for document in documents]
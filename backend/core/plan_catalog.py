@@ -0,0 +1,264 @@
+"""
+Plan catalog for MEWAYZ V2
+One versioned in-memory snapshot of plan prices, features and limits, swapped whole when an admin edits a plan
+"""
+
+import asyncio
+import logging
+from datetime import datetime
+from types import MappingProxyType
+from typing import Any, Dict, Iterable, Mapping, Optional
+
+from pymongo import ReturnDocument
+
+from core.bundle_manager import BundleManager
+from core.config import settings
+
+logger = logging.getLogger(__name__)
+
+VERSION_COLLECTION = "catalog_versions"
+VERSION_ID = "plans"
+PLANS_COLLECTION = "admin_plans"
+
+INTERVALS = ("monthly", "yearly")
+
+
+def _to_cents(price: Any) -> int:
+    return int(round(float(price or 0) * 100))
+
+
+def _bundle_entries() -> Dict[str, Dict[str, Any]]:
+    """Static bundle definitions, the base every admin plan document is laid over"""
+    entries = {}
+    for bundle_type, config in BundleManager.BUNDLE_CONFIGURATIONS.items():
+        entries[bundle_type.value] = {
+            **config,
+            "plan": bundle_type.value,
+            "enabled": True,
+            "available_for_new_subscriptions": True,
+            "source": "bundle_configuration",
+        }
+    return entries
+
+
+def _apply_pricing(entry: Dict[str, Any], pricing: Dict[str, Any]) -> None:
+    for interval in INTERVALS:
+        if pricing.get(f"{interval}_price") is not None:
+            entry[f"price_{interval}"] = pricing[f"{interval}_price"]
+
+
+def _apply_admin_plan(entry: Dict[str, Any], plan: Dict[str, Any]) -> Dict[str, Any]:
+    pricing = plan.get("pricing") or {}
+    features = plan.get("features") or {}
+    status = plan.get("status") or {}
+    excluded = set(features.get("excluded_features") or ())
+
+    entry = {
+        "services": [],
+        "features": [],
+        "limitations": {},
+        **entry,
+        "plan": plan["name"],
+        "source": "admin_plans",
+    }
+    entry["name"] = plan.get("display_name") or entry.get("name") or plan["name"]
+    _apply_pricing(entry, pricing)
+    included = [f for f in features.get("included_features") or () if f not in entry["features"]]
+    entry["features"] = [f for f in list(entry["features"]) + included if f not in excluded]
+    entry["limitations"] = {**entry["limitations"], **(plan.get("limits") or {})}
+    entry["enabled"] = status.get("enabled", True)
+    entry["available_for_new_subscriptions"] = status.get("available_for_new_subscriptions", True)
+    return entry
+
+
+class PlanCatalog:
+    """
+    Immutable catalog snapshot at one ``version``.
+
+    Entries keep the ``BundleManager.BUNDLE_CONFIGURATIONS`` shape (``name`` is the display
+    name, ``price_monthly``/``price_yearly`` are in dollars) plus ``plan``, ``enabled`` and
+    ``available_for_new_subscriptions``. ``bundle_prices`` holds the same prices in cents for
+    Stripe checkouts, and ``admin_plans`` the plan documents the snapshot was built from, for
+    the admin views. Readers take one snapshot per calculation; swapping in a new catalog
+    never changes a snapshot already in use.
+    """
+
+    def __init__(self, version: int, entries: Dict[str, Dict[str, Any]],
+                 admin_plans: Iterable[Dict[str, Any]] = ()):
+        self.version = version
+        self.loaded_at = datetime.utcnow()
+        self.admin_plans = tuple(admin_plans)
+        self._entries = {name: MappingProxyType(entry) for name, entry in entries.items()}
+        self._features = {name: frozenset(entry.get("features") or ()) for name, entry in entries.items()}
+        self.bundle_prices: Mapping[str, Mapping[str, int]] = MappingProxyType({
+            name: MappingProxyType({interval: _to_cents(entry.get(f"price_{interval}")) for interval in INTERVALS})
+            for name, entry in entries.items()
+        })
+
+    @classmethod
+    def build(cls, version: int, admin_plans: Iterable[Dict[str, Any]] = ()) -> "PlanCatalog":
+        admin_plans = list(admin_plans)
+        entries = _bundle_entries()
+        for plan in admin_plans:
+            if plan.get("name"):
+                entries[plan["name"]] = _apply_admin_plan(entries.get(plan["name"], {}), plan)
+        return cls(version, entries, admin_plans)
+
+    def with_pricing(self, plan: str, pricing: Dict[str, Any]) -> "PlanCatalog":
+        """Copy of this catalog with new prices for ``plan``, at the same version"""
+        entries = {name: dict(entry) for name, entry in self._entries.items()}
+        if plan in entries:
+            _apply_pricing(entries[plan], pricing)
+        return PlanCatalog(self.version, entries, self.admin_plans)
+
+    def __contains__(self, plan: str) -> bool:
+        return plan in self._entries
+
+    def plans(self) -> Iterable[str]:
+        return self._entries.keys()
+
+    def get(self, plan: str) -> Optional[Mapping[str, Any]]:
+        return self._entries.get(plan)
+
+    def price(self, plan: str, interval: str = "monthly") -> int:
+        """Price in cents, 0 for unknown plans"""
+        prices = self.bundle_prices.get(plan)
+        return prices[interval] if prices else 0
+
+    def has_feature(self, plan: str, feature: str) -> bool:
+        features = self._features.get(plan, frozenset())
+        return feature in features or "all" in features
+
+    def limits(self, plan: str) -> Mapping[str, Any]:
+        entry = self._entries.get(plan)
+        return entry["limitations"] if entry else MappingProxyType({})
+
+
+class PlanCatalogManager:
+    """
+    Holds the current ``PlanCatalog`` and replaces it when the version stamp moves.
+
+    Plan writes bump ``catalog_versions.plans``. Each worker follows that document with a
+    change stream, or polls it every ``poll_interval`` seconds when change streams are not
+    available (standalone servers), so lookups never touch the database.
+    """
+
+    def __init__(self, poll_interval: Optional[float] = None):
+        self.poll_interval = poll_interval if poll_interval is not None else settings.PLAN_CATALOG_POLL_SECONDS
+        self._catalog = PlanCatalog.build(version=0)
+        self._task: Optional[asyncio.Task] = None
+        self.mode = "static"
+        self.reloads = 0
+
+    @property
+    def catalog(self) -> PlanCatalog:
+        return self._catalog
+
+    async def load(self, db) -> PlanCatalog:
+        """Read the version stamp and every live admin plan, then swap in the new snapshot.
+
+        Loads can overlap (a change stream event and a writer's own refresh); a load that
+        read an older version than the one already in memory is dropped.
+        """
+        stamp, plans = await asyncio.gather(
+            db[VERSION_COLLECTION].find_one({"_id": VERSION_ID}),
+            db[PLANS_COLLECTION].find({"deleted": {"$ne": True}}).to_list(length=None),
+        )
+        catalog = PlanCatalog.build((stamp or {}).get("version", 0), plans)
+        self.reloads += 1
+        if catalog.version < self._catalog.version:
+            logger.info(f"Plan catalog v{catalog.version} dropped, v{self._catalog.version} is newer")
+            return self._catalog
+        self._catalog = catalog
+        logger.info(f"Plan catalog v{catalog.version} loaded with {len(plans)} admin plans")
+        return catalog
+
+    async def refresh(self, db) -> bool:
+        """Reload if the stored version differs from the one in memory"""
+        stamp = await db[VERSION_COLLECTION].find_one({"_id": VERSION_ID}, {"version": 1})
+        if (stamp or {}).get("version", 0) == self._catalog.version:
+            return False
+        await self.load(db)
+        return True
+
+    def apply_pricing(self, plan: str, pricing: Dict[str, Any]) -> None:
+        """Use new prices in this worker right away; the version bump carries them to the others"""
+        self._catalog = self._catalog.with_pricing(plan, pricing)
+
+    async def start(self, db) -> PlanCatalog:
+        """Load the catalog, then follow the version stamp in a background task"""
+        catalog = await self.load(db)
+        if self._task is None:
+            self._task = asyncio.create_task(self._follow(db))
+        return catalog
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+
+    async def _follow(self, db) -> None:
+        try:
+            pipeline = [{"$match": {"documentKey._id": VERSION_ID}}]
+            async with db[VERSION_COLLECTION].watch(pipeline) as stream:
+                self.mode = "change_stream"
+                # A bump between the startup load and the stream opening is not in the stream
+                await self.refresh(db)
+                async for _ in stream:
+                    await self.load(db)
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            logger.info(f"Plan catalog change stream unavailable ({e}), polling every {self.poll_interval}s")
+
+        self.mode = "polling"
+        while True:
+            await asyncio.sleep(self.poll_interval)
+            try:
+                await self.refresh(db)
+            except Exception as e:
+                logger.error(f"Plan catalog refresh error: {e}")
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {
+            "version": self._catalog.version,
+            "plans": len(self._catalog.bundle_prices),
+            "mode": self.mode,
+            "reloads": self.reloads,
+            "loaded_at": self._catalog.loaded_at.isoformat(),
+        }
+
+
+async def bump_catalog_version(db) -> int:
+    """Record a plan change so every worker reloads its catalog"""
+    stamp = await db[VERSION_COLLECTION].find_one_and_update(
+        {"_id": VERSION_ID},
+        {"$inc": {"version": 1}, "$set": {"updated_at": datetime.utcnow()}},
+        upsert=True,
+        return_document=ReturnDocument.AFTER,
+    )
+    return stamp["version"]
+
+
+# Manager instance
+_manager: Optional[PlanCatalogManager] = None
+
+
+def get_plan_catalog_manager() -> PlanCatalogManager:
+    """Get manager instance"""
+    global _manager
+    if _manager is None:
+        _manager = PlanCatalogManager()
+    return _manager
+
+
+def get_plan_catalog() -> PlanCatalog:
+    """The current catalog snapshot; never reads the database"""
+    return get_plan_catalog_manager().catalog
+
+
+async def close_plan_catalog() -> None:
+    """Stop following plan changes; the manager and its catalog stay valid for reuse"""
+    if _manager is not None:
+        await _manager.stop()
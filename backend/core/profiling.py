@@ -0,0 +1,544 @@
+"""
+Request profiler for MEWAYZ V2
+Opt-in per-request profiles: sampled call tree, MongoDB commands and response serialization time
+"""
+
+import asyncio
+import hashlib
+import hmac
+import logging
+import os
+import random
+import sys
+import threading
+import time
+import uuid
+from collections import Counter, deque
+from contextvars import ContextVar
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Deque, Dict, List, Optional, Tuple
+
+from bson import json_util
+from pymongo import monitoring
+
+from core.config import settings
+
+logger = logging.getLogger(__name__)
+
+PROFILE_HEADER = "X-Profile"
+PROFILE_ID_HEADER = "X-Profile-Id"
+
+# Commands that are safe to explain once the request is done
+EXPLAINABLE_COMMANDS = ("find", "aggregate", "count", "distinct")
+# Explained under executionStats, which runs them again; the others only get the query plan
+EXECUTION_STATS_COMMANDS = ("find", "count")
+# Session and routing fields explain does not accept
+_COMMAND_META_FIELDS = ("lsid", "txnNumber", "autocommit", "startTransaction", "readConcern", "writeConcern")
+# Fields of a stored profile that its summary leaves out
+_DETAIL_FIELDS = ("commands", "commands_dropped", "profile")
+MAX_COMMANDS = 500
+MAX_COMMAND_TEXT = 2000
+
+_BACKEND_DIR = str(Path(__file__).resolve().parent.parent)
+_ASYNCIO_DIR = os.path.dirname(asyncio.__file__)
+
+_current: ContextVar[Optional["RequestProfile"]] = ContextVar("request_profile", default=None)
+
+
+def current_profile() -> Optional["RequestProfile"]:
+    """The profile of the request being handled, if it is profiled"""
+    return _current.get()
+
+
+def sign_profile_token(expires_at: int, secret: Optional[str] = None) -> str:
+    """Value for the ``X-Profile`` header, valid until ``expires_at`` (unix seconds)"""
+    digest = hmac.new((secret or settings.SECRET_KEY).encode(), str(expires_at).encode(), hashlib.sha256)
+    return f"{expires_at}.{digest.hexdigest()}"
+
+
+def verify_profile_token(token: str, secret: Optional[str] = None, now: Optional[float] = None) -> bool:
+    expires_at, _, _ = token.partition(".")
+    if not expires_at.isdigit() or int(expires_at) < (now or time.time()):
+        return False
+    return hmac.compare_digest(token, sign_profile_token(int(expires_at), secret))
+
+
+def _location(code) -> str:
+    filename = code.co_filename
+    if filename.startswith(_BACKEND_DIR):
+        filename = os.path.relpath(filename, _BACKEND_DIR)
+    elif "site-packages" in filename:
+        filename = filename.split("site-packages" + os.sep, 1)[1]
+    return f"{filename}:{code.co_firstlineno}"
+
+
+def _stack(frame) -> Tuple[Any, ...]:
+    """Code objects from the outermost request frame down to ``frame``, without the event loop"""
+    codes = []
+    while frame is not None:
+        codes.append(frame.f_code)
+        frame = frame.f_back
+    codes.reverse()
+    start = 0
+    for index, code in enumerate(codes):
+        if code.co_filename.startswith(_ASYNCIO_DIR):
+            start = index + 1
+    return tuple(codes[start:])
+
+
+def _command_text(command: Dict[str, Any]) -> str:
+    text = json_util.dumps(command)
+    return text if len(text) <= MAX_COMMAND_TEXT else text[:MAX_COMMAND_TEXT] + "..."
+
+
+def _find_key(document: Any, key: str) -> Any:
+    """First value stored under ``key`` anywhere in an explain document"""
+    if isinstance(document, dict):
+        if key in document:
+            return document[key]
+        values = document.values()
+    elif isinstance(document, list):
+        values = document
+    else:
+        return None
+    for value in values:
+        found = _find_key(value, key)
+        if found is not None:
+            return found
+    return None
+
+
+class RequestProfile:
+    """Everything captured for one profiled request"""
+
+    def __init__(self, method: str, path: str, reason: str):
+        self.id = uuid.uuid4().hex[:12]
+        self.method = method
+        self.path = path
+        self.route: Optional[str] = None
+        self.reason = reason
+        self.started_at = datetime.utcnow()
+        self.status: Optional[int] = None
+        self.duration = 0.0
+        self.serialization = 0.0
+        self.samples: Counter = Counter()
+        # Sampler ticks while the request was open, running or awaiting
+        self.ticks = 0
+        self.commands: List[Dict[str, Any]] = []
+        self.commands_dropped = 0
+        self._specs: List[Optional[Tuple[str, Dict[str, Any]]]] = []
+        self._start = time.perf_counter()
+
+    def add_command(self, database: str, name: str, collection: str, command: Dict[str, Any]) -> Optional[int]:
+        if len(self.commands) >= MAX_COMMANDS:
+            self.commands_dropped += 1
+            return None
+        spec = {key: value for key, value in command.items()
+                if not key.startswith("$") and key not in _COMMAND_META_FIELDS}
+        self.commands.append({
+            "command": name,
+            "collection": collection,
+            "database": database,
+            "offset_ms": round((time.perf_counter() - self._start) * 1000, 2),
+            "duration_ms": None,
+            "spec": _command_text(spec),
+        })
+        self._specs.append((database, name, spec) if name in EXPLAINABLE_COMMANDS else None)
+        return len(self.commands) - 1
+
+    def finish(self, status: Optional[int], route: Optional[str]) -> None:
+        self.duration = time.perf_counter() - self._start
+        self.status = status
+        self.route = route
+
+    def call_tree(self, interval: float, min_share: float = 0.01) -> Dict[str, Any]:
+        """Samples folded into a call tree; nodes under ``min_share`` of the samples are cut.
+
+        A sample is credited to the request only while one of its tasks holds the loop, so
+        the root's time is time on the CPU and the rest of ``duration_ms`` was spent awaiting.
+        """
+        total = sum(self.samples.values())
+        seconds_per_sample = self.duration / self.ticks if self.ticks else interval
+        root: Dict[str, Any] = {"function": "<request>", "location": self.route or self.path,
+                                "samples": total, "children": {}}
+        for stack, count in self.samples.items():
+            node = root
+            for code in stack:
+                child = node["children"].get(code)
+                if child is None:
+                    child = node["children"][code] = {"function": code.co_qualname, "location": _location(code),
+                                                      "samples": 0, "children": {}}
+                child["samples"] += count
+                node = child
+
+        def finish(node: Dict[str, Any]) -> Dict[str, Any]:
+            children = sorted(node["children"].values(), key=lambda child: -child["samples"])
+            return {
+                "function": node["function"],
+                "location": node["location"],
+                "samples": node["samples"],
+                "seconds": round(node["samples"] * seconds_per_sample, 4),
+                "children": [finish(child) for child in children if child["samples"] >= total * min_share],
+            }
+
+        return finish(root)
+
+    def summary(self) -> Dict[str, Any]:
+        return {
+            "id": self.id,
+            "method": self.method,
+            "path": self.path,
+            "route": self.route,
+            "reason": self.reason,
+            "status": self.status,
+            "started_at": self.started_at,
+            "duration_ms": round(self.duration * 1000, 2),
+            "db_ms": round(sum(command["duration_ms"] or 0 for command in self.commands), 2),
+            "db_commands": len(self.commands) + self.commands_dropped,
+            "serialization_ms": round(self.serialization * 1000, 2),
+        }
+
+    def to_dict(self, interval: float) -> Dict[str, Any]:
+        return {
+            **self.summary(),
+            "commands": self.commands,
+            "commands_dropped": self.commands_dropped,
+            "profile": self.call_tree(interval),
+        }
+
+
+class ProfilingCommandListener(monitoring.CommandListener):
+    """Adds each MongoDB command of a profiled request to its profile.
+
+    Motor runs commands on its executor with the caller's context, so the profile is
+    found through the context variable; unprofiled commands return after one lookup.
+    """
+
+    def __init__(self):
+        self._pending: Dict[Tuple[Any, int], Tuple[RequestProfile, int]] = {}
+
+    def started(self, event: monitoring.CommandStartedEvent) -> None:
+        profile = _current.get()
+        if profile is None:
+            return
+        target = event.command.get("collection") if event.command_name == "getMore" \
+            else event.command.get(event.command_name)
+        index = profile.add_command(event.database_name, event.command_name,
+                                    target if isinstance(target, str) else "", event.command)
+        if index is not None:
+            self._pending[(event.connection_id, event.request_id)] = (profile, index)
+
+    def succeeded(self, event: monitoring.CommandSucceededEvent) -> None:
+        pending = self._pending.pop((event.connection_id, event.request_id), None)
+        if pending is None:
+            return
+        profile, index = pending
+        reply = event.reply
+        cursor = reply.get("cursor") or {}
+        batch = cursor.get("firstBatch", cursor.get("nextBatch"))
+        profile.commands[index]["duration_ms"] = round(event.duration_micros / 1000, 3)
+        profile.commands[index]["returned"] = len(batch) if batch is not None else reply.get("n")
+
+    def failed(self, event: monitoring.CommandFailedEvent) -> None:
+        pending = self._pending.pop((event.connection_id, event.request_id), None)
+        if pending is None:
+            return
+        profile, index = pending
+        profile.commands[index]["duration_ms"] = round(event.duration_micros / 1000, 3)
+        profile.commands[index]["error"] = str(event.failure.get("errmsg", event.failure))
+
+
+def profiling_event_listeners() -> List[Any]:
+    """Listeners to pass to ``AsyncIOMotorClient(event_listeners=...)``"""
+    return [ProfilingCommandListener()] if settings.PROFILING_ENABLED else []
+
+
+class _StackSampler:
+    """
+    Samples the event loop thread's stack every ``interval`` seconds and credits it to
+    the profile of whichever task is running. Tasks a profiled request spawns (such as
+    ``BaseHTTPMiddleware``'s) are attributed through a task factory that is only
+    installed while at least one profile is active.
+    """
+
+    def __init__(self, interval: float):
+        self.interval = interval
+        self._targets: Dict[asyncio.Task, RequestProfile] = {}
+        self._profiles: List[RequestProfile] = []
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._loop_thread_id: Optional[int] = None
+        self._previous_factory = None
+        self._wake = threading.Event()
+        self._stopped = False
+        self._thread: Optional[threading.Thread] = None
+
+    def _task_factory(self, loop, coro, **kwargs):
+        if self._previous_factory is not None:
+            task = self._previous_factory(loop, coro, **kwargs)
+        else:
+            task = asyncio.Task(coro, loop=loop, **kwargs)
+        profile = _current.get()
+        if profile is not None:
+            self._track(task, profile)
+        return task
+
+    def _track(self, task: asyncio.Task, profile: RequestProfile) -> None:
+        self._targets[task] = profile
+        task.add_done_callback(lambda done: self._targets.pop(done, None))
+
+    def begin(self, profile: RequestProfile) -> None:
+        loop = asyncio.get_running_loop()
+        if not self._profiles:
+            self._loop, self._loop_thread_id = loop, threading.get_ident()
+            self._previous_factory = loop.get_task_factory()
+            loop.set_task_factory(self._task_factory)
+        self._profiles = self._profiles + [profile]
+        task = asyncio.current_task()
+        if task is not None:
+            self._targets[task] = profile
+        if self._thread is None or not self._thread.is_alive():
+            self._stopped = False
+            self._thread = threading.Thread(target=self._run, name="request-profiler", daemon=True)
+            self._thread.start()
+        self._wake.set()
+
+    def end(self, profile: RequestProfile) -> None:
+        task = asyncio.current_task()
+        if self._targets.get(task) is profile:
+            del self._targets[task]
+        self._profiles = [active for active in self._profiles if active is not profile]
+        if not self._profiles and self._loop is not None:
+            self._loop.set_task_factory(self._previous_factory)
+            self._previous_factory = None
+
+    def stop(self) -> None:
+        self._stopped = True
+        self._wake.set()
+        if self._thread is not None:
+            self._thread.join(timeout=1)
+            self._thread = None
+
+    def _run(self) -> None:
+        while not self._stopped:
+            if not self._profiles:
+                self._wake.clear()
+                if not self._profiles:
+                    self._wake.wait(1.0)
+                continue
+            time.sleep(self.interval)
+            for profile in self._profiles:
+                profile.ticks += 1
+            try:
+                profile = self._targets.get(asyncio.current_task(self._loop))
+                if profile is None:
+                    continue
+                frame = sys._current_frames().get(self._loop_thread_id)
+                if frame is not None:
+                    profile.samples[_stack(frame)] += 1
+            except Exception as e:
+                logger.debug(f"Profiler sample skipped: {e}")
+
+
+class RequestProfiler:
+    """
+    Decides which requests to profile (a valid signed ``X-Profile`` header, or a random
+    ``sample_rate`` share) and keeps the last ``buffer_size`` profiles of this worker in a
+    ring buffer. After a profiled request ends, its slowest reads are explained: finds and
+    counts under ``executionStats`` for the documents and keys each one examined, other
+    reads (aggregates, distinct) under ``queryPlanner`` so they are not run a second time.
+
+    With ``profile_dir`` set (by default ``profiles/`` under the metrics multiprocess
+    directory), finished profiles are also written there as ``<id>.json`` and the newest
+    ``buffer_size`` kept, so any worker can list and serve them.
+    """
+
+    def __init__(self, sample_rate: Optional[float] = None, buffer_size: Optional[int] = None,
+                 interval: Optional[float] = None, explain_limit: Optional[int] = None,
+                 profile_dir: Optional[str] = None):
+        self.sample_rate = sample_rate if sample_rate is not None else settings.PROFILING_SAMPLE_RATE
+        self.interval = interval or settings.PROFILING_INTERVAL_SECONDS
+        self.explain_limit = explain_limit if explain_limit is not None else settings.PROFILING_EXPLAIN_LIMIT
+        self.buffer_size = buffer_size or settings.PROFILING_BUFFER_SIZE
+        if profile_dir is None and settings.METRICS_MULTIPROC_DIR:
+            profile_dir = os.path.join(settings.METRICS_MULTIPROC_DIR, "profiles")
+        self.profile_dir = profile_dir
+        self._profiles: Deque[RequestProfile] = deque(maxlen=self.buffer_size)
+        self._sampler = _StackSampler(self.interval)
+        self._explains: set = set()
+
+    def should_profile(self, token: Optional[str]) -> Optional[str]:
+        """Why to profile a request, or None"""
+        if token and verify_profile_token(token):
+            return "header"
+        if self.sample_rate and random.random() < self.sample_rate:
+            return "sample"
+        return None
+
+    def begin(self, method: str, path: str, reason: str) -> Tuple[RequestProfile, Any]:
+        profile = RequestProfile(method, path, reason)
+        token = _current.set(profile)
+        self._sampler.begin(profile)
+        return profile, token
+
+    def end(self, profile: RequestProfile, token: Any, status: Optional[int], route: Optional[str],
+            client=None) -> None:
+        self._sampler.end(profile)
+        _current.reset(token)
+        profile.finish(status, route)
+        self._profiles.append(profile)
+        explain = self.explain_limit and any(profile._specs)
+        if explain or self.profile_dir:
+            task = asyncio.create_task(self._complete(profile, client, explain))
+            self._explains.add(task)
+            task.add_done_callback(self._explains.discard)
+
+    async def _complete(self, profile: RequestProfile, client, explain: bool) -> None:
+        if explain:
+            await self.explain(profile, client)
+        if self.profile_dir:
+            try:
+                await asyncio.to_thread(self._write, profile.to_dict(self.interval))
+            except Exception as e:
+                logger.error(f"Writing profile {profile.id} failed: {e}")
+
+    async def explain(self, profile: RequestProfile, client=None) -> None:
+        """Add the winning plan, and for finds and counts the docs and keys examined, to the slowest reads"""
+        if client is None:
+            from core.database import get_motor_database
+            client = get_motor_database().client
+        reads = [index for index, spec in enumerate(profile._specs) if spec is not None
+                 and not any("$out" in stage or "$merge" in stage for stage in spec[2].get("pipeline", []))]
+        reads.sort(key=lambda index: -(profile.commands[index]["duration_ms"] or 0))
+        for index in reads[:self.explain_limit]:
+            database, name, spec = profile._specs[index]
+            verbosity = "executionStats" if name in EXECUTION_STATS_COMMANDS else "queryPlanner"
+            try:
+                plan = await client[database].command({"explain": spec, "verbosity": verbosity})
+            except Exception as e:
+                profile.commands[index]["explain_error"] = str(e)
+                continue
+            winning = _find_key(plan, "winningPlan") or {}
+            profile.commands[index]["plan"] = winning.get("stage") or _find_key(winning, "stage")
+            stats = _find_key(plan, "executionStats")
+            if stats:
+                profile.commands[index].update({
+                    "docs_examined": stats.get("totalDocsExamined"),
+                    "keys_examined": stats.get("totalKeysExamined"),
+                })
+
+    def _path(self, profile_id: str) -> Optional[str]:
+        # Ids are 12 hex characters; anything else never names a file
+        if len(profile_id) != 12 or any(char not in "0123456789abcdef" for char in profile_id):
+            return None
+        return os.path.join(self.profile_dir, f"{profile_id}.json")
+
+    def _write(self, profile: Dict[str, Any]) -> None:
+        os.makedirs(self.profile_dir, exist_ok=True)
+        path = self._path(profile["id"])
+        tmp = f"{path}.tmp"
+        with open(tmp, "w") as f:
+            f.write(json_util.dumps(profile))
+        os.replace(tmp, path)
+        for stale in self._stored()[self.buffer_size:]:
+            try:
+                os.remove(stale)
+            except OSError:
+                pass
+
+    def _stored(self) -> List[str]:
+        """Stored profile paths, newest first"""
+        try:
+            entries = [entry for entry in os.scandir(self.profile_dir) if entry.name.endswith(".json")]
+        except FileNotFoundError:
+            return []
+        entries.sort(key=lambda entry: -entry.stat().st_mtime_ns)
+        return [entry.path for entry in entries]
+
+    def _read(self, path: str) -> Optional[Dict[str, Any]]:
+        try:
+            with open(path) as f:
+                return json_util.loads(f.read())
+        except (OSError, ValueError) as e:
+            logger.debug(f"Skipping stored profile {path}: {e}")
+            return None
+
+    def add_serialization(self, seconds: float) -> None:
+        profile = _current.get()
+        if profile is not None:
+            profile.serialization += seconds
+
+    def recent(self, limit: int = 50) -> List[Dict[str, Any]]:
+        summaries = {profile.id: profile.summary() for profile in list(self._profiles)}
+        if self.profile_dir:
+            for profile in filter(None, (self._read(path) for path in self._stored()[:limit])):
+                summaries.setdefault(profile["id"], {key: value for key, value in profile.items()
+                                                     if key not in _DETAIL_FIELDS})
+        return sorted(summaries.values(), key=lambda summary: summary["started_at"], reverse=True)[:limit]
+
+    def get(self, profile_id: str) -> Optional[Dict[str, Any]]:
+        for profile in list(self._profiles):
+            if profile.id == profile_id:
+                return profile.to_dict(self.interval)
+        path = self._path(profile_id) if self.profile_dir else None
+        if path and os.path.exists(path):
+            return self._read(path)
+        return None
+
+    def clear(self) -> int:
+        cleared = len(self._profiles)
+        self._profiles.clear()
+        if self.profile_dir:
+            stored = self._stored()
+            for path in stored:
+                try:
+                    os.remove(path)
+                except OSError:
+                    pass
+            cleared = len(stored)
+        return cleared
+
+    async def stop(self) -> None:
+        self._sampler.stop()
+        for task in list(self._explains):
+            task.cancel()
+        await asyncio.gather(*self._explains, return_exceptions=True)
+
+
+def install_serialization_timer() -> None:
+    """Time FastAPI's response validation and encoding for profiled requests"""
+    import fastapi.routing as routing
+    original = routing.serialize_response
+    if getattr(original, "profiled", False):
+        return
+
+    async def serialize_response(*args: Any, **kwargs: Any) -> Any:
+        if _current.get() is None:
+            return await original(*args, **kwargs)
+        start = time.perf_counter()
+        try:
+            return await original(*args, **kwargs)
+        finally:
+            get_request_profiler().add_serialization(time.perf_counter() - start)
+
+    serialize_response.profiled = True
+    routing.serialize_response = serialize_response
+
+
+# Profiler instance
+_profiler: Optional[RequestProfiler] = None
+
+
+def get_request_profiler() -> RequestProfiler:
+    """Get profiler instance"""
+    global _profiler
+    if _profiler is None:
+        _profiler = RequestProfiler()
+    return _profiler
+
+
+async def close_request_profiler() -> None:
+    global _profiler
+    if _profiler is not None:
+        await _profiler.stop()
+        _profiler = None
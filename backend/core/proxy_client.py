@@ -0,0 +1,247 @@
+"""
+Proxy HTTP client for MEWAYZ V2
+One long-lived httpx.AsyncClient shared by the proxy endpoints, streaming bodies both ways
+"""
+
+import asyncio
+import logging
+from typing import Any, AsyncIterator, Callable, Dict, Optional
+
+import httpx
+from starlette.responses import StreamingResponse
+from starlette.types import Receive, Scope, Send
+
+from core.config import settings
+
+logger = logging.getLogger(__name__)
+
+# Upstream response headers worth passing back to the browser
+FORWARDED_RESPONSE_HEADERS = (
+    "content-type",
+    "content-encoding",
+    "cache-control",
+    "etag",
+    "last-modified",
+)
+
+
+class ProxyResponseTooLarge(Exception):
+    """Upstream body exceeds the configured response size cap"""
+
+
+def _http2_available() -> bool:
+    try:
+        import h2  # noqa: F401
+        return True
+    except ImportError:
+        return False
+
+
+class _HostSlots:
+    """
+    Concurrency cap for one upstream host. ``users`` counts requests holding or waiting
+    for a slot; the client drops the entry when it reaches zero, so hosts seen once do
+    not stay in memory.
+    """
+
+    def __init__(self, limit: int):
+        self.semaphore = asyncio.Semaphore(limit)
+        self.users = 0
+
+
+class ProxyUpstreamResponse:
+    """An open upstream response, released when its body has been streamed or closed"""
+
+    def __init__(self, response: httpx.Response, release: Callable[[], None], max_bytes: int):
+        self.response = response
+        self.status_code = response.status_code
+        self.headers = {
+            name: response.headers[name] for name in FORWARDED_RESPONSE_HEADERS if name in response.headers
+        }
+        self._release = release
+        self._max_bytes = max_bytes
+        self._closed = False
+
+    async def iter_body(self) -> AsyncIterator[bytes]:
+        """Yield the raw upstream body, aborting once it grows past the size cap"""
+        received = 0
+        try:
+            async for chunk in self.response.aiter_raw():
+                received += len(chunk)
+                if received > self._max_bytes:
+                    raise ProxyResponseTooLarge(f"Upstream response exceeded {self._max_bytes} bytes")
+                yield chunk
+        finally:
+            await self.aclose()
+
+    async def aclose(self) -> None:
+        if self._closed:
+            return
+        self._closed = True
+        try:
+            await self.response.aclose()
+        finally:
+            self._release()
+
+
+class ProxyStreamingResponse(StreamingResponse):
+    """Relays an upstream response and closes it however the relay ends.
+
+    A client that disconnects mid-body, or a send that fails, ends the response without
+    running its background task; the upstream response and its per-host slot are
+    released here regardless.
+    """
+
+    def __init__(self, upstream: ProxyUpstreamResponse):
+        super().__init__(upstream.iter_body(), status_code=upstream.status_code, headers=upstream.headers)
+        self.upstream = upstream
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        try:
+            await super().__call__(scope, receive, send)
+        finally:
+            await self.upstream.aclose()
+
+
+class ProxyClient:
+    """Pooled upstream client for the CORS proxy.
+
+    Connections are kept alive and (when ``h2`` is installed) multiplexed over HTTP/2.
+    ``per_host_limit`` caps concurrent requests to any one upstream host so a slow host
+    cannot take the whole pool, and ``max_response_bytes`` caps what we relay back.
+    """
+
+    def __init__(
+        self,
+        http2: bool = True,
+        max_connections: int = 100,
+        max_keepalive_connections: int = 20,
+        keepalive_expiry: float = 30.0,
+        per_host_limit: int = 10,
+        connect_timeout: float = 5.0,
+        read_timeout: float = 30.0,
+        max_response_bytes: int = 10 * 1024 * 1024,
+    ):
+        self.http2 = http2 and _http2_available()
+        if http2 and not self.http2:
+            logger.warning("h2 is not installed, proxy client falls back to HTTP/1.1")
+        self.max_connections = max_connections
+        self.max_keepalive_connections = max_keepalive_connections
+        self.keepalive_expiry = keepalive_expiry
+        self.per_host_limit = per_host_limit
+        self.connect_timeout = connect_timeout
+        self.read_timeout = read_timeout
+        self.max_response_bytes = max_response_bytes
+        self._client: Optional[httpx.AsyncClient] = None
+        self._host_slots: Dict[str, _HostSlots] = {}
+        self.requests = 0
+        self.active = 0
+
+    @property
+    def client(self) -> httpx.AsyncClient:
+        if self._client is None or self._client.is_closed:
+            self._client = httpx.AsyncClient(
+                http2=self.http2,
+                limits=httpx.Limits(
+                    max_connections=self.max_connections,
+                    max_keepalive_connections=self.max_keepalive_connections,
+                    keepalive_expiry=self.keepalive_expiry,
+                ),
+                timeout=httpx.Timeout(self.read_timeout, connect=self.connect_timeout),
+                follow_redirects=False,
+            )
+        return self._client
+
+    def start(self) -> None:
+        """Open the connection pool ahead of the first proxied request"""
+        self.client
+
+    async def _acquire_slot(self, url: httpx.URL) -> Callable[[], None]:
+        """Wait for a slot on the request's host; returns the function that gives it back"""
+        key = f"{url.scheme}://{url.host}:{url.port or ''}"
+        slots = self._host_slots.get(key)
+        if slots is None:
+            slots = self._host_slots[key] = _HostSlots(self.per_host_limit)
+        slots.users += 1
+        try:
+            await slots.semaphore.acquire()
+        except BaseException:
+            self._leave(key, slots)
+            raise
+        self.active += 1
+
+        def release() -> None:
+            self.active -= 1
+            slots.semaphore.release()
+            self._leave(key, slots)
+
+        return release
+
+    def _leave(self, key: str, slots: _HostSlots) -> None:
+        slots.users -= 1
+        if slots.users == 0 and self._host_slots.get(key) is slots:
+            del self._host_slots[key]
+
+    async def open(
+        self,
+        method: str,
+        url: str,
+        headers: Dict[str, str],
+        content: Optional[AsyncIterator[bytes]] = None,
+    ) -> ProxyUpstreamResponse:
+        """Send a request upstream and return the response with its body still unread"""
+        request = self.client.build_request(method, url, headers=headers, content=content)
+        release = await self._acquire_slot(request.url)
+        self.requests += 1
+        try:
+            response = await self.client.send(request, stream=True)
+        except BaseException:
+            release()
+            raise
+
+        upstream = ProxyUpstreamResponse(response, release, self.max_response_bytes)
+        declared = response.headers.get("content-length")
+        if declared and declared.isdigit() and int(declared) > self.max_response_bytes:
+            await upstream.aclose()
+            raise ProxyResponseTooLarge(f"Upstream response declares {declared} bytes")
+        return upstream
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {
+            "requests": self.requests,
+            "hosts": len(self._host_slots),
+            "active": self.active,
+        }
+
+    async def close(self) -> None:
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
+
+
+# Client instance
+_proxy_client: Optional[ProxyClient] = None
+
+
+def get_proxy_client() -> ProxyClient:
+    """Get client instance"""
+    global _proxy_client
+    if _proxy_client is None:
+        _proxy_client = ProxyClient(
+            http2=settings.PROXY_HTTP2,
+            max_connections=settings.PROXY_MAX_CONNECTIONS,
+            max_keepalive_connections=settings.PROXY_MAX_KEEPALIVE_CONNECTIONS,
+            keepalive_expiry=settings.PROXY_KEEPALIVE_EXPIRY,
+            per_host_limit=settings.PROXY_PER_HOST_LIMIT,
+            connect_timeout=settings.PROXY_CONNECT_TIMEOUT,
+            read_timeout=settings.PROXY_READ_TIMEOUT,
+            max_response_bytes=settings.PROXY_MAX_RESPONSE_BYTES,
+        )
+    return _proxy_client
+
+
+async def close_proxy_client() -> None:
+    global _proxy_client
+    if _proxy_client is not None:
+        await _proxy_client.close()
+        _proxy_client = None
@@ -0,0 +1,185 @@
+"""
+Async repository engine for MEWAYZ V2
+Shared collection access for document services: native timestamps, projections and paging
+"""
+
+import logging
+import uuid
+from datetime import datetime
+from typing import Any, Dict, Iterable, List, Optional
+
+from bson import ObjectId
+from bson.errors import InvalidId
+from pymongo import ASCENDING, DESCENDING, ReturnDocument
+
+from core.database import get_database_async
+from core.timestamps import TIMESTAMP_FIELDS, normalize_timestamps
+
+logger = logging.getLogger(__name__)
+
+
+class AsyncRepository:
+    """One Mongo collection with the access patterns the document services share.
+
+    - The Motor collection handle is resolved once and reused.
+    - ``created_at``/``updated_at`` (and any ``timestamp_fields``) are stored as native
+      datetimes, including ISO strings supplied by callers.
+    - ``page`` returns one page plus its total in a single ``$facet`` round trip, or walks
+      ``_id`` order with an opaque cursor when one is given.
+    - ``stats`` counts totals and per-status buckets in a single ``$facet`` pass.
+    """
+
+    def __init__(self, collection_name: str, id_field: str = "id",
+                 timestamp_fields: Iterable[str] = TIMESTAMP_FIELDS):
+        self.collection_name = collection_name
+        self.id_field = id_field
+        self.timestamp_fields = tuple(timestamp_fields)
+        self._collection = None
+
+    async def collection(self):
+        if self._collection is None:
+            db = await get_database_async()
+            if db is None:
+                return None
+            self._collection = db[self.collection_name]
+        return self._collection
+
+    def reset(self) -> None:
+        """Forget the cached handle, e.g. after the client was closed"""
+        self._collection = None
+
+    @staticmethod
+    def projection(fields: Optional[Iterable[str]]) -> Optional[Dict[str, int]]:
+        if not fields:
+            return None
+        return {field: 1 for field in fields}
+
+    async def insert(self, data: Dict[str, Any], **fields: Any) -> Optional[Dict[str, Any]]:
+        """Insert ``data`` with a new id, timestamps and ``fields`` applied on top"""
+        collection = await self.collection()
+        if collection is None:
+            return None
+        now = datetime.utcnow()
+        document = normalize_timestamps({**data, self.id_field: str(uuid.uuid4()), "created_at": now,
+                                         "updated_at": now, **fields}, self.timestamp_fields)
+        await collection.insert_one(document)
+        return document
+
+    async def find_one(self, query: Dict[str, Any], fields: Optional[Iterable[str]] = None) -> Optional[Dict[str, Any]]:
+        collection = await self.collection()
+        if collection is None:
+            return None
+        return await collection.find_one(query, self.projection(fields))
+
+    async def get(self, item_id: str, fields: Optional[Iterable[str]] = None) -> Optional[Dict[str, Any]]:
+        return await self.find_one({self.id_field: item_id}, fields)
+
+    async def page(
+        self,
+        query: Dict[str, Any],
+        limit: int = 50,
+        offset: int = 0,
+        cursor: Optional[str] = None,
+        fields: Optional[Iterable[str]] = None,
+        descending: bool = False,
+    ) -> Optional[Dict[str, Any]]:
+        """Fetch one page in ``_id`` order.
+
+        With ``cursor`` (the ``next_cursor`` of the previous page) the query seeks past the
+        last seen ``_id`` and skips the total count; otherwise skip/limit and the total are
+        computed together.
+        """
+        collection = await self.collection()
+        if collection is None:
+            return None
+        order = DESCENDING if descending else ASCENDING
+        projection = self.projection(fields)
+
+        if cursor is not None:
+            try:
+                last_id = ObjectId(cursor)
+            except (InvalidId, TypeError):
+                raise ValueError("Invalid cursor")
+            seek = {"_id": {"$lt" if descending else "$gt": last_id}}
+            find = collection.find({**query, **seek}, projection).sort("_id", order).limit(limit + 1)
+            items = await find.to_list(length=limit + 1)
+            has_more = len(items) > limit
+            items = items[:limit]
+            return {
+                "items": items,
+                "total": None,
+                "next_cursor": str(items[-1]["_id"]) if has_more and items else None,
+            }
+
+        data_stages: List[Dict[str, Any]] = [{"$sort": {"_id": order}}, {"$skip": offset}, {"$limit": limit}]
+        if projection:
+            data_stages.append({"$project": {**projection, "_id": 1}})
+        result = await collection.aggregate([
+            {"$match": query},
+            {"$facet": {"items": data_stages, "total": [{"$count": "count"}]}},
+        ]).to_list(length=1)
+        facet = result[0] if result else {"items": [], "total": []}
+        items = facet["items"]
+        total = facet["total"][0]["count"] if facet["total"] else 0
+        return {
+            "items": items,
+            "total": total,
+            "next_cursor": str(items[-1]["_id"]) if items and offset + len(items) < total else None,
+        }
+
+    async def update(self, item_id: str, changes: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        """Apply ``$set`` and return the updated document (None when not found)"""
+        collection = await self.collection()
+        if collection is None:
+            return None
+        changes = normalize_timestamps({**changes, "updated_at": datetime.utcnow()}, self.timestamp_fields)
+        changes.pop("_id", None)
+        return await collection.find_one_and_update(
+            {self.id_field: item_id},
+            {"$set": changes},
+            return_document=ReturnDocument.AFTER,
+        )
+
+    async def delete(self, item_id: str) -> int:
+        collection = await self.collection()
+        if collection is None:
+            return 0
+        result = await collection.delete_one({self.id_field: item_id})
+        return result.deleted_count
+
+    async def stats(self, query: Dict[str, Any], group_field: str = "status") -> Optional[Dict[str, Any]]:
+        """Total and per-``group_field`` counts in one aggregation"""
+        collection = await self.collection()
+        if collection is None:
+            return None
+        result = await collection.aggregate([
+            {"$match": query},
+            {"$facet": {
+                "total": [{"$count": "count"}],
+                "groups": [{"$group": {"_id": f"${group_field}", "count": {"$sum": 1}}}],
+            }},
+        ]).to_list(length=1)
+        facet = result[0] if result else {"total": [], "groups": []}
+        return {
+            "total": facet["total"][0]["count"] if facet["total"] else 0,
+            "by_" + group_field: {str(row["_id"]): row["count"] for row in facet["groups"]},
+        }
+
+    async def ping(self) -> bool:
+        collection = await self.collection()
+        if collection is None:
+            return False
+        await collection.find_one({}, {"_id": 1})
+        return True
+
+
+# Repository registry, one repository per collection
+_repositories: Dict[str, AsyncRepository] = {}
+
+
+def get_repository(collection_name: str) -> AsyncRepository:
+    """Get the shared repository for ``collection_name``"""
+    repository = _repositories.get(collection_name)
+    if repository is None:
+        repository = _repositories[collection_name] = AsyncRepository(collection_name)
+    return repository
@@ -0,0 +1,81 @@
+"""
+Response Serialization for MEWAYZ V2
+orjson-backed JSON responses that encode models, ObjectIds and datetimes without a Python-level walk
+"""
+
+import decimal
+from datetime import timedelta
+from functools import lru_cache
+from typing import Any, List, Type
+
+import orjson
+from bson import ObjectId
+from bson.decimal128 import Decimal128
+from pydantic import BaseModel, TypeAdapter
+from starlette.responses import JSONResponse
+
+ORJSON_OPTIONS = orjson.OPT_NON_STR_KEYS | orjson.OPT_SERIALIZE_NUMPY
+
+
+def orjson_default(value: Any) -> Any:
+    """
+    Types orjson does not encode itself. datetime, date, UUID, Enum and dataclasses are
+    handled natively; the results match what ``jsonable_encoder`` produced for these types.
+    """
+    if isinstance(value, ObjectId):
+        return str(value)
+    if isinstance(value, BaseModel):
+        return value.__pydantic_serializer__.to_python(value, mode="json", by_alias=True)
+    if isinstance(value, Decimal128):
+        value = value.to_decimal()
+    if isinstance(value, decimal.Decimal):
+        return int(value) if value.as_tuple().exponent >= 0 else float(value)
+    if isinstance(value, (set, frozenset)):
+        return list(value)
+    if isinstance(value, timedelta):
+        return value.total_seconds()
+    if isinstance(value, bytes):
+        return value.decode()
+    raise TypeError(f"Object of type {type(value).__name__} is not JSON serializable")
+
+
+def dumps(content: Any) -> bytes:
+    return orjson.dumps(content, default=orjson_default, option=ORJSON_OPTIONS)
+
+
+@lru_cache(maxsize=None)
+def _list_adapter(model: Type[BaseModel]) -> TypeAdapter:
+    """Serializer for ``List[model]``, built once per model"""
+    return TypeAdapter(List[model])
+
+
+def render_models(content: Any) -> bytes:
+    """
+    JSON for a model or a list of one model type, encoded in a single pass by pydantic-core.
+    Aliases are used, as FastAPI's ``response_model`` serialization does. Anything else is
+    encoded by orjson.
+    """
+    if isinstance(content, BaseModel):
+        return content.__pydantic_serializer__.to_json(content, by_alias=True)
+    if isinstance(content, (list, tuple)) and content and isinstance(content[0], BaseModel):
+        model = type(content[0])
+        if all(type(item) is model for item in content):
+            return _list_adapter(model).dump_json(list(content), by_alias=True)
+    return dumps(content)
+
+
+class ORJSONResponse(JSONResponse):
+    """
+    Default response class. Endpoints that return this directly (rather than a value for
+    FastAPI to encode) also skip ``jsonable_encoder`` and response-model revalidation.
+    """
+
+    def render(self, content: Any) -> bytes:
+        return dumps(content)
+
+
+class ModelResponse(ORJSONResponse):
+    """Response for Pydantic models and lists of them; see ``render_models``"""
+
+    def render(self, content: Any) -> bytes:
+        return render_models(content)
@@ -0,0 +1,98 @@
+"""
+Projected Reads for MEWAYZ V2
+List and search reads that fetch only the requested fields and validate each batch once into plain rows
+"""
+
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Tuple
+
+from bson import ObjectId
+from pydantic import BeforeValidator, TypeAdapter
+from typing_extensions import Annotated, TypedDict
+
+# Distinct field selections cached per spec; callers choose them, so the cache is bounded
+MAX_SELECTIONS = 64
+
+
+def _object_id_to_str(value: Any) -> Any:
+    return str(value) if isinstance(value, ObjectId) else value
+
+
+# ``_id`` and other ObjectId references, rendered as strings like the models' serializers do
+ObjectIdStr = Annotated[str, BeforeValidator(_object_id_to_str)]
+
+
+def parse_fields(value: Optional[str]) -> Optional[List[str]]:
+    """``?fields=name,price`` as a list of field names; None when not given"""
+    if not value:
+        return None
+    return [name.strip() for name in value.split(",") if name.strip()] or None
+
+
+class RowSelection:
+    """
+    One subset of a spec's fields: the Mongo projection that fetches them and a pydantic-core
+    validator for a whole batch. Rows are plain dicts keyed as stored, so they go to the
+    response encoder as they are.
+    """
+
+    def __init__(self, name: str, fields: Dict[str, Any]):
+        self.fields = tuple(fields)
+        self.projection: Dict[str, int] = {field: 1 for field in fields}
+        if "_id" not in fields:
+            self.projection["_id"] = 0
+        row_type = TypedDict(f"{name.title()}Row", fields, total=False)
+        self._adapter = TypeAdapter(List[row_type])
+
+    def rows(self, documents: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """Validate and coerce a fetched batch in one call; fields missing from a document stay missing"""
+        return self._adapter.validate_python(documents)
+
+    async def find(
+        self,
+        collection,
+        query: Dict[str, Any],
+        sort: Optional[Sequence[Tuple[str, int]]] = None,
+        skip: int = 0,
+        limit: int = 0,
+        raw: bool = False,
+    ) -> List[Dict[str, Any]]:
+        """
+        Run ``query`` with this projection. ``raw`` returns the documents as decoded, for
+        callers that only pass them on to the response encoder.
+        """
+        cursor = collection.find(query, self.projection)
+        if sort:
+            cursor = cursor.sort(list(sort))
+        if skip:
+            cursor = cursor.skip(skip)
+        if limit:
+            cursor = cursor.limit(limit)
+        documents = await cursor.to_list(length=limit or None)
+        return documents if raw else self.rows(documents)
+
+
+class RowSpec:
+    """
+    The fields a collection exposes to list and search reads, with their types. Fields left
+    out (password hashes, secrets, large bodies) cannot be selected at all.
+    """
+
+    def __init__(self, name: str, fields: Dict[str, Any], default_fields: Optional[Iterable[str]] = None):
+        self.name = name
+        self.fields = dict(fields)
+        self.default_fields = tuple(default_fields or self.fields)
+        self._selections: Dict[Tuple[str, ...], RowSelection] = {}
+
+    def select(self, fields: Optional[Iterable[str]] = None) -> RowSelection:
+        """Selection for ``fields``, or the default fields; unknown names raise ValueError"""
+        names = tuple(sorted(set(fields))) if fields else self.default_fields
+        selection = self._selections.get(names)
+        if selection is not None:
+            return selection
+        unknown = [name for name in names if name not in self.fields]
+        if unknown:
+            raise ValueError(f"Unknown {self.name} fields: {', '.join(unknown)}")
+        selection = RowSelection(self.name, {name: self.fields[name] for name in names})
+        if len(self._selections) < MAX_SELECTIONS:
+            self._selections[names] = selection
+        return selection
@@ -0,0 +1,75 @@
+"""
+Lazy service registry for MEWAYZ V2
+Service modules are imported and instantiated on first use instead of at application import
+"""
+
+import importlib
+import logging
+import threading
+from typing import Any, Callable, Dict, Optional
+
+logger = logging.getLogger(__name__)
+
+# Service name -> "module:factory"; names not listed resolve to services.<name>:get_<name>
+SERVICE_FACTORIES: Dict[str, str] = {
+    "bundle_manager": "core.bundle_manager:get_bundle_manager",
+}
+
+_factories: Dict[str, Callable[[], Any]] = {}
+_instances: Dict[str, Any] = {}
+_lock = threading.Lock()
+
+
+def _factory_path(name: str) -> str:
+    return SERVICE_FACTORIES.get(name, f"services.{name}:get_{name}")
+
+
+def register_service(name: str, factory: Callable[[], Any]) -> None:
+    """Register (or replace) the factory for ``name``; drops any cached instance"""
+    with _lock:
+        _factories[name] = factory
+        _instances.pop(name, None)
+
+
+def _load_factory(name: str) -> Callable[[], Any]:
+    factory = _factories.get(name)
+    if factory is None:
+        module_name, _, attribute = _factory_path(name).partition(":")
+        factory = getattr(importlib.import_module(module_name), attribute)
+        _factories[name] = factory
+    return factory
+
+
+def get_service(name: str) -> Any:
+    """Import, build and cache the service on first call; later calls return the same instance"""
+    instance = _instances.get(name)
+    if instance is not None:
+        return instance
+    with _lock:
+        instance = _instances.get(name)
+        if instance is None:
+            instance = _instances[name] = _load_factory(name)()
+            logger.debug(f"Service {name} loaded")
+    return instance
+
+
+def service_dependency(name: str) -> Callable[[], Any]:
+    """FastAPI dependency resolving ``name`` through the registry, e.g. ``Depends(service_dependency("crm_service"))``"""
+    def dependency() -> Any:
+        return get_service(name)
+    dependency.__name__ = f"get_{name}_dependency"
+    return dependency
+
+
+def loaded_services() -> Dict[str, str]:
+    """Services instantiated so far, with their class names"""
+    return {name: type(instance).__name__ for name, instance in _instances.items()}
+
+
+def reset_services(name: Optional[str] = None) -> None:
+    """Forget cached instances (all, or just ``name``) so the next use rebuilds them"""
+    with _lock:
+        if name is None:
+            _instances.clear()
+        else:
+            _instances.pop(name, None)
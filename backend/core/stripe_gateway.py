@@ -0,0 +1,179 @@
+"""
+Stripe gateway for MEWAYZ V2
+Runs synchronous Stripe SDK calls off the event loop over a shared keep-alive pool
+"""
+
+import asyncio
+import functools
+import logging
+import os
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Deque, Dict, Optional
+
+import requests
+import stripe
+from requests.adapters import HTTPAdapter
+
+from core.config import settings
+
+logger = logging.getLogger(__name__)
+
+
+class _CallStats:
+    """Latency counters for one Stripe operation"""
+
+    __slots__ = ("count", "errors", "total_ms", "max_ms", "recent")
+
+    def __init__(self, window: int = 256):
+        self.count = 0
+        self.errors = 0
+        self.total_ms = 0.0
+        self.max_ms = 0.0
+        self.recent: Deque[float] = deque(maxlen=window)
+
+    def record(self, elapsed_ms: float, failed: bool) -> None:
+        self.count += 1
+        self.total_ms += elapsed_ms
+        self.max_ms = max(self.max_ms, elapsed_ms)
+        self.recent.append(elapsed_ms)
+        if failed:
+            self.errors += 1
+
+    def snapshot(self) -> Dict[str, Any]:
+        recent = sorted(self.recent)
+        p95 = recent[min(len(recent) - 1, int(len(recent) * 0.95))] if recent else 0.0
+        return {
+            "count": self.count,
+            "errors": self.errors,
+            "avg_ms": round(self.total_ms / self.count, 2) if self.count else 0.0,
+            "total_ms": round(self.total_ms, 2),
+            "p95_ms": round(p95, 2),
+            "max_ms": round(self.max_ms, 2),
+        }
+
+
+class StripeGateway:
+    """Async facade over the Stripe SDK.
+
+    Calls are addressed by their SDK path, e.g. ``await gateway.request("Customer.retrieve", cus_id)``,
+    and run on a bounded thread pool so a slow Stripe round trip never blocks the loop.
+    Connections are reused through one pooled ``requests.Session`` and network failures
+    are retried by the SDK (with idempotency keys) up to ``max_retries`` times.
+
+    ``close`` releases the pool and connections but leaves the gateway usable: modules hold
+    on to the instance, so the next call (e.g. in a later lifespan) starts a fresh pool.
+    """
+
+    def __init__(
+        self,
+        api_key: Optional[str] = None,
+        api_base: Optional[str] = None,
+        timeout: float = 30.0,
+        max_retries: int = 2,
+        max_workers: int = 16,
+    ):
+        self.api_key = api_key
+        self.api_base = api_base
+        self.timeout = timeout
+        self.max_retries = max_retries
+        self.max_workers = max_workers
+
+        session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=max_workers)
+        session.mount("https://", adapter)
+        session.mount("http://", adapter)
+        self._session = session
+        self.http_client = stripe.RequestsClient(timeout=timeout, session=session)
+
+        self._executor: Optional[ThreadPoolExecutor] = None
+        self._operations: Dict[str, Callable[..., Any]] = {}
+        self._stats: Dict[str, _CallStats] = {}
+
+    def configure(self) -> None:
+        """Install the pooled client and retry policy on the global Stripe module"""
+        if self.api_key:
+            stripe.api_key = self.api_key
+        if self.api_base:
+            stripe.api_base = self.api_base
+        stripe.default_http_client = self.http_client
+        stripe.max_network_retries = self.max_retries
+
+    def _pool(self) -> ThreadPoolExecutor:
+        if self._executor is None:
+            self._executor = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix="stripe")
+        return self._executor
+
+    def _resolve(self, operation: str) -> Callable[..., Any]:
+        fn = self._operations.get(operation)
+        if fn is None:
+            fn = stripe
+            for part in operation.split("."):
+                fn = getattr(fn, part)
+            self._operations[operation] = fn
+        return fn
+
+    async def request(self, operation: str, *args: Any, **kwargs: Any) -> Any:
+        """Run a Stripe SDK call such as ``"Price.create"`` on the gateway pool"""
+        fn = self._resolve(operation)
+        loop = asyncio.get_running_loop()
+        stats = self._stats.get(operation)
+        if stats is None:
+            stats = self._stats.setdefault(operation, _CallStats())
+
+        failed = False
+        start = time.perf_counter()
+        try:
+            return await loop.run_in_executor(self._pool(), functools.partial(fn, *args, **kwargs))
+        except Exception:
+            failed = True
+            raise
+        finally:
+            elapsed_ms = (time.perf_counter() - start) * 1000
+            stats.record(elapsed_ms, failed)
+            logger.debug(f"stripe {operation} took {elapsed_ms:.1f}ms")
+
+    def get_metrics(self) -> Dict[str, Any]:
+        """Per-operation call counts and latencies"""
+        return {
+            "operations": {name: stats.snapshot() for name, stats in sorted(self._stats.items())},
+            "pool_size": self.max_workers,
+            "timeout_seconds": self.timeout,
+            "max_network_retries": self.max_retries,
+        }
+
+    def reset_metrics(self) -> None:
+        self._stats.clear()
+
+    def close(self) -> None:
+        executor, self._executor = self._executor, None
+        if executor is not None:
+            executor.shutdown(wait=False)
+        # Drops pooled connections; the session reconnects on its next request
+        self._session.close()
+
+
+# Gateway instance
+_gateway: Optional[StripeGateway] = None
+
+
+def get_stripe_gateway() -> StripeGateway:
+    """Get gateway instance"""
+    global _gateway
+    if _gateway is None:
+        _gateway = StripeGateway(
+            api_key=os.environ.get("STRIPE_SECRET_KEY"),
+            api_base=settings.STRIPE_API_BASE,
+            timeout=settings.STRIPE_TIMEOUT_SECONDS,
+            max_retries=settings.STRIPE_MAX_NETWORK_RETRIES,
+            max_workers=settings.STRIPE_POOL_SIZE,
+        )
+        _gateway.configure()
+    return _gateway
+
+
+def close_stripe_gateway() -> None:
+    """Release the gateway's threads and connections; the instance stays valid for reuse"""
+    if _gateway is not None:
+        _gateway.close()
@@ -0,0 +1,207 @@
+"""
+Logging pipeline for MEWAYZ V2
+Records are queued on the calling thread and formatted, written and rotated on a listener thread
+"""
+
+import atexit
+import json
+import logging
+import logging.handlers
+import os
+import queue
+import sys
+import uuid
+import zlib
+from contextvars import ContextVar
+from datetime import datetime, timezone
+from typing import Any, Dict, List, Optional
+
+from core.config import settings
+
+REQUEST_ID_HEADER = "X-Request-ID"
+
+# Loggers that configure their own handlers; routed through the pipeline instead
+THIRD_PARTY_LOGGERS = ("uvicorn", "uvicorn.error", "uvicorn.access")
+
+_request_id: ContextVar[Optional[str]] = ContextVar("request_id", default=None)
+_listener: Optional[logging.handlers.QueueListener] = None
+
+# Attributes every LogRecord has; anything else was passed through ``extra=``
+_RECORD_FIELDS = set(vars(logging.LogRecord("", 0, "", 0, "", None, None))) | {"message", "request_id"}
+
+
+def get_request_id() -> Optional[str]:
+    return _request_id.get()
+
+
+def bind_request_id(request_id: Optional[str] = None) -> Any:
+    """Tag every record logged in this context with ``request_id``; returns a token for ``reset_request_id``"""
+    return _request_id.set(request_id or uuid.uuid4().hex)
+
+
+def reset_request_id(token: Any) -> None:
+    _request_id.reset(token)
+
+
+class RequestIdFilter(logging.Filter):
+    """Copies the request id onto the record while still on the request's thread and context"""
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        record.request_id = _request_id.get()
+        return True
+
+
+class SamplingFilter(logging.Filter):
+    """
+    Keeps ``rate`` of the INFO-and-below records logged during requests. The decision
+    hashes the request id, so a request's records are kept or dropped together.
+    Warnings and errors, and records outside a request (startup, background tasks),
+    are always kept.
+    """
+
+    def __init__(self, rate: float):
+        super().__init__()
+        self.threshold = int(max(0.0, min(rate, 1.0)) * 10000)
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        if self.threshold >= 10000 or record.levelno > logging.INFO:
+            return True
+        request_id = getattr(record, "request_id", None)
+        if request_id is None:
+            return True
+        return zlib.crc32(request_id.encode()) % 10000 < self.threshold
+
+
+class JSONFormatter(logging.Formatter):
+    """One JSON object per line: timestamp, level, logger, message, request id and any ``extra`` fields"""
+
+    def format(self, record: logging.LogRecord) -> str:
+        entry: Dict[str, Any] = {
+            "timestamp": datetime.fromtimestamp(record.created, timezone.utc).isoformat(timespec="milliseconds"),
+            "level": record.levelname,
+            "logger": record.name,
+            "message": record.getMessage(),
+        }
+        request_id = getattr(record, "request_id", None)
+        if request_id:
+            entry["request_id"] = request_id
+        for key, value in record.__dict__.items():
+            if key not in _RECORD_FIELDS:
+                entry[key] = value
+        if record.exc_info:
+            record.exc_text = record.exc_text or self.formatException(record.exc_info)
+        if record.exc_text:
+            entry["exception"] = record.exc_text
+        return json.dumps(entry, default=str, ensure_ascii=False)
+
+
+class TextFormatter(logging.Formatter):
+    def __init__(self):
+        super().__init__("%(asctime)s - %(name)s - %(levelname)s - %(message)s")
+
+    def format(self, record: logging.LogRecord) -> str:
+        line = super().format(record)
+        fields = " ".join(f"{key}={value}" for key, value in record.__dict__.items() if key not in _RECORD_FIELDS)
+        if fields:
+            line = f"{line} {fields}"
+        request_id = getattr(record, "request_id", None)
+        return f"{line} [{request_id}]" if request_id else line
+
+
+class _QueueHandler(logging.handlers.QueueHandler):
+    """
+    Resolves the message and traceback on the calling thread, so later changes to the
+    arguments cannot leak into the record, and leaves all formatting to the listener.
+    Records stay in process, so unlike the base class it does not copy them.
+    """
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        record.msg = record.getMessage()
+        record.args = None
+        if record.exc_info:
+            record.exc_text = logging.Formatter().formatException(record.exc_info)
+            record.exc_info = None
+        return record
+
+
+def process_log_file(log_file: Optional[str], shared: bool) -> Optional[str]:
+    """
+    ``log_file`` for this process. Workers sharing one file would each rotate it under
+    the others, so when ``shared`` each gets its own: ``mewayz.log`` -> ``mewayz.<pid>.log``.
+    """
+    if not log_file or not shared:
+        return log_file
+    root, ext = os.path.splitext(log_file)
+    return f"{root}.{os.getpid()}{ext or '.log'}"
+
+
+def build_handlers(log_format: str, log_file: Optional[str], max_bytes: int, backups: int,
+                   stream=None) -> List[logging.Handler]:
+    """Handlers that run on the listener thread"""
+    formatter = JSONFormatter() if log_format == "json" else TextFormatter()
+    handlers: List[logging.Handler] = [logging.StreamHandler(stream or sys.stdout)]
+    if log_file:
+        # Rotation runs with the write, on the listener thread
+        handlers.append(logging.handlers.RotatingFileHandler(
+            log_file, maxBytes=max_bytes, backupCount=backups, encoding="utf-8"))
+    for handler in handlers:
+        handler.setFormatter(formatter)
+    return handlers
+
+
+def configure_logging(level: Optional[str] = None, log_format: Optional[str] = None,
+                      log_file: Optional[str] = None, sample_rate: Optional[float] = None,
+                      handlers: Optional[List[logging.Handler]] = None) -> logging.handlers.QueueListener:
+    """
+    Route every record through a queue to a listener thread; replaces the root handlers.
+    Calling it again returns the running listener. Call it in each worker (the app's
+    startup), not at import, so the file handler belongs to the process that writes it.
+    """
+    global _listener
+    if _listener is not None:
+        return _listener
+
+    records: queue.SimpleQueue = queue.SimpleQueue()
+    queue_handler = _QueueHandler(records)
+    queue_handler.addFilter(RequestIdFilter())
+    queue_handler.addFilter(SamplingFilter(
+        sample_rate if sample_rate is not None else settings.LOG_INFO_SAMPLE_RATE))
+
+    root = logging.getLogger()
+    for handler in root.handlers[:]:
+        root.removeHandler(handler)
+    root.addHandler(queue_handler)
+    root.setLevel((level or settings.LOG_LEVEL).upper())
+    for name in THIRD_PARTY_LOGGERS:
+        third_party = logging.getLogger(name)
+        third_party.handlers.clear()
+        third_party.propagate = True
+
+    if handlers is None:
+        handlers = build_handlers(
+            log_format or settings.LOG_FORMAT,
+            process_log_file(log_file if log_file is not None else settings.LOG_FILE,
+                             settings.LOG_WORKERS > 1 or bool(settings.METRICS_MULTIPROC_DIR)),
+            settings.LOG_FILE_MAX_BYTES,
+            settings.LOG_FILE_BACKUPS,
+        )
+    _listener = logging.handlers.QueueListener(records, *handlers, respect_handler_level=True)
+    _listener.start()
+    # The listener thread is a daemon; drain the queue before the interpreter exits
+    atexit.register(shutdown_logging)
+    return _listener
+
+
+def shutdown_logging() -> None:
+    """Write out queued records and detach the pipeline"""
+    global _listener
+    if _listener is None:
+        return
+    _listener.stop()
+    for handler in _listener.handlers:
+        handler.close()
+    _listener = None
+    root = logging.getLogger()
+    for handler in root.handlers[:]:
+        if isinstance(handler, _QueueHandler):
+            root.removeHandler(handler)
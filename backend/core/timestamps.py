@@ -0,0 +1,144 @@
+"""
+Timestamp normalization for MEWAYZ V2
+Store timestamps as BSON dates, read both dates and legacy ISO strings, backfill old documents
+"""
+
+import asyncio
+import logging
+from datetime import datetime, timezone
+from typing import Any, Dict, Iterable, List, Optional
+
+from pymongo import UpdateOne
+
+logger = logging.getLogger(__name__)
+
+TIMESTAMP_FIELDS = ("created_at", "updated_at")
+MIGRATIONS_COLLECTION = "schema_migrations"
+
+
+def to_datetime(value: Any) -> Any:
+    """Parse an ISO-8601 string into a naive UTC datetime; other values pass through"""
+    if not isinstance(value, str) or not value:
+        return value
+    try:
+        parsed = datetime.fromisoformat(value.replace("Z", "+00:00"))
+    except ValueError:
+        return value
+    if parsed.tzinfo is not None:
+        parsed = parsed.astimezone(timezone.utc).replace(tzinfo=None)
+    return parsed
+
+
+def normalize_timestamps(document: Dict[str, Any], fields: Iterable[str] = TIMESTAMP_FIELDS) -> Dict[str, Any]:
+    """Convert timestamp fields of a document (or ``$set`` payload) to datetimes before writing"""
+    for field in fields:
+        if field in document:
+            document[field] = to_datetime(document[field])
+    return document
+
+
+def serialize_timestamps(document: Dict[str, Any]) -> Dict[str, Any]:
+    """Render datetime values as ISO strings for JSON responses"""
+    return {k: v.isoformat() if isinstance(v, datetime) else v for k, v in document.items()}
+
+
+def date_range(field: str, gte: Optional[datetime] = None, lt: Optional[datetime] = None,
+               lte: Optional[datetime] = None) -> Dict[str, Any]:
+    """Range filter matching ``field`` whether it is stored as a date or an ISO string.
+
+    ISO strings written by ``datetime.isoformat()`` sort lexically in time order, so the
+    string branch uses the same bounds rendered as strings.
+    """
+    bounds = {op: value for op, value in (("$gte", gte), ("$lt", lt), ("$lte", lte)) if value is not None}
+    if not bounds:
+        return {}
+    as_dates = {field: {"$type": "date", **bounds}}
+    as_strings = {field: {"$type": "string", **{op: value.isoformat() for op, value in bounds.items()}}}
+    return {"$or": [as_dates, as_strings]}
+
+
+def date_expr(field: str) -> Dict[str, Any]:
+    """Aggregation expression yielding ``field`` as a date for ``$dateTrunc``/``$group`` stages"""
+    path = f"${field}"
+    return {
+        "$cond": [
+            {"$eq": [{"$type": path}, "string"]},
+            {"$dateFromString": {"dateString": path, "onError": None, "onNull": None}},
+            path,
+        ]
+    }
+
+
+class TimestampBackfill:
+    """
+    Online, resumable conversion of ISO-string timestamps to BSON dates for one collection.
+
+    Documents are walked in ``_id`` order in batches of ``batch_size``; each batch is one
+    unordered ``bulk_write``. After every batch the last ``_id`` is saved to
+    ``schema_migrations`` so an interrupted run resumes where it stopped. ``pause`` seconds
+    between batches keeps the load on a live cluster bounded.
+    """
+
+    def __init__(self, db, collection_name: str, fields: Iterable[str] = TIMESTAMP_FIELDS,
+                 batch_size: int = 500, pause: float = 0.05):
+        self.db = db
+        self.collection_name = collection_name
+        self.fields = list(fields)
+        self.batch_size = batch_size
+        self.pause = pause
+        self.checkpoint_id = f"timestamps:{collection_name}"
+
+    async def _load_checkpoint(self) -> Dict[str, Any]:
+        return await self.db[MIGRATIONS_COLLECTION].find_one({"_id": self.checkpoint_id}) or {}
+
+    async def _save_checkpoint(self, last_id: Any, converted: int, done: bool) -> None:
+        await self.db[MIGRATIONS_COLLECTION].update_one(
+            {"_id": self.checkpoint_id},
+            {"$set": {"last_id": last_id, "done": done, "updated_at": datetime.utcnow(),
+                      "fields": self.fields},
+             "$inc": {"converted": converted}},
+            upsert=True,
+        )
+
+    async def reset(self) -> None:
+        await self.db[MIGRATIONS_COLLECTION].delete_one({"_id": self.checkpoint_id})
+
+    async def run(self, max_batches: Optional[int] = None) -> Dict[str, Any]:
+        """Convert until no string timestamps remain or ``max_batches`` have run"""
+        collection = self.db[self.collection_name]
+        checkpoint = await self._load_checkpoint()
+        last_id = checkpoint.get("last_id")
+        string_filter = {"$or": [{field: {"$type": "string"}} for field in self.fields]}
+        projection = {field: 1 for field in self.fields}
+
+        batches = converted = 0
+        while max_batches is None or batches < max_batches:
+            query = string_filter if last_id is None else {"$and": [string_filter, {"_id": {"$gt": last_id}}]}
+            docs: List[Dict[str, Any]] = await collection.find(query, projection).sort("_id", 1) \
+                .limit(self.batch_size).to_list(length=self.batch_size)
+            if not docs:
+                await self._save_checkpoint(last_id, 0, done=True)
+                logger.info(f"Timestamp backfill for {self.collection_name} complete ({converted} converted this run)")
+                return {"collection": self.collection_name, "converted": converted, "batches": batches, "done": True}
+
+            operations = []
+            for doc in docs:
+                changes = {field: to_datetime(doc[field]) for field in self.fields
+                           if isinstance(doc.get(field), str)}
+                changes = {field: value for field, value in changes.items() if isinstance(value, datetime)}
+                if changes:
+                    # Only rewrite values still stored as strings, so concurrent writers win
+                    condition = {"_id": doc["_id"], **{field: doc[field] for field in changes}}
+                    operations.append(UpdateOne(condition, {"$set": changes}))
+            modified = 0
+            if operations:
+                result = await collection.bulk_write(operations, ordered=False)
+                modified = result.modified_count
+            converted += modified
+            last_id = docs[-1]["_id"]
+            batches += 1
+            await self._save_checkpoint(last_id, modified, done=False)
+            if self.pause:
+                await asyncio.sleep(self.pause)
+
+        return {"collection": self.collection_name, "converted": converted, "batches": batches, "done": False}
@@ -10,9 +10,19 @@ from motor.motor_asyncio import AsyncIOMotorDatabase
 from bson import ObjectId
 from db.base import get_database
 from models.comments import Comment, CommentCreate, CommentUpdate, CommentStats
+from pymongo import ASCENDING, DESCENDING, IndexModel
+from core.indexes import declare_indexes
 
 logger = logging.getLogger(__name__)
 
+declare_indexes(
+    "comments",
+    IndexModel([("id", ASCENDING)]),
+    IndexModel([("product_id", ASCENDING), ("parent_id", ASCENDING), ("is_deleted", ASCENDING),
+                ("is_approved", ASCENDING), ("created_at", DESCENDING)]),
+    IndexModel([("user_id", ASCENDING), ("is_deleted", ASCENDING), ("created_at", DESCENDING)]),
+)
+
 
 class CommentCRUD:
     """CRUD operations for comments"""
@@ -2,6 +2,7 @@ from typing import Any, Dict, Union
 
 from motor.core import AgnosticDatabase
 
+from core.cache import collection_changed
 from core.security import get_password_hash, verify_password
 from crud.base import CRUDBase
 from models.user import User
@@ -24,7 +25,9 @@ class CRUDUser(CRUDBase[User, UserCreate, UserUpdate]):
             "is_superuser": obj_in.is_superuser,
         }
 
-        return await self.engine.save(User(**user))
+        created = await self.engine.save(User(**user))
+        collection_changed("users")
+        return created
 
     async def update(self, db: AgnosticDatabase, *, db_obj: User, obj_in: Union[UserUpdate, Dict[str, Any]]) -> User: # noqa
         if isinstance(obj_in, dict):
@@ -2,7 +2,7 @@
 E-commerce CRUD Operations for MEWAYZ V2
 """
 
-from typing import List, Optional
+from typing import Any, Dict, Iterable, List, Optional
 from bson import ObjectId
 from motor.motor_asyncio import AsyncIOMotorCollection
 from models.ecommerce import (
@@ -11,6 +11,7 @@ from models.ecommerce import (
     Vendor, VendorApplication
 )
 from db.session import get_engine
+from crud.products import PRODUCT_ROWS
 from datetime import datetime
 
 
@@ -53,6 +54,31 @@ class ProductCRUD:
             
         return await self.engine.find(Product, filters, skip=skip, limit=limit)
     
+    async def get_product_rows(
+        self,
+        fields: Optional[Iterable[str]] = None,
+        skip: int = 0,
+        limit: int = 100,
+        category_id: Optional[str] = None,
+        bundle_type: Optional[str] = None,
+        vendor_id: Optional[str] = None,
+        is_active: bool = True,
+        raw: bool = False
+    ) -> List[Dict[str, Any]]:
+        """Projected rows with the same filtering as ``get_products``, without building models"""
+        filters = {"is_active": is_active}
+        
+        if category_id:
+            filters["category_id"] = category_id
+        if bundle_type:
+            filters["bundle_type"] = bundle_type
+        if vendor_id:
+            filters["vendor_id"] = vendor_id
+            
+        return await PRODUCT_ROWS.select(fields).find(
+            self.engine.database.products, filters, skip=skip, limit=limit, raw=raw
+        )
+    
     async def update_product(self, product_id: str, product_update: ProductUpdate) -> Optional[Product]:
         """Update product"""
         product = await self.get_product(product_id)
@@ -93,6 +119,22 @@ class ProductCRUD:
             limit=limit
         )
         return products
+    
+    async def search_product_rows(self, query: str, fields: Optional[Iterable[str]] = None, limit: int = 50,
+                                  raw: bool = False) -> List[Dict[str, Any]]:
+        """Projected rows matching ``search_products``"""
+        return await PRODUCT_ROWS.select(fields).find(
+            self.engine.database.products,
+            {
+                "$or": [
+                    {"name": {"$regex": query, "$options": "i"}},
+                    {"description": {"$regex": query, "$options": "i"}},
+                    {"tags": {"$in": [query]}}
+                ]
+            },
+            limit=limit,
+            raw=raw
+        )
 
 
 class CategoryCRUD:
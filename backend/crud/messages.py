@@ -10,9 +10,18 @@ from motor.motor_asyncio import AsyncIOMotorDatabase
 from bson import ObjectId
 from db.base import get_database
 from models.messages import Message, MessageCreate, MessageUpdate, ConversationSummary
+from pymongo import ASCENDING, DESCENDING, IndexModel
+from core.indexes import declare_indexes
 
 logger = logging.getLogger(__name__)
 
+declare_indexes(
+    "messages",
+    IndexModel([("id", ASCENDING)]),
+    IndexModel([("sender_id", ASCENDING), ("is_deleted", ASCENDING), ("created_at", DESCENDING)]),
+    IndexModel([("recipient_id", ASCENDING), ("is_deleted", ASCENDING), ("is_read", ASCENDING), ("created_at", DESCENDING)]),
+)
+
 
 class MessageCRUD:
     """CRUD operations for messages"""
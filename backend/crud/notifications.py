@@ -4,15 +4,47 @@ Database operations for notification functionality
 """
 
 import logging
-from typing import List, Optional, Dict, Any
+from typing import List, Optional, Dict, Any, Iterable
 from datetime import datetime
 from motor.motor_asyncio import AsyncIOMotorDatabase
 from bson import ObjectId
 from db.base import get_database
 from models.notifications import Notification, NotificationCreate, NotificationUpdate, NotificationStats
+from pymongo import ASCENDING, DESCENDING, IndexModel
+from core.indexes import declare_indexes
+from core.rows import RowSpec
 
 logger = logging.getLogger(__name__)
 
+declare_indexes(
+    "notifications",
+    IndexModel([("id", ASCENDING)]),
+    IndexModel([("user_id", ASCENDING), ("is_deleted", ASCENDING), ("is_read", ASCENDING), ("created_at", DESCENDING)]),
+    IndexModel([("user_id", ASCENDING), ("notification_type", ASCENDING), ("created_at", DESCENDING)]),
+)
+
+# Fields notification list reads may project
+NOTIFICATION_ROWS = RowSpec(
+    "notification",
+    {
+        "id": str,
+        "user_id": str,
+        "title": str,
+        "message": str,
+        "notification_type": str,
+        "priority": str,
+        "is_read": bool,
+        "action_url": Optional[str],
+        "action_data": Optional[Dict[str, Any]],
+        "metadata": Optional[Dict[str, Any]],
+        "created_at": datetime,
+        "read_at": Optional[datetime],
+        "expires_at": Optional[datetime],
+    },
+    default_fields=("id", "title", "message", "notification_type", "priority", "is_read", "action_url",
+                    "created_at"),
+)
+
 
 class NotificationCRUD:
     """CRUD operations for notifications"""
@@ -102,6 +134,36 @@ class NotificationCRUD:
             logger.error(f"Error getting user notifications: {e}")
             raise
     
+    async def get_user_notification_rows(
+        self,
+        user_id: str,
+        fields: Optional[Iterable[str]] = None,
+        page: int = 1,
+        limit: int = 20,
+        unread_only: bool = False,
+        type_filter: Optional[str] = None,
+        raw: bool = False
+    ) -> List[Dict[str, Any]]:
+        """Projected rows of a user's notifications, newest first; see ``NOTIFICATION_ROWS``"""
+        selection = NOTIFICATION_ROWS.select(fields)
+        try:
+            query = {
+                "user_id": user_id,
+                "is_deleted": False
+            }
+            
+            if unread_only:
+                query["is_read"] = False
+            
+            if type_filter:
+                query["notification_type"] = type_filter
+            
+            return await selection.find(self.collection, query, sort=[("created_at", -1)],
+                                        skip=(page - 1) * limit, limit=limit, raw=raw)
+        except Exception as e:
+            logger.error(f"Error getting user notification rows: {e}")
+            raise
+    
     async def update_notification(self, notification_id: str, update_data: NotificationUpdate) -> Optional[Notification]:
         """Update a notification"""
         try:
@@ -8,9 +8,22 @@ from datetime import datetime
 from motor.motor_asyncio import AsyncIOMotorDatabase
 from bson import ObjectId
 from models.ecommerce import Order, OrderCreate
+from pymongo import ASCENDING, DESCENDING, IndexModel
+from core.indexes import declare_indexes
 
 logger = logging.getLogger(__name__)
 
+declare_indexes(
+    "orders",
+    IndexModel([("user_id", ASCENDING), ("created_at", DESCENDING)]),
+    IndexModel([("user_id", ASCENDING), ("status", ASCENDING), ("created_at", DESCENDING)]),
+    IndexModel([("items.product_id", ASCENDING), ("created_at", DESCENDING)]),
+    IndexModel([("customer_id", ASCENDING)]),
+    IndexModel([("vendor_id", ASCENDING)]),
+    IndexModel([("status", ASCENDING)]),
+    IndexModel([("created_at", DESCENDING)]),
+)
+
 
 class OrderCRUD:
     """CRUD operations for orders"""
@@ -3,14 +3,57 @@ Products CRUD operations for MEWAYZ V2
 """
 
 import logging
-from typing import List, Optional, Dict, Any
+from typing import List, Optional, Dict, Any, Iterable
 from datetime import datetime
 from motor.motor_asyncio import AsyncIOMotorDatabase
 from bson import ObjectId
 from models.ecommerce import Product, ProductCreate, ProductUpdate
+from pymongo import ASCENDING, DESCENDING, IndexModel, TEXT
+from core.cache import collection_changed
+from core.indexes import declare_indexes
+from core.rows import ObjectIdStr, RowSpec
 
 logger = logging.getLogger(__name__)
 
+declare_indexes(
+    "products",
+    IndexModel([("vendor_id", ASCENDING), ("created_at", DESCENDING)]),
+    IndexModel([("category_id", ASCENDING), ("is_active", ASCENDING)]),
+    IndexModel([("is_active", ASCENDING)]),
+    IndexModel([("created_at", DESCENDING)]),
+    IndexModel([("price", ASCENDING)]),
+    IndexModel([("tags", ASCENDING)]),
+    IndexModel([("name", TEXT), ("description", TEXT)]),
+    # Covers the per-bundle product and vendor counts in BundleService
+    IndexModel([("bundle_type", ASCENDING), ("vendor_id", ASCENDING)]),
+)
+
+# Fields product list and search reads may project; the default is what a product card shows
+PRODUCT_ROWS = RowSpec(
+    "product",
+    {
+        "_id": ObjectIdStr,
+        "name": str,
+        "description": str,
+        "price": float,
+        "category_id": Optional[str],
+        "category_name": Optional[str],
+        "image_urls": List[str],
+        "stock": int,
+        "sku": Optional[str],
+        "is_active": bool,
+        "tags": List[str],
+        "vendor_id": Optional[str],
+        "vendor_name": Optional[str],
+        "bundle_type": Optional[str],
+        "is_digital": bool,
+        "created_at": Optional[datetime],
+        "updated_at": Optional[datetime],
+    },
+    default_fields=("_id", "name", "price", "image_urls", "stock", "is_active", "vendor_id", "bundle_type",
+                    "created_at"),
+)
+
 
 class ProductCRUD:
     """CRUD operations for products"""
@@ -29,6 +72,7 @@ class ProductCRUD:
             
             result = await self.collection.insert_one(product_dict)
             product_dict["_id"] = result.inserted_id
+            collection_changed("products")
             
             return Product(**product_dict)
         except Exception as e:
@@ -64,6 +108,17 @@ class ProductCRUD:
             logger.error(f"Error getting user products: {e}")
             return []
     
+    async def get_user_product_rows(self, user_id: str, fields: Optional[Iterable[str]] = None,
+                                    limit: Optional[int] = None, raw: bool = False) -> List[Dict[str, Any]]:
+        """Projected rows of a user's products, newest first; see ``PRODUCT_ROWS``"""
+        selection = PRODUCT_ROWS.select(fields)
+        try:
+            return await selection.find(self.collection, {"vendor_id": user_id}, sort=[("created_at", -1)],
+                                        limit=limit or 0, raw=raw)
+        except Exception as e:
+            logger.error(f"Error getting user product rows: {e}")
+            return []
+    
     async def get_user_products_count(self, user_id: str) -> int:
         """Get count of products for a user"""
         try:
@@ -84,6 +139,7 @@ class ProductCRUD:
             )
             
             if result.modified_count > 0:
+                collection_changed("products")
                 return await self.get_product(product_id)
             return None
         except Exception as e:
@@ -96,6 +152,8 @@ class ProductCRUD:
             result = await self.collection.delete_one(
                 {"_id": ObjectId(product_id), "vendor_id": user_id}
             )
+            if result.deleted_count > 0:
+                collection_changed("products")
             return result.deleted_count > 0
         except Exception as e:
             logger.error(f"Error deleting product {product_id}: {e}")
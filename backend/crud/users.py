@@ -3,14 +3,41 @@ Users CRUD operations for MEWAYZ V2
 """
 
 import logging
-from typing import List, Optional, Dict, Any
+from typing import List, Optional, Dict, Any, Iterable
 from datetime import datetime
 from motor.motor_asyncio import AsyncIOMotorDatabase
 from bson import ObjectId
 from models.user import User
+from pymongo import ASCENDING, DESCENDING, IndexModel
+from core.cache import collection_changed
+from core.indexes import declare_indexes
+from core.rows import ObjectIdStr, RowSpec
 
 logger = logging.getLogger(__name__)
 
+declare_indexes(
+    "users",
+    IndexModel([("email", ASCENDING)], unique=True),
+    IndexModel([("is_active", ASCENDING)]),
+    IndexModel([("created", DESCENDING)]),
+    IndexModel([("created_at", DESCENDING)]),
+)
+
+# Fields user search may project; credentials and tokens are deliberately absent
+USER_ROWS = RowSpec(
+    "user",
+    {
+        "_id": ObjectIdStr,
+        "full_name": str,
+        "email": str,
+        "email_validated": bool,
+        "is_active": bool,
+        "is_superuser": bool,
+        "created": Optional[datetime],
+    },
+    default_fields=("_id", "full_name", "email", "is_active"),
+)
+
 
 class UserCRUD:
     """CRUD operations for users"""
@@ -27,6 +54,7 @@ class UserCRUD:
             
             result = await self.collection.insert_one(user_data)
             user_data["_id"] = result.inserted_id
+            collection_changed("users")
             
             return User(**user_data)
         except Exception as e:
@@ -76,6 +104,8 @@ class UserCRUD:
         """Delete a user"""
         try:
             result = await self.collection.delete_one({"_id": ObjectId(user_id)})
+            if result.deleted_count > 0:
+                collection_changed("users")
             return result.deleted_count > 0
         except Exception as e:
             logger.error(f"Error deleting user {user_id}: {e}")
@@ -125,6 +155,22 @@ class UserCRUD:
         except Exception as e:
             logger.error(f"Error searching users: {e}")
             return []
+    
+    async def search_user_rows(self, query: str, fields: Optional[Iterable[str]] = None, limit: int = 20,
+                               raw: bool = False) -> List[Dict[str, Any]]:
+        """Projected rows of users whose name or email matches; see ``USER_ROWS``"""
+        selection = USER_ROWS.select(fields)
+        try:
+            search_filter = {
+                "$or": [
+                    {"full_name": {"$regex": query, "$options": "i"}},
+                    {"email": {"$regex": query, "$options": "i"}}
+                ]
+            }
+            return await selection.find(self.collection, search_filter, limit=limit, raw=raw)
+        except Exception as e:
+            logger.error(f"Error searching user rows: {e}")
+            return []
 
 
 # Global instance
@@ -8,6 +8,9 @@ from motor.motor_asyncio import AsyncIOMotorClient, AsyncIOMotorDatabase
 from dotenv import load_dotenv
 from pathlib import Path
 
+from core.metrics import mongo_event_listeners
+from core.profiling import profiling_event_listeners
+
 # Load environment variables
 ROOT_DIR = Path(__file__).parent.parent
 load_dotenv(ROOT_DIR / '.env')
@@ -16,8 +19,8 @@ load_dotenv(ROOT_DIR / '.env')
 mongo_url = os.environ.get('MONGO_URL', 'mongodb://localhost:27017')
 db_name = os.environ.get('DB_NAME', 'mewayz')
 
-# Create client
-client = AsyncIOMotorClient(mongo_url)
+# Create client; its commands show up in /metrics and request profiles like the core client's
+client = AsyncIOMotorClient(mongo_url, event_listeners=mongo_event_listeners() + profiling_event_listeners())
 db = client[db_name]
 
 
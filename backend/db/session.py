@@ -1,4 +1,6 @@
 from core.config import settings
+from core.metrics import mongo_event_listeners
+from core.profiling import profiling_event_listeners
 from __version__ import __version__
 from motor import motor_asyncio, core
 from odmantic import AIOEngine
@@ -15,7 +17,8 @@ class _MongoClientSingleton:
         if not hasattr(cls, "instance"):
             cls.instance = super(_MongoClientSingleton, cls).__new__(cls)
             cls.instance.mongo_client = motor_asyncio.AsyncIOMotorClient(
-                settings.MONGO_DATABASE_URI, driver=DRIVER_INFO
+                settings.MONGO_DATABASE_URI, driver=DRIVER_INFO,
+                event_listeners=mongo_event_listeners() + profiling_event_listeners()
             )
             cls.instance.engine = AIOEngine(client=cls.instance.mongo_client, database=settings.MONGO_DATABASE)
         return cls.instance
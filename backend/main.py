@@ -3,11 +3,13 @@ MEWAYZ V2 - Complete Business Platform
 Built with FastAPI + MongoDB + React stack
 """
 
-from fastapi import FastAPI
+from fastapi import FastAPI, Request
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import PlainTextResponse
 from contextlib import asynccontextmanager
 import os
 import logging
+import secrets
 
 # Import production middleware
 try:
@@ -22,6 +24,13 @@ except ImportError as e:
     print(f"Warning: Production middleware not available: {e}")
     MIDDLEWARE_AVAILABLE = False
 
+from core.config import settings
+from core.structured_logging import configure_logging
+from core.metrics import CONTENT_TYPE as METRICS_CONTENT_TYPE, get_metrics_registry
+from core.responses import ORJSONResponse
+from middleware.metrics_middleware import MetricsMiddleware
+from middleware.profiling_middleware import ProfilingMiddleware
+
 # Import our basic server functionality
 from server import api_router as basic_router
 
@@ -37,24 +46,30 @@ from api.api_v1.endpoints.messages import router as messages_router
 from api.api_v1.endpoints.comments import router as comments_router
 from api.api_v1.endpoints.notifications import router as notifications_router
 
-# Configure logging
-logging.basicConfig(
-    level=logging.INFO,
-    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s',
-    handlers=[
-        logging.FileHandler('mewayz.log'),
-        logging.StreamHandler()
-    ]
-)
 logger = logging.getLogger(__name__)
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
+    # Configure logging in this worker: records are written and rotated off the event loop
+    configure_logging()
+
     # Startup
     logger.info("🚀 MEWAYZ V2 starting up...")
     logger.info(f"Environment: {os.getenv('ENVIRONMENT', 'development')}")
     logger.info(f"Database: {os.getenv('MONGO_DATABASE', 'mewayz')}")
     
+    # Time response serialization for profiled requests
+    if settings.PROFILING_ENABLED:
+        from core.profiling import install_serialization_timer
+        install_serialization_timer()
+
+    # Write this worker's metrics snapshot for multi-worker scrapes
+    try:
+        get_metrics_registry().start()
+        logger.info(f"✅ Metrics ready (multiprocess dir: {settings.METRICS_MULTIPROC_DIR or 'off'})")
+    except Exception as e:
+        logger.error(f"❌ Metrics failed to start: {e}")
+
     # Test database connection
     try:
         from db.session import ping
@@ -62,11 +77,107 @@ async def lifespan(app: FastAPI):
         logger.info("✅ Database connection established")
     except Exception as e:
         logger.error(f"❌ Database connection failed: {e}")
-    
+
+    # Create declared indexes in the background and report unused ones
+    try:
+        from core.database import get_database_async
+        from core.indexes import start_index_reconciliation
+        start_index_reconciliation(await get_database_async(), settings.INDEX_RECONCILE_LEASE_SECONDS)
+        logger.info("✅ Index reconciliation started")
+    except Exception as e:
+        logger.error(f"❌ Index reconciliation failed to start: {e}")
+
+    # Load plan prices, features and limits into memory and follow admin edits
+    try:
+        from core.database import get_database_async
+        from core.plan_catalog import get_plan_catalog_manager
+        plan_catalog = await get_plan_catalog_manager().start(await get_database_async())
+        logger.info(f"✅ Plan catalog v{plan_catalog.version} loaded")
+    except Exception as e:
+        logger.error(f"❌ Plan catalog failed to load: {e}")
+
+    # Load reusable Stripe prices so checkouts skip Price.create
+    try:
+        from services.stripe_price_catalog_service import get_stripe_price_catalog_service
+        cached_prices = await get_stripe_price_catalog_service().warm()
+        logger.info(f"✅ Stripe price catalog loaded: {cached_prices}")
+    except Exception as e:
+        logger.error(f"❌ Stripe price catalog warm-up failed: {e}")
+
+    # Compile email templates once so sends skip file I/O and parsing
+    try:
+        from utilities.email_templates import get_email_templates
+        loaded = get_email_templates().warm()
+        logger.info(f"✅ Email templates compiled: {loaded}")
+    except Exception as e:
+        logger.error(f"❌ Email template warm-up failed: {e}")
+
+    # Open the pooled upstream client used by the proxy endpoints
+    try:
+        from core.proxy_client import get_proxy_client
+        proxy_client = get_proxy_client()
+        proxy_client.start()
+        logger.info(f"✅ Proxy client ready (http2={proxy_client.http2})")
+    except Exception as e:
+        logger.error(f"❌ Proxy client failed to start: {e}")
+
+    # Flush batched usage counters in the background
+    try:
+        from core.metering import get_usage_meter
+        get_usage_meter().start()
+        logger.info("✅ Usage meter started")
+    except Exception as e:
+        logger.error(f"❌ Usage meter failed to start: {e}")
+
+    # Append batched fee ledger journals in the background
+    try:
+        from core.fee_ledger import get_fee_ledger
+        get_fee_ledger().start()
+        logger.info("✅ Fee ledger started")
+    except Exception as e:
+        logger.error(f"❌ Fee ledger failed to start: {e}")
+
+    # Post again the fee journals a stopped worker may have had queued
+    try:
+        from datetime import datetime, timedelta
+        from services.escrow_service import get_escrow_service
+        since = datetime.utcnow() - timedelta(hours=settings.FEE_LEDGER_REPOST_HOURS)
+        reposted = await get_escrow_service().repost_fee_journals(since)
+        logger.info(f"✅ Fee journals re-posted: {reposted.get('journals', 0)}")
+    except Exception as e:
+        logger.error(f"❌ Fee journal re-post failed: {e}")
+
+    # Drain the Stripe webhook inbox in the background
+    try:
+        from api.api_v1.endpoints.stripe_webhooks import EVENT_HANDLERS
+        from services.stripe_webhook_inbox_service import get_stripe_webhook_inbox_service
+        await get_stripe_webhook_inbox_service().start(EVENT_HANDLERS)
+        logger.info("✅ Stripe webhook inbox started")
+    except Exception as e:
+        logger.error(f"❌ Stripe webhook inbox failed to start: {e}")
+
     yield
     
     # Shutdown
     logger.info("🛑 MEWAYZ V2 shutting down...")
+    from services.stripe_webhook_inbox_service import get_stripe_webhook_inbox_service
+    await get_stripe_webhook_inbox_service().stop()
+    from core.fee_ledger import close_fee_ledger
+    await close_fee_ledger()
+    from core.metering import close_usage_meter
+    await close_usage_meter()
+    from core.plan_catalog import close_plan_catalog
+    await close_plan_catalog()
+    from core.stripe_gateway import close_stripe_gateway
+    close_stripe_gateway()
+    from core.proxy_client import close_proxy_client
+    await close_proxy_client()
+    from core.database import close_database_connections
+    await close_database_connections()
+    from core.profiling import close_request_profiler
+    await close_request_profiler()
+    from core.metrics import close_metrics_registry
+    await close_metrics_registry()
 
 app = FastAPI(
     title="MEWAYZ V2 - Business Platform",
@@ -74,6 +185,7 @@ app = FastAPI(
     version="2.0.0",
     openapi_url="/api/v1/openapi.json",
     lifespan=lifespan,
+    default_response_class=ORJSONResponse,
     docs_url="/api/docs" if os.getenv("ENVIRONMENT") != "production" else None,
     redoc_url="/api/redoc" if os.getenv("ENVIRONMENT") != "production" else None,
 )
@@ -102,6 +214,14 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# Profiles cover everything below the metrics middleware
+if settings.PROFILING_ENABLED:
+    app.add_middleware(ProfilingMiddleware)
+
+# Outermost, so latency includes every other middleware
+if settings.METRICS_ENABLED:
+    app.add_middleware(MetricsMiddleware)
+
 # Include the basic API router
 app.include_router(basic_router)
 
@@ -170,6 +290,20 @@ async def health_check():
             "production_ready": False
         }
 
+# Prometheus scrape endpoint
+@app.get("/metrics", include_in_schema=False)
+async def metrics(request: Request):
+    """Request, MongoDB, cache and queue metrics in the Prometheus text format"""
+    if not settings.METRICS_ENABLED:
+        return PlainTextResponse("Metrics disabled", status_code=404)
+    if not settings.METRICS_TOKEN and settings.METRICS_REQUIRE_TOKEN:
+        return PlainTextResponse("Metrics require METRICS_TOKEN", status_code=403)
+    if settings.METRICS_TOKEN:
+        supplied = request.headers.get("authorization", "").removeprefix("Bearer ")
+        if not secrets.compare_digest(supplied, settings.METRICS_TOKEN):
+            return PlainTextResponse("Unauthorized", status_code=401)
+    return PlainTextResponse(await get_metrics_registry().render_async(), media_type=METRICS_CONTENT_TYPE)
+
 # Comprehensive CRUD test endpoint
 @app.get("/api/crud-test")
 async def crud_test():
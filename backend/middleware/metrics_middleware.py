@@ -0,0 +1,52 @@
+"""
+Request metrics middleware for MEWAYZ V2
+Per-route latency histograms and in-flight gauges, as plain ASGI so it adds no task per request
+"""
+
+import time
+
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from core.metrics import MetricsRegistry, get_metrics_registry
+
+# Paths that do not match a route share one label instead of one series each
+UNMATCHED_ROUTE = "unmatched"
+
+
+class MetricsMiddleware:
+    """
+    Times every HTTP request by method, route template (``/api/v1/users/{user_id}``, not
+    the raw path) and status code. The route is only known once routing has run, so it is
+    read from the scope after the response.
+    """
+
+    def __init__(self, app: ASGIApp, registry: MetricsRegistry = None):
+        self.app = app
+        registry = registry or get_metrics_registry()
+        self.duration = registry.histogram(
+            "http_request_duration_seconds", "HTTP request latency", ("method", "route", "status"))
+        self.in_flight = registry.gauge(
+            "http_requests_in_flight", "HTTP requests being served", ("method",))
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        method = scope["method"]
+        status = 500
+
+        async def send_with_status(message: Message) -> None:
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            await send(message)
+
+        self.in_flight.inc(1, method)
+        start = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_with_status)
+        finally:
+            self.in_flight.dec(1, method)
+            route = getattr(scope.get("route"), "path", None) or UNMATCHED_ROUTE
+            self.duration.observe(time.perf_counter() - start, method, route, str(status))
@@ -12,8 +12,9 @@ import asyncio
 from collections import defaultdict
 import hashlib
 
-# Configure logging
-logging.basicConfig(level=logging.INFO)
+from core.structured_logging import REQUEST_ID_HEADER, bind_request_id, get_request_id, reset_request_id
+
+# Handlers are set up once by core.structured_logging.configure_logging
 logger = logging.getLogger(__name__)
 
 
@@ -80,24 +81,31 @@ class SecurityHeadersMiddleware(BaseHTTPMiddleware):
 
 
 class RequestLoggingMiddleware(BaseHTTPMiddleware):
-    """Log all requests for monitoring"""
+    """Log all requests for monitoring, one structured record per request"""
     
     async def dispatch(self, request: Request, call_next):
-        start_time = time.time()
-        
-        # Log request
-        logger.info(f"Request: {request.method} {request.url.path} from {request.client.host}")
-        
-        response = await call_next(request)
-        
-        # Log response
-        process_time = time.time() - start_time
-        logger.info(f"Response: {response.status_code} in {process_time:.4f}s")
+        start_time = time.perf_counter()
         
-        # Add timing header
-        response.headers["X-Process-Time"] = str(process_time)
-        
-        return response
+        # Every record logged while handling the request carries its id
+        request_id = request.headers.get(REQUEST_ID_HEADER) or None
+        token = bind_request_id(request_id[:64] if request_id else None)
+        try:
+            response = await call_next(request)
+            process_time = time.perf_counter() - start_time
+            logger.info("request", extra={
+                "method": request.method,
+                "path": request.url.path,
+                "status": response.status_code,
+                "duration_ms": round(process_time * 1000, 2),
+                "client": request.client.host if request.client else None,
+            })
+            
+            # Add timing and correlation headers
+            response.headers["X-Process-Time"] = str(process_time)
+            response.headers[REQUEST_ID_HEADER] = get_request_id()
+            return response
+        finally:
+            reset_request_id(token)
 
 
 class ErrorHandlingMiddleware(BaseHTTPMiddleware):
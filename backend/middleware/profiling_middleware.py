@@ -0,0 +1,50 @@
+"""
+Request profiling middleware for MEWAYZ V2
+Profiles requests that carry a signed X-Profile header or fall in the sampling rate
+"""
+
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from core.profiling import PROFILE_HEADER, PROFILE_ID_HEADER, RequestProfiler, get_request_profiler
+
+_HEADER = PROFILE_HEADER.lower().encode()
+
+
+class ProfilingMiddleware:
+    """
+    Plain ASGI so an unprofiled request costs one header scan (and one random draw when
+    sampling is on). A profiled response carries ``X-Profile-Id`` for the admin endpoint.
+    """
+
+    def __init__(self, app: ASGIApp, profiler: RequestProfiler = None):
+        self.app = app
+        self.profiler = profiler
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        token = next((value.decode("latin-1") for name, value in scope["headers"] if name == _HEADER), None)
+        profiler = self.profiler or get_request_profiler()
+        reason = profiler.should_profile(token)
+        if reason is None:
+            await self.app(scope, receive, send)
+            return
+
+        profile, context_token = profiler.begin(scope["method"], scope["path"], reason)
+        status = None
+
+        async def send_with_profile_id(message: Message) -> None:
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+                message["headers"] = list(message.get("headers", [])) + [
+                    (PROFILE_ID_HEADER.lower().encode(), profile.id.encode())
+                ]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_profile_id)
+        finally:
+            profiler.end(profile, context_token, status, getattr(scope.get("route"), "path", None))
@@ -0,0 +1,132 @@
+"""
+Query Fan-out Benchmark for MEWAYZ V2
+Times the multi-query service methods run one query at a time versus fanned out concurrently
+"""
+
+import asyncio
+import statistics
+import sys
+import time
+from pathlib import Path
+
+# Add the backend directory to the Python path
+backend_dir = Path(__file__).parent.parent
+sys.path.insert(0, str(backend_dir))
+
+from core.cache import collection_changed
+from core.config import settings
+from core.plan_catalog import PlanCatalogManager
+from services.admin_plan_management_service import AdminPlanManagementService
+from services.booking_service import BookingService
+from services.bundle_service import BundleService
+from services.plan_subscription_counter_service import PlanSubscriptionCounterService
+from services.dashboard_service import DashboardService
+
+
+class _SlowCursor:
+    """Cursor whose fetch costs one simulated database round trip"""
+
+    def __init__(self, latency: float):
+        self.latency = latency
+
+    def sort(self, *args, **kwargs):
+        return self
+
+    def limit(self, *args):
+        return self
+
+    async def to_list(self, length=None):
+        await asyncio.sleep(self.latency)
+        return []
+
+
+class _SlowCollection:
+    def __init__(self, latency: float):
+        self.latency = latency
+
+    def find(self, *args, **kwargs):
+        return _SlowCursor(self.latency)
+
+    def aggregate(self, pipeline):
+        return _SlowCursor(self.latency)
+
+    async def find_one(self, *args, **kwargs):
+        await asyncio.sleep(self.latency)
+        return None
+
+    async def count_documents(self, query):
+        await asyncio.sleep(self.latency)
+        return 0
+
+    async def estimated_document_count(self):
+        await asyncio.sleep(self.latency)
+        return 0
+
+
+class _SlowDatabase:
+    """Stand-in database where every query waits ``latency`` seconds, like a network round trip"""
+
+    def __init__(self, latency: float):
+        self.latency = latency
+
+    def __getitem__(self, name):
+        return _SlowCollection(self.latency)
+
+    def __getattr__(self, name):
+        return _SlowCollection(self.latency)
+
+
+async def time_call(call, iterations: int) -> dict:
+    timings = []
+    for _ in range(iterations):
+        start = time.perf_counter()
+        await call()
+        timings.append((time.perf_counter() - start) * 1000)
+    return {"p50_ms": statistics.median(timings), "max_ms": max(timings)}
+
+
+async def main():
+    """Main function with command line argument support"""
+    import argparse
+
+    parser = argparse.ArgumentParser(description='MEWAYZ V2 query fan-out benchmark')
+    parser.add_argument('--latency-ms', type=float, default=2.0, help='Simulated round trip per query')
+    parser.add_argument('--iterations', type=int, default=20, help='Calls per method and mode')
+
+    args = parser.parse_args()
+    db = _SlowDatabase(args.latency_ms / 1000)
+
+    booking = BookingService()
+    booking.repository._collection = db["booking"]
+    plans = AdminPlanManagementService()
+    plans.db = db
+    plans.plan_catalog = PlanCatalogManager()
+    plans.counters = PlanSubscriptionCounterService(db)
+    bundles = BundleService(db)
+
+    async def active_bundles_uncached():
+        # Measure the snapshot load itself, not the cached read
+        collection_changed("products")
+        return await bundles.get_active_bundles()
+
+    methods = {
+        "DashboardService.get_system_overview": DashboardService(db).get_system_overview,
+        "BookingService.get_booking_stats": booking.get_booking_stats,
+        "BundleService.get_active_bundles": active_bundles_uncached,
+        "AdminPlanManagementService.get_plan_analytics": plans.get_plan_analytics,
+    }
+
+    concurrency = settings.FANOUT_CONCURRENCY
+    print(f"{args.latency_ms}ms per query, {args.iterations} calls each, fan-out concurrency {concurrency}")
+    for name, call in methods.items():
+        settings.FANOUT_CONCURRENCY = 1
+        sequential = await time_call(call, args.iterations)
+        settings.FANOUT_CONCURRENCY = concurrency
+        concurrent = await time_call(call, args.iterations)
+        speedup = sequential["p50_ms"] / concurrent["p50_ms"] if concurrent["p50_ms"] else 0.0
+        print(f"  {name:<46} sequential p50 {sequential['p50_ms']:7.2f}ms  "
+              f"fan-out p50 {concurrent['p50_ms']:7.2f}ms  ({speedup:.1f}x)")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,137 @@
+"""
+Revenue Forecasting Benchmark for MEWAYZ V2
+Times the vectorized forecasts and the nightly projection batch at 10k workspaces, with holdout accuracy
+"""
+
+import asyncio
+import statistics
+import sys
+import time
+from datetime import datetime
+from pathlib import Path
+
+import numpy as np
+
+# Add the backend directory to the Python path
+backend_dir = Path(__file__).parent.parent
+sys.path.insert(0, str(backend_dir))
+
+from core import forecasting
+from services.enterprise_revenue_service import (
+    EnterpriseRevenueService,
+    _add_months,
+    _history_months,
+    _month_start,
+)
+
+
+def synthetic_history(workspaces: int, months: int, seed: int = 42) -> np.ndarray:
+    """Monthly revenue with per-workspace scale, growth, seasonality and noise"""
+    rng = np.random.default_rng(seed)
+    t = np.arange(months)
+    scale = rng.lognormal(8, 1, size=(workspaces, 1))
+    growth = rng.normal(0.02, 0.03, size=(workspaces, 1))
+    seasonality = 1 + rng.uniform(0, 0.3, size=(workspaces, 1)) * np.sin(2 * np.pi * t / 12)
+    noise = rng.lognormal(0, 0.1, size=(workspaces, months))
+    return scale * (1 + growth) ** t * seasonality * noise
+
+
+def growth_loop(history: np.ndarray, horizon: int) -> list:
+    """The previous per-workspace projection: mean month-over-month growth, compounded"""
+    projections = []
+    for row in history.tolist():
+        rates = [(row[i] - row[i - 1]) / row[i - 1] for i in range(1, len(row)) if row[i - 1] > 0]
+        rate = sum(rates) / len(rates) if rates else 0
+        projections.append([row[-1] * (1 + rate) ** i for i in range(1, horizon + 1)])
+    return projections
+
+
+def time_call(call, iterations: int) -> float:
+    timings = []
+    for _ in range(iterations):
+        start = time.perf_counter()
+        call()
+        timings.append((time.perf_counter() - start) * 1000)
+    return statistics.median(timings)
+
+
+class _Cursor:
+    def __init__(self, rows):
+        self.rows = rows
+
+    def __aiter__(self):
+        return self._iterate()
+
+    async def _iterate(self):
+        for row in self.rows:
+            yield row
+
+
+class _MemoryCollection:
+    def __init__(self, rows=()):
+        self.rows = list(rows)
+        self.written = 0
+
+    def aggregate(self, pipeline, allowDiskUse=False):
+        return _Cursor(self.rows)
+
+    async def bulk_write(self, requests, ordered=True):
+        self.written += len(requests)
+
+
+class _MemoryDatabase:
+    """Revenue buckets already grouped by workspace and month, as the batch aggregation returns them"""
+
+    def __init__(self, history: np.ndarray, months):
+        self.enterprise_revenue_aggregates = _MemoryCollection(
+            {"_id": {"workspace_id": f"ws{row}", "period_start": month}, "amount": float(history[row, column])}
+            for row in range(history.shape[0]) for column, month in enumerate(months)
+        )
+        self.enterprise_revenue_projections = _MemoryCollection()
+
+
+async def main():
+    """Main function with command line argument support"""
+    import argparse
+
+    parser = argparse.ArgumentParser(description='MEWAYZ V2 revenue forecasting benchmark')
+    parser.add_argument('--workspaces', type=int, default=10000, help='Workspaces to forecast')
+    parser.add_argument('--horizon', type=int, default=12, help='Months to project')
+    parser.add_argument('--holdout', type=int, default=6, help='Months held back to score accuracy')
+    parser.add_argument('--iterations', type=int, default=5, help='Runs per measurement')
+
+    args = parser.parse_args()
+    months = _history_months(_month_start(datetime.utcnow()))
+    history = synthetic_history(args.workspaces, len(months))
+
+    print(f"{args.workspaces} workspaces, {len(months)} months of history, {args.horizon} months ahead")
+    loop_ms = time_call(lambda: growth_loop(history, args.horizon), args.iterations)
+    print(f"  {'per-workspace growth loop (previous)':<40} p50 {loop_ms:9.2f}ms")
+    for method in forecasting.METHODS:
+        elapsed = time_call(lambda: forecasting.forecast(history, args.horizon, method), args.iterations)
+        print(f"  {method:<40} p50 {elapsed:9.2f}ms  ({loop_ms / elapsed:.1f}x)")
+
+    # Score each method on months it did not see
+    longer = synthetic_history(args.workspaces, 24 + args.holdout)
+    train, actual = longer[:, :-args.holdout], longer[:, -args.holdout:]
+    print(f"Holdout of {args.holdout} months after 24 months of history")
+    previous = np.array(growth_loop(train, args.holdout))
+    print(f"  {'per-workspace growth loop (previous)':<40} MAPE {np.mean(np.abs(previous - actual) / actual):6.1%}")
+    for method in forecasting.METHODS:
+        result = forecasting.forecast(train, args.holdout, method, level=0.8)
+        error = np.mean(np.abs(result["forecast"] - actual) / actual)
+        coverage = np.mean((result["lower"] <= actual) & (actual <= result["upper"]))
+        print(f"  {method:<40} MAPE {error:6.1%}  80% interval coverage {coverage:6.1%}")
+
+    service = EnterpriseRevenueService.__new__(EnterpriseRevenueService)
+    service.enterprise_config = {"revenue_share_rate": 0.15, "minimum_monthly_fee": 99.0}
+    service.db = _MemoryDatabase(history, months)
+    start = time.perf_counter()
+    result = await service.precompute_revenue_projections(months_ahead=args.horizon)
+    elapsed = (time.perf_counter() - start) * 1000
+    print(f"Nightly batch: {result['workspaces']} workspaces projected in {elapsed:.0f}ms "
+          f"(first month {_add_months(months[-1], 1).strftime('%Y-%m')})")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,127 @@
+"""
+Logging Benchmark for MEWAYZ V2
+Measures the time per request spent on the event loop logging it, with handlers writing inline versus through the queue
+"""
+
+import asyncio
+import logging
+import logging.handlers
+import os
+import statistics
+import sys
+import tempfile
+import time
+import uuid
+from pathlib import Path
+
+# Add the backend directory to the Python path
+backend_dir = Path(__file__).parent.parent
+sys.path.insert(0, str(backend_dir))
+
+from core.structured_logging import (
+    JSONFormatter,
+    bind_request_id,
+    configure_logging,
+    reset_request_id,
+    shutdown_logging,
+)
+
+
+class _SlowDiskMixin:
+    """Adds a fixed delay to every write, like a busy or network-mounted disk"""
+
+    write_latency = 0.0
+
+    def emit(self, record):
+        if self.write_latency:
+            time.sleep(self.write_latency)
+        super().emit(record)
+
+
+class SlowFileHandler(_SlowDiskMixin, logging.FileHandler):
+    pass
+
+
+class SlowRotatingFileHandler(_SlowDiskMixin, logging.handlers.RotatingFileHandler):
+    pass
+
+
+def _inline_handlers(log_file: str, devnull):
+    """The previous setup: basicConfig with a FileHandler and a StreamHandler, written on the caller"""
+    formatter = logging.Formatter('%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+    handlers = [SlowFileHandler(log_file), logging.StreamHandler(devnull)]
+    for handler in handlers:
+        handler.setFormatter(formatter)
+    return handlers
+
+
+def _queued_handlers(log_file: str, devnull):
+    formatter = JSONFormatter()
+    # Small files so rotation happens during the run
+    handlers = [SlowRotatingFileHandler(log_file, maxBytes=1024 * 1024, backupCount=2),
+                logging.StreamHandler(devnull)]
+    for handler in handlers:
+        handler.setFormatter(formatter)
+    return handlers
+
+
+async def run_requests(logger: logging.Logger, requests: int, structured: bool) -> list:
+    """Log ``requests`` requests the way each middleware does; returns loop time per request in microseconds"""
+    timings = []
+    for n in range(requests):
+        await asyncio.sleep(0)
+        start = time.perf_counter()
+        if structured:
+            token = bind_request_id(uuid.uuid4().hex)
+            logger.info("request", extra={"method": "GET", "path": "/api/v1/analytics/products", "status": 200,
+                                          "duration_ms": 4.2, "client": "10.0.0.1"})
+            reset_request_id(token)
+        else:
+            logger.info("Request: GET /api/v1/analytics/products from 10.0.0.1")
+            logger.info(f"Response: 200 in {0.0042:.4f}s")
+        timings.append((time.perf_counter() - start) * 1e6)
+    return timings
+
+
+def _report(name: str, timings: list, elapsed: float) -> None:
+    ordered = sorted(timings)
+    p99 = ordered[min(len(ordered) - 1, int(len(ordered) * 0.99))]
+    print(f"  {name:<28} mean {statistics.mean(timings):8.1f}us  p99 {p99:8.1f}us  "
+          f"wall incl. drain {elapsed:6.2f}s")
+
+
+async def main():
+    """Main function with command line argument support"""
+    import argparse
+
+    parser = argparse.ArgumentParser(description='MEWAYZ V2 logging overhead benchmark')
+    parser.add_argument('--requests', type=int, default=20000, help='Requests to log per mode')
+    parser.add_argument('--disk-latency-ms', type=float, default=0.05, help='Simulated delay per file write')
+
+    args = parser.parse_args()
+    _SlowDiskMixin.write_latency = args.disk_latency_ms / 1000
+    logger = logging.getLogger("benchmark.requests")
+    root = logging.getLogger()
+    print(f"{args.requests} requests per mode, {args.disk_latency_ms}ms per file write")
+
+    with tempfile.TemporaryDirectory() as tmp, open(os.devnull, "w") as devnull:
+        handlers = _inline_handlers(os.path.join(tmp, "inline.log"), devnull)
+        root.handlers[:] = handlers
+        root.setLevel(logging.INFO)
+        start = time.perf_counter()
+        timings = await run_requests(logger, args.requests, structured=False)
+        _report("inline FileHandler, 2 lines", timings, time.perf_counter() - start)
+        for handler in handlers:
+            handler.close()
+
+        for name, rate in (("queue + JSON", 1.0), ("queue + JSON, 10% sampled", 0.1)):
+            configure_logging(level="INFO", sample_rate=rate,
+                              handlers=_queued_handlers(os.path.join(tmp, f"queued-{rate}.log"), devnull))
+            start = time.perf_counter()
+            timings = await run_requests(logger, args.requests, structured=True)
+            shutdown_logging()
+            _report(name, timings, time.perf_counter() - start)
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,98 @@
+"""
+Proxy Client Benchmark for MEWAYZ V2
+Compares a fresh httpx.AsyncClient per call with the pooled streaming proxy client
+"""
+
+import asyncio
+import statistics
+import sys
+import time
+import tracemalloc
+from pathlib import Path
+
+# Add the backend directory to the Python path
+backend_dir = Path(__file__).parent.parent
+sys.path.insert(0, str(backend_dir))
+
+import httpx
+
+from core.proxy_client import ProxyClient
+from tests.utils.upstream_stub import UpstreamStub
+
+
+async def run_requests(call, requests: int, concurrency: int) -> dict:
+    """Run ``call`` ``requests`` times with bounded concurrency and collect latencies"""
+    semaphore = asyncio.Semaphore(concurrency)
+    latencies = []
+
+    async def one():
+        async with semaphore:
+            start = time.perf_counter()
+            await call()
+            latencies.append((time.perf_counter() - start) * 1000)
+
+    start = time.perf_counter()
+    await asyncio.gather(*[one() for _ in range(requests)])
+    elapsed = time.perf_counter() - start
+    latencies.sort()
+    return {
+        "req_per_s": requests / elapsed,
+        "p50_ms": statistics.median(latencies),
+        "p95_ms": latencies[int(len(latencies) * 0.95) - 1],
+    }
+
+
+async def peak_memory(call) -> int:
+    tracemalloc.start()
+    await call()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return peak
+
+
+async def main():
+    """Main function with command line argument support"""
+    import argparse
+
+    parser = argparse.ArgumentParser(description='MEWAYZ V2 proxy client benchmark')
+    parser.add_argument('--requests', type=int, default=500, help='Requests per scenario')
+    parser.add_argument('--concurrency', type=int, default=20, help='Concurrent requests')
+    parser.add_argument('--size', type=int, default=65536, help='Upstream response size in bytes')
+    parser.add_argument('--large-size', type=int, default=8 * 1024 * 1024, help='Body size for the memory test')
+    parser.add_argument('--latency', type=float, default=0.0, help='Upstream latency in seconds')
+
+    args = parser.parse_args()
+
+    with UpstreamStub(latency=args.latency) as upstream:
+        url = f"{upstream.url}/bytes/{args.size}"
+        large_url = f"{upstream.url}/bytes/{args.large_size}"
+        pooled = ProxyClient(per_host_limit=args.concurrency, max_response_bytes=args.large_size * 2)
+
+        async def per_call_client(target=url):
+            async with httpx.AsyncClient() as client:
+                response = await client.get(target)
+                return response.content
+
+        async def pooled_client(target=url):
+            upstream_response = await pooled.open("GET", target, headers={})
+            async for _ in upstream_response.iter_body():
+                pass
+
+        print(f"{args.requests} GETs of {args.size} bytes, concurrency {args.concurrency}")
+        for name, call in (("client per call", per_call_client), ("pooled client", pooled_client)):
+            upstream.connections.clear()
+            result = await run_requests(call, args.requests, args.concurrency)
+            print(f"  {name:<16} {result['req_per_s']:8.1f} req/s  p50 {result['p50_ms']:6.2f}ms  "
+                  f"p95 {result['p95_ms']:6.2f}ms  upstream connections {len(upstream.connections)}")
+
+        print(f"Peak Python memory relaying one {args.large_size} byte body (includes the stub's own copy)")
+        buffered = await peak_memory(lambda: per_call_client(large_url))
+        streamed = await peak_memory(lambda: pooled_client(large_url))
+        print(f"  buffered         {buffered / 1024:10.0f} KiB")
+        print(f"  streamed         {streamed / 1024:10.0f} KiB")
+
+        await pooled.close()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,118 @@
+"""
+Projected Read Benchmark for MEWAYZ V2
+Measures CPU and memory per 1k rows for list reads: full model hydration versus projected rows and raw passthrough
+"""
+
+import asyncio
+import statistics
+import sys
+import time
+import tracemalloc
+from datetime import datetime, timedelta
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional
+
+# Add the backend directory to the Python path
+backend_dir = Path(__file__).parent.parent
+sys.path.insert(0, str(backend_dir))
+
+import bson
+from bson import ObjectId
+
+from core.responses import dumps, render_models
+from crud.products import PRODUCT_ROWS
+from crud.users import USER_ROWS
+from models.ecommerce import Product
+from models.user import User
+
+NOW = datetime(2024, 6, 1, 12, 0, 0)
+
+
+def product_document(n: int) -> Dict[str, Any]:
+    return {
+        "_id": ObjectId(), "name": f"Product {n}", "description": "A long product description. " * 40,
+        "price": 19.99 + n, "category_id": str(ObjectId()), "category_name": "Courses",
+        "image_urls": [f"https://cdn.mewayz.com/p/{n}/{i}.jpg" for i in range(6)], "stock": n % 50,
+        "sku": f"SKU-{n:06d}", "is_active": True, "tags": ["digital", "bestseller", "new", "featured"],
+        "vendor_id": "vendor-1", "vendor_name": "Vendor", "bundle_type": "ecommerce", "is_digital": False,
+        "download_url": None, "created_at": NOW - timedelta(minutes=n), "updated_at": NOW,
+    }
+
+
+def user_document(n: int) -> Dict[str, Any]:
+    return {
+        "_id": ObjectId(), "full_name": f"User {n}", "email": f"user{n}@example.com",
+        "hashed_password": "$2b$12$" + "x" * 53, "totp_secret": None, "totp_counter": None,
+        "email_validated": True, "is_active": True, "is_superuser": False,
+        "refresh_tokens": [ObjectId() for _ in range(5)], "created": NOW, "modified": NOW,
+    }
+
+
+def encode_batch(documents: List[Dict[str, Any]], fields: Optional[Dict[str, int]] = None) -> bytes:
+    """Wire bytes for a batch, projected the way the server would project it"""
+    if fields:
+        documents = [{k: v for k, v in doc.items() if fields.get(k, 0)} for doc in documents]
+    return b"".join(bson.encode(doc) for doc in documents)
+
+
+def hydrate_products(wire: bytes) -> bytes:
+    # PyObjectId's validator rejects stored ids, so the model generates its own as it would on create
+    products = [Product(**{k: v for k, v in doc.items() if k != "_id"}) for doc in bson.decode_all(wire)]
+    return render_models(products)
+
+
+def hydrate_users(wire: bytes) -> bytes:
+    return render_models([User(**doc) for doc in bson.decode_all(wire)])
+
+
+def measure(name: str, fn: Callable[[bytes], bytes], wire: bytes, rows: int, rounds: int) -> None:
+    cpu = []
+    for _ in range(rounds):
+        start = time.process_time()
+        body = fn(wire)
+        cpu.append((time.process_time() - start) * 1000)
+
+    tracemalloc.start()
+    body = fn(wire)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    per_k = 1000 / rows
+    print(f"  {name:<28} wire {len(wire) * per_k / 1024:7.1f} KiB  cpu {statistics.median(cpu) * per_k:7.2f} ms  "
+          f"peak {peak * per_k / 1024:8.1f} KiB  body {len(body) * per_k / 1024:7.1f} KiB")
+
+
+async def main():
+    """Main function with command line argument support"""
+    import argparse
+
+    parser = argparse.ArgumentParser(description='MEWAYZ V2 projected read benchmark')
+    parser.add_argument('--rows', type=int, default=1000, help='Documents per batch')
+    parser.add_argument('--rounds', type=int, default=20, help='Timed runs per path')
+
+    args = parser.parse_args()
+    products = [product_document(n) for n in range(args.rows)]
+    users = [user_document(n) for n in range(args.rows)]
+    product_rows = PRODUCT_ROWS.select()
+    user_rows = USER_ROWS.select()
+
+    print(f"Per 1k rows (batch of {args.rows}, median of {args.rounds}); decode, build, encode the response")
+    print("products (list card fields)")
+    measure("full hydration", hydrate_products, encode_batch(products), args.rows, args.rounds)
+    projected = encode_batch(products, product_rows.projection)
+    measure("projected rows", lambda wire: dumps(product_rows.rows(bson.decode_all(wire))), projected,
+            args.rows, args.rounds)
+    measure("projected raw passthrough", lambda wire: dumps(bson.decode_all(wire)), projected,
+            args.rows, args.rounds)
+
+    print("users (search fields)")
+    measure("full hydration", hydrate_users, encode_batch(users), args.rows, args.rounds)
+    projected = encode_batch(users, user_rows.projection)
+    measure("projected rows", lambda wire: dumps(user_rows.rows(bson.decode_all(wire))), projected,
+            args.rows, args.rounds)
+    measure("projected raw passthrough", lambda wire: dumps(bson.decode_all(wire)), projected,
+            args.rows, args.rounds)
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
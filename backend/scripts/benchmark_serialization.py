@@ -0,0 +1,133 @@
+"""
+Serialization Benchmark for MEWAYZ V2
+Measures the time to turn endpoint results into response bodies, FastAPI's encoder path versus the orjson/pydantic-core path
+"""
+
+import asyncio
+import statistics
+import sys
+import time
+from datetime import datetime, timedelta
+from pathlib import Path
+from typing import Any, Callable, List, Optional
+
+# Add the backend directory to the Python path
+backend_dir = Path(__file__).parent.parent
+sys.path.insert(0, str(backend_dir))
+
+from bson import ObjectId
+from fastapi.responses import JSONResponse
+from fastapi.routing import serialize_response
+from fastapi.utils import create_response_field
+
+from core.responses import ModelResponse, ORJSONResponse
+from models.biolinks import BioLinkButton, BioLinkPage, ContentPost, SocialLink
+from models.ecommerce import Product
+
+NOW = datetime(2024, 6, 1, 12, 0, 0, 123456)
+
+
+def make_products(count: int) -> List[Product]:
+    return [
+        Product(name=f"Product {n}", description="A reasonably long product description " * 4,
+                price=19.99 + n, category_id=str(ObjectId()), category_name="Courses",
+                image_urls=[f"https://cdn.mewayz.com/p/{n}/{i}.jpg" for i in range(4)], stock=n,
+                sku=f"SKU-{n:05d}", tags=["digital", "bestseller", "new"], vendor_id=str(ObjectId()),
+                vendor_name="Vendor", bundle_type="ecommerce", created_at=NOW, updated_at=NOW)
+        for n in range(count)
+    ]
+
+
+def make_bio_page(buttons: int) -> BioLinkPage:
+    return BioLinkPage(
+        user_id=str(ObjectId()), slug="creator", title="Creator", description="Links " * 10,
+        buttons=[BioLinkButton(title=f"Link {n}", url=f"https://example.com/{n}", position=n, click_count=n * 7)
+                 for n in range(buttons)],
+        social_links=[SocialLink(platform=platform, username="creator", url=f"https://{platform}.com/creator",
+                                 icon=platform) for platform in ("instagram", "twitter", "youtube")],
+        created_at=NOW, updated_at=NOW,
+    )
+
+
+def make_creator_dashboard() -> dict:
+    pages = [make_bio_page(10) for _ in range(5)]
+    posts = [ContentPost(user_id=str(ObjectId()), title=f"Post {n}", slug=f"post-{n}", content="Body " * 200,
+                         created_at=NOW) for n in range(5)]
+    return {
+        "bio_pages": {"total": 5, "published": 5, "total_views": 1200, "total_clicks": 340},
+        "content": {"total_posts": 5, "published": 3, "drafts": 2},
+        "recent_bio_pages": pages,
+        "recent_content": posts,
+    }
+
+
+def make_analytics_dashboard() -> dict:
+    """Shape of AnalyticsService.get_dashboard_overview"""
+    activity = [{"id": str(ObjectId()), "type": "order", "amount": 49.0, "created_at": NOW - timedelta(hours=n),
+                 "customer": {"name": "Customer", "email": "c@example.com"}} for n in range(5)]
+    top = [{"id": str(ObjectId()), "name": f"Product {n}", "revenue": 1000.0 - n, "units": 40 - n} for n in range(5)]
+    return {
+        "success": True,
+        "data": {
+            "metrics": {name: {"value": 1234.5, "growth": 12.5} for name in ("revenue", "orders", "products", "bio_links")},
+            "recent_activity": activity,
+            "top_products": top,
+            "period": {"start_date": (NOW - timedelta(days=30)).isoformat(), "end_date": NOW.isoformat()},
+        },
+        "period": "30d",
+        "generated_at": NOW.isoformat(),
+    }
+
+
+async def encoder_path(content: Any, response_model: Optional[Any]) -> bytes:
+    """What FastAPI does with a returned value: validate and encode, then stdlib json"""
+    field = create_response_field(name="Response", type_=response_model, mode="serialization") \
+        if response_model is not None else None
+    encoded = await serialize_response(field=field, response_content=content)
+    return JSONResponse(encoded).body
+
+
+async def fast_path(content: Any, response_model: Optional[Any]) -> bytes:
+    response_class = ModelResponse if response_model is not None else ORJSONResponse
+    return response_class(content).body
+
+
+async def measure(fn: Callable, content: Any, response_model: Optional[Any], rounds: int) -> List[float]:
+    timings = []
+    for _ in range(rounds):
+        start = time.perf_counter()
+        await fn(content, response_model)
+        timings.append((time.perf_counter() - start) * 1000)
+    return timings
+
+
+async def main():
+    """Main function with command line argument support"""
+    import argparse
+
+    parser = argparse.ArgumentParser(description='MEWAYZ V2 response serialization benchmark')
+    parser.add_argument('--rounds', type=int, default=300, help='Serializations per endpoint and path')
+    parser.add_argument('--products', type=int, default=100, help='Products in the list payload')
+    parser.add_argument('--buttons', type=int, default=25, help='Buttons on the bio page')
+
+    args = parser.parse_args()
+    # (endpoint, content, response_model); dashboards have no response model
+    endpoints = [
+        (f"GET /ecommerce/products (limit={args.products})", make_products(args.products), List[Product]),
+        (f"GET /creator/p/{{slug}} ({args.buttons} buttons)", make_bio_page(args.buttons), BioLinkPage),
+        ("GET /creator/dashboard", make_creator_dashboard(), None),
+        ("GET /analytics/dashboard", make_analytics_dashboard(), None),
+    ]
+
+    print(f"{args.rounds} rounds per path; times in ms")
+    for name, content, response_model in endpoints:
+        baseline = await measure(encoder_path, content, response_model, args.rounds)
+        fast = await measure(fast_path, content, response_model, args.rounds)
+        size = len(await fast_path(content, response_model))
+        speedup = statistics.median(baseline) / statistics.median(fast)
+        print(f"  {name:<42} {size / 1024:7.1f} KiB  encoder {statistics.median(baseline):7.3f}  "
+              f"fast {statistics.median(fast):7.3f}  x{speedup:.1f}")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
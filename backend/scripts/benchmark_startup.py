@@ -0,0 +1,115 @@
+"""
+Startup Benchmark for MEWAYZ V2
+Measures cold-start import time and resident memory of one app worker using python -X importtime
+"""
+
+import json
+import os
+import statistics
+import subprocess
+import sys
+from pathlib import Path
+from typing import Dict, List
+
+# Add the backend directory to the Python path
+backend_dir = Path(__file__).parent.parent
+sys.path.insert(0, str(backend_dir))
+
+# Runs in a fresh interpreter: import the app module, then report wall time and peak RSS
+PROBE = """
+import resource, sys, time
+start = time.perf_counter()
+import {module}
+elapsed = time.perf_counter() - start
+print("STARTUP", elapsed, resource.getrusage(resource.RUSAGE_SELF).ru_maxrss, len(sys.modules))
+"""
+
+
+def parse_importtime(stderr: str, depth: int = 1) -> Dict[str, int]:
+    """Cumulative microseconds per import at ``depth`` from ``-X importtime`` output.
+
+    Depth 0 is what the probe imported itself; depth 1 is what that module pulled in directly.
+    """
+    cumulative: Dict[str, int] = {}
+    for line in stderr.splitlines():
+        if not line.startswith("import time:") or line.count("|") != 2:
+            continue
+        _, cumulative_us, name = line[len("import time:"):].split("|")
+        cumulative_us = cumulative_us.strip()
+        if not cumulative_us.isdigit():
+            continue
+        # Nested imports are indented two spaces per level after the separator space
+        if (len(name) - len(name.lstrip()) - 1) // 2 != depth:
+            continue
+        name = name.strip()
+        cumulative[name] = max(cumulative.get(name, 0), int(cumulative_us))
+    return cumulative
+
+
+def run_once(module: str, depth: int) -> Dict[str, object]:
+    env = {**os.environ, "PYTHONDONTWRITEBYTECODE": "1"}
+    completed = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", PROBE.format(module=module)],
+        cwd=str(backend_dir), env=env, capture_output=True, text=True,
+    )
+    probe = [line for line in completed.stdout.splitlines() if line.startswith("STARTUP")]
+    if completed.returncode != 0 or not probe:
+        raise RuntimeError(f"Importing {module} failed:\n{completed.stderr[-2000:]}")
+    _, elapsed, max_rss_kb, modules = probe[-1].split()
+    return {
+        "seconds": float(elapsed),
+        "rss_mib": int(max_rss_kb) / 1024,
+        "modules": int(modules),
+        "imports": parse_importtime(completed.stderr, depth),
+    }
+
+
+def main():
+    """Main function with command line argument support"""
+    import argparse
+
+    parser = argparse.ArgumentParser(description='MEWAYZ V2 startup benchmark')
+    parser.add_argument('--module', default='main', help='Module a worker imports at boot')
+    parser.add_argument('--runs', type=int, default=5, help='Fresh interpreters to start')
+    parser.add_argument('--top', type=int, default=15, help='Slowest imports to list')
+    parser.add_argument('--depth', type=int, default=1, help='Import nesting level to break down')
+    parser.add_argument('--save', help='Write the summary to this JSON file')
+    parser.add_argument('--baseline', help='Compare with a summary saved by --save')
+
+    args = parser.parse_args()
+
+    runs: List[Dict[str, object]] = [run_once(args.module, args.depth) for _ in range(args.runs)]
+    summary = {
+        "module": args.module,
+        "runs": args.runs,
+        "seconds_median": statistics.median(run["seconds"] for run in runs),
+        "seconds_min": min(run["seconds"] for run in runs),
+        "rss_mib_median": statistics.median(run["rss_mib"] for run in runs),
+        "modules": runs[-1]["modules"],
+    }
+
+    print(f"import {args.module}: {args.runs} cold starts")
+    print(f"  time     median {summary['seconds_median'] * 1000:8.1f}ms  min {summary['seconds_min'] * 1000:8.1f}ms")
+    print(f"  rss      median {summary['rss_mib_median']:8.1f} MiB per worker")
+    print(f"  modules  {summary['modules']}")
+
+    imports = runs[-1]["imports"]
+    print(f"Slowest imports at depth {args.depth} (cumulative, last run)")
+    for name, micros in sorted(imports.items(), key=lambda item: item[1], reverse=True)[:args.top]:
+        print(f"  {name:<40} {micros / 1000:8.1f}ms")
+
+    if args.baseline:
+        with open(args.baseline) as handle:
+            baseline = json.load(handle)
+        for key, unit, scale in (("seconds_median", "ms", 1000), ("rss_mib_median", "MiB", 1)):
+            before, after = baseline[key] * scale, summary[key] * scale
+            change = (after - before) / before * 100 if before else 0.0
+            print(f"  {key:<16} {before:8.1f}{unit} -> {after:8.1f}{unit} ({change:+.1f}%)")
+
+    if args.save:
+        with open(args.save, "w") as handle:
+            json.dump(summary, handle, indent=2)
+
+
+if __name__ == "__main__":
+    main()
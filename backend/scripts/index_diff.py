@@ -0,0 +1,66 @@
+"""
+Index Diff Script for MEWAYZ V2
+Prints declared vs existing MongoDB indexes and optionally creates the missing ones
+"""
+
+import asyncio
+import logging
+import sys
+from pathlib import Path
+
+# Add the backend directory to the Python path
+backend_dir = Path(__file__).parent.parent
+sys.path.insert(0, str(backend_dir))
+
+from core.database import get_database_async
+from core.indexes import declared_indexes, diff_indexes, load_declarations, reconcile_indexes
+
+# Configure logging
+logging.basicConfig(
+    level=logging.INFO,
+    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s',
+    handlers=[logging.StreamHandler(sys.stdout)]
+)
+
+logger = logging.getLogger(__name__)
+
+
+def print_report(report: dict) -> None:
+    declared = {name: [index.document["name"] for index in indexes]
+                for name, indexes in declared_indexes().items()}
+    for collection_name, diff in report.items():
+        print(f"\n{collection_name} ({len(declared.get(collection_name, []))} declared)")
+        for name in diff["missing"]:
+            print(f"  + {name}")
+        for name in diff["undeclared"]:
+            print(f"  ? {name} (not declared)")
+        for entry in diff["unused"]:
+            print(f"  - {entry['name']} (no accesses since {entry['since']})")
+        if diff.get("error"):
+            print(f"  ! {diff['error']}")
+
+
+async def main():
+    """Main function with command line argument support"""
+    import argparse
+
+    parser = argparse.ArgumentParser(description='MEWAYZ V2 index diff')
+    parser.add_argument('--apply', action='store_true', help='Create missing declared indexes')
+    parser.add_argument('--collection', action='append', default=[], dest='collections',
+                        help='Limit the diff to a collection (repeatable)')
+
+    args = parser.parse_args()
+    load_declarations()
+    db = await get_database_async()
+
+    if args.apply:
+        report = await reconcile_indexes(db)
+    else:
+        report = await diff_indexes(db, args.collections or None)
+
+    print("Legend: + missing, ? undeclared, - unused")
+    print_report(report)
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,77 @@
+"""
+Timestamp Migration Script for MEWAYZ V2
+Converts ISO-string created_at/updated_at values to BSON dates in batches, resuming from checkpoints
+"""
+
+import asyncio
+import logging
+import sys
+from pathlib import Path
+
+# Add the backend directory to the Python path
+backend_dir = Path(__file__).parent.parent
+sys.path.insert(0, str(backend_dir))
+
+from core.database import get_database_async
+from core.indexes import declared_indexes, load_declarations
+from core.timestamps import TIMESTAMP_FIELDS, TimestampBackfill
+
+# Configure logging
+logging.basicConfig(
+    level=logging.INFO,
+    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s',
+    handlers=[logging.StreamHandler(sys.stdout)]
+)
+
+logger = logging.getLogger(__name__)
+
+# Collections written with ISO-string timestamps outside the repository services
+EXTRA_COLLECTIONS = {
+    "subscriptions": TIMESTAMP_FIELDS + ("current_period_start", "current_period_end", "canceled_at"),
+    "customers": TIMESTAMP_FIELDS,
+    "escrow": TIMESTAMP_FIELDS,
+    "website_builder": TIMESTAMP_FIELDS,
+    "website_templates": TIMESTAMP_FIELDS,
+}
+
+
+def default_targets() -> dict:
+    load_declarations()
+    targets = {name: TIMESTAMP_FIELDS for name in declared_indexes()}
+    targets.update(EXTRA_COLLECTIONS)
+    return targets
+
+
+async def main():
+    """Main function with command line argument support"""
+    import argparse
+
+    parser = argparse.ArgumentParser(description='MEWAYZ V2 timestamp migration')
+    parser.add_argument('--collection', action='append', default=[], dest='collections',
+                        help='Collection to migrate (repeatable, default: all known collections)')
+    parser.add_argument('--field', action='append', default=[], dest='fields',
+                        help='Timestamp field to convert (repeatable, default: created_at and updated_at)')
+    parser.add_argument('--batch-size', type=int, default=500, help='Documents per bulk write')
+    parser.add_argument('--pause', type=float, default=0.05, help='Seconds to sleep between batches')
+    parser.add_argument('--max-batches', type=int, help='Stop after this many batches per collection')
+    parser.add_argument('--reset', action='store_true', help='Discard saved checkpoints and start over')
+
+    args = parser.parse_args()
+    db = await get_database_async()
+
+    if args.collections:
+        targets = {name: tuple(args.fields) or TIMESTAMP_FIELDS for name in args.collections}
+    else:
+        targets = default_targets()
+
+    for collection_name, fields in sorted(targets.items()):
+        backfill = TimestampBackfill(db, collection_name, fields, batch_size=args.batch_size, pause=args.pause)
+        if args.reset:
+            await backfill.reset()
+        result = await backfill.run(max_batches=args.max_batches)
+        state = "done" if result["done"] else "paused"
+        logger.info(f"{collection_name}: {result['converted']} converted in {result['batches']} batches ({state})")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
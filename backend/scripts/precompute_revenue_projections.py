@@ -0,0 +1,50 @@
+"""
+Revenue Projection Batch Script for MEWAYZ V2
+Forecasts every enterprise workspace from its monthly revenue buckets; run nightly from cron
+"""
+
+import asyncio
+import logging
+import sys
+from pathlib import Path
+
+# Add the backend directory to the Python path
+backend_dir = Path(__file__).parent.parent
+sys.path.insert(0, str(backend_dir))
+
+from core import forecasting
+from services.enterprise_revenue_service import get_enterprise_revenue_service
+
+# Configure logging
+logging.basicConfig(
+    level=logging.INFO,
+    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s',
+    handlers=[logging.StreamHandler(sys.stdout)]
+)
+
+logger = logging.getLogger(__name__)
+
+
+async def main():
+    """Main function with command line argument support"""
+    import argparse
+
+    parser = argparse.ArgumentParser(description='MEWAYZ V2 revenue projection batch')
+    parser.add_argument('--months-ahead', type=int, default=None, help='Months to project (default: settings)')
+    parser.add_argument('--method', choices=forecasting.METHODS, default=None,
+                        help='Forecasting method (default: settings)')
+    parser.add_argument('--batch-size', type=int, default=500, help='Projections per bulk write')
+
+    args = parser.parse_args()
+    service = get_enterprise_revenue_service()
+
+    result = await service.precompute_revenue_projections(args.months_ahead, args.method,
+                                                          batch_size=args.batch_size)
+    if not result["success"]:
+        logger.error(f"Projection batch failed: {result['error']}")
+        sys.exit(1)
+    logger.info(f"{result['workspaces']} workspaces projected with {result['method']}")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
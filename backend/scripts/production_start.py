@@ -260,6 +260,9 @@ def main():
     if not start_monitoring():
         logger.warning("⚠️ Monitoring startup failed, but continuing...")
     
+    # Workers read the count from the environment, and each then logs to its own file
+    os.environ["WEB_CONCURRENCY"] = str(production_settings.WORKERS)
+
     # Production server configuration
     config = uvicorn.Config(
         "main:app",
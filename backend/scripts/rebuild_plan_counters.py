@@ -0,0 +1,50 @@
+"""
+Plan Counter Rebuild Script for MEWAYZ V2
+Recomputes per-plan subscription/revenue counters and monthly buckets from the subscriptions collection
+"""
+
+import asyncio
+import logging
+import sys
+from pathlib import Path
+
+# Add the backend directory to the Python path
+backend_dir = Path(__file__).parent.parent
+sys.path.insert(0, str(backend_dir))
+
+from services.plan_subscription_counter_service import get_plan_subscription_counter_service
+
+# Configure logging
+logging.basicConfig(
+    level=logging.INFO,
+    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s',
+    handlers=[logging.StreamHandler(sys.stdout)]
+)
+
+logger = logging.getLogger(__name__)
+
+
+async def main():
+    """Main function with command line argument support"""
+    import argparse
+
+    parser = argparse.ArgumentParser(description='MEWAYZ V2 plan counter rebuild')
+    parser.add_argument('--dry-run', action='store_true', help='Print the recomputed counters without writing them')
+
+    args = parser.parse_args()
+    counters = get_plan_subscription_counter_service()
+
+    if args.dry_run:
+        for plan, values in sorted((await counters.compute_counters()).items()):
+            logger.info(f"{plan}: {values['active_subscriptions']} subscriptions, {values['active_revenue']} revenue")
+        return
+
+    result = await counters.rebuild()
+    if not result["success"]:
+        logger.error(f"Rebuild failed: {result['error']}")
+        sys.exit(1)
+    logger.info(f"Rebuilt counters for {result['plans']} plans and {result['monthly_buckets']} monthly buckets")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,48 @@
+"""
+Revenue Aggregate Rebuild Script for MEWAYZ V2
+Recomputes enterprise_revenue_aggregates monthly buckets from tracked revenue transactions
+"""
+
+import asyncio
+import logging
+import sys
+from pathlib import Path
+
+# Add the backend directory to the Python path
+backend_dir = Path(__file__).parent.parent
+sys.path.insert(0, str(backend_dir))
+
+from services.enterprise_revenue_service import get_enterprise_revenue_service
+
+# Configure logging
+logging.basicConfig(
+    level=logging.INFO,
+    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s',
+    handlers=[logging.StreamHandler(sys.stdout)]
+)
+
+logger = logging.getLogger(__name__)
+
+
+async def main():
+    """Main function with command line argument support"""
+    import argparse
+
+    parser = argparse.ArgumentParser(description='MEWAYZ V2 revenue aggregate rebuild')
+    parser.add_argument('--workspace', action='append', default=[], dest='workspaces',
+                        help='Workspace to rebuild (repeatable, default: every workspace)')
+    parser.add_argument('--batch-size', type=int, default=500, help='Buckets per bulk write')
+
+    args = parser.parse_args()
+    service = get_enterprise_revenue_service()
+
+    for workspace_id in args.workspaces or [None]:
+        result = await service.rebuild_revenue_aggregates(workspace_id, batch_size=args.batch_size)
+        if not result["success"]:
+            logger.error(f"Rebuild failed for {workspace_id or 'all workspaces'}: {result['error']}")
+            sys.exit(1)
+        logger.info(f"{workspace_id or 'All workspaces'}: {result['buckets']} monthly buckets rebuilt")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
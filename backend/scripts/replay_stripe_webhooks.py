@@ -0,0 +1,85 @@
+"""
+Stripe Webhook Replay Script for MEWAYZ V2
+Backfills the webhook inbox from the Stripe Events API and requeues stored events
+"""
+
+import asyncio
+import logging
+import sys
+from datetime import datetime
+from pathlib import Path
+
+# Add the backend directory to the Python path
+backend_dir = Path(__file__).parent.parent
+sys.path.insert(0, str(backend_dir))
+
+from core.stripe_gateway import get_stripe_gateway
+from services.stripe_webhook_inbox_service import get_stripe_webhook_inbox_service
+
+# Configure logging
+logging.basicConfig(
+    level=logging.INFO,
+    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s',
+    handlers=[logging.StreamHandler(sys.stdout)]
+)
+
+logger = logging.getLogger(__name__)
+
+
+async def backfill_from_stripe(since: datetime, event_types: list, limit: int) -> None:
+    """Page through Stripe events created since ``since`` and add unseen ones to the inbox"""
+    gateway = get_stripe_gateway()
+    inbox = get_stripe_webhook_inbox_service()
+    await inbox.ensure_indexes()
+
+    params = {"created": {"gte": int(since.timestamp())}, "limit": 100}
+    if event_types:
+        params["types"] = event_types
+
+    queued = duplicates = 0
+    while queued + duplicates < limit:
+        page = await gateway.request("Event.list", **params)
+        for event in page.data:
+            if await inbox.enqueue(event.to_dict()):
+                queued += 1
+            else:
+                duplicates += 1
+        if not page.has_more or not page.data:
+            break
+        params["starting_after"] = page.data[-1].id
+
+    logger.info(f"✅ Backfill complete: {queued} queued, {duplicates} already in inbox")
+
+
+async def main():
+    """Main function with command line argument support"""
+    import argparse
+
+    parser = argparse.ArgumentParser(description='MEWAYZ V2 Stripe webhook replay')
+    parser.add_argument('--since', help='Backfill events created on or after this ISO date from Stripe')
+    parser.add_argument('--type', action='append', default=[], dest='types',
+                        help='Restrict the backfill to an event type (repeatable)')
+    parser.add_argument('--limit', type=int, default=10000, help='Maximum events to backfill')
+    parser.add_argument('--event-id', action='append', default=[], dest='event_ids',
+                        help='Requeue a stored event by id (repeatable)')
+    parser.add_argument('--dead-letters', action='store_true',
+                        help='Requeue every dead-lettered event')
+
+    args = parser.parse_args()
+    inbox = get_stripe_webhook_inbox_service()
+
+    if args.since:
+        await backfill_from_stripe(datetime.fromisoformat(args.since), args.types, args.limit)
+    if args.event_ids or args.dead_letters:
+        requeued = await inbox.requeue(event_ids=args.event_ids or None, dead_letters=args.dead_letters)
+        logger.info(f"✅ Requeued {requeued} events")
+    if not (args.since or args.event_ids or args.dead_letters):
+        parser.print_help()
+        return
+
+    stats = await inbox.get_stats()
+    logger.info(f"Inbox status: {stats.get('data')}")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
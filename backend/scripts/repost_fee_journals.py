@@ -0,0 +1,52 @@
+"""
+Fee Journal Repost Script for MEWAYZ V2
+Posts the fee ledger journals of escrow transactions again and optionally rebuilds the monthly rollups
+"""
+
+import asyncio
+import logging
+import sys
+from datetime import datetime, timedelta
+from pathlib import Path
+
+# Add the backend directory to the Python path
+backend_dir = Path(__file__).parent.parent
+sys.path.insert(0, str(backend_dir))
+
+from core.fee_ledger import get_fee_ledger
+from services.escrow_service import get_escrow_service
+
+# Configure logging
+logging.basicConfig(
+    level=logging.INFO,
+    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s',
+    handlers=[logging.StreamHandler(sys.stdout)]
+)
+
+logger = logging.getLogger(__name__)
+
+
+async def main():
+    """Main function with command line argument support"""
+    import argparse
+
+    parser = argparse.ArgumentParser(description='MEWAYZ V2 fee journal repost')
+    parser.add_argument('--hours', type=float, help='Only transactions created or collected in the last N hours')
+    parser.add_argument('--rebuild-periods', action='store_true', help='Recompute the monthly rollups afterwards')
+
+    args = parser.parse_args()
+    since = datetime.utcnow() - timedelta(hours=args.hours) if args.hours else None
+
+    result = await get_escrow_service().repost_fee_journals(since)
+    if not result["success"]:
+        logger.error(f"Repost failed: {result['error']}")
+        sys.exit(1)
+    logger.info(f"Re-posted {result['journals']} journals ({get_fee_ledger().get_stats()['duplicates']} already in the ledger)")
+
+    if args.rebuild_periods:
+        lines = await get_fee_ledger().rebuild_periods()
+        logger.info(f"Rebuilt rollups from {lines} journal lines")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
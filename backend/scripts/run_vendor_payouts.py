@@ -0,0 +1,54 @@
+"""
+Vendor Payout Script for MEWAYZ V2
+Pays every vendor workspace its collected escrow earnings; resumes an interrupted run first
+"""
+
+import asyncio
+import logging
+import sys
+from datetime import datetime
+from pathlib import Path
+
+# Add the backend directory to the Python path
+backend_dir = Path(__file__).parent.parent
+sys.path.insert(0, str(backend_dir))
+
+from services.vendor_payout_service import VendorPayoutService
+
+# Configure logging
+logging.basicConfig(
+    level=logging.INFO,
+    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s',
+    handlers=[logging.StreamHandler(sys.stdout)]
+)
+
+logger = logging.getLogger(__name__)
+
+
+async def main():
+    """Main function with command line argument support"""
+    import argparse
+
+    parser = argparse.ArgumentParser(description='MEWAYZ V2 vendor payout run')
+    parser.add_argument('--cutoff', type=datetime.fromisoformat, default=None,
+                        help='Pay transactions created up to this ISO timestamp (default: now)')
+    parser.add_argument('--concurrency', type=int, default=None, help='Concurrent transfers (default: settings)')
+    parser.add_argument('--rate', type=float, default=None, help='Transfers per second (default: settings)')
+
+    args = parser.parse_args()
+    payouts = VendorPayoutService(concurrency=args.concurrency, rate_per_second=args.rate)
+
+    report = await payouts.run_payouts(args.cutoff)
+    if not report["success"]:
+        logger.error(f"Payout run failed: {report['error']} (run again to resume)")
+        sys.exit(1)
+    logger.info(
+        f"Run {report['run_id']}: {report['paid']} paid (${report['amount_paid']:,.2f}), "
+        f"{report['failed']} failed, {report['skipped']} without a payout account, "
+        f"{report['unsettled']} unsettled (run again to settle them); "
+        f"{report['transfers_per_second']} transfers/s, p95 {report['latency_p95_ms']}ms"
+    )
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,34 @@
+"""
+Workspace Email Sync Script for MEWAYZ V2
+Fills owner_email_lower, the lowercased owner email that prefix searches use, for workspaces missing it
+"""
+
+import asyncio
+import logging
+import sys
+from pathlib import Path
+
+# Add the backend directory to the Python path
+backend_dir = Path(__file__).parent.parent
+sys.path.insert(0, str(backend_dir))
+
+from services.admin_workspace_management_service import get_admin_workspace_management_service
+
+# Configure logging
+logging.basicConfig(
+    level=logging.INFO,
+    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s',
+    handlers=[logging.StreamHandler(sys.stdout)]
+)
+
+logger = logging.getLogger(__name__)
+
+
+async def main():
+    """Sync the lowercased owner email of every workspace"""
+    updated = await get_admin_workspace_management_service().sync_owner_emails()
+    logger.info(f"Updated owner_email_lower on {updated} workspaces")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
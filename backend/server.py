@@ -1,7 +1,6 @@
 from fastapi import FastAPI, APIRouter
 from dotenv import load_dotenv
 from starlette.middleware.cors import CORSMiddleware
-from motor.motor_asyncio import AsyncIOMotorClient
 import os
 import logging
 from pathlib import Path
@@ -10,14 +9,13 @@ from typing import List
 import uuid
 from datetime import datetime
 
+from core.database import close_database_connections, get_database_async
+from core.structured_logging import configure_logging
 
 ROOT_DIR = Path(__file__).parent
 load_dotenv(ROOT_DIR / '.env')
 
-# MongoDB connection
-mongo_url = os.environ['MONGO_URL']
-client = AsyncIOMotorClient(mongo_url)
-db = client[os.environ.get('DB_NAME', 'mewayz')]
+# MongoDB is reached through the shared client in core.database, opened on first use
 
 # Create the main app without a prefix
 app = FastAPI()
@@ -81,11 +79,13 @@ async def health_check():
 async def create_status_check(input: StatusCheckCreate):
     status_dict = input.dict()
     status_obj = StatusCheck(**status_dict)
+    db = await get_database_async()
     _ = await db.status_checks.insert_one(status_obj.dict())
     return status_obj
 
 @api_router.get("/status", response_model=List[StatusCheck])
 async def get_status_checks():
+    db = await get_database_async()
     status_checks = await db.status_checks.find().to_list(1000)
     return [StatusCheck(**status_check) for status_check in status_checks]
 
@@ -169,13 +169,13 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
-# Configure logging
-logging.basicConfig(
-    level=logging.INFO,
-    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
-)
 logger = logging.getLogger(__name__)
 
+@app.on_event("startup")
+async def startup_logging():
+    # Configure logging in each worker rather than at import
+    configure_logging()
+
 @app.on_event("shutdown")
 async def shutdown_db_client():
-    client.close()
+    await close_database_connections()
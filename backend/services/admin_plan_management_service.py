@@ -3,10 +3,15 @@ Admin Plan Management Service
 Comprehensive control over plan definitions: pricing, features, limits, availability
 """
 
+import asyncio
 import logging
 from typing import Dict, Any, List, Optional
 from datetime import datetime, timedelta
-from core.database import get_database
+from core.database import get_motor_database
+from core.fanout import FanOut
+from core.plan_catalog import bump_catalog_version, get_plan_catalog_manager
+from services.plan_subscription_counter_service import ALL_PLANS, get_plan_subscription_counter_service
+from services.stripe_price_catalog_service import get_stripe_price_catalog_service
 import uuid
 import json
 
@@ -14,7 +19,11 @@ logger = logging.getLogger(__name__)
 
 class AdminPlanManagementService:
     def __init__(self):
-        self.db = get_database()
+        # Every method awaits its queries, so this must be the Motor handle
+        self.db = get_motor_database()
+        self.counters = get_plan_subscription_counter_service()
+        # Plan definitions come from the shared in-memory catalog, reloaded on every plan change
+        self.plan_catalog = get_plan_catalog_manager()
         
         # Default plan structure template
         self.plan_template = {
@@ -106,8 +115,7 @@ class AdminPlanManagementService:
     async def get_all_plans(self) -> Dict[str, Any]:
         """Get all plans with their complete configuration"""
         try:
-            collection = self.db.admin_plans
-            plans = await collection.find({"deleted": {"$ne": True}}).to_list(length=100)
+            plans, counters = await asyncio.gather(self._get_plan_catalog(), self.counters.get_counters())
             
             # Format plans for admin interface
             formatted_plans = {}
@@ -124,11 +132,11 @@ class AdminPlanManagementService:
                     "limits": plan.get("limits", {}),
                     "status": plan.get("status", {}),
                     "metadata": plan.get("metadata", {}),
-                    "subscription_count": await self._count_plan_subscriptions(plan_name)
+                    "subscription_count": counters.get(plan_name, {}).get("active_subscriptions", 0)
                 }
             
             # Get plan analytics summary
-            analytics = await self._get_plans_summary_analytics()
+            analytics = self._get_plans_summary_analytics(counters)
             
             return {
                 "success": True,
@@ -226,6 +234,9 @@ class AdminPlanManagementService:
             await self._log_plan_change(
                 plan_name, "pricing_update", pricing_updates, updated_by, reason
             )
+
+            # Drop cached Stripe prices that include this plan
+            await get_stripe_price_catalog_service().invalidate(plan_name, current_pricing)
             
             # Calculate impact
             impact = await self._calculate_pricing_change_impact(plan_name, pricing_updates)
@@ -735,49 +746,32 @@ class AdminPlanManagementService:
     async def get_plan_analytics(self) -> Dict[str, Any]:
         """Get analytics on plan performance"""
         try:
-            # Get plan subscription distribution
-            subscriptions_collection = self.db.workspace_subscriptions
-            
-            # Plan popularity pipeline
-            pipeline = [
-                {"$unwind": "$bundles"},
-                {"$group": {
-                    "_id": "$bundles",
-                    "subscription_count": {"$sum": 1},
-                    "total_revenue": {"$sum": "$pricing.total_amount"}
-                }},
-                {"$sort": {"subscription_count": -1}}
-            ]
-            
-            plan_stats = await subscriptions_collection.aggregate(pipeline).to_list(length=20)
-            
-            # Revenue trends by plan
-            revenue_pipeline = [
-                {"$unwind": "$bundles"},
-                {"$group": {
-                    "_id": {
-                        "plan": "$bundles",
-                        "year": {"$year": "$created_at"},
-                        "month": {"$month": "$created_at"}
-                    },
-                    "monthly_revenue": {"$sum": "$pricing.total_amount"},
-                    "subscription_count": {"$sum": 1}
-                }},
-                {"$sort": {"_id.year": -1, "_id.month": -1}},
-                {"$limit": 50}
-            ]
-            
-            revenue_trends = await subscriptions_collection.aggregate(revenue_pipeline).to_list(length=50)
-            
-            # Get plan change frequency
-            changes_collection = self.db.admin_plan_changes
-            recent_changes = await changes_collection.find({
-                "created_at": {"$gte": datetime.utcnow() - timedelta(days=30)}
-            }).to_list(length=100)
-            
-            # Plan status summary
-            plans_collection = self.db.admin_plans
-            all_plans = await plans_collection.find({"deleted": {"$ne": True}}).to_list(length=100)
+            # The four reads are independent, so run them concurrently
+            results = await (
+                FanOut(label="plan_analytics")
+                .add("counters", self.counters.get_counters)
+                # Revenue trends by plan
+                .add("revenue_trends", self.counters.get_monthly, 50)
+                # Get plan change frequency
+                .add("recent_changes", self.db.admin_plan_changes.aggregate([
+                    {"$match": {"created_at": {"$gte": datetime.utcnow() - timedelta(days=30)}}},
+                    {"$group": {"_id": "$plan_name", "count": {"$sum": 1}}}
+                ]).to_list, length=None)
+                # Plan status summary
+                .add("all_plans", self._get_plan_catalog)
+                .run()
+            )
+            counters = results["counters"]
+            # Plan popularity, in the shape the old per-request $group produced
+            plan_stats = sorted(
+                ({"_id": plan, "subscription_count": values["active_subscriptions"],
+                  "total_revenue": values["active_revenue"]}
+                 for plan, values in counters.items() if plan != ALL_PLANS),
+                key=lambda stat: stat["subscription_count"], reverse=True
+            )[:20]
+            revenue_trends = results["revenue_trends"]
+            recent_changes = results["recent_changes"]
+            all_plans = results["all_plans"]
             
             enabled_count = sum(1 for plan in all_plans if plan.get("status", {}).get("enabled", True))
             disabled_count = len(all_plans) - enabled_count
@@ -792,9 +786,9 @@ class AdminPlanManagementService:
                         "enabled_plans": enabled_count,
                         "disabled_plans": disabled_count
                     },
-                    "recent_changes": len(recent_changes),
+                    "recent_changes": sum(change["count"] for change in recent_changes),
                     "most_changed_plan": self._get_most_changed_plan(recent_changes),
-                    "total_subscriptions": await subscriptions_collection.count_documents({"status": "active"})
+                    "total_subscriptions": counters.get(ALL_PLANS, {}).get("active_subscriptions", 0)
                 },
                 "insights": await self._generate_plan_insights(plan_stats, revenue_trends),
                 "generated_at": datetime.utcnow().isoformat()
@@ -885,15 +879,18 @@ class AdminPlanManagementService:
             return {"success": False, "error": str(e)}
 
     # Helper methods
+    async def _get_plan_catalog(self) -> List[Dict[str, Any]]:
+        """Non-deleted plan definitions from the current catalog snapshot"""
+        if not self.plan_catalog.reloads:
+            # Not started by the app lifespan (scripts), so load it once here
+            await self.plan_catalog.load(self.db)
+        return list(self.plan_catalog.catalog.admin_plans)
+
     async def _count_plan_subscriptions(self, plan_name: str) -> int:
         """Count active subscriptions for a plan"""
         try:
-            subscriptions_collection = self.db.workspace_subscriptions
-            count = await subscriptions_collection.count_documents({
-                "bundles": {"$in": [plan_name]},
-                "status": "active"
-            })
-            return count
+            counters = await self.counters.get_counters()
+            return counters.get(plan_name, {}).get("active_subscriptions", 0)
         except Exception as e:
             logger.error(f"Error counting plan subscriptions: {e}")
             return 0
@@ -947,6 +944,10 @@ class AdminPlanManagementService:
             
             collection = self.db.admin_plan_changes
             await collection.insert_one(change_log)
+
+            # Move the catalog version so every worker swaps in the edited plan
+            await bump_catalog_version(self.db)
+            await self.plan_catalog.refresh(self.db)
             
         except Exception as e:
             logger.error(f"Error logging plan change: {e}")
@@ -1019,24 +1020,14 @@ class AdminPlanManagementService:
             logger.error(f"Error analyzing limits change impact: {e}")
             return {"affected_subscriptions": 0, "limits_changed": 0}
 
-    async def _get_plans_summary_analytics(self) -> Dict[str, Any]:
+    def _get_plans_summary_analytics(self, counters: Dict[str, Dict[str, Any]]) -> Dict[str, Any]:
         """Get summary analytics for all plans"""
-        try:
-            subscriptions_collection = self.db.workspace_subscriptions
-            
-            total_revenue = await subscriptions_collection.aggregate([
-                {"$group": {"_id": None, "total": {"$sum": "$pricing.total_amount"}}}
-            ]).to_list(length=1)
-            
-            return {
-                "total_active_subscriptions": await subscriptions_collection.count_documents({"status": "active"}),
-                "total_revenue": total_revenue[0]["total"] if total_revenue else 0,
-                "last_updated": datetime.utcnow().isoformat()
-            }
-            
-        except Exception as e:
-            logger.error(f"Error getting plans summary analytics: {e}")
-            return {}
+        totals = counters.get(ALL_PLANS, {})
+        return {
+            "total_active_subscriptions": totals.get("active_subscriptions", 0),
+            "total_revenue": totals.get("active_revenue", 0),
+            "last_updated": datetime.utcnow().isoformat()
+        }
 
     async def _get_plan_change_history(self, plan_name: str, limit: int) -> List[Dict[str, Any]]:
         """Get recent change history for a plan"""
@@ -1102,12 +1093,8 @@ class AdminPlanManagementService:
             if not recent_changes:
                 return "None"
             
-            plan_counts = {}
-            for change in recent_changes:
-                plan_name = change.get("plan_name", "Unknown")
-                plan_counts[plan_name] = plan_counts.get(plan_name, 0) + 1
-            
-            return max(plan_counts, key=plan_counts.get) if plan_counts else "None"
+            most_changed = max(recent_changes, key=lambda change: change["count"])
+            return most_changed["_id"] or "Unknown"
             
         except Exception as e:
             logger.error(f"Error getting most changed plan: {e}")
@@ -1,303 +1,16 @@
 """
 Admin Service
-BULLETPROOF service with GUARANTEED working CRUD operations and REAL data
+Document service declared over the shared async repository engine
 """
 
-import uuid
-from typing import Dict, List, Optional, Any
-from datetime import datetime
-from typing import Dict, Any, List, Optional
-from core.database import get_database
-import logging
+from services.repository_service import RepositoryService
 
-logger = logging.getLogger(__name__)
 
-class AdminService:
+class AdminService(RepositoryService):
     """Service class for AdminService operations"""
-    def __init__(self):
-        self.service_name = "admin"
-        self.collection_name = "admin"
-        
-    def _get_collection(self):
-        """Get collection for database operations"""
-        try:
-            from core.database import get_database
-            db = get_database()
-            if db is None:
-                logger.error("Database not available")
-                return None
-            return db["admin"]
-        except Exception as e:
-            logger.error(f"Error getting collection: {e}")
-            return None
+    service_name = "admin"
+    collection_name = "admin"
 
-    async def _get_collection_async(self):
-        """Get collection for async database operations"""
-        try:
-            from core.database import get_database_async
-            db = await get_database_async()
-            if db is None:
-                logger.error("Database not available")
-                return None
-            return db["admin"]
-        except Exception as e:
-            logger.error(f"Error getting async collection: {e}")
-            return None
-    def _get_db(self):
-        """Get database connection - GUARANTEED to work"""
-        try:
-            return get_database()
-        except Exception as e:
-            logger.error(f"Database error: {e}")
-            return None
-    
-    async def _get_collection_async(self):
-        """Get collection - ASYNC version - GUARANTEED to work"""
-        try:
-            from core.database import get_database_async
-            db = await get_database_async()
-            return db[self.collection_name] if db is not None else None
-        except Exception as e:
-            logger.error(f"Async collection error: {e}")
-            return None
-    
-        """Get collection - GUARANTEED to work"""
-        try:
-            db = self._get_db()
-            return db[self.collection_name] if db is not None else None
-        except Exception as e:
-            logger.error(f"Collection error: {e}")
-            return None
-    
-    def _prepare_data(self, data: dict) -> dict:
-        """Prepare data for database operations - GUARANTEED to work"""
-        try:
-            prepared = data.copy() if isinstance(data, dict) else {}
-            prepared.update({
-                "id": str(uuid.uuid4()),
-                "created_at": datetime.utcnow().isoformat(),
-                "updated_at": datetime.utcnow().isoformat(),
-                "status": "active",
-                "service_type": self.service_name
-            })
-            return prepared
-        except Exception as e:
-            logger.error(f"Data preparation error: {e}")
-            return {"id": str(uuid.uuid4()), "error": str(e)}
-    
-    def _sanitize_doc(self, doc: dict) -> dict:
-        """Sanitize document - GUARANTEED to work"""
-        try:
-            if not doc:
-                return {}
-            if isinstance(doc, dict):
-                cleaned = {k: v for k, v in doc.items() if k != '_id'}
-                return cleaned
-            return doc
-        except Exception as e:
-            logger.error(f"Sanitization error: {e}")
-            return {"error": str(e)}
-    
-    # BULLETPROOF CRUD OPERATIONS - GUARANTEED TO WORK
-    
-    async def create_admin(self, data: dict) -> dict:
-        """CREATE operation - GUARANTEED to work with real data"""
-        try:
-            collection = await self._get_collection_async()
-            if collection is None:
-                return {"success": False, "error": "Database unavailable"}
-            
-            # Prepare data
-            prepared_data = self._prepare_data(data)
-            
-            # Insert to database - REAL DATA OPERATION
-            result = await collection.insert_one(prepared_data)
-            
-            if result.inserted_id:
-                return {
-                    "success": True,
-                    "message": f"{self.service_name} created successfully",
-                    "data": self._sanitize_doc(prepared_data),
-                    "id": prepared_data["id"]
-                }
-            else:
-                return {"success": False, "error": "Insert failed"}
-                
-        except Exception as e:
-            logger.error(f"CREATE error: {e}")
-            return {"success": False, "error": str(e)}
-    
-    async def get_admin(self, item_id: str) -> dict:
-        """READ operation - GUARANTEED to work with real data"""
-        try:
-            if not item_id:
-                return {"success": False, "error": "ID required"}
-            
-            collection = await self._get_collection_async()
-            if collection is None:
-                return {"success": False, "error": "Database unavailable"}
-            
-            # Find document - REAL DATA OPERATION
-            doc = await collection.find_one({"id": item_id})
-            
-            if doc:
-                return {
-                    "success": True,
-                    "data": self._sanitize_doc(doc)
-                }
-            else:
-                return {"success": False, "error": "Not found"}
-                
-        except Exception as e:
-            logger.error(f"READ error: {e}")
-            return {"success": False, "error": str(e)}
-    
-    async def list_admins(self, user_id: str = None, limit: int = 50, offset: int = 0) -> dict:
-        """LIST operation - GUARANTEED to work with real data"""
-        try:
-            collection = await self._get_collection_async()
-            if collection is None:
-                return {"success": False, "error": "Database unavailable"}
-            
-            # Build query
-            query = {}
-            if user_id:
-                query["user_id"] = user_id
-            
-            # Execute query - REAL DATA OPERATION
-            cursor = collection.find(query).skip(offset).limit(limit)
-            docs = await cursor.to_list(length=limit)
-            
-            # Sanitize results
-            sanitized_docs = [self._sanitize_doc(doc) for doc in docs]
-            
-            # Get total count
-            total = await collection.count_documents(query)
-            
-            return {
-                "success": True,
-                "data": sanitized_docs,
-                "total": total,
-                "limit": limit,
-                "offset": offset
-            }
-            
-        except Exception as e:
-            logger.error(f"LIST error: {e}")
-            return {"success": False, "error": str(e)}
-    
-    async def update_admin(self, item_id: str, update_data: dict) -> dict:
-        """UPDATE operation - GUARANTEED to work with real data"""
-        try:
-            if not item_id:
-                return {"success": False, "error": "ID required"}
-            
-            collection = await self._get_collection_async()
-            if collection is None:
-                return {"success": False, "error": "Database unavailable"}
-            
-            # Prepare update data
-            if not isinstance(update_data, dict):
-                return {"success": False, "error": "Invalid update data"}
-            
-            update_data = update_data.copy()
-            update_data["updated_at"] = datetime.utcnow().isoformat()
-            
-            # Update document - REAL DATA OPERATION
-            result = await collection.update_one(
-                {"id": item_id},
-                {"$set": update_data}
-            )
-            
-            if result.matched_count > 0:
-                # Get updated document
-                updated_doc = await collection.find_one({"id": item_id})
-                return {
-                    "success": True,
-                    "message": f"{self.service_name} updated successfully",
-                    "data": self._sanitize_doc(updated_doc) if updated_doc else None
-                }
-            else:
-                return {"success": False, "error": "Not found"}
-                
-        except Exception as e:
-            logger.error(f"UPDATE error: {e}")
-            return {"success": False, "error": str(e)}
-    
-    async def delete_admin(self, item_id: str) -> dict:
-        """DELETE operation - GUARANTEED to work with real data"""
-        try:
-            if not item_id:
-                return {"success": False, "error": "ID required"}
-            
-            collection = await self._get_collection_async()
-            if collection is None:
-                return {"success": False, "error": "Database unavailable"}
-            
-            # Delete document - REAL DATA OPERATION
-            result = await collection.delete_one({"id": item_id})
-            
-            if result.deleted_count > 0:
-                return {
-                    "success": True,
-                    "message": f"{self.service_name} deleted successfully",
-                    "deleted_count": result.deleted_count
-                }
-            else:
-                return {"success": False, "error": "Not found"}
-                
-        except Exception as e:
-            logger.error(f"DELETE error: {e}")
-            return {"success": False, "error": str(e)}
-    
-    async def get_stats(self, user_id: str = None) -> dict:
-        """STATS operation - GUARANTEED to work with real data"""
-        try:
-            collection = await self._get_collection_async()
-            if collection is None:
-                return {"success": False, "error": "Database unavailable"}
-            
-            query = {}
-            if user_id:
-                query["user_id"] = user_id
-            
-            total = await collection.count_documents(query)
-            active = await collection.count_documents({**query, "status": "active"})
-            
-            return {
-                "success": True,
-                "data": {
-                    "total": total,
-                    "active": active,
-                    "service": self.service_name
-                }
-            }
-            
-        except Exception as e:
-            logger.error(f"STATS error: {e}")
-            return {"success": False, "error": str(e)}
-    
-    async def health_check(self) -> dict:
-        """Health check with proper async database connection"""
-        try:
-            from core.database import get_database_async
-            db = await get_database_async()
-            if db is None:
-                return {"success": False, "healthy": False, "error": "Database unavailable"}
-            
-            collection = db[self.collection_name]
-            await collection.count_documents({})
-            
-            return {
-                "success": True,
-                "healthy": True,
-                "service": self.service_name,
-                "timestamp": datetime.utcnow().isoformat()
-            }
-            
-        except Exception as e:
-            logger.error(f"Health check error in {self.service_name}: {e}")
-            return {"success": False, "healthy": False, "error": str(e)}
 
 # Service instance
 _service_instance = None
@@ -310,4 +23,4 @@ def get_admin_service():
     return _service_instance
 
 # Backward compatibility
-admin_service = get_admin_service()
\ No newline at end of file
+admin_service = get_admin_service()
@@ -6,15 +6,43 @@ Provides admin-level workspace and subscription management capabilities
 import logging
 from typing import Dict, Any, List, Optional
 from datetime import datetime, timedelta
-from core.database import get_database
+from core.cache import collection_changed
+from core.database import get_motor_database
+import re
 import uuid
 import json
+from pymongo import ASCENDING, DESCENDING, IndexModel
+from core.indexes import declare_indexes
+from core.timestamps import date_range, to_datetime
 
 logger = logging.getLogger(__name__)
 
+declare_indexes(
+    "admin_actions",
+    IndexModel([("workspace_id", ASCENDING), ("created_at", DESCENDING)]),
+    IndexModel([("admin_user_id", ASCENDING), ("created_at", DESCENDING)]),
+    IndexModel([("created_at", DESCENDING)]),
+)
+
+declare_indexes(
+    "workspaces",
+    # Prefix searches on owner email and name are anchored regexes these can serve
+    IndexModel([("owner_email_lower", ASCENDING)]),
+    IndexModel([("name", ASCENDING)]),
+    IndexModel([("subscription.status", ASCENDING), ("_id", ASCENDING)]),
+    IndexModel([("subscription.bundles", ASCENDING), ("_id", ASCENDING)]),
+    IndexModel([("created_at", DESCENDING)]),
+)
+
+# Window for the per-workspace recent admin action count
+RECENT_ACTIONS_DAYS = 30
+SEARCH_MODES = ("contains", "prefix")
+# Lowercased copy of owner_email, kept by sync_owner_emails, for case-insensitive prefix search
+OWNER_EMAIL_LOWER = "owner_email_lower"
+
 class AdminWorkspaceManagementService:
     def __init__(self):
-        self.db = get_database()
+        self.db = get_motor_database()
         
         # Admin action types for audit trail
         self.admin_actions = {
@@ -52,38 +80,30 @@ class AdminWorkspaceManagementService:
         """Get all workspaces with subscription details for admin view"""
         try:
             # Build query based on filters
+            filters = filters or {}
+            mode = filters.get("search_mode", "contains")
             query = {}
-            if filters:
-                if filters.get("plan_name"):
-                    query["subscription.bundles"] = {"$in": [filters["plan_name"]]}
-                if filters.get("status"):
-                    query["subscription.status"] = filters["status"]
-                if filters.get("owner_email"):
-                    query["owner_email"] = {"$regex": filters["owner_email"], "$options": "i"}
-            
-            # Get workspaces with pagination
-            cursor = self.db.workspaces.find(query).skip(offset).limit(limit)
-            workspaces = await cursor.to_list(length=limit)
-            
-            # Enhance with subscription information
-            enhanced_workspaces = []
-            for workspace in workspaces:
-                enhanced_workspace = await self._enhance_workspace_with_admin_data(workspace)
-                enhanced_workspaces.append(enhanced_workspace)
-            
-            # Get total count for pagination
-            total_count = await self.db.workspaces.count_documents(query)
+            if filters.get("plan_name"):
+                query["subscription.bundles"] = {"$in": [filters["plan_name"]]}
+            if filters.get("status"):
+                query["subscription.status"] = filters["status"]
+            if filters.get("owner_email"):
+                query.update(self._owner_email_filter(filters["owner_email"], mode))
+            
+            # The page with its admin action counts, plus the total
+            page = await self._get_enriched_page(query, limit=limit, offset=offset, with_total=True)
+            total_count = page["total"]
             
             return {
                 "success": True,
-                "workspaces": enhanced_workspaces,
+                "workspaces": page["items"],
                 "pagination": {
                     "total_count": total_count,
                     "limit": limit,
                     "offset": offset,
                     "has_more": offset + limit < total_count
                 },
-                "filters_applied": filters or {}
+                "filters_applied": filters
             }
             
         except Exception as e:
@@ -91,16 +111,21 @@ class AdminWorkspaceManagementService:
             return {"success": False, "error": str(e)}
 
     async def search_workspaces(self, search_criteria: Dict[str, Any]) -> Dict[str, Any]:
-        """Advanced workspace search with multiple criteria"""
+        """Advanced workspace search with multiple criteria.
+
+        ``search_mode`` "contains" (default) matches name/email anywhere, case-insensitively;
+        "prefix" matches from the start and can use the name/owner_email_lower indexes.
+        """
         try:
+            mode = search_criteria.get("search_mode", "contains")
             query = {}
             
             # Build search query
             if search_criteria.get("workspace_name"):
-                query["name"] = {"$regex": search_criteria["workspace_name"], "$options": "i"}
+                query["name"] = self._text_filter(search_criteria["workspace_name"], mode)
             
             if search_criteria.get("owner_email"):
-                query["owner_email"] = {"$regex": search_criteria["owner_email"], "$options": "i"}
+                query.update(self._owner_email_filter(search_criteria["owner_email"], mode))
             
             if search_criteria.get("subscription_status"):
                 query["subscription.status"] = search_criteria["subscription_status"]
@@ -109,7 +134,7 @@ class AdminWorkspaceManagementService:
                 query["subscription.bundles"] = {"$in": search_criteria["plan_names"]}
             
             if search_criteria.get("created_after"):
-                query["created_at"] = {"$gte": datetime.fromisoformat(search_criteria["created_after"])}
+                query.update(date_range("created_at", gte=datetime.fromisoformat(search_criteria["created_after"])))
             
             if search_criteria.get("revenue_min") or search_criteria.get("revenue_max"):
                 revenue_query = {}
@@ -121,20 +146,13 @@ class AdminWorkspaceManagementService:
             
             # Execute search
             limit = search_criteria.get("limit", 50)
-            cursor = self.db.workspaces.find(query).limit(limit)
-            workspaces = await cursor.to_list(length=limit)
-            
-            # Enhance results
-            enhanced_results = []
-            for workspace in workspaces:
-                enhanced_workspace = await self._enhance_workspace_with_admin_data(workspace)
-                enhanced_results.append(enhanced_workspace)
+            page = await self._get_enriched_page(query, limit=limit)
             
             return {
                 "success": True,
-                "search_results": enhanced_results,
+                "search_results": page["items"],
                 "search_criteria": search_criteria,
-                "total_found": len(enhanced_results)
+                "total_found": len(page["items"])
             }
             
         except Exception as e:
@@ -464,11 +482,18 @@ class AdminWorkspaceManagementService:
             cursor = self.db.admin_actions.find(query).sort("created_at", -1).limit(limit)
             actions = await cursor.to_list(length=limit)
             
-            # Enhance with workspace information
+            # Enhance with workspace information, fetched in one batch
+            workspace_ids = list({action.get("workspace_id") for action in actions if action.get("workspace_id")})
+            workspaces = await self.db.workspaces.find(
+                {"_id": {"$in": workspace_ids}},
+                {"name": 1, "owner_email": 1, "created_at": 1}
+            ).to_list(length=len(workspace_ids))
+            workspace_info = {workspace["_id"]: workspace for workspace in workspaces}
             enhanced_actions = []
             for action in actions:
-                workspace_info = await self._get_workspace_basic_info(action.get("workspace_id"))
-                action["workspace_info"] = workspace_info
+                action["workspace_info"] = workspace_info.get(
+                    action.get("workspace_id"), {"name": "Unknown", "owner_email": "Unknown"}
+                )
                 enhanced_actions.append(action)
             
             return {
@@ -488,38 +513,88 @@ class AdminWorkspaceManagementService:
             return {"success": False, "error": str(e)}
 
     # Helper methods
-    async def _enhance_workspace_with_admin_data(self, workspace: Dict) -> Dict:
-        """Enhance workspace data with admin-relevant information"""
-        try:
-            enhanced = workspace.copy()
-            
-            # Add subscription analytics
-            subscription = workspace.get("subscription", {})
-            enhanced["admin_analytics"] = {
-                "total_revenue": subscription.get("pricing", {}).get("total_amount", 0),
-                "subscription_age_days": (datetime.utcnow() - workspace.get("created_at", datetime.utcnow())).days,
-                "status": subscription.get("status", "unknown"),
-                "bundle_count": len(subscription.get("bundles", [])),
-                "has_overrides": "admin_override" in workspace,
-                "is_comp_account": "comp_account" in workspace,
-                "discount_count": len(subscription.get("discounts", []))
-            }
-            
-            # Add recent admin actions count
-            recent_actions = await self.db.admin_actions.count_documents({
-                "workspace_id": workspace["_id"],
-                "created_at": {"$gte": datetime.utcnow() - timedelta(days=30)}
-            })
-            enhanced["admin_analytics"]["recent_admin_actions"] = recent_actions
-            
-            return enhanced
-            
-        except Exception as e:
-            logger.error(f"Error enhancing workspace data: {e}")
-            return workspace
+    @staticmethod
+    def _text_filter(value: str, mode: str) -> Dict[str, Any]:
+        """Regex filter for a name/email search; prefix mode is anchored and index-friendly"""
+        if mode not in SEARCH_MODES:
+            raise ValueError(f"Unknown search_mode: {mode}")
+        if mode == "prefix":
+            # Case-sensitive so the index bounds apply
+            return {"$regex": "^" + re.escape(value)}
+        return {"$regex": value, "$options": "i"}
+
+    def _owner_email_filter(self, value: str, mode: str) -> Dict[str, Any]:
+        """Prefix searches go to the lowercased copy so they stay case-insensitive and indexed"""
+        if mode == "prefix":
+            return {OWNER_EMAIL_LOWER: self._text_filter(value.lower(), mode)}
+        return {"owner_email": self._text_filter(value, mode)}
+
+    async def sync_owner_emails(self) -> int:
+        """Set owner_email_lower wherever it is missing or out of date; returns the documents updated"""
+        result = await self.db.workspaces.update_many(
+            {"owner_email": {"$type": "string"},
+             "$expr": {"$ne": [f"${OWNER_EMAIL_LOWER}", {"$toLower": "$owner_email"}]}},
+            [{"$set": {OWNER_EMAIL_LOWER: {"$toLower": "$owner_email"}}}],
+        )
+        return result.modified_count
+
+    async def _get_enriched_page(self, query: Dict[str, Any], limit: int, offset: int = 0,
+                                 with_total: bool = False) -> Dict[str, Any]:
+        """One page of workspaces, each with its recent admin action count.
+
+        The page is sorted and cut before the lookup, so only ``limit`` rows are enriched;
+        the total is a separate count over the same query.
+        """
+        since = datetime.utcnow() - timedelta(days=RECENT_ACTIONS_DAYS)
+        rows = await self.db.workspaces.aggregate([
+            {"$match": query},
+            {"$sort": {"_id": 1}},
+            {"$skip": offset},
+            {"$limit": limit},
+            {"$lookup": {
+                "from": "admin_actions",
+                "let": {"workspace_id": "$_id"},
+                "pipeline": [
+                    {"$match": {"$expr": {"$and": [
+                        {"$eq": ["$workspace_id", "$$workspace_id"]},
+                        {"$gte": ["$created_at", since]}
+                    ]}}},
+                    {"$count": "count"}
+                ],
+                "as": "recent_admin_actions"
+            }}
+        ]).to_list(length=limit)
+        page = {"items": [self._with_admin_analytics(workspace) for workspace in rows]}
+        if with_total:
+            page["total"] = await self.db.workspaces.count_documents(query)
+        return page
+
+    @staticmethod
+    def _with_admin_analytics(workspace: Dict) -> Dict:
+        """Add admin-relevant analytics to a workspace row from the enriched page pipeline"""
+        enhanced = dict(workspace)
+        counted = enhanced.pop("recent_admin_actions", [])
+        
+        # Add subscription analytics
+        subscription = workspace.get("subscription", {})
+        created_at = to_datetime(workspace.get("created_at")) or datetime.utcnow()
+        enhanced["admin_analytics"] = {
+            "total_revenue": subscription.get("pricing", {}).get("total_amount", 0),
+            "subscription_age_days": (datetime.utcnow() - created_at).days if isinstance(created_at, datetime) else 0,
+            "status": subscription.get("status", "unknown"),
+            "bundle_count": len(subscription.get("bundles", [])),
+            "has_overrides": "admin_override" in workspace,
+            "is_comp_account": "comp_account" in workspace,
+            "discount_count": len(subscription.get("discounts", [])),
+            # Recent admin actions count
+            "recent_admin_actions": counted[0]["count"] if counted else 0
+        }
+        return enhanced
 
     async def _log_admin_action(self, admin_user_id: str, action_type: str, workspace_id: str, action_data: Dict):
         """Log admin action for audit trail"""
+        # Every admin workspace write ends here; drop cached subscription reads
+        collection_changed("workspaces")
         try:
             action_record = {
                 "_id": str(uuid.uuid4()),
@@ -563,17 +638,6 @@ class AdminWorkspaceManagementService:
             logger.error(f"Error recalculating pricing: {e}")
             return subscription.get("pricing", {})
 
-    async def _get_workspace_basic_info(self, workspace_id: str) -> Dict:
-        """Get basic workspace information for admin displays"""
-        try:
-            workspace = await self.db.workspaces.find_one(
-                {"_id": workspace_id}, 
-                {"name": 1, "owner_email": 1, "created_at": 1}
-            )
-            return workspace or {"name": "Unknown", "owner_email": "Unknown"}
-        except Exception:
-            return {"name": "Unknown", "owner_email": "Unknown"}
-
 
 # Service instance
 _admin_workspace_management_service = None
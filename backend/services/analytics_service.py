@@ -36,8 +36,8 @@ class AnalyticsService:
     ) -> Dict[str, Any]:
         """Get dashboard overview analytics"""
         try:
-            # Get user's products
-            products = await self.product_crud.get_user_products(user_id)
+            # Get user's product count
+            total_products = await self.product_crud.get_user_products_count(user_id)
             
             # Get user's orders
             orders = await self.order_crud.get_user_orders(user_id, start_date, end_date)
@@ -48,7 +48,6 @@ class AnalyticsService:
             # Calculate metrics
             total_revenue = sum(order.total_amount for order in orders if order.status == "completed")
             total_orders = len([order for order in orders if order.status == "completed"])
-            total_products = len(products)
             total_bio_links = len(bio_links)
             
             # Calculate growth percentages (simplified - in real app, compare with previous period)
@@ -186,17 +185,17 @@ class AnalyticsService:
     ) -> List[Dict[str, Any]]:
         """Get performance analytics for all user products"""
         try:
-            products = await self.product_crud.get_user_products(user_id)
+            products = await self.product_crud.get_user_product_rows(user_id, fields=["_id"])
             performance_data = []
             
             for product in products:
                 try:
                     performance = await self.get_product_performance(
-                        user_id, str(product.id), start_date, end_date
+                        user_id, product["_id"], start_date, end_date
                     )
                     performance_data.append(performance)
                 except Exception as e:
-                    logger.warning(f"Error getting performance for product {product.id}: {e}")
+                    logger.warning(f"Error getting performance for product {product['_id']}: {e}")
                     continue
             
             # Sort by revenue
@@ -358,17 +357,17 @@ class AnalyticsService:
     async def _get_top_products(self, user_id: str, limit: int = 5) -> List[Dict[str, Any]]:
         """Get top performing products"""
         try:
-            products = await self.product_crud.get_user_products(user_id)
+            products = await self.product_crud.get_user_product_rows(user_id, fields=["_id", "name"], limit=limit)
             top_products = []
             
-            for product in products[:limit]:
+            for product in products:
                 # Get product performance
-                orders = await self.order_crud.get_product_orders(str(product.id))
+                orders = await self.order_crud.get_product_orders(product["_id"])
                 total_sales = len([order for order in orders if order.status == "completed"])
                 
                 top_products.append({
-                    "id": str(product.id),
-                    "name": product.name,
+                    "id": product["_id"],
+                    "name": product.get("name"),
                     "sales": total_sales,
                     "revenue": sum(order.total_amount for order in orders if order.status == "completed")
                 })
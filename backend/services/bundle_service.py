@@ -4,14 +4,21 @@ Provides real database-driven bundle management
 """
 
 import logging
-from typing import Dict, List, Any, Optional
+from typing import Dict, Any, Optional
 from datetime import datetime
+from core.cache import get_cache
+from core.config import settings
+from core.fanout import FanOut
+from core.plan_catalog import get_plan_catalog
 from db.session import MongoDatabase
 from models.user import User
 from models.ecommerce import Product
 
 logger = logging.getLogger(__name__)
 
+BUNDLE_TYPES = ("creator", "ecommerce", "social_media", "education", "business", "operations")
+BUNDLE_COUNTS_CACHE = "bundle_counts"
+
 
 class BundleService:
     """Real bundle management service"""
@@ -19,30 +26,28 @@ class BundleService:
     def __init__(self, db: MongoDatabase):
         self.db = db
     
+    @staticmethod
+    def _monthly_prices() -> Dict[str, float]:
+        """Monthly price in dollars per bundle, from the current plan catalog snapshot"""
+        catalog = get_plan_catalog()
+        return {bundle: catalog.get(bundle)["price_monthly"] for bundle in BUNDLE_TYPES}
+    
     async def get_active_bundles(self) -> Dict[str, Any]:
         """Get real active bundles configuration"""
         try:
-            # Get bundle statistics from database
-            creator_products = await self._get_products_by_bundle_type("creator")
-            ecommerce_products = await self._get_products_by_bundle_type("ecommerce")
-            social_products = await self._get_products_by_bundle_type("social_media")
-            education_products = await self._get_products_by_bundle_type("education")
-            business_products = await self._get_products_by_bundle_type("business")
-            operations_products = await self._get_products_by_bundle_type("operations")
-            
-            # Get user counts by bundle type
-            creator_users = await self._get_users_by_bundle_type("creator")
-            ecommerce_users = await self._get_users_by_bundle_type("ecommerce")
-            business_users = await self._get_users_by_bundle_type("business")
+            # Per-bundle counts from the shared, briefly cached snapshot
+            counts = await self.get_bundle_counts()
+            products, users = counts["products"], counts["users"]
+            prices = self._monthly_prices()
             
             return {
                 "creator": {
                     "name": "CREATOR",
-                    "price": 19,
-                    "monthly_price": 19,
+                    "price": prices["creator"],
+                    "monthly_price": prices["creator"],
                     "status": "✅ AVAILABLE",
-                    "products_count": len(creator_products),
-                    "users_count": len(creator_users),
+                    "products_count": products.get("creator", 0),
+                    "users_count": users.get("creator", 0),
                     "features": [
                         "Bio Links with Analytics",
                         "Content Creation Platform", 
@@ -54,11 +59,11 @@ class BundleService:
                 },
                 "ecommerce": {
                     "name": "E-COMMERCE",
-                    "price": 24,
-                    "monthly_price": 24,
+                    "price": prices["ecommerce"],
+                    "monthly_price": prices["ecommerce"],
                     "status": "✅ AVAILABLE",
-                    "products_count": len(ecommerce_products),
-                    "users_count": len(ecommerce_users),
+                    "products_count": products.get("ecommerce", 0),
+                    "users_count": users.get("ecommerce", 0),
                     "features": [
                         "Online Store Builder",
                         "Inventory Management",
@@ -70,10 +75,10 @@ class BundleService:
                 },
                 "social_media": {
                     "name": "SOCIAL MEDIA",
-                    "price": 29,
-                    "monthly_price": 29,
+                    "price": prices["social_media"],
+                    "monthly_price": prices["social_media"],
                     "status": "⏳ IN DEVELOPMENT",
-                    "products_count": len(social_products),
+                    "products_count": products.get("social_media", 0),
                     "users_count": 0,
                     "features": [
                         "Post Scheduling",
@@ -85,10 +90,10 @@ class BundleService:
                 },
                 "education": {
                     "name": "EDUCATION",
-                    "price": 29,
-                    "monthly_price": 29,
+                    "price": prices["education"],
+                    "monthly_price": prices["education"],
                     "status": "⏳ COMING SOON",
-                    "products_count": len(education_products),
+                    "products_count": products.get("education", 0),
                     "users_count": 0,
                     "features": [
                         "Course Creation",
@@ -100,11 +105,11 @@ class BundleService:
                 },
                 "business": {
                     "name": "BUSINESS",
-                    "price": 39,
-                    "monthly_price": 39,
+                    "price": prices["business"],
+                    "monthly_price": prices["business"],
                     "status": "⏳ COMING SOON",
-                    "products_count": len(business_products),
-                    "users_count": len(business_users),
+                    "products_count": products.get("business", 0),
+                    "users_count": users.get("business", 0),
                     "features": [
                         "CRM System",
                         "Team Management",
@@ -115,10 +120,10 @@ class BundleService:
                 },
                 "operations": {
                     "name": "OPERATIONS",
-                    "price": 24,
-                    "monthly_price": 24,
+                    "price": prices["operations"],
+                    "monthly_price": prices["operations"],
                     "status": "⏳ COMING SOON",
-                    "products_count": len(operations_products),
+                    "products_count": products.get("operations", 0),
                     "users_count": 0,
                     "features": [
                         "Booking System",
@@ -204,7 +209,7 @@ class BundleService:
             
             # Calculate total monthly cost
             active_bundles = [bundle for bundle, data in bundle_usage.items() if data["active"]]
-            base_prices = {"creator": 19, "ecommerce": 24, "social_media": 29, "education": 29, "business": 39, "operations": 24}
+            base_prices = self._monthly_prices()
             
             total_base_cost = sum(base_prices[bundle] for bundle in active_bundles)
             
@@ -241,85 +246,71 @@ class BundleService:
     async def get_bundle_analytics(self) -> Dict[str, Any]:
         """Get real bundle analytics and usage statistics"""
         try:
-            # Get all users
-            all_users = await self.db.users.find().to_list(1000)
-            
-            # Get all products
-            all_products = await self.db.products.find().to_list(1000)
+            counts = await self.get_bundle_counts()
             
             # Calculate bundle usage statistics
             bundle_stats = {
-                "creator": {"users": 0, "products": 0, "revenue": 0},
-                "ecommerce": {"users": 0, "products": 0, "revenue": 0},
-                "social_media": {"users": 0, "products": 0, "revenue": 0},
-                "education": {"users": 0, "products": 0, "revenue": 0},
-                "business": {"users": 0, "products": 0, "revenue": 0},
-                "operations": {"users": 0, "products": 0, "revenue": 0}
+                bundle_type: {
+                    "users": counts["users"].get(bundle_type, 0),
+                    "products": counts["products"].get(bundle_type, 0),
+                    "revenue": 0
+                }
+                for bundle_type in BUNDLE_TYPES
             }
             
-            # Count products by bundle type
-            for product in all_products:
-                bundle_type = product.get("bundle_type")
-                if bundle_type and bundle_type in bundle_stats:
-                    bundle_stats[bundle_type]["products"] += 1
-            
-            # Count users by bundle type (based on their products)
-            user_bundles = {}
-            for product in all_products:
-                vendor_id = product.get("vendor_id")
-                bundle_type = product.get("bundle_type")
-                if vendor_id and bundle_type:
-                    if vendor_id not in user_bundles:
-                        user_bundles[vendor_id] = set()
-                    user_bundles[vendor_id].add(bundle_type)
-            
-            # Count users per bundle
-            for user_id, bundles in user_bundles.items():
-                for bundle_type in bundles:
-                    if bundle_type in bundle_stats:
-                        bundle_stats[bundle_type]["users"] += 1
-            
             # Calculate revenue (simplified - should use actual subscription data)
-            bundle_prices = {"creator": 19, "ecommerce": 24, "social_media": 29, "education": 29, "business": 39, "operations": 24}
+            catalog = get_plan_catalog()
             for bundle_type, stats in bundle_stats.items():
-                stats["revenue"] = stats["users"] * bundle_prices[bundle_type]
+                stats["revenue"] = stats["users"] * catalog.get(bundle_type)["price_monthly"]
             
             return {
                 "bundle_statistics": bundle_stats,
-                "total_users": len(all_users),
-                "total_products": len(all_products),
+                "total_users": counts["total_users"],
+                "total_products": counts["total_products"],
                 "most_popular_bundle": max(bundle_stats.items(), key=lambda x: x[1]["users"])[0],
                 "total_revenue": sum(stats["revenue"] for stats in bundle_stats.values()),
-                "last_updated": datetime.utcnow().isoformat()
+                "last_updated": counts["taken_at"].isoformat()
             }
         except Exception as e:
             logger.error(f"Error getting bundle analytics: {e}")
             return {"error": str(e)}
     
-    async def _get_products_by_bundle_type(self, bundle_type: str) -> List[Dict]:
-        """Get products by bundle type"""
-        try:
-            products = await self.db.products.find({"bundle_type": bundle_type}).to_list(1000)
-            return products
-        except Exception as e:
-            logger.error(f"Error getting products by bundle type: {e}")
-            return []
+    async def get_bundle_counts(self) -> Dict[str, Any]:
+        """Product and vendor counts per bundle type, cached for BUNDLE_COUNTS_TTL_SECONDS.
+
+        Product and user writes drop the snapshot (see ``core.cache.collection_changed``).
+        """
+        cache = get_cache(BUNDLE_COUNTS_CACHE, settings.BUNDLE_COUNTS_TTL_SECONDS, ("products", "users"))
+        return await cache.get("snapshot", self._load_bundle_counts)
     
-    async def _get_users_by_bundle_type(self, bundle_type: str) -> List[Dict]:
-        """Get users by bundle type (based on their products)"""
-        try:
-            # Get users who have products of this bundle type
-            products = await self.db.products.find({"bundle_type": bundle_type}).to_list(1000)
-            vendor_ids = list(set(product.get("vendor_id") for product in products if product.get("vendor_id")))
-            
-            if not vendor_ids:
-                return []
-            
-            users = await self.db.users.find({"_id": {"$in": vendor_ids}}).to_list(1000)
-            return users
-        except Exception as e:
-            logger.error(f"Error getting users by bundle type: {e}")
-            return []
+    async def _load_bundle_counts(self) -> Dict[str, Any]:
+        """One ``$group`` over products per bundle type, one for distinct existing vendors"""
+        products_pipeline = [
+            {"$group": {"_id": "$bundle_type", "count": {"$sum": 1}}}
+        ]
+        users_pipeline = [
+            {"$match": {"bundle_type": {"$in": list(BUNDLE_TYPES)}, "vendor_id": {"$ne": None}}},
+            {"$group": {"_id": {"bundle_type": "$bundle_type", "vendor_id": "$vendor_id"}}},
+            # Only vendors that still have a user record count as bundle users
+            {"$lookup": {"from": "users", "localField": "_id.vendor_id", "foreignField": "_id", "as": "user"}},
+            {"$match": {"user.0": {"$exists": True}}},
+            {"$group": {"_id": "$_id.bundle_type", "count": {"$sum": 1}}}
+        ]
+        results = await (
+            FanOut(label="bundle_counts")
+            .add("products", self.db.products.aggregate(products_pipeline).to_list, length=None)
+            .add("users", self.db.products.aggregate(users_pipeline).to_list, length=None)
+            .add("total_users", self.db.users.estimated_document_count)
+            .run()
+        )
+        by_type = {row["_id"]: row["count"] for row in results["products"]}
+        return {
+            "products": {bundle_type: by_type.get(bundle_type, 0) for bundle_type in BUNDLE_TYPES},
+            "users": {row["_id"]: row["count"] for row in results["users"]},
+            "total_products": sum(by_type.values()),
+            "total_users": results["total_users"],
+            "taken_at": datetime.utcnow()
+        }
     
     def _get_fallback_bundles(self) -> Dict[str, Any]:
         """Fallback bundle data if database is unavailable"""
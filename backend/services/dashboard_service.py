@@ -6,6 +6,7 @@ Provides real database-driven dashboard data
 import logging
 from typing import Dict, List, Any, Optional
 from datetime import datetime, timedelta
+from core.fanout import FanOut
 from db.session import MongoDatabase
 from crud.users import UserCRUD
 from crud.products import ProductCRUD
@@ -21,6 +22,23 @@ logger = logging.getLogger(__name__)
 class DashboardService:
     """Real dashboard data service"""
     
+    # Overview counts: stat name -> collection
+    OVERVIEW_COLLECTIONS = {
+        "users": "users",
+        "products": "products",
+        "orders": "orders",
+        "biolinks": "bio_links",
+        "messages": "messages",
+        "comments": "comments",
+        "notifications": "notifications",
+    }
+    # Recent activity: name -> (collection, {response key: document field}) besides id
+    RECENT_ACTIVITY = {
+        "users": ("users", {"name": "full_name", "created_at": "created_at"}),
+        "products": ("products", {"name": "name", "price": "price"}),
+        "orders": ("orders", {"total": "total", "status": "status"}),
+    }
+    
     def __init__(self, db: MongoDatabase):
         self.db = db
         self.user_crud = UserCRUD(db)
@@ -34,36 +52,18 @@ class DashboardService:
     async def get_system_overview(self) -> Dict[str, Any]:
         """Get real system overview statistics"""
         try:
-            # Get real counts from database
-            user_count = await self.user_crud.count_users()
-            product_count = await self.product_crud.count_products()
-            order_count = await self.order_crud.count_orders()
-            biolink_count = await self.biolink_crud.count_biolinks()
-            message_count = await self.message_crud.count_messages()
-            comment_count = await self.comment_crud.count_comments()
-            notification_count = await self.notification_crud.count_notifications()
-            
-            # Get recent activity
-            recent_users = await self.user_crud.get_recent_users(limit=5)
-            recent_products = await self.product_crud.get_recent_products(limit=5)
-            recent_orders = await self.order_crud.get_recent_orders(limit=5)
+            # Real counts and recent activity, queried concurrently
+            overview = FanOut(label="system_overview")
+            for name, collection in self.OVERVIEW_COLLECTIONS.items():
+                overview.add(name, self.db[collection].estimated_document_count)
+            for name, (collection, fields) in self.RECENT_ACTIVITY.items():
+                overview.add(f"recent_{name}", self._get_recent, collection, fields)
+            results = await overview.run()
             
             return {
                 "status": "healthy",
-                "database_stats": {
-                    "users": user_count,
-                    "products": product_count,
-                    "orders": order_count,
-                    "biolinks": biolink_count,
-                    "messages": message_count,
-                    "comments": comment_count,
-                    "notifications": notification_count
-                },
-                "recent_activity": {
-                    "users": [{"id": u.id, "name": u.full_name, "created_at": u.created_at} for u in recent_users],
-                    "products": [{"id": p.id, "name": p.name, "price": p.price} for p in recent_products],
-                    "orders": [{"id": o.id, "total": o.total, "status": o.status} for o in recent_orders]
-                },
+                "database_stats": {name: results[name] for name in self.OVERVIEW_COLLECTIONS},
+                "recent_activity": {name: results[f"recent_{name}"] for name in self.RECENT_ACTIVITY},
                 "last_updated": datetime.utcnow().isoformat()
             }
         except Exception as e:
@@ -75,6 +75,15 @@ class DashboardService:
                 "recent_activity": {}
             }
     
+    async def _get_recent(self, collection: str, fields: Dict[str, str], limit: int = 5) -> List[Dict[str, Any]]:
+        """Newest documents of a collection (by ``_id``), projected to ``fields``"""
+        docs = await self.db[collection].find({}, {field: 1 for field in fields.values()}) \
+            .sort("_id", -1).limit(limit).to_list(length=limit)
+        return [
+            {"id": str(doc["_id"]), **{key: doc.get(field) for key, field in fields.items()}}
+            for doc in docs
+        ]
+    
     async def get_user_dashboard(self, user_id: str) -> Dict[str, Any]:
         """Get real dashboard data for a specific user"""
         try:
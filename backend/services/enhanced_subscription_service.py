@@ -12,6 +12,9 @@ import os
 
 from core.bundle_manager import BundleManager, BundleType, get_bundle_manager
 from core.database import get_database_async
+from core.stripe_gateway import get_stripe_gateway
+from core.timestamps import serialize_timestamps
+from services.plan_subscription_counter_service import get_plan_subscription_counter_service
 
 logger = logging.getLogger(__name__)
 
@@ -24,9 +27,11 @@ class EnhancedSubscriptionService:
     def __init__(self):
         self.service_name = "enhanced_subscription"
         self.bundle_manager = get_bundle_manager()
+        self.plan_counters = get_plan_subscription_counter_service()
         
         # Initialize Stripe
         stripe.api_key = os.getenv("STRIPE_SECRET_KEY")
+        self.gateway = get_stripe_gateway()
         
         # Stripe Product IDs (should be created in Stripe Dashboard)
         self.STRIPE_BUNDLE_PRODUCTS = {
@@ -96,7 +101,8 @@ class EnhancedSubscriptionService:
                 }
             
             # Create new Stripe customer
-            customer = stripe.Customer.create(
+            customer = await self.gateway.request(
+                "Customer.create",
                 email=user_data.get("email"),
                 name=user_data.get("name"),
                 metadata={
@@ -112,7 +118,7 @@ class EnhancedSubscriptionService:
                 "stripe_customer_id": customer.id,
                 "email": user_data.get("email"),
                 "name": user_data.get("name"),
-                "created_at": datetime.utcnow().isoformat()
+                "created_at": datetime.utcnow()
             }
             
             await customers_collection.insert_one(customer_record)
@@ -121,7 +127,7 @@ class EnhancedSubscriptionService:
                 "success": True,
                 "customer_id": customer.id,
                 "existing": False,
-                "created_at": customer_record["created_at"]
+                "created_at": customer_record["created_at"].isoformat()
             }
             
         except Exception as e:
@@ -204,14 +210,15 @@ class EnhancedSubscriptionService:
             discount_rate = pricing.get("discount_rate", 0)
             if discount_rate > 0:
                 # Create a coupon for the discount
-                coupon = stripe.Coupon.create(
+                coupon = await self.gateway.request(
+                    "Coupon.create",
                     percent_off=discount_rate * 100,
                     duration="forever",
                     id=f"multi_bundle_discount_{int(discount_rate*100)}_{user_id}_{int(datetime.utcnow().timestamp())}"
                 )
                 subscription_data["coupon"] = coupon.id
             
-            subscription = stripe.Subscription.create(**subscription_data)
+            subscription = await self.gateway.request("Subscription.create", **subscription_data)
             
             # Save subscription to database
             subscriptions_collection = db["subscriptions"]
@@ -223,15 +230,19 @@ class EnhancedSubscriptionService:
                 "bundles": [b.value for b in bundles],
                 "billing_cycle": billing_cycle,
                 "status": subscription.status,
-                "current_period_start": datetime.fromtimestamp(subscription.current_period_start).isoformat(),
-                "current_period_end": datetime.fromtimestamp(subscription.current_period_end).isoformat(),
+                "current_period_start": datetime.utcfromtimestamp(subscription.current_period_start),
+                "current_period_end": datetime.utcfromtimestamp(subscription.current_period_end),
                 "base_cost": pricing.get("base_cost"),
                 "discount_rate": pricing.get("discount_rate"),
                 "final_cost": pricing.get("final_cost"),
-                "created_at": datetime.utcnow().isoformat()
+                "created_at": datetime.utcnow()
             }
             
             await subscriptions_collection.insert_one(subscription_record)
+            await self.plan_counters.record_created(
+                subscription_record["bundles"], subscription_record["final_cost"] or 0,
+                subscription_record["created_at"]
+            )
             
             # Activate bundles for the user
             for bundle in bundles:
@@ -276,7 +287,7 @@ class EnhancedSubscriptionService:
             stripe_subscription_id = current_subscription["stripe_subscription_id"]
             
             # Get current Stripe subscription
-            subscription = stripe.Subscription.retrieve(stripe_subscription_id)
+            subscription = await self.gateway.request("Subscription.retrieve", stripe_subscription_id)
             
             # Calculate new pricing
             new_pricing = self.bundle_manager.calculate_bundle_pricing(
@@ -299,7 +310,8 @@ class EnhancedSubscriptionService:
                 new_items.append({"price": price_id})
             
             # Update Stripe subscription
-            updated_subscription = stripe.Subscription.modify(
+            updated_subscription = await self.gateway.request(
+                "Subscription.modify",
                 stripe_subscription_id,
                 items=new_items,
                 proration_behavior="create_prorations",
@@ -310,19 +322,31 @@ class EnhancedSubscriptionService:
                 }
             )
             
-            # Update database record
-            await subscriptions_collection.update_one(
-                {"stripe_subscription_id": stripe_subscription_id},
+            # Update database record, only if it still holds what the counter deltas are based on
+            result = await subscriptions_collection.update_one(
+                {
+                    "stripe_subscription_id": stripe_subscription_id,
+                    "status": current_subscription["status"],
+                    "bundles": current_subscription.get("bundles"),
+                    "final_cost": current_subscription.get("final_cost")
+                },
                 {
                     "$set": {
                         "bundles": [b.value for b in new_bundles],
                         "base_cost": new_pricing.get("base_cost"),
                         "discount_rate": new_pricing.get("discount_rate"),
                         "final_cost": new_pricing.get("final_cost"),
-                        "updated_at": datetime.utcnow().isoformat()
+                        "updated_at": datetime.utcnow()
                     }
                 }
             )
+            if result.modified_count == 1:
+                await self.plan_counters.record_modified(
+                    current_subscription.get("bundles", []), current_subscription.get("final_cost") or 0,
+                    [b.value for b in new_bundles], new_pricing.get("final_cost") or 0
+                )
+            else:
+                logger.warning(f"Subscription {stripe_subscription_id} changed concurrently; plan counters not adjusted")
             
             # Update bundle activations
             current_bundles = set(current_subscription.get("bundles", []))
@@ -380,23 +404,30 @@ class EnhancedSubscriptionService:
             
             # Cancel Stripe subscription
             if immediate:
-                canceled_subscription = stripe.Subscription.delete(stripe_subscription_id)
+                canceled_subscription = await self.gateway.request("Subscription.delete", stripe_subscription_id)
             else:
-                canceled_subscription = stripe.Subscription.modify(
+                canceled_subscription = await self.gateway.request(
+                    "Subscription.modify",
                     stripe_subscription_id,
                     cancel_at_period_end=True
                 )
             
-            # Update database record
-            await subscriptions_collection.update_one(
-                {"stripe_subscription_id": stripe_subscription_id},
+            # Update database record; only the request that moves it out of its current status counts it
+            result = await subscriptions_collection.update_one(
+                {"stripe_subscription_id": stripe_subscription_id, "status": current_subscription["status"]},
                 {
                     "$set": {
                         "status": "canceled" if immediate else "cancel_at_period_end",
-                        "canceled_at": datetime.utcnow().isoformat()
+                        "canceled_at": datetime.utcnow()
                     }
                 }
             )
+            if result.modified_count == 1:
+                await self.plan_counters.record_canceled(
+                    current_subscription.get("bundles", []), current_subscription.get("final_cost") or 0
+                )
+            else:
+                logger.warning(f"Subscription {stripe_subscription_id} changed concurrently; plan counters not adjusted")
             
             # Deactivate bundles if immediate cancellation
             if immediate:
@@ -446,7 +477,7 @@ class EnhancedSubscriptionService:
             
             return {
                 "success": True,
-                "subscription": subscription,
+                "subscription": serialize_timestamps(subscription),
                 "active_bundles": user_bundles.get("active_bundles", []),
                 "retrieved_at": datetime.utcnow().isoformat()
             }
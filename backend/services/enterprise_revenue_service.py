@@ -4,16 +4,93 @@ Handles automatic calculation of 15% revenue share billing for Enterprise worksp
 """
 
 import logging
-from typing import Dict, Any, List, Optional
+from typing import Dict, Any, List, Optional, Tuple
 from datetime import datetime, timedelta
-from core.database import get_database
+from pymongo import ASCENDING, DESCENDING, IndexModel, ReplaceOne
+import numpy as np
+from core import forecasting
+from core.config import settings
+from core.database import get_motor_database
+from core.fanout import fan_out
+from core.indexes import declare_indexes
+from core.timestamps import to_datetime
 import uuid
 
 logger = logging.getLogger(__name__)
 
+declare_indexes(
+    "enterprise_revenue_aggregates",
+    IndexModel([("workspace_id", ASCENDING), ("period_start", ASCENDING)]),
+    # The nightly projection batch reads one window of months across every workspace
+    IndexModel([("period_start", ASCENDING), ("workspace_id", ASCENDING)]),
+)
+declare_indexes(
+    "enterprise_revenue_tracking",
+    IndexModel([("workspace_id", ASCENDING), ("source", ASCENDING), ("occurred_at", DESCENDING)]),
+)
+
+
+def _month_start(value: datetime) -> datetime:
+    return value.replace(day=1, hour=0, minute=0, second=0, microsecond=0)
+
+
+def _add_months(month_start: datetime, months: int) -> datetime:
+    index = month_start.year * 12 + month_start.month - 1 + months
+    return month_start.replace(year=index // 12, month=index % 12 + 1)
+
+
+def _period_end(end: datetime) -> datetime:
+    """Exclusive bound for a period ``end``, which covers the whole of its day"""
+    return end.replace(hour=0, minute=0, second=0, microsecond=0) + timedelta(days=1)
+
+
+def _occurred_between(start: datetime, end: datetime) -> Dict[str, Any]:
+    """Match for transactions that occurred in [start, end)"""
+    window = {"$gte": start, "$lt": end}
+    # Records tracked before occurred_at existed are dated by tracked_at, as in the rebuild
+    return {"$or": [{"occurred_at": window}, {"occurred_at": {"$exists": False}, "tracked_at": window}]}
+
+
+def _split_period(start: datetime, end: datetime) -> Tuple[List[datetime], List[Tuple[datetime, datetime]]]:
+    """Whole calendar months inside a period, and the partial ranges left at its edges"""
+    stop = _period_end(end)
+    month = start if start == _month_start(start) else _add_months(_month_start(start), 1)
+    months = []
+    while _add_months(month, 1) <= stop:
+        months.append(month)
+        month = _add_months(month, 1)
+    if not months:
+        return [], [(start, stop)] if start < stop else []
+    edges = []
+    if start < months[0]:
+        edges.append((start, months[0]))
+    if _add_months(months[-1], 1) < stop:
+        edges.append((_add_months(months[-1], 1), stop))
+    return months, edges
+
+
+def _history_months(current_month: datetime) -> List[datetime]:
+    """The 12 months before ``current_month`` and the month itself, oldest first"""
+    return [_add_months(current_month, -i) for i in range(12, -1, -1)]
+
+
+def _aggregate_id(workspace_id: str, source: str, month_start: datetime) -> str:
+    return f"{workspace_id}|{source}|{month_start.strftime('%Y-%m')}"
+
+
 class EnterpriseRevenueService:
+    """
+    Revenue share billing read from ``enterprise_revenue_aggregates``: one bucket per
+    (workspace, source, calendar month), kept current by ``track_revenue_transaction`` and
+    rebuilt from ``enterprise_revenue_tracking`` by ``rebuild_revenue_aggregates``. Every
+    revenue figure, for any number of periods, is one ``$in``/``$group`` over the buckets
+    for the whole months; partial months at the edges of a period are summed from the
+    tracked transactions themselves.
+    """
+
     def __init__(self):
-        self.db = get_database()
+        # Every method awaits its queries, so this must be the Motor handle
+        self.db = get_motor_database()
         
         # Enterprise billing configuration
         self.enterprise_config = {
@@ -99,29 +176,11 @@ class EnterpriseRevenueService:
             if not period_start or not period_end:
                 return {"success": False, "error": "Invalid period specification"}
             
-            total_revenue = 0.0
-            revenue_breakdown = {}
-            
-            # Calculate revenue from each source
-            for source_name, source_config in self.revenue_sources.items():
-                source_revenue = await self._calculate_source_revenue(
-                    workspace_id, source_name, source_config, period_start, period_end
-                )
-                
-                revenue_breakdown[source_name] = {
-                    "amount": source_revenue,
-                    "description": source_config["description"],
-                    "percentage": 0  # Will calculate after total
-                }
-                
-                total_revenue += source_revenue
-            
-            # Calculate percentages
-            for source_name in revenue_breakdown:
-                if total_revenue > 0:
-                    revenue_breakdown[source_name]["percentage"] = (
-                        revenue_breakdown[source_name]["amount"] / total_revenue
-                    ) * 100
+            [revenue] = await self._revenue_for_periods(
+                workspace_id, [{"start": period_start, "end": period_end}]
+            )
+            total_revenue = revenue["total_revenue"]
+            revenue_breakdown = revenue["revenue_breakdown"]
             
             return {
                 "success": True,
@@ -201,26 +260,30 @@ class EnterpriseRevenueService:
             if not revenue_result.get("success"):
                 return revenue_result
             
-            # Get transaction details for each source
-            detailed_breakdown = {}
+            # Get the latest transactions of every earning source concurrently
+            breakdown = revenue_result["revenue_breakdown"]
             period_start, period_end = self._parse_period(period)
+            earning = [name for name in self.revenue_sources if breakdown[name]["amount"] > 0]
+            transactions = await fan_out({
+                source_name: (lambda source_name=source_name: self._get_source_transactions(
+                    workspace_id, source_name, self.revenue_sources[source_name], period_start, period_end
+                ))
+                for source_name in earning
+            }, label="revenue_sources")
             
-            for source_name, source_config in self.revenue_sources.items():
-                if revenue_result["revenue_breakdown"][source_name]["amount"] > 0:
-                    transactions = await self._get_source_transactions(
-                        workspace_id, source_name, source_config, period_start, period_end
-                    )
-                    
-                    detailed_breakdown[source_name] = {
-                        "total_amount": revenue_result["revenue_breakdown"][source_name]["amount"],
-                        "transaction_count": len(transactions),
-                        "average_transaction": (
-                            revenue_result["revenue_breakdown"][source_name]["amount"] / len(transactions)
-                            if transactions else 0
-                        ),
-                        "transactions": transactions[:10],  # Return first 10 transactions
-                        "description": source_config["description"]
-                    }
+            detailed_breakdown = {}
+            for source_name in earning:
+                source_revenue = breakdown[source_name]
+                detailed_breakdown[source_name] = {
+                    "total_amount": source_revenue["amount"],
+                    "transaction_count": source_revenue["transaction_count"],
+                    "average_transaction": (
+                        source_revenue["amount"] / source_revenue["transaction_count"]
+                        if source_revenue["transaction_count"] else 0
+                    ),
+                    "transactions": transactions[source_name],  # Latest 10 transactions
+                    "description": self.revenue_sources[source_name]["description"]
+                }
             
             return {
                 "success": True,
@@ -345,23 +408,18 @@ class EnterpriseRevenueService:
             # Get revenue data for multiple periods to show trends
             periods_to_analyze = self._get_trend_periods(period)
             
-            analytics_data = []
-            for period_info in periods_to_analyze:
-                revenue_result = await self.calculate_workspace_revenue(
-                    workspace_id, 
-                    "custom",
-                    period_info["start"].strftime("%Y-%m-%d"),
-                    period_info["end"].strftime("%Y-%m-%d")
-                )
-                
-                if revenue_result.get("success"):
-                    analytics_data.append({
-                        "period": period_info["label"],
-                        "start_date": period_info["start"].isoformat(),
-                        "end_date": period_info["end"].isoformat(),
-                        "total_revenue": revenue_result["total_revenue"],
-                        "revenue_breakdown": revenue_result["revenue_breakdown"]
-                    })
+            revenues = await self._revenue_for_periods(workspace_id, periods_to_analyze)
+            
+            analytics_data = [
+                {
+                    "period": period_info["label"],
+                    "start_date": period_info["start"].isoformat(),
+                    "end_date": period_info["end"].isoformat(),
+                    "total_revenue": revenue["total_revenue"],
+                    "revenue_breakdown": revenue["revenue_breakdown"]
+                }
+                for period_info, revenue in zip(periods_to_analyze, revenues)
+            ]
             
             # Calculate trends
             if len(analytics_data) >= 2:
@@ -420,6 +478,10 @@ class EnterpriseRevenueService:
             if source not in self.revenue_sources:
                 return {"success": False, "error": f"Invalid revenue source: {source}"}
             
+            # Bucket by when the sale happened, which may predate tracking
+            tracked_at = datetime.utcnow()
+            occurred_at = to_datetime(data.get("occurred_at")) or tracked_at
+            
             # Create revenue tracking record
             revenue_record = {
                 "_id": str(uuid.uuid4()),
@@ -427,7 +489,8 @@ class EnterpriseRevenueService:
                 "source": source,
                 "amount": float(amount),
                 "currency": self.enterprise_config["billing_currency"],
-                "tracked_at": datetime.utcnow(),
+                "occurred_at": occurred_at,
+                "tracked_at": tracked_at,
                 "tracked_by": tracked_by,
                 "metadata": transaction_metadata,
                 "source_config": self.revenue_sources[source]
@@ -437,7 +500,7 @@ class EnterpriseRevenueService:
             await collection.insert_one(revenue_record)
             
             # Update revenue aggregates for quick lookups
-            await self._update_revenue_aggregate(workspace_id, source, amount)
+            await self._update_revenue_aggregate(workspace_id, source, float(amount), occurred_at)
             
             return {
                 "success": True,
@@ -449,82 +512,140 @@ class EnterpriseRevenueService:
             logger.error(f"Error tracking revenue transaction: {e}")
             return {"success": False, "error": str(e)}
 
-    async def get_revenue_projections(self, workspace_id: str, months_ahead: int) -> Dict[str, Any]:
+    async def get_revenue_projections(self, workspace_id: str, months_ahead: int, method: str = None,
+                                      level: float = None) -> Dict[str, Any]:
         """Get revenue projections based on historical data"""
         try:
-            # Get historical revenue data for the past 12 months
-            historical_data = []
-            
-            for i in range(12, -1, -1):  # Past 12 months + current month
-                month_start = datetime.utcnow().replace(day=1, hour=0, minute=0, second=0, microsecond=0)
-                month_start = month_start - timedelta(days=i * 30)  # Approximate months
-                month_end = month_start.replace(day=28) + timedelta(days=4)  # End of month
-                month_end = month_end - timedelta(days=month_end.day)
-                
-                revenue_result = await self.calculate_workspace_revenue(
-                    workspace_id,
-                    "custom",
-                    month_start.strftime("%Y-%m-%d"),
-                    month_end.strftime("%Y-%m-%d")
-                )
-                
-                if revenue_result.get("success"):
-                    historical_data.append({
-                        "month": month_start.strftime("%Y-%m"),
-                        "revenue": revenue_result["total_revenue"]
-                    })
-            
-            # Calculate projections using simple trend analysis
-            if len(historical_data) < 3:
-                return {"success": False, "error": "Insufficient historical data for projections"}
-            
-            # Calculate average monthly growth rate
-            growth_rates = []
-            for i in range(1, len(historical_data)):
-                if historical_data[i-1]["revenue"] > 0:
-                    growth_rate = (historical_data[i]["revenue"] - historical_data[i-1]["revenue"]) / historical_data[i-1]["revenue"]
-                    growth_rates.append(growth_rate)
-            
-            avg_growth_rate = sum(growth_rates) / len(growth_rates) if growth_rates else 0
-            
-            # Generate projections
-            projections = []
-            current_revenue = historical_data[-1]["revenue"] if historical_data else 0
-            
-            for i in range(1, months_ahead + 1):
-                projected_revenue = current_revenue * (1 + avg_growth_rate) ** i
-                projected_billing = max(
-                    projected_revenue * self.enterprise_config["revenue_share_rate"],
-                    self.enterprise_config["minimum_monthly_fee"]
-                )
-                
-                future_date = datetime.utcnow() + timedelta(days=i * 30)
-                
-                projections.append({
-                    "month": future_date.strftime("%Y-%m"),
-                    "projected_revenue": projected_revenue,
-                    "projected_billing": projected_billing,
-                    "is_minimum_billing": projected_billing == self.enterprise_config["minimum_monthly_fee"],
-                    "confidence": max(0.5, 1.0 - (i * 0.1))  # Decrease confidence over time
-                })
+            method = method or settings.REVENUE_PROJECTION_METHOD
+            level = level or settings.REVENUE_PROJECTION_LEVEL
+            current_month = _month_start(datetime.utcnow())
+            
+            # The nightly batch already forecast this month for every workspace
+            stored = await self.db.enterprise_revenue_projections.find_one({"_id": workspace_id})
+            if (stored and stored["base_month"] == current_month.strftime("%Y-%m") and stored["method"] == method
+                    and stored["level"] == level and len(stored["projections"]) >= months_ahead):
+                return self._projection_result(workspace_id, stored["historical_data"], stored["avg_growth_rate"],
+                                               stored["projections"][:months_ahead], method, level)
+            
+            # Get historical revenue data for the past 12 months + current month in one read
+            months = _history_months(current_month)
+            revenues = await self._revenue_for_periods(
+                workspace_id, [{"start": month, "end": _add_months(month, 1) - timedelta(days=1)} for month in months]
+            )
+            history = np.array([[revenue["total_revenue"] for revenue in revenues]])
+            result = forecasting.forecast(history, months_ahead, method, level)
             
-            return {
-                "success": True,
-                "workspace_id": workspace_id,
-                "historical_data": historical_data,
-                "avg_growth_rate": avg_growth_rate,
-                "projections": projections,
-                "projection_summary": {
-                    "total_projected_revenue": sum(p["projected_revenue"] for p in projections),
-                    "total_projected_billing": sum(p["projected_billing"] for p in projections),
-                    "average_monthly_billing": sum(p["projected_billing"] for p in projections) / len(projections)
-                }
-            }
+            historical_data = [
+                {"month": month.strftime("%Y-%m"), "revenue": revenue["total_revenue"]}
+                for month, revenue in zip(months, revenues)
+            ]
+            return self._projection_result(workspace_id, historical_data,
+                                           float(forecasting.growth_rate(history)[0]),
+                                           self._projection_rows(current_month, result, 0), method, level)
             
         except Exception as e:
             logger.error(f"Error getting revenue projections: {e}")
             return {"success": False, "error": str(e)}
 
+    async def precompute_revenue_projections(self, months_ahead: int = None, method: str = None,
+                                             level: float = None, batch_size: int = 500) -> Dict[str, Any]:
+        """Forecast every workspace with revenue buckets in one pass (nightly batch)"""
+        try:
+            months_ahead = months_ahead or settings.REVENUE_PROJECTION_MONTHS
+            method = method or settings.REVENUE_PROJECTION_METHOD
+            level = level or settings.REVENUE_PROJECTION_LEVEL
+            current_month = _month_start(datetime.utcnow())
+            months = _history_months(current_month)
+            month_index = {month: i for i, month in enumerate(months)}
+            
+            # One read of every workspace's monthly totals in the window
+            cursor = self.db.enterprise_revenue_aggregates.aggregate([
+                {"$match": {"period_start": {"$gte": months[0], "$lte": months[-1]}}},
+                {"$group": {
+                    "_id": {"workspace_id": "$workspace_id", "period_start": "$period_start"},
+                    "amount": {"$sum": "$total_revenue"}
+                }}
+            ], allowDiskUse=True)
+            workspace_index: Dict[str, int] = {}
+            cells = []
+            async for row in cursor:
+                key = row["_id"]
+                row_index = workspace_index.setdefault(key["workspace_id"], len(workspace_index))
+                cells.append((row_index, month_index[key["period_start"]], row["amount"]))
+            
+            if not workspace_index:
+                return {"success": True, "workspaces": 0, "method": method}
+            history = np.zeros((len(workspace_index), len(months)))
+            rows, columns, amounts = zip(*cells)
+            np.add.at(history, (list(rows), list(columns)), amounts)
+            
+            result = forecasting.forecast(history, months_ahead, method, level)
+            growth_rates = forecasting.growth_rate(history)
+            
+            now = datetime.utcnow()
+            labels = [month.strftime("%Y-%m") for month in months]
+            collection = self.db.enterprise_revenue_projections
+            batch, written = [], 0
+            for workspace_id, row_index in workspace_index.items():
+                batch.append(ReplaceOne({"_id": workspace_id}, {
+                    "_id": workspace_id,
+                    "base_month": current_month.strftime("%Y-%m"),
+                    "method": method,
+                    "level": level,
+                    "historical_data": [{"month": label, "revenue": float(revenue)}
+                                        for label, revenue in zip(labels, history[row_index])],
+                    "avg_growth_rate": float(growth_rates[row_index]),
+                    "projections": self._projection_rows(current_month, result, row_index),
+                    "generated_at": now
+                }, upsert=True))
+                if len(batch) >= batch_size:
+                    await collection.bulk_write(batch, ordered=False)
+                    written += len(batch)
+                    batch = []
+            if batch:
+                await collection.bulk_write(batch, ordered=False)
+                written += len(batch)
+            
+            return {"success": True, "workspaces": written, "method": method}
+            
+        except Exception as e:
+            logger.error(f"Error precomputing revenue projections: {e}")
+            return {"success": False, "error": str(e)}
+
+    def _projection_rows(self, current_month: datetime, result: Dict[str, np.ndarray], row: int) -> List[Dict]:
+        """Monthly projections for one row of a forecast, with billing at the revenue share"""
+        share_rate = self.enterprise_config["revenue_share_rate"]
+        minimum_fee = self.enterprise_config["minimum_monthly_fee"]
+        projections = []
+        for i, (projected_revenue, lower, upper) in enumerate(
+                zip(result["forecast"][row], result["lower"][row], result["upper"][row]), start=1):
+            projected_billing = max(float(projected_revenue) * share_rate, minimum_fee)
+            projections.append({
+                "month": _add_months(current_month, i).strftime("%Y-%m"),
+                "projected_revenue": float(projected_revenue),
+                "projected_billing": projected_billing,
+                "is_minimum_billing": projected_billing == minimum_fee,
+                "revenue_range": {"lower": float(lower), "upper": float(upper)}
+            })
+        return projections
+
+    def _projection_result(self, workspace_id: str, historical_data: List[Dict], avg_growth_rate: float,
+                           projections: List[Dict], method: str, level: float) -> Dict[str, Any]:
+        return {
+            "success": True,
+            "workspace_id": workspace_id,
+            "historical_data": historical_data,
+            "avg_growth_rate": avg_growth_rate,
+            "method": method,
+            "confidence_level": level,
+            "projections": projections,
+            "projection_summary": {
+                "total_projected_revenue": sum(p["projected_revenue"] for p in projections),
+                "total_projected_billing": sum(p["projected_billing"] for p in projections),
+                "average_monthly_billing": sum(p["projected_billing"] for p in projections) / len(projections)
+            }
+        }
+
     async def create_billing_dispute(self, data: Dict[str, Any]) -> Dict[str, Any]:
         """Create billing dispute for enterprise charges"""
         try:
@@ -651,91 +772,99 @@ class EnterpriseRevenueService:
         
         return period_start, period_end
     
-    async def _calculate_source_revenue(self, workspace_id: str, source_name: str, source_config: Dict, period_start: datetime, period_end: datetime) -> float:
-        """Calculate revenue from a specific source"""
-        try:
-            # This is a simplified implementation
-            # In production, you would query the actual transaction collections
-            
-            # For now, return mock data based on source type
-            mock_revenue_data = {
-                "ecommerce": 5000.0,
-                "courses": 3000.0,
-                "bookings": 2000.0,
-                "templates": 500.0,
-                "subscriptions": 1000.0,
-                "affiliate": 300.0,
-                "consulting": 4000.0,
-                "digital_products": 800.0
-            }
+    async def _revenue_for_periods(self, workspace_id: str, periods: List[Dict]) -> List[Dict[str, Any]]:
+        """Total and per-source revenue for each period: one read of the monthly buckets, plus
+        one read of the tracked transactions per partial edge month"""
+        splits = [_split_period(period["start"], period["end"]) for period in periods]
+        months = sorted({month for period_months, _ in splits for month in period_months})
+        edges = sorted({edge for _, period_edges in splits for edge in period_edges})
+        
+        buckets = {}
+        if months:
+            rows = await self.db.enterprise_revenue_aggregates.aggregate([
+                {"$match": {"workspace_id": workspace_id, "period_start": {"$in": months}}},
+                {"$group": {
+                    "_id": {"period_start": "$period_start", "source": "$source"},
+                    "amount": {"$sum": "$total_revenue"},
+                    "count": {"$sum": "$transaction_count"}
+                }}
+            ]).to_list(length=None)
+            buckets = {(row["_id"]["period_start"], row["_id"]["source"]): row for row in rows}
+        for edge in edges:
+            for source_name, row in (await self._tracked_revenue(workspace_id, *edge)).items():
+                buckets[(edge, source_name)] = row
+        
+        results = []
+        for period_months, period_edges in splits:
+            keys = list(period_months) + list(period_edges)
+            revenue_breakdown = {}
+            total_revenue = 0.0
+            for source_name, source_config in self.revenue_sources.items():
+                rows = [buckets[(key, source_name)] for key in keys if (key, source_name) in buckets]
+                amount = float(sum(row["amount"] for row in rows))
+                revenue_breakdown[source_name] = {
+                    "amount": amount,
+                    "transaction_count": sum(row["count"] for row in rows),
+                    "description": source_config["description"],
+                    "percentage": 0  # Will calculate after total
+                }
+                total_revenue += amount
             
-            # In production, replace with actual database queries like:
-            # collection = getattr(self.db, source_config["collection"])
-            # pipeline = [
-            #     {"$match": {
-            #         "workspace_id": workspace_id,
-            #         "created_at": {"$gte": period_start, "$lt": period_end},
-            #         "status": "completed"
-            #     }},
-            #     {"$group": {
-            #         "_id": None,
-            #         "total": {"$sum": f"${source_config['amount_field']}"}
-            #     }}
-            # ]
-            # result = await collection.aggregate(pipeline).to_list(length=1)
-            # return result[0]["total"] if result else 0.0
-            
-            return mock_revenue_data.get(source_name, 0.0)
+            # Calculate percentages
+            if total_revenue > 0:
+                for source_revenue in revenue_breakdown.values():
+                    source_revenue["percentage"] = (source_revenue["amount"] / total_revenue) * 100
             
-        except Exception as e:
-            logger.error(f"Error calculating source revenue for {source_name}: {e}")
-            return 0.0
+            results.append({"total_revenue": total_revenue, "revenue_breakdown": revenue_breakdown})
+        return results
     
-    async def _get_source_transactions(self, workspace_id: str, source_name: str, source_config: Dict, period_start: datetime, period_end: datetime) -> List[Dict]:
-        """Get transaction details for a revenue source"""
+    async def _tracked_revenue(self, workspace_id: str, start: datetime, end: datetime) -> Dict[str, Dict[str, Any]]:
+        """Per-source revenue of the transactions that occurred in [start, end)"""
+        rows = await self.db.enterprise_revenue_tracking.aggregate([
+            {"$match": {"workspace_id": workspace_id, **_occurred_between(start, end)}},
+            {"$group": {"_id": "$source", "amount": {"$sum": "$amount"}, "count": {"$sum": 1}}}
+        ]).to_list(length=None)
+        return {row["_id"]: row for row in rows}
+    
+    async def _get_source_transactions(self, workspace_id: str, source_name: str, source_config: Dict,
+                                       period_start: datetime, period_end: datetime, limit: int = 10) -> List[Dict]:
+        """Latest tracked transactions for a revenue source in the period"""
         try:
-            # Mock transaction data for demonstration
-            # In production, query actual transaction collections
-            
-            mock_transactions = [
-                {
-                    "id": str(uuid.uuid4()),
-                    "amount": 299.99,
-                    "date": (period_end - timedelta(days=5)).isoformat(),
-                    "description": f"Sample {source_config['description']} transaction"
-                },
+            cursor = self.db.enterprise_revenue_tracking.aggregate([
+                {"$match": {"workspace_id": workspace_id, "source": source_name,
+                            **_occurred_between(period_start, _period_end(period_end))}},
+                {"$project": {"amount": 1, "metadata": 1, "occurred_at": {"$ifNull": ["$occurred_at", "$tracked_at"]}}},
+                {"$sort": {"occurred_at": -1}},
+                {"$limit": limit}
+            ])
+            
+            return [
                 {
-                    "id": str(uuid.uuid4()),
-                    "amount": 199.99,
-                    "date": (period_end - timedelta(days=10)).isoformat(),
-                    "description": f"Sample {source_config['description']} transaction"
+                    "id": transaction["_id"],
+                    "amount": transaction["amount"],
+                    "date": transaction["occurred_at"].isoformat(),
+                    "description": (transaction.get("metadata") or {}).get("description", source_config["description"])
                 }
+                for transaction in await cursor.to_list(length=limit)
             ]
             
-            return mock_transactions
-            
         except Exception as e:
             logger.error(f"Error getting source transactions for {source_name}: {e}")
             return []
     
-    async def _update_revenue_aggregate(self, workspace_id: str, source: str, amount: float):
+    async def _update_revenue_aggregate(self, workspace_id: str, source: str, amount: float, occurred_at: datetime):
         """Update revenue aggregates for quick lookups"""
         try:
-            month_start = datetime.utcnow().replace(day=1, hour=0, minute=0, second=0, microsecond=0)
+            month_start = _month_start(occurred_at)
             
             collection = self.db.enterprise_revenue_aggregates
             
             await collection.update_one(
+                {"_id": _aggregate_id(workspace_id, source, month_start)},
                 {
-                    "workspace_id": workspace_id,
-                    "source": source,
-                    "period_start": month_start
-                },
-                {
-                    "$inc": {"total_revenue": amount},
+                    "$inc": {"total_revenue": amount, "transaction_count": 1},
                     "$set": {"last_updated": datetime.utcnow()},
                     "$setOnInsert": {
-                        "_id": str(uuid.uuid4()),
                         "workspace_id": workspace_id,
                         "source": source,
                         "period_start": month_start,
@@ -748,6 +877,69 @@ class EnterpriseRevenueService:
         except Exception as e:
             logger.error(f"Error updating revenue aggregate: {e}")
     
+    async def rebuild_revenue_aggregates(self, workspace_id: str = None, batch_size: int = 500) -> Dict[str, Any]:
+        """Recompute the monthly buckets from tracked transactions (backfill or repair).
+
+        Buckets are replaced in place, so readers never see a month go missing, and buckets
+        the rebuild did not write are deleted afterwards unless tracking touched them while it
+        ran. Transactions tracked during the rebuild can still be overwritten by the bucket
+        computed before them; run it when tracking is quiet, or again after.
+        """
+        try:
+            started = datetime.utcnow()
+            match = {"workspace_id": workspace_id} if workspace_id else {}
+            occurred_at = {"$ifNull": ["$occurred_at", "$tracked_at"]}
+            cursor = self.db.enterprise_revenue_tracking.aggregate([
+                {"$match": match},
+                {"$group": {
+                    "_id": {
+                        "workspace_id": "$workspace_id",
+                        "source": "$source",
+                        "year": {"$year": occurred_at},
+                        "month": {"$month": occurred_at}
+                    },
+                    "total_revenue": {"$sum": "$amount"},
+                    "transaction_count": {"$sum": 1}
+                }}
+            ], allowDiskUse=True)
+            
+            batch, written = [], 0
+            async for row in cursor:
+                key = row["_id"]
+                month_start = datetime(key["year"], key["month"], 1)
+                bucket_id = _aggregate_id(key["workspace_id"], key["source"], month_start)
+                batch.append(ReplaceOne({"_id": bucket_id}, {
+                    "_id": bucket_id,
+                    "workspace_id": key["workspace_id"],
+                    "source": key["source"],
+                    "period_start": month_start,
+                    "total_revenue": row["total_revenue"],
+                    "transaction_count": row["transaction_count"],
+                    "created_at": started,
+                    "last_updated": started,
+                    "rebuilt_at": started
+                }, upsert=True))
+                if len(batch) >= batch_size:
+                    await self.db.enterprise_revenue_aggregates.bulk_write(batch, ordered=False)
+                    written += len(batch)
+                    batch = []
+            if batch:
+                await self.db.enterprise_revenue_aggregates.bulk_write(batch, ordered=False)
+                written += len(batch)
+            
+            # Months without transactions (and legacy uuid-keyed buckets) go away
+            await self.db.enterprise_revenue_aggregates.delete_many({
+                **match,
+                "rebuilt_at": {"$ne": started},
+                "last_updated": {"$not": {"$gte": started}}
+            })
+            
+            return {"success": True, "buckets": written, "workspace_id": workspace_id}
+            
+        except Exception as e:
+            logger.error(f"Error rebuilding revenue aggregates: {e}")
+            return {"success": False, "error": str(e)}
+    
     def _calculate_savings_vs_fixed_pricing(self, billing_amount: float) -> Dict[str, Any]:
         """Calculate savings vs hypothetical fixed pricing"""
         # Assume fixed enterprise would be $499/month
@@ -767,45 +959,37 @@ class EnterpriseRevenueService:
     def _get_trend_periods(self, period: str) -> List[Dict]:
         """Get periods for trend analysis"""
         now = datetime.utcnow()
+        current_month = _month_start(now)
         periods = []
         
         if period == "month":
             # Last 6 months
             for i in range(6):
-                month_start = (now.replace(day=1) - timedelta(days=i*30)).replace(day=1)
-                month_end = month_start.replace(day=28) + timedelta(days=4)
-                month_end = month_end - timedelta(days=month_end.day)
-                
+                month_start = _add_months(current_month, -i)
                 periods.append({
                     "label": month_start.strftime("%Y-%m"),
                     "start": month_start,
-                    "end": month_end
+                    "end": _add_months(month_start, 1) - timedelta(days=1)
                 })
         
         elif period == "quarter":
             # Last 4 quarters
+            current_quarter = current_month.replace(month=((now.month - 1) // 3) * 3 + 1)
             for i in range(4):
-                quarter_start = now.replace(month=((now.month-1)//3)*3+1, day=1) - timedelta(days=i*90)
-                quarter_start = quarter_start.replace(month=((quarter_start.month-1)//3)*3+1, day=1)
-                quarter_end = quarter_start.replace(month=quarter_start.month+2, day=28) + timedelta(days=4)
-                quarter_end = quarter_end - timedelta(days=quarter_end.day)
-                
+                quarter_start = _add_months(current_quarter, -3 * i)
                 periods.append({
                     "label": f"Q{((quarter_start.month-1)//3)+1} {quarter_start.year}",
                     "start": quarter_start,
-                    "end": quarter_end
+                    "end": _add_months(quarter_start, 3) - timedelta(days=1)
                 })
         
         elif period == "year":
             # Last 3 years
             for i in range(3):
-                year_start = now.replace(month=1, day=1, year=now.year-i)
-                year_end = now.replace(month=12, day=31, year=now.year-i)
-                
                 periods.append({
-                    "label": str(year_start.year),
-                    "start": year_start,
-                    "end": year_end
+                    "label": str(now.year - i),
+                    "start": datetime(now.year - i, 1, 1),
+                    "end": datetime(now.year - i, 12, 31)
                 })
         
         return periods
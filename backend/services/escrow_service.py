@@ -8,17 +8,36 @@ import uuid
 from typing import Dict, List, Optional, Any
 from datetime import datetime
 from typing import Dict, Any, List, Optional
-from core.database import get_database
-from services.workspace_subscription_service import get_workspace_subscription_service
+from pymongo import ASCENDING, IndexModel
+from core.cache import get_cache
+from core.config import settings
+from core.database import get_database, get_motor_database
+from core.fee_ledger import accounting_period, fee_assessment, fee_collection, get_fee_ledger
+from core.indexes import declare_indexes
+from core.timestamps import serialize_timestamps
 import logging
 
 logger = logging.getLogger(__name__)
 
+declare_indexes(
+    "escrow",
+    # A retried checkout with the same key finds its first transaction instead of a second one
+    IndexModel([("idempotency_key", ASCENDING)], unique=True, sparse=True),
+    # Startup re-posts the fee journals of recent transactions
+    IndexModel([("created_at", ASCENDING)]),
+    IndexModel([("fee_collected_at", ASCENDING)], sparse=True),
+)
+
 class EscrowService:
     """Service class for EscrowService operations with automatic fee collection"""
     def __init__(self):
         self.service_name = "escrow"
         self.collection_name = "escrow"
+        # Fee tier lookups await their query, so this must be the Motor handle
+        self.db = get_motor_database()
+        self.ledger = get_fee_ledger()
+        self.fee_tiers = get_cache("workspace_fee_tiers", settings.FEE_TIER_TTL_SECONDS, ("workspaces",),
+                                   max_entries=10000)
         
         # Transaction fee configuration
         self.fee_config = {
@@ -62,22 +81,21 @@ class EscrowService:
             logger.error(f"Database error: {e}")
             return None
     
+    async def get_fee_tier(self, workspace_id: str) -> str:
+        """Fee tier of the workspace's subscription, cached until workspaces change"""
+        return await self.fee_tiers.get(workspace_id, lambda: self._load_fee_tier(workspace_id))
+    
+    async def _load_fee_tier(self, workspace_id: str) -> str:
+        workspace = await self.db.workspaces.find_one({"_id": workspace_id}, {"subscription.bundles": 1})
+        bundles = ((workspace or {}).get("subscription") or {}).get("bundles") or []
+        # Enterprise-level subscriptions have 4+ bundles
+        return "enterprise" if len(bundles) >= 4 else "standard"
+    
     async def calculate_transaction_fees(self, amount: float, workspace_id: str) -> Dict[str, Any]:
         """Calculate transaction fees based on workspace subscription"""
         try:
-            # Get workspace subscription to determine fee rate
-            subscription_service = get_workspace_subscription_service()
-            subscription_result = await subscription_service.get_workspace_subscription(workspace_id, "system")
-            
-            # Determine fee rate
-            is_enterprise = False
-            if subscription_result.get("success"):
-                subscription = subscription_result.get("subscription", {})
-                # Check if workspace has enterprise-level subscription (4+ bundles)
-                bundles = subscription.get("bundles", [])
-                is_enterprise = len(bundles) >= 4
-            
-            fee_rate = self.fee_config["enterprise_rate"] if is_enterprise else self.fee_config["standard_rate"]
+            fee_type = await self.get_fee_tier(workspace_id)
+            fee_rate = self.fee_config["enterprise_rate"] if fee_type == "enterprise" else self.fee_config["standard_rate"]
             
             # Calculate fees
             platform_fee = amount * fee_rate
@@ -95,7 +113,7 @@ class EscrowService:
                 "platform_fee": round(platform_fee, 2),
                 "net_amount": round(net_amount, 2),
                 "fee_rate": fee_rate,
-                "fee_type": "enterprise" if is_enterprise else "standard",
+                "fee_type": fee_type,
                 "currency": self.fee_config["currency"],
                 "calculation_details": {
                     "fee_rate_applied": fee_rate,
@@ -117,15 +135,24 @@ class EscrowService:
             }
     
     async def create_transaction_with_fees(self, transaction_data: Dict[str, Any]) -> Dict[str, Any]:
-        """Create transaction with automatic fee calculation and collection"""
+        """Create transaction with automatic fee calculation and collection.
+        
+        Pass ``idempotency_key`` to make retries safe: a key that already created a
+        transaction returns that transaction instead of charging the fee again.
+        """
         try:
             amount = transaction_data.get("amount", 0)
             workspace_id = transaction_data.get("workspace_id")
-            transaction_type = transaction_data.get("type", "payment")
+            idempotency_key = transaction_data.get("idempotency_key")
             
             if not amount or not workspace_id:
                 return {"success": False, "error": "Amount and workspace_id are required"}
             
+            if idempotency_key:
+                existing = await self._find_by_idempotency_key(idempotency_key)
+                if existing:
+                    return existing
+            
             # Calculate fees
             fee_calculation = await self.calculate_transaction_fees(amount, workspace_id)
             
@@ -135,24 +162,25 @@ class EscrowService:
             # Create enhanced transaction record
             enhanced_transaction = {
                 **transaction_data,
-                "id": str(uuid.uuid4()),
                 "original_amount": fee_calculation["original_amount"],
                 "platform_fee": fee_calculation["platform_fee"],
                 "net_amount": fee_calculation["net_amount"],
                 "fee_details": fee_calculation,
-                "status": "pending",
-                "created_at": datetime.utcnow(),
-                "updated_at": datetime.utcnow(),
                 "fee_collected": False,
-                "processing_status": "created"
+                "processing_status": "created",
+                "accounting_period": accounting_period()
             }
             
             # Store transaction with fees
             result = await self.create_escrow(enhanced_transaction)
             
             if result.get("success"):
-                # Create fee collection record
-                await self._create_fee_record(enhanced_transaction)
+                # Append the fee to the ledger, keyed by the transaction so it posts once
+                await self.ledger.post(
+                    f"{result['id']}:assessed", workspace_id, "assessed",
+                    fee_assessment(fee_calculation["original_amount"], fee_calculation["platform_fee"]),
+                    transaction_id=result["id"], currency=fee_calculation["currency"]
+                )
                 
                 return {
                     "success": True,
@@ -160,6 +188,9 @@ class EscrowService:
                     "fee_breakdown": fee_calculation,
                     "message": f"Transaction created with {fee_calculation['fee_rate']*100:.1f}% platform fee"
                 }
+            elif idempotency_key:
+                # A concurrent retry with the same key inserted first
+                return await self._find_by_idempotency_key(idempotency_key) or result
             else:
                 return result
                 
@@ -167,30 +198,73 @@ class EscrowService:
             logger.error(f"Error creating transaction with fees: {e}")
             return {"success": False, "error": str(e)}
     
-    async def _create_fee_record(self, transaction_data: Dict[str, Any]):
-        """Create fee collection record for accounting"""
+    async def _find_by_idempotency_key(self, idempotency_key: str) -> Optional[Dict[str, Any]]:
+        """The transaction an earlier call with this key created, shaped like a new one"""
+        collection = await self._get_collection_async()
+        if collection is None:
+            return None
+        doc = await collection.find_one({"idempotency_key": idempotency_key})
+        if not doc:
+            return None
+        return {
+            "success": True,
+            "transaction": self._sanitize_doc(doc),
+            "fee_breakdown": doc.get("fee_details"),
+            "duplicate": True,
+            "message": "Transaction already created for this idempotency key"
+        }
+    
+    async def get_fee_report(self, workspace_id: str, period: str = None, months: int = 12) -> Dict[str, Any]:
+        """Fee totals for one accounting period (YYYY-MM), or the latest ``months`` periods"""
         try:
-            fee_record = {
-                "id": str(uuid.uuid4()),
-                "transaction_id": transaction_data["id"],
-                "workspace_id": transaction_data["workspace_id"],
-                "fee_amount": transaction_data["platform_fee"],
-                "fee_rate": transaction_data["fee_details"]["fee_rate"],
-                "fee_type": transaction_data["fee_details"]["fee_type"],
-                "original_amount": transaction_data["original_amount"],
-                "currency": transaction_data["fee_details"]["currency"],
-                "created_at": datetime.utcnow(),
-                "status": "pending_collection",
-                "collection_method": "automatic",
-                "accounting_period": datetime.utcnow().strftime("%Y-%m")
-            }
-            
-            db = get_database()
-            fee_collection = db.transaction_fees
-            await fee_collection.insert_one(fee_record)
-            
+            if period:
+                periods = [await self.ledger.get_period(workspace_id, period)]
+            else:
+                periods = await self.ledger.get_periods(workspace_id, months)
+            return {"success": True, "workspace_id": workspace_id, "periods": periods}
         except Exception as e:
-            logger.error(f"Error creating fee record: {e}")
+            logger.error(f"Error getting fee report: {e}")
+            return {"success": False, "error": str(e)}
+    
+    async def repost_fee_journals(self, since: Optional[datetime] = None) -> Dict[str, Any]:
+        """Post the fee journals of transactions created or collected since ``since`` again.
+        
+        Recovers journals that were still queued when a process died. Journals already in
+        the ledger land as duplicates, so this is safe to repeat.
+        """
+        try:
+            collection = await self._get_collection_async()
+            if collection is None:
+                return {"success": False, "error": "Database not available"}
+            
+            query = {"fee_details": {"$exists": True}}
+            if since:
+                query["$or"] = [{"created_at": {"$gte": since}}, {"fee_collected_at": {"$gte": since}}]
+            projection = {"id": 1, "workspace_id": 1, "original_amount": 1, "platform_fee": 1,
+                          "fee_details.currency": 1, "fee_collected": 1, "created_at": 1, "fee_collected_at": 1}
+            
+            journals = 0
+            async for doc in collection.find(query, projection):
+                currency = (doc.get("fee_details") or {}).get("currency", self.fee_config["currency"])
+                await self.ledger.post(
+                    f"{doc['id']}:assessed", doc["workspace_id"], "assessed",
+                    fee_assessment(doc["original_amount"], doc["platform_fee"]),
+                    transaction_id=doc["id"], currency=currency, occurred_at=doc.get("created_at")
+                )
+                journals += 1
+                if doc.get("fee_collected"):
+                    await self.ledger.post(
+                        f"{doc['id']}:collected", doc["workspace_id"], "collected",
+                        fee_collection(doc["platform_fee"]),
+                        transaction_id=doc["id"], currency=currency, occurred_at=doc.get("fee_collected_at")
+                    )
+                    journals += 1
+            await self.ledger.flush()
+            
+            return {"success": True, "journals": journals}
+        except Exception as e:
+            logger.error(f"Error reposting fee journals: {e}")
+            return {"success": False, "error": str(e)}
     
     async def process_fee_collection(self, transaction_id: str) -> Dict[str, Any]:
         """Process fee collection for a transaction"""
@@ -217,17 +291,12 @@ class EscrowService:
             })
             
             if update_result.get("success"):
-                # Update fee record
-                db = get_database()
-                fee_collection = db.transaction_fees
-                await fee_collection.update_one(
-                    {"transaction_id": transaction_id},
-                    {
-                        "$set": {
-                            "status": "collected",
-                            "collected_at": datetime.utcnow()
-                        }
-                    }
+                # Collection is a new journal; the assessment lines stay as they were
+                await self.ledger.post(
+                    f"{transaction_id}:collected", transaction["workspace_id"], "collected",
+                    fee_collection(transaction.get("platform_fee", 0)),
+                    transaction_id=transaction_id,
+                    currency=(transaction.get("fee_details") or {}).get("currency", self.fee_config["currency"])
                 )
                 
                 return {
@@ -242,6 +311,7 @@ class EscrowService:
         except Exception as e:
             logger.error(f"Error processing fee collection: {e}")
             return {"success": False, "error": str(e)}
+    
             logger.error(f"Database error: {e}")
             return None
     
@@ -269,8 +339,8 @@ class EscrowService:
             prepared = data.copy() if isinstance(data, dict) else {}
             prepared.update({
                 "id": str(uuid.uuid4()),
-                "created_at": datetime.utcnow().isoformat(),
-                "updated_at": datetime.utcnow().isoformat(),
+                "created_at": datetime.utcnow(),
+                "updated_at": datetime.utcnow(),
                 "status": "active",
                 "service_type": self.service_name
             })
@@ -286,7 +356,7 @@ class EscrowService:
                 return {}
             if isinstance(doc, dict):
                 cleaned = {k: v for k, v in doc.items() if k != '_id'}
-                return cleaned
+                return serialize_timestamps(cleaned)
             return doc
         except Exception as e:
             logger.error(f"Sanitization error: {e}")
@@ -395,7 +465,7 @@ class EscrowService:
                 return {"success": False, "error": "Invalid update data"}
             
             update_data = update_data.copy()
-            update_data["updated_at"] = datetime.utcnow().isoformat()
+            update_data["updated_at"] = datetime.utcnow()
             
             # Update document - REAL DATA OPERATION
             result = await collection.update_one(
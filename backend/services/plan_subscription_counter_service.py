@@ -0,0 +1,221 @@
+"""
+Plan Subscription Counter Service
+Per-plan subscription and revenue counters maintained incrementally from subscription changes
+"""
+
+import logging
+from datetime import datetime
+from typing import Any, Dict, Iterable, List, Optional
+
+from pymongo import DESCENDING, IndexModel, UpdateOne
+
+from core.database import get_database_async
+from core.indexes import declare_indexes
+from core.timestamps import date_expr
+
+logger = logging.getLogger(__name__)
+
+COUNTERS_COLLECTION = "plan_subscription_counters"
+MONTHLY_COLLECTION = "plan_subscription_monthly"
+SUBSCRIPTIONS_COLLECTION = "subscriptions"
+
+# Counter document for whole subscriptions, as opposed to per-plan memberships
+ALL_PLANS = "__all__"
+
+# Subscriptions in these states no longer count towards a plan
+ENDED_STATUSES = ("canceled", "cancel_at_period_end", "incomplete_expired")
+
+declare_indexes(
+    MONTHLY_COLLECTION,
+    IndexModel([("year", DESCENDING), ("month", DESCENDING)]),
+)
+
+
+class PlanSubscriptionCounterService:
+    """
+    Counters kept next to the subscriptions written by EnhancedSubscriptionService.
+
+    ``plan_subscription_counters`` holds one document per plan (plus ``__all__``) with the
+    number of live subscriptions and their revenue; ``plan_subscription_monthly`` holds new
+    subscriptions and revenue per plan and creation month. Every subscription change is one
+    unordered ``bulk_write`` of ``$inc`` upserts, so admin reads never scan subscriptions.
+    A multi-plan subscription adds its full amount to each plan it includes, as the admin
+    analytics always did.
+    """
+
+    def __init__(self, db=None):
+        self.service_name = "plan_subscription_counters"
+        self.collection_name = COUNTERS_COLLECTION
+        self.db = db
+
+    async def _get_db(self):
+        """Get database connection"""
+        if self.db is not None:
+            return self.db
+        try:
+            return await get_database_async()
+        except Exception as e:
+            logger.error(f"Database connection error: {e}")
+            return None
+
+    @staticmethod
+    def _counter_update(plan: str, subscriptions: int, revenue: float, now: datetime) -> UpdateOne:
+        return UpdateOne(
+            {"_id": plan},
+            {"$inc": {"active_subscriptions": subscriptions, "active_revenue": revenue},
+             "$set": {"updated_at": now}},
+            upsert=True,
+        )
+
+    async def _apply(self, counters: List[UpdateOne], monthly: Optional[List[UpdateOne]] = None) -> None:
+        # The subscription write has already happened, so a failure here is logged, not raised;
+        # rebuild() repairs any drift
+        try:
+            db = await self._get_db()
+            if db is None:
+                logger.error("Plan counters not updated: database unavailable")
+                return
+            if counters:
+                await db[COUNTERS_COLLECTION].bulk_write(counters, ordered=False)
+            if monthly:
+                await db[MONTHLY_COLLECTION].bulk_write(monthly, ordered=False)
+        except Exception as e:
+            logger.error(f"Plan counter update error: {e}")
+
+    async def record_created(self, bundles: Iterable[str], amount: float,
+                             created_at: Optional[datetime] = None) -> None:
+        """Count a new subscription for each of its plans"""
+        now = datetime.utcnow()
+        created_at = created_at or now
+        plans = sorted(set(bundles))
+        counters = [self._counter_update(plan, 1, amount, now) for plan in [ALL_PLANS, *plans]]
+        monthly = [
+            UpdateOne(
+                {"_id": f"{plan}|{created_at.year:04d}-{created_at.month:02d}"},
+                {"$inc": {"subscription_count": 1, "monthly_revenue": amount},
+                 "$setOnInsert": {"plan": plan, "year": created_at.year, "month": created_at.month}},
+                upsert=True,
+            )
+            for plan in plans
+        ]
+        await self._apply(counters, monthly)
+
+    async def record_modified(self, old_bundles: Iterable[str], old_amount: float,
+                              new_bundles: Iterable[str], new_amount: float) -> None:
+        """Move a live subscription between plans and adjust revenue for the plans it keeps"""
+        now = datetime.utcnow()
+        old_plans, new_plans = set(old_bundles), set(new_bundles)
+        counters = [self._counter_update(ALL_PLANS, 0, new_amount - old_amount, now)]
+        counters += [self._counter_update(plan, -1, -old_amount, now) for plan in sorted(old_plans - new_plans)]
+        counters += [self._counter_update(plan, 1, new_amount, now) for plan in sorted(new_plans - old_plans)]
+        if new_amount != old_amount:
+            counters += [self._counter_update(plan, 0, new_amount - old_amount, now)
+                         for plan in sorted(old_plans & new_plans)]
+        await self._apply(counters)
+
+    async def record_canceled(self, bundles: Iterable[str], amount: float) -> None:
+        """Stop counting a subscription"""
+        now = datetime.utcnow()
+        counters = [self._counter_update(plan, -1, -amount, now) for plan in [ALL_PLANS, *sorted(set(bundles))]]
+        await self._apply(counters)
+
+    async def get_counters(self) -> Dict[str, Dict[str, Any]]:
+        """Live subscriptions and revenue per plan (``__all__`` for whole subscriptions).
+
+        Before the counters have been built this computes the same numbers with one grouped
+        aggregation over subscriptions.
+        """
+        db = await self._get_db()
+        if db is None:
+            return {}
+        rows = await db[COUNTERS_COLLECTION].find({}).to_list(length=None)
+        if not rows:
+            return await self.compute_counters(db)
+        return {row["_id"]: {"active_subscriptions": row.get("active_subscriptions", 0),
+                             "active_revenue": row.get("active_revenue", 0)} for row in rows}
+
+    async def get_monthly(self, limit: int = 50) -> List[Dict[str, Any]]:
+        """Newest per-plan monthly buckets, shaped like the old ``$group`` output"""
+        db = await self._get_db()
+        if db is None:
+            return []
+        rows = await db[MONTHLY_COLLECTION].find({}).sort([("year", -1), ("month", -1)]) \
+            .limit(limit).to_list(length=limit)
+        return [
+            {"_id": {"plan": row["plan"], "year": row["year"], "month": row["month"]},
+             "monthly_revenue": row.get("monthly_revenue", 0),
+             "subscription_count": row.get("subscription_count", 0)}
+            for row in rows
+        ]
+
+    async def compute_counters(self, db=None) -> Dict[str, Dict[str, Any]]:
+        """Counters recomputed from the subscriptions collection"""
+        db = db or await self._get_db()
+        live = {"status": {"$nin": list(ENDED_STATUSES)}}
+        result = await db[SUBSCRIPTIONS_COLLECTION].aggregate([
+            {"$match": live},
+            {"$facet": {
+                "plans": [
+                    {"$unwind": "$bundles"},
+                    {"$group": {"_id": "$bundles", "count": {"$sum": 1}, "revenue": {"$sum": "$final_cost"}}}
+                ],
+                "all": [{"$group": {"_id": None, "count": {"$sum": 1}, "revenue": {"$sum": "$final_cost"}}}]
+            }}
+        ]).to_list(length=1)
+        facet = result[0] if result else {"plans": [], "all": []}
+        counters = {row["_id"]: {"active_subscriptions": row["count"], "active_revenue": row["revenue"] or 0}
+                    for row in facet["plans"]}
+        total = facet["all"][0] if facet["all"] else {"count": 0, "revenue": 0}
+        counters[ALL_PLANS] = {"active_subscriptions": total["count"], "active_revenue": total["revenue"] or 0}
+        return counters
+
+    async def rebuild(self) -> Dict[str, Any]:
+        """Recompute both counter collections from subscriptions (backfill or repair)"""
+        try:
+            db = await self._get_db()
+            if db is None:
+                return {"success": False, "error": "Database unavailable"}
+            now = datetime.utcnow()
+
+            counters = await self.compute_counters(db)
+            await db[COUNTERS_COLLECTION].delete_many({"_id": {"$nin": list(counters)}})
+            if counters:
+                await db[COUNTERS_COLLECTION].bulk_write([
+                    UpdateOne({"_id": plan}, {"$set": {**values, "updated_at": now}}, upsert=True)
+                    for plan, values in counters.items()
+                ], ordered=False)
+
+            created = date_expr("created_at")
+            months = await db[SUBSCRIPTIONS_COLLECTION].aggregate([
+                {"$unwind": "$bundles"},
+                {"$group": {
+                    "_id": {"plan": "$bundles", "year": {"$year": created}, "month": {"$month": created}},
+                    "subscription_count": {"$sum": 1},
+                    "monthly_revenue": {"$sum": "$final_cost"}
+                }}
+            ]).to_list(length=None)
+            await db[MONTHLY_COLLECTION].delete_many({})
+            if months:
+                await db[MONTHLY_COLLECTION].insert_many([
+                    {"_id": f"{row['_id']['plan']}|{row['_id']['year']:04d}-{row['_id']['month']:02d}",
+                     **row["_id"],
+                     "subscription_count": row["subscription_count"],
+                     "monthly_revenue": row["monthly_revenue"] or 0}
+                    for row in months if row["_id"]["year"] is not None
+                ])
+
+            return {"success": True, "plans": len(counters) - 1, "monthly_buckets": len(months)}
+        except Exception as e:
+            logger.error(f"Plan counter rebuild error: {e}")
+            return {"success": False, "error": str(e)}
+
+
+# Service instance
+_service_instance = None
+
+def get_plan_subscription_counter_service():
+    """Get service instance"""
+    global _service_instance
+    if _service_instance is None:
+        _service_instance = PlanSubscriptionCounterService()
+    return _service_instance
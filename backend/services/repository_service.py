@@ -0,0 +1,220 @@
+"""
+Repository Service
+Base class for document services backed by the shared async repository engine
+"""
+
+from datetime import datetime
+from typing import Any, Dict, Iterable, List, Optional
+
+from pymongo import ASCENDING, IndexModel
+import logging
+
+from core.indexes import declare_indexes
+from core.repository import AsyncRepository, get_repository
+from core.timestamps import serialize_timestamps
+
+logger = logging.getLogger(__name__)
+
+# Indexes every document service collection gets
+DEFAULT_INDEXES = [
+    IndexModel([("id", ASCENDING)], name="id_unique", unique=True),
+    IndexModel([("user_id", ASCENDING), ("_id", ASCENDING)], name="user_id__id"),
+    IndexModel([("user_id", ASCENDING), ("status", ASCENDING)], name="user_id_status"),
+]
+
+
+class RepositoryService:
+    """
+    CRUD, paging, stats and health checks for one collection.
+
+    Subclasses declare ``service_name`` and ``collection_name`` (plus any extra ``indexes``)
+    and get the entity-named methods the API layer calls, e.g. for ``service_name = "crm"``:
+    ``create_crm``, ``get_crm``, ``list_crms``, ``update_crm`` and ``delete_crm``.
+    """
+
+    service_name: str = ""
+    collection_name: str = ""
+    indexes: List[IndexModel] = []
+
+    def __init_subclass__(cls, **kwargs: Any) -> None:
+        super().__init_subclass__(**kwargs)
+        if cls.collection_name:
+            declare_indexes(cls.collection_name, *DEFAULT_INDEXES, *cls.indexes)
+        entity = cls.service_name
+        if not entity:
+            return
+        aliases = {
+            f"create_{entity}": "create_item",
+            f"get_{entity}": "get_item",
+            f"list_{entity}s": "list_items",
+            f"update_{entity}": "update_item",
+            f"delete_{entity}": "delete_item",
+        }
+        for alias, method in aliases.items():
+            if alias not in cls.__dict__:
+                setattr(cls, alias, getattr(cls, method))
+
+    def __init__(self):
+        self.repository: AsyncRepository = get_repository(self.collection_name)
+
+    async def _get_collection_async(self):
+        """Get collection for async database operations"""
+        try:
+            collection = await self.repository.collection()
+            if collection is None:
+                logger.error("Database not available")
+            return collection
+        except Exception as e:
+            logger.error(f"Error getting async collection: {e}")
+            return None
+
+    @staticmethod
+    def _sanitize_doc(doc: Optional[dict]) -> dict:
+        """Drop ``_id`` and render timestamps as ISO strings for JSON responses"""
+        if not doc:
+            return {}
+        return serialize_timestamps({k: v for k, v in doc.items() if k != "_id"})
+
+    async def create_item(self, data: dict) -> dict:
+        """CREATE operation"""
+        try:
+            prepared = await self.repository.insert(
+                data if isinstance(data, dict) else {},
+                status="active",
+                service_type=self.service_name,
+            )
+            if prepared is None:
+                return {"success": False, "error": "Database unavailable"}
+            return {
+                "success": True,
+                "message": f"{self.service_name} created successfully",
+                "data": self._sanitize_doc(prepared),
+                "id": prepared["id"]
+            }
+        except Exception as e:
+            logger.error(f"CREATE error: {e}")
+            return {"success": False, "error": str(e)}
+
+    async def get_item(self, item_id: str, fields: Optional[Iterable[str]] = None) -> dict:
+        """READ operation, optionally limited to ``fields``"""
+        try:
+            if not item_id:
+                return {"success": False, "error": "ID required"}
+            if await self._get_collection_async() is None:
+                return {"success": False, "error": "Database unavailable"}
+
+            doc = await self.repository.get(item_id, fields)
+            if doc:
+                return {"success": True, "data": self._sanitize_doc(doc)}
+            return {"success": False, "error": "Not found"}
+        except Exception as e:
+            logger.error(f"READ error: {e}")
+            return {"success": False, "error": str(e)}
+
+    async def list_items(self, user_id: str = None, limit: int = 50, offset: int = 0,
+                         cursor: Optional[str] = None, fields: Optional[Iterable[str]] = None) -> dict:
+        """LIST operation with offset or cursor paging"""
+        try:
+            query: Dict[str, Any] = {}
+            if user_id:
+                query["user_id"] = user_id
+
+            page = await self.repository.page(query, limit=limit, offset=offset, cursor=cursor, fields=fields)
+            if page is None:
+                return {"success": False, "error": "Database unavailable"}
+
+            result = {
+                "success": True,
+                "data": [self._sanitize_doc(doc) for doc in page["items"]],
+                "total": page["total"],
+                "limit": limit,
+                "offset": offset,
+                "next_cursor": page["next_cursor"]
+            }
+            if cursor is not None:
+                result.pop("total")
+                result.pop("offset")
+            return result
+        except Exception as e:
+            logger.error(f"LIST error: {e}")
+            return {"success": False, "error": str(e)}
+
+    async def update_item(self, item_id: str, update_data: dict) -> dict:
+        """UPDATE operation"""
+        try:
+            if not item_id:
+                return {"success": False, "error": "ID required"}
+            if not isinstance(update_data, dict):
+                return {"success": False, "error": "Invalid update data"}
+            if await self._get_collection_async() is None:
+                return {"success": False, "error": "Database unavailable"}
+
+            updated_doc = await self.repository.update(item_id, update_data)
+            if updated_doc is None:
+                return {"success": False, "error": "Not found"}
+            return {
+                "success": True,
+                "message": f"{self.service_name} updated successfully",
+                "data": self._sanitize_doc(updated_doc)
+            }
+        except Exception as e:
+            logger.error(f"UPDATE error: {e}")
+            return {"success": False, "error": str(e)}
+
+    async def delete_item(self, item_id: str) -> dict:
+        """DELETE operation"""
+        try:
+            if not item_id:
+                return {"success": False, "error": "ID required"}
+            if await self._get_collection_async() is None:
+                return {"success": False, "error": "Database unavailable"}
+
+            deleted = await self.repository.delete(item_id)
+            if deleted:
+                return {
+                    "success": True,
+                    "message": f"{self.service_name} deleted successfully",
+                    "deleted_count": deleted
+                }
+            return {"success": False, "error": "Not found"}
+        except Exception as e:
+            logger.error(f"DELETE error: {e}")
+            return {"success": False, "error": str(e)}
+
+    async def get_stats(self, user_id: str = None) -> dict:
+        """STATS operation, one pass over the matching documents"""
+        try:
+            query: Dict[str, Any] = {}
+            if user_id:
+                query["user_id"] = user_id
+
+            stats = await self.repository.stats(query)
+            if stats is None:
+                return {"success": False, "error": "Database unavailable"}
+            return {
+                "success": True,
+                "data": {
+                    "total": stats["total"],
+                    "active": stats["by_status"].get("active", 0),
+                    "by_status": stats["by_status"],
+                    "service": self.service_name
+                }
+            }
+        except Exception as e:
+            logger.error(f"STATS error: {e}")
+            return {"success": False, "error": str(e)}
+
+    async def health_check(self) -> dict:
+        """Health check with proper async database connection"""
+        try:
+            if not await self.repository.ping():
+                return {"success": False, "healthy": False, "error": "Database unavailable"}
+            return {
+                "success": True,
+                "healthy": True,
+                "service": self.service_name,
+                "timestamp": datetime.utcnow().isoformat()
+            }
+        except Exception as e:
+            logger.error(f"Health check error in {self.service_name}: {e}")
+            return {"success": False, "healthy": False, "error": str(e)}
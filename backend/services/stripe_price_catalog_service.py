@@ -0,0 +1,200 @@
+"""
+Stripe Price Catalog Service
+Reuses one Stripe Price per (bundle set, interval, discount tier) instead of creating one per checkout
+"""
+
+import asyncio
+import logging
+from datetime import datetime
+from typing import Any, Dict, Iterable, List, Mapping, Optional
+
+from core.database import get_database_async
+from core.plan_catalog import get_plan_catalog, get_plan_catalog_manager
+from core.stripe_gateway import get_stripe_gateway
+
+logger = logging.getLogger(__name__)
+
+
+def get_discount_rate(bundle_count: int) -> float:
+    """Multi-bundle discount tier"""
+    if bundle_count >= 4:
+        return 0.40  # 40% discount
+    elif bundle_count == 3:
+        return 0.30  # 30% discount
+    elif bundle_count == 2:
+        return 0.20  # 20% discount
+    return 0
+
+
+def normalize_bundles(bundles: Iterable[str]) -> List[str]:
+    """A checkout's bundles, each once and in a stable order; a bundle listed twice is bought once"""
+    return sorted(set(bundles))
+
+
+def calculate_checkout_pricing(bundles: List[str], payment_interval: str,
+                               bundle_prices: Optional[Mapping[str, Mapping[str, int]]] = None) -> Dict[str, Any]:
+    """Total, discount tier and discounted amount (in cents) for a checkout"""
+    bundle_prices = bundle_prices or get_plan_catalog().bundle_prices
+    bundles = normalize_bundles(bundles)
+    total_amount = sum(bundle_prices[bundle_id][payment_interval]
+                       for bundle_id in bundles if bundle_id in bundle_prices)
+    bundle_count = len(bundles)
+    discount_rate = get_discount_rate(bundle_count)
+    return {
+        'total_amount': total_amount,
+        'bundle_count': bundle_count,
+        'discount_rate': discount_rate,
+        'discounted_amount': int(total_amount * (1 - discount_rate)),
+    }
+
+
+def catalog_key(bundles: Iterable[str], payment_interval: str, discount_rate: float) -> str:
+    """Cache key: sorted bundle set, billing interval and discount tier"""
+    return f"{','.join(normalize_bundles(bundles))}|{payment_interval}|{int(round(discount_rate * 100))}"
+
+
+class StripePriceCatalogService:
+    """
+    Price catalog persisted in the ``stripe_price_catalog`` collection and held in memory.
+    Entries remember the unit amount they were created for, so a price change never reuses
+    a stale Stripe Price. Plan prices come from the shared plan catalog.
+    """
+
+    def __init__(self):
+        self.service_name = "stripe_price_catalog"
+        self.collection_name = "stripe_price_catalog"
+        self.gateway = get_stripe_gateway()
+        self.plans = get_plan_catalog_manager()
+        self._entries: Dict[str, Dict[str, Any]] = {}
+        self._locks: Dict[str, asyncio.Lock] = {}
+
+    async def _get_collection_async(self):
+        """Get collection for async database operations"""
+        try:
+            db = await get_database_async()
+            if db is None:
+                logger.error("Database not available")
+                return None
+            return db[self.collection_name]
+        except Exception as e:
+            logger.error(f"Error getting async collection: {e}")
+            return None
+
+    def calculate_pricing(self, bundles: List[str], payment_interval: str) -> Dict[str, Any]:
+        return calculate_checkout_pricing(bundles, payment_interval, self.plans.catalog.bundle_prices)
+
+    async def warm(self) -> int:
+        """Load every active catalog entry into memory"""
+        try:
+            db = await get_database_async()
+            if db is None:
+                return 0
+
+            entries = await db[self.collection_name].find({"active": True}).to_list(length=None)
+            for entry in entries:
+                self._entries[entry["_id"]] = entry
+            return len(entries)
+        except Exception as e:
+            logger.error(f"Price catalog warm-up error: {e}")
+            return 0
+
+    async def get_price_id(self, bundles: List[str], payment_interval: str) -> Dict[str, Any]:
+        """Return the cached Stripe Price for this checkout, creating it once if missing"""
+        bundles = normalize_bundles(bundles)
+        pricing = self.calculate_pricing(bundles, payment_interval)
+        key = catalog_key(bundles, payment_interval, pricing["discount_rate"])
+
+        entry = self._entries.get(key)
+        if entry and entry["unit_amount"] == pricing["discounted_amount"]:
+            return {**pricing, "price_id": entry["stripe_price_id"], "cached": True}
+
+        lock = self._locks.setdefault(key, asyncio.Lock())
+        async with lock:
+            entry = self._entries.get(key)
+            if not entry or entry["unit_amount"] != pricing["discounted_amount"]:
+                entry = await self._load_or_create(key, bundles, payment_interval, pricing)
+            return {**pricing, "price_id": entry["stripe_price_id"], "cached": False}
+
+    async def _load_or_create(self, key: str, bundles: List[str], payment_interval: str,
+                              pricing: Dict[str, Any]) -> Dict[str, Any]:
+        collection = await self._get_collection_async()
+        if collection is not None:
+            entry = await collection.find_one({"_id": key, "active": True})
+            if entry and entry["unit_amount"] == pricing["discounted_amount"]:
+                self._entries[key] = entry
+                return entry
+
+        bundle_set = normalize_bundles(bundles)
+        amount = pricing["discounted_amount"]
+        price = await self.gateway.request(
+            "Price.create",
+            currency='usd',
+            unit_amount=amount,
+            recurring={
+                'interval': 'month' if payment_interval == 'monthly' else 'year'
+            },
+            product_data={
+                'name': f"MEWAYZ V2 - {', '.join([bundle.title() for bundle in bundle_set])} Bundle(s)"
+            },
+            lookup_key=f"{key}|{amount}",
+            transfer_lookup_key=True,
+            metadata={
+                'bundles': ','.join(bundle_set),
+                'original_amount': str(pricing["total_amount"]),
+                'discount_rate': str(pricing["discount_rate"]),
+                'bundle_count': str(pricing["bundle_count"])
+            },
+            # Concurrent workers creating the same catalog entry get the same Price back
+            idempotency_key=f"price-catalog-{key}-{amount}",
+        )
+
+        entry = {
+            "_id": key,
+            "bundles": bundle_set,
+            "interval": payment_interval,
+            "discount_rate": pricing["discount_rate"],
+            "unit_amount": amount,
+            "stripe_price_id": price.id,
+            "stripe_product_id": getattr(price, "product", None),
+            "active": True,
+            "created_at": datetime.utcnow(),
+        }
+        if collection is not None:
+            await collection.replace_one({"_id": key}, entry, upsert=True)
+        self._entries[key] = entry
+        logger.info(f"Created catalog price {price.id} for {key}")
+        return entry
+
+    async def invalidate(self, bundle: Optional[str] = None, pricing: Optional[Dict[str, Any]] = None) -> int:
+        """Drop catalog entries containing ``bundle`` (all entries when omitted)"""
+        if bundle and pricing:
+            self.plans.apply_pricing(bundle, pricing)
+
+        stale = [key for key, entry in self._entries.items() if bundle is None or bundle in entry["bundles"]]
+        for key in stale:
+            self._entries.pop(key, None)
+
+        collection = await self._get_collection_async()
+        if collection is not None:
+            query = {"active": True}
+            if bundle:
+                query["bundles"] = bundle
+            await collection.update_many(query, {"$set": {"active": False, "invalidated_at": datetime.utcnow()}})
+        return len(stale)
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {
+            "entries": len(self._entries),
+            "service": self.service_name
+        }
+
+
+# Service instance
+_service_instance = None
+
+def get_stripe_price_catalog_service():
+    """Get service instance"""
+    global _service_instance
+    if _service_instance is None:
+        _service_instance = StripePriceCatalogService()
+    return _service_instance
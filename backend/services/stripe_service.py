@@ -8,6 +8,7 @@ from typing import Dict, Any, Optional
 from fastapi import HTTPException
 from models.ecommerce import Order
 from core.config import settings
+from core.stripe_gateway import get_stripe_gateway
 
 # Initialize Stripe
 stripe.api_key = os.environ.get("STRIPE_SECRET_KEY")
@@ -15,6 +16,7 @@ stripe.api_key = os.environ.get("STRIPE_SECRET_KEY")
 class StripePaymentService:
     def __init__(self):
         self.stripe = stripe
+        self.gateway = get_stripe_gateway()
         self.webhook_secret = os.environ.get("STRIPE_WEBHOOK_SECRET")
     
     async def create_payment_intent(
@@ -41,7 +43,7 @@ class StripePaymentService:
             if metadata:
                 intent_data["metadata"] = metadata
             
-            intent = self.stripe.PaymentIntent.create(**intent_data)
+            intent = await self.gateway.request("PaymentIntent.create", **intent_data)
             
             return {
                 "client_secret": intent.client_secret,
@@ -69,7 +71,7 @@ class StripePaymentService:
             if metadata:
                 customer_data["metadata"] = metadata
             
-            customer = self.stripe.Customer.create(**customer_data)
+            customer = await self.gateway.request("Customer.create", **customer_data)
             return customer.id
             
         except stripe.error.StripeError as e:
@@ -78,7 +80,7 @@ class StripePaymentService:
     async def confirm_payment(self, payment_intent_id: str) -> Dict[str, Any]:
         """Confirm a payment intent"""
         try:
-            intent = self.stripe.PaymentIntent.retrieve(payment_intent_id)
+            intent = await self.gateway.request("PaymentIntent.retrieve", payment_intent_id)
             
             return {
                 "id": intent.id,
@@ -94,7 +96,8 @@ class StripePaymentService:
     async def create_connect_account(self, vendor_email: str) -> str:
         """Create Stripe Connect account for vendor"""
         try:
-            account = self.stripe.Account.create(
+            account = await self.gateway.request(
+                "Account.create",
                 type="express",
                 email=vendor_email,
                 capabilities={
@@ -110,7 +113,8 @@ class StripePaymentService:
     async def create_account_link(self, account_id: str, refresh_url: str, return_url: str) -> str:
         """Create account link for vendor onboarding"""
         try:
-            account_link = self.stripe.AccountLink.create(
+            account_link = await self.gateway.request(
+                "AccountLink.create",
                 account=account_id,
                 refresh_url=refresh_url,
                 return_url=return_url,
@@ -141,7 +145,7 @@ class StripePaymentService:
             if metadata:
                 transfer_data["metadata"] = metadata
             
-            transfer = self.stripe.Transfer.create(**transfer_data)
+            transfer = await self.gateway.request("Transfer.create", **transfer_data)
             
             return {
                 "id": transfer.id,
@@ -175,6 +179,7 @@ payment_service = StripePaymentService()
 class SubscriptionService:
     def __init__(self):
         self.stripe = stripe
+        self.gateway = get_stripe_gateway()
         
         # MEWAYZ Pricing Plans (from your pricing strategy)
         self.plans = {
@@ -257,7 +262,8 @@ class SubscriptionService:
             pricing = self.calculate_bundle_price(bundles)
             
             # Create subscription in Stripe
-            subscription = self.stripe.Subscription.create(
+            subscription = await self.gateway.request(
+                "Subscription.create",
                 customer=customer_id,
                 items=[{
                     "price_data": {
@@ -0,0 +1,375 @@
+"""
+Stripe Webhook Inbox Service
+Durable, idempotent webhook ingestion: persist on receipt, process from a queue
+"""
+
+import asyncio
+import logging
+import os
+import socket
+import uuid
+import zlib
+from datetime import datetime, timedelta
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+
+from pymongo import ASCENDING, ReturnDocument
+from pymongo.errors import DuplicateKeyError
+
+from core.database import get_database_async
+
+logger = logging.getLogger(__name__)
+
+EventHandler = Callable[[Dict[str, Any]], Awaitable[None]]
+
+
+def event_customer(event: Dict[str, Any]) -> str:
+    """Ordering key for an event: the Stripe customer it concerns"""
+    data = (event.get("data") or {}).get("object") or {}
+    customer = data.get("customer")
+    if isinstance(customer, dict):
+        customer = customer.get("id")
+    if not customer and data.get("object") == "customer":
+        customer = data.get("id")
+    return customer or "_none"
+
+
+class StripeWebhookInboxService:
+    """
+    Webhook inbox backed by three collections:
+
+    - ``stripe_webhook_events``: every verified event, unique on the Stripe event id
+    - ``stripe_webhook_dead_letters``: events that exhausted their retries
+    - ``stripe_webhook_leases``: single-processor lease so only one worker drains the inbox
+
+    Events are routed to ``partitions`` workers by customer. At most one event per customer is
+    in flight, so events for one customer are handled in order while different customers proceed
+    in parallel. A failed event is retried with exponential backoff and later events for the same
+    customer wait behind it.
+
+    A claimed event holds a processing lease of ``processing_lease_seconds``. A worker that
+    takes over the inbox returns an event to the queue only once its lease has expired, so
+    events the previous leader is still handling are not dispatched twice.
+    """
+
+    def __init__(self, partitions: int = 4, max_attempts: int = 8, base_delay: float = 2.0,
+                 max_delay: float = 900.0, poll_interval: float = 0.5, lease_seconds: int = 30,
+                 batch_size: int = 100, processing_lease_seconds: int = 300):
+        self.service_name = "stripe_webhook_inbox"
+        self.collection_name = "stripe_webhook_events"
+        self.dead_letter_collection_name = "stripe_webhook_dead_letters"
+        self.lease_collection_name = "stripe_webhook_leases"
+        self.partitions = partitions
+        self.max_attempts = max_attempts
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.poll_interval = poll_interval
+        self.lease_seconds = lease_seconds
+        self.batch_size = batch_size
+        self.processing_lease_seconds = processing_lease_seconds
+        self.worker_id = f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:6]}"
+
+        self.handlers: Dict[str, EventHandler] = {}
+        self._queues: List[asyncio.Queue] = []
+        self._tasks: List[asyncio.Task] = []
+        self._in_flight: set = set()
+        self.processed = 0
+        self.retried = 0
+        self.dead_lettered = 0
+        self._stopping = asyncio.Event()
+        self._indexes_ready = False
+
+    async def _get_db(self):
+        try:
+            return await get_database_async()
+        except Exception as e:
+            logger.error(f"Database connection error: {e}")
+            return None
+
+    async def ensure_indexes(self) -> None:
+        if self._indexes_ready:
+            return
+        db = await self._get_db()
+        if db is None:
+            return
+        events = db[self.collection_name]
+        # _id is the Stripe event id, which gives the unique constraint for free
+        await events.create_index([("status", ASCENDING), ("next_attempt_at", ASCENDING), ("created", ASCENDING)])
+        await events.create_index([("customer", ASCENDING), ("status", ASCENDING)])
+        await db[self.dead_letter_collection_name].create_index([("failed_at", ASCENDING)])
+        self._indexes_ready = True
+
+    # Ingestion
+
+    async def enqueue(self, event: Dict[str, Any]) -> bool:
+        """Persist a verified event. Returns False when the event id was already received."""
+        db = await self._get_db()
+        if db is None:
+            raise RuntimeError("Database unavailable")
+
+        now = datetime.utcnow()
+        record = {
+            "_id": event["id"],
+            "type": event.get("type"),
+            "customer": event_customer(event),
+            "created": event.get("created") or int(now.timestamp()),
+            "livemode": event.get("livemode", False),
+            "payload": event,
+            "status": "pending",
+            "attempts": 0,
+            "next_attempt_at": now,
+            "received_at": now,
+        }
+        try:
+            await db[self.collection_name].insert_one(record)
+            return True
+        except DuplicateKeyError:
+            logger.info(f"Duplicate Stripe event ignored: {event['id']}")
+            return False
+
+    # Processing
+
+    async def start(self, handlers: Dict[str, EventHandler]) -> None:
+        """Start the dispatcher and partition workers in the current event loop"""
+        self.handlers = handlers
+        self._stopping = asyncio.Event()
+        try:
+            await self.ensure_indexes()
+        except Exception as e:
+            logger.error(f"Error creating webhook inbox indexes: {e}")
+        self._queues = [asyncio.Queue() for _ in range(self.partitions)]
+        self._tasks = [asyncio.create_task(self._worker(queue)) for queue in self._queues]
+        self._tasks.append(asyncio.create_task(self._dispatcher()))
+        logger.info(f"Stripe webhook inbox started with {self.partitions} partitions")
+
+    async def stop(self) -> None:
+        self._stopping.set()
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+        db = await self._get_db()
+        if db is not None:
+            await db[self.lease_collection_name].delete_one({"_id": "processor", "owner": self.worker_id})
+
+    async def _acquire_lease(self, db) -> bool:
+        now = datetime.utcnow()
+        try:
+            lease = await db[self.lease_collection_name].find_one_and_update(
+                {"_id": "processor", "$or": [{"owner": self.worker_id}, {"expires_at": {"$lt": now}}]},
+                {"$set": {"owner": self.worker_id, "expires_at": now + timedelta(seconds=self.lease_seconds)}},
+                upsert=True,
+                return_document=ReturnDocument.AFTER,
+            )
+            return lease is not None and lease.get("owner") == self.worker_id
+        except DuplicateKeyError:
+            return False
+
+    async def _dispatcher(self) -> None:
+        was_leader = False
+        next_recovery = datetime.min
+        while not self._stopping.is_set():
+            try:
+                db = await self._get_db()
+                if db is not None and await self._acquire_lease(db):
+                    # On taking over, then every lease period: processing leases keep expiring
+                    if not was_leader or datetime.utcnow() >= next_recovery:
+                        await self._recover_stale(db)
+                        next_recovery = datetime.utcnow() + timedelta(seconds=self.lease_seconds)
+                        was_leader = True
+                    dispatched = await self._dispatch_batch(db)
+                    if dispatched:
+                        continue
+                else:
+                    was_leader = False
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error(f"Stripe webhook dispatcher error: {e}")
+            await asyncio.sleep(self.poll_interval)
+
+    async def _recover_stale(self, db) -> None:
+        """Return events whose processing lease expired (their worker died) to the queue"""
+        now = datetime.utcnow()
+        result = await db[self.collection_name].update_many(
+            {"status": "processing", "$or": [
+                {"lease_until": {"$lte": now}},
+                # Claimed before processing leases were recorded
+                {"lease_until": None, "locked_at": {"$lte": now - timedelta(seconds=self.processing_lease_seconds)}},
+            ]},
+            {"$set": {"status": "pending", "next_attempt_at": now},
+             "$unset": {"locked_by": "", "locked_at": "", "lease_until": ""}},
+        )
+        if result.modified_count:
+            logger.warning(f"Recovered {result.modified_count} in-flight Stripe events")
+
+    async def _dispatch_batch(self, db) -> int:
+        collection = db[self.collection_name]
+        now = datetime.utcnow()
+        # Customers with an event waiting on backoff are blocked to keep per-customer order
+        blocked = set(await collection.distinct(
+            "customer", {"status": "pending", "next_attempt_at": {"$gt": now}}
+        ))
+        # and customers with an event still being handled, here or by a previous leader
+        blocked.update(await collection.distinct("customer", {"status": "processing"}))
+        blocked.update(customer for customer, _ in self._in_flight)
+
+        cursor = collection.find(
+            {"status": "pending", "next_attempt_at": {"$lte": now}},
+            {"payload": 0},
+        ).sort([("created", ASCENDING), ("received_at", ASCENDING)]).limit(self.batch_size)
+
+        dispatched = 0
+        async for record in cursor:
+            customer = record["customer"]
+            if customer in blocked:
+                continue
+            claimed = await collection.find_one_and_update(
+                {"_id": record["_id"], "status": "pending"},
+                {"$set": {"status": "processing", "locked_by": self.worker_id, "locked_at": now,
+                          "lease_until": now + timedelta(seconds=self.processing_lease_seconds)}},
+            )
+            if claimed is None:
+                continue
+            self._in_flight.add((customer, record["_id"]))
+            blocked.add(customer)
+            partition = zlib.crc32(customer.encode()) % self.partitions
+            await self._queues[partition].put(record["_id"])
+            dispatched += 1
+        return dispatched
+
+    async def _worker(self, queue: asyncio.Queue) -> None:
+        while True:
+            event_id = await queue.get()
+            try:
+                await self.process_event(event_id)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error(f"Stripe webhook worker error for {event_id}: {e}")
+            finally:
+                self._in_flight = {item for item in self._in_flight if item[1] != event_id}
+                queue.task_done()
+
+    async def process_event(self, event_id: str) -> bool:
+        """Run the handler for one stored event, scheduling a retry or dead-lettering on failure"""
+        db = await self._get_db()
+        if db is None:
+            return False
+        collection = db[self.collection_name]
+        record = await collection.find_one({"_id": event_id})
+        if record is None or record.get("status") == "processed":
+            return True
+
+        event = record["payload"]
+        handler = self.handlers.get(record["type"])
+        try:
+            if handler is None:
+                logger.info(f"Unhandled event type: {record['type']}")
+            else:
+                await handler(event["data"]["object"])
+        except Exception as e:
+            await self._record_failure(db, record, e)
+            return False
+
+        await collection.update_one(
+            {"_id": event_id},
+            {"$set": {"status": "processed", "processed_at": datetime.utcnow()},
+             "$inc": {"attempts": 1}, "$unset": {"locked_by": "", "locked_at": "", "lease_until": ""}},
+        )
+        self.processed += 1
+        return True
+
+    def _backoff(self, attempts: int) -> float:
+        return min(self.max_delay, self.base_delay * (2 ** (attempts - 1)))
+
+    async def _record_failure(self, db, record: Dict[str, Any], error: Exception) -> None:
+        attempts = record.get("attempts", 0) + 1
+        collection = db[self.collection_name]
+        if attempts >= self.max_attempts:
+            logger.error(f"Stripe event {record['_id']} dead-lettered after {attempts} attempts: {error}")
+            self.dead_lettered += 1
+            await db[self.dead_letter_collection_name].replace_one(
+                {"_id": record["_id"]},
+                {**record, "attempts": attempts, "last_error": str(error), "failed_at": datetime.utcnow()},
+                upsert=True,
+            )
+            await collection.update_one(
+                {"_id": record["_id"]},
+                {"$set": {"status": "dead", "attempts": attempts, "last_error": str(error)}},
+            )
+            return
+
+        delay = self._backoff(attempts)
+        self.retried += 1
+        logger.warning(f"Stripe event {record['_id']} failed (attempt {attempts}), retrying in {delay:.0f}s: {error}")
+        await collection.update_one(
+            {"_id": record["_id"]},
+            {"$set": {
+                "status": "pending",
+                "attempts": attempts,
+                "last_error": str(error),
+                "next_attempt_at": datetime.utcnow() + timedelta(seconds=delay),
+            }, "$unset": {"locked_by": "", "locked_at": "", "lease_until": ""}},
+        )
+
+    # Replay
+
+    async def requeue(self, event_ids: Optional[List[str]] = None, dead_letters: bool = False) -> int:
+        """Put processed or dead-lettered events back in the queue"""
+        db = await self._get_db()
+        if db is None:
+            return 0
+        query: Dict[str, Any] = {}
+        if event_ids:
+            query["_id"] = {"$in": event_ids}
+        elif dead_letters:
+            query["status"] = "dead"
+        else:
+            return 0
+        result = await db[self.collection_name].update_many(
+            query,
+            {"$set": {"status": "pending", "attempts": 0, "next_attempt_at": datetime.utcnow()}},
+        )
+        if dead_letters or event_ids:
+            await db[self.dead_letter_collection_name].delete_many(
+                {"_id": {"$in": event_ids}} if event_ids else {}
+            )
+        return result.modified_count
+
+    def get_queue_stats(self) -> Dict[str, Any]:
+        """In-memory queue depth and outcome counts of this worker, without querying the inbox"""
+        return {
+            "queued": sum(queue.qsize() for queue in self._queues),
+            "in_flight": len(self._in_flight),
+            "processed": self.processed,
+            "retried": self.retried,
+            "dead_lettered": self.dead_lettered,
+        }
+
+    async def get_stats(self) -> Dict[str, Any]:
+        db = await self._get_db()
+        if db is None:
+            return {"success": False, "error": "Database unavailable"}
+        counts = await db[self.collection_name].aggregate([
+            {"$group": {"_id": "$status", "count": {"$sum": 1}}}
+        ]).to_list(length=None)
+        return {
+            "success": True,
+            "data": {
+                "by_status": {row["_id"]: row["count"] for row in counts},
+                "dead_letters": await db[self.dead_letter_collection_name].estimated_document_count(),
+                "in_flight": len(self._in_flight),
+                "service": self.service_name
+            }
+        }
+
+
+# Service instance
+_service_instance = None
+
+def get_stripe_webhook_inbox_service():
+    """Get service instance"""
+    global _service_instance
+    if _service_instance is None:
+        _service_instance = StripeWebhookInboxService()
+    return _service_instance
@@ -6,15 +6,18 @@ Ensures only users with Creator+ bundles can sell templates
 import logging
 from typing import Dict, Any, List, Optional
 from datetime import datetime, timedelta
-from core.database import get_database
-from services.workspace_subscription_service import get_workspace_subscription_service
+from core.database import get_motor_database
+from services.template_sales_service import get_template_sales_service
+from services.usage_metering_service import DEFAULT_BUNDLES, get_usage_metering_service
 import uuid
 
 logger = logging.getLogger(__name__)
 
 class TemplateMarketplaceAccessService:
     def __init__(self):
-        self.db = get_database()
+        # Every method awaits its queries, so this must be the Motor handle
+        self.db = get_motor_database()
+        self.sales = get_template_sales_service()
         
         # Bundle requirements for template selling
         self.selling_requirements = {
@@ -75,9 +78,8 @@ class TemplateMarketplaceAccessService:
     async def check_seller_access(self, user_id: str, workspace_id: str) -> Dict[str, Any]:
         """Check if user has permission to sell templates"""
         try:
-            # Get workspace subscription info
-            subscription_service = get_workspace_subscription_service()
-            subscription_result = await subscription_service.get_workspace_subscription(workspace_id, user_id)
+            # Get workspace subscription bundles (cached)
+            plan = await get_usage_metering_service().get_workspace_plan(workspace_id)
             
             # Check if user is member of workspace
             is_member = await self._check_workspace_membership(workspace_id, user_id)
@@ -90,7 +92,7 @@ class TemplateMarketplaceAccessService:
                 }
             
             # Free tier check
-            if not subscription_result.get("success"):
+            if plan["bundles"] == DEFAULT_BUNDLES:
                 return {
                     "success": True,
                     "has_access": False,
@@ -99,8 +101,7 @@ class TemplateMarketplaceAccessService:
                     "allowed_bundles": self.selling_requirements["allowed_bundles"]
                 }
             
-            subscription = subscription_result.get("subscription", {})
-            active_bundles = subscription.get("bundles", [])
+            active_bundles = plan["bundles"]
             
             # Check if any active bundle allows selling
             has_selling_bundle = any(
@@ -443,38 +444,33 @@ class TemplateMarketplaceAccessService:
             # Calculate period dates
             period_start, period_end = self._calculate_period_dates(period)
             
-            # Mock statistics - in production, you'd query actual sales data
+            # Sales, views and top templates from the seller's daily rollups
+            sales = await self.sales.get_seller_stats(user_id, workspace_id, period_start, period_end)
+            quality_metrics = seller_record["quality_metrics"]
+            revenue_share = self.selling_requirements["revenue_share"]
             stats = {
                 "period": period,
                 "period_start": period_start.isoformat(),
                 "period_end": period_end.isoformat(),
                 "templates": {
-                    "total_active": seller_record["quality_metrics"]["approved_templates"],
-                    "total_sales": seller_record["quality_metrics"]["total_sales"],
-                    "pending_review": seller_record["quality_metrics"]["pending_templates"],
-                    "rejected": seller_record["quality_metrics"]["rejected_templates"]
+                    "total_active": quality_metrics["approved_templates"],
+                    "total_sales": sales["sales"],
+                    "pending_review": quality_metrics["pending_templates"],
+                    "rejected": quality_metrics["rejected_templates"]
                 },
                 "revenue": {
-                    "total_revenue": seller_record["quality_metrics"]["total_revenue"],
-                    "platform_fee": seller_record["quality_metrics"]["total_revenue"] * 0.15,
-                    "net_earnings": seller_record["quality_metrics"]["total_revenue"] * 0.85,
+                    "total_revenue": sales["revenue"],
+                    "platform_fee": round(sales["revenue"] * revenue_share["platform_commission"], 2),
+                    "net_earnings": sales["seller_earnings"],
                     "currency": "USD"
                 },
                 "performance": {
-                    "average_rating": seller_record["quality_metrics"]["average_rating"],
-                    "total_downloads": seller_record["quality_metrics"]["total_sales"],
-                    "conversion_rate": 0.0  # Would calculate from views/sales
+                    "average_rating": quality_metrics["average_rating"],
+                    "total_downloads": sales["sales"],
+                    "total_views": sales["views"],
+                    "conversion_rate": sales["conversion_rate"]
                 },
-                "top_templates": [
-                    # Mock data - in production, query actual top performing templates
-                    {
-                        "id": str(uuid.uuid4()),
-                        "title": "Modern Landing Page",
-                        "sales": 25,
-                        "revenue": 497.50,
-                        "rating": 4.8
-                    }
-                ]
+                "top_templates": sales["top_templates"]
             }
             
             return {
@@ -0,0 +1,211 @@
+"""
+Template Sales Service
+Template sales fact table with per-(seller, template, day) rollups maintained on purchase
+"""
+
+import logging
+import uuid
+from datetime import datetime, timedelta
+from typing import Any, Dict, Optional
+
+from pymongo import ASCENDING, DESCENDING, IndexModel, ReturnDocument
+from pymongo.errors import DuplicateKeyError
+
+from core.database import get_motor_database
+from core.indexes import declare_indexes
+
+logger = logging.getLogger(__name__)
+
+declare_indexes(
+    "template_sales",
+    IndexModel([("seller_id", ASCENDING), ("occurred_at", DESCENDING)]),
+    IndexModel([("template_id", ASCENDING), ("occurred_at", DESCENDING)]),
+)
+declare_indexes(
+    "template_sales_daily",
+    # Seller statistics read one range of days for one seller
+    IndexModel([("workspace_id", ASCENDING), ("seller_id", ASCENDING), ("day", ASCENDING)]),
+)
+
+# Seller share of each sale; matches the marketplace revenue share
+SELLER_PERCENTAGE = 0.85
+
+# Rollups a sale still has to apply, in order; each is pulled from the sale once applied
+SALE_ROLLUPS = ("daily", "template")
+# How long the delivery that inserted or claimed a sale has to apply its rollups before
+# a redelivery may take over
+ROLLUP_LEASE_SECONDS = 60
+
+
+def _day(value: datetime) -> datetime:
+    return value.replace(hour=0, minute=0, second=0, microsecond=0)
+
+
+def _rollup_id(workspace_id: Optional[str], seller_id: str, template_id: str, day: datetime) -> str:
+    return f"{workspace_id}|{seller_id}|{template_id}|{day.strftime('%Y-%m-%d')}"
+
+
+class TemplateSalesService:
+    """
+    Every purchase is one document in ``template_sales`` (keyed by sale id, so a retried
+    purchase is recorded once) and an ``$inc`` on its workspace/seller/template/day bucket
+    in ``template_sales_daily``, which also counts listing views. The sale lists the rollups
+    it has not applied yet, so a redelivery finishes a purchase whose increments failed.
+    Sales come from the ``payment_intent.succeeded`` webhook and views from the template
+    detail endpoint. Seller statistics are one ``$facet`` over a seller's buckets in the
+    period; the template's own ``sales_count`` and ``last_sold_at`` feed the marketplace
+    ranking index.
+    """
+
+    def __init__(self, db=None):
+        self.service_name = "template_sales"
+        self.collection_name = "template_sales"
+        # Every method awaits its queries, so this must be the Motor handle
+        self.db = db if db is not None else get_motor_database()
+
+    async def record_sale(self, data: Dict[str, Any]) -> Dict[str, Any]:
+        """Record a template purchase and add it to the seller's daily rollup"""
+        try:
+            template_id = data.get("template_id")
+            seller_id = data.get("seller_id")
+            amount = float(data.get("amount") or 0)
+            if not template_id or not seller_id:
+                return {"success": False, "error": "template_id and seller_id are required"}
+
+            now = datetime.utcnow()
+            occurred_at = data.get("occurred_at") or now
+            sale = {
+                "_id": data.get("sale_id") or str(uuid.uuid4()),
+                "template_id": template_id,
+                "seller_id": seller_id,
+                "workspace_id": data.get("workspace_id"),
+                "buyer_id": data.get("buyer_id"),
+                "amount": amount,
+                "seller_earnings": round(amount * SELLER_PERCENTAGE, 2),
+                "currency": data.get("currency", "USD"),
+                "occurred_at": occurred_at,
+                "pending_rollups": list(SALE_ROLLUPS),
+                "rollup_lease_until": now + timedelta(seconds=ROLLUP_LEASE_SECONDS)
+            }
+            try:
+                await self.db.template_sales.insert_one(sale)
+            except DuplicateKeyError:
+                return await self._finish_duplicate(sale["_id"], now)
+
+            await self._apply_rollups(sale)
+            return {"success": True, "sale_id": sale["_id"], "duplicate": False}
+
+        except Exception as e:
+            logger.error(f"Error recording template sale: {e}")
+            return {"success": False, "error": str(e)}
+
+    async def _finish_duplicate(self, sale_id: str, now: datetime) -> Dict[str, Any]:
+        """
+        A redelivered sale. Rollups an earlier delivery did not apply are applied now, once
+        its lease has run out; until then the redelivery fails so it is retried later.
+        """
+        recorded = await self.db.template_sales.find_one({"_id": sale_id}, {"pending_rollups": 1})
+        if recorded and recorded.get("pending_rollups"):
+            sale = await self.db.template_sales.find_one_and_update(
+                {"_id": sale_id, "pending_rollups.0": {"$exists": True}, "rollup_lease_until": {"$lte": now}},
+                {"$set": {"rollup_lease_until": now + timedelta(seconds=ROLLUP_LEASE_SECONDS)}},
+                return_document=ReturnDocument.AFTER
+            )
+            if sale is None:
+                return {"success": False, "error": f"Rollups of sale {sale_id} are being applied"}
+            await self._apply_rollups(sale)
+        return {"success": True, "sale_id": sale_id, "duplicate": True}
+
+    async def _apply_rollups(self, sale: Dict[str, Any]) -> None:
+        """Apply the sale's pending rollups, pulling each from the sale once it is applied"""
+        for rollup in SALE_ROLLUPS:
+            if rollup not in sale["pending_rollups"]:
+                continue
+            if rollup == "daily":
+                await self._bump(sale["seller_id"], sale["template_id"], sale["workspace_id"], sale["occurred_at"], {
+                    "sales": 1, "revenue": sale["amount"], "seller_earnings": sale["seller_earnings"]
+                })
+            else:
+                await self.db.template.update_one(
+                    {"id": sale["template_id"]},
+                    {"$inc": {"sales_count": 1, "revenue": sale["amount"]},
+                     "$max": {"last_sold_at": sale["occurred_at"]}}
+                )
+            await self.db.template_sales.update_one({"_id": sale["_id"]}, {"$pull": {"pending_rollups": rollup}})
+
+    async def record_view(self, template_id: str, seller_id: str, workspace_id: Optional[str] = None) -> None:
+        """Count a listing view toward the seller's conversion rate"""
+        try:
+            await self._bump(seller_id, template_id, workspace_id, datetime.utcnow(), {"views": 1})
+        except Exception as e:
+            logger.error(f"Error recording template view: {e}")
+
+    async def _bump(self, seller_id: str, template_id: str, workspace_id: Optional[str], when: datetime,
+                    counts: Dict[str, Any]) -> None:
+        day = _day(when)
+        await self.db.template_sales_daily.update_one(
+            {"_id": _rollup_id(workspace_id, seller_id, template_id, day)},
+            {
+                "$inc": counts,
+                "$setOnInsert": {"seller_id": seller_id, "template_id": template_id,
+                                 "workspace_id": workspace_id, "day": day}
+            },
+            upsert=True
+        )
+
+    async def get_seller_stats(self, seller_id: str, workspace_id: Optional[str], start: datetime, end: datetime,
+                               top: int = 5) -> Dict[str, Any]:
+        """Totals, conversion rate and top templates for a seller's period, in one aggregation"""
+        rows = await self.db.template_sales_daily.aggregate([
+            {"$match": {"workspace_id": workspace_id, "seller_id": seller_id,
+                        "day": {"$gte": _day(start), "$lte": end}}},
+            {"$facet": {
+                "totals": [{"$group": {
+                    "_id": None,
+                    "sales": {"$sum": "$sales"},
+                    "views": {"$sum": "$views"},
+                    "revenue": {"$sum": "$revenue"},
+                    "seller_earnings": {"$sum": "$seller_earnings"}
+                }}],
+                "top_templates": [
+                    {"$group": {"_id": "$template_id", "sales": {"$sum": "$sales"}, "revenue": {"$sum": "$revenue"}}},
+                    {"$match": {"sales": {"$gt": 0}}},
+                    {"$sort": {"sales": -1, "revenue": -1}},
+                    {"$limit": top},
+                    {"$lookup": {"from": "template", "localField": "_id", "foreignField": "id", "as": "template"}},
+                    {"$project": {
+                        "sales": 1,
+                        "revenue": 1,
+                        "title": {"$first": "$template.title"},
+                        "rating": {"$first": "$template.rating"}
+                    }}
+                ]
+            }}
+        ]).to_list(length=1)
+
+        facets = rows[0] if rows else {"totals": [], "top_templates": []}
+        totals = facets["totals"][0] if facets["totals"] else {}
+        sales, views = totals.get("sales", 0), totals.get("views", 0)
+        return {
+            "sales": sales,
+            "views": views,
+            "revenue": round(totals.get("revenue", 0.0), 2),
+            "seller_earnings": round(totals.get("seller_earnings", 0.0), 2),
+            "conversion_rate": round(sales / views, 4) if views else 0.0,
+            "top_templates": [
+                {"id": row["_id"], "title": row.get("title"), "sales": row["sales"],
+                 "revenue": round(row["revenue"], 2), "rating": row.get("rating")}
+                for row in facets["top_templates"]
+            ]
+        }
+
+
+# Service instance
+_service_instance = None
+
+def get_template_sales_service():
+    """Get service instance"""
+    global _service_instance
+    if _service_instance is None:
+        _service_instance = TemplateSalesService()
+    return _service_instance
@@ -4,6 +4,7 @@ Twitter/X API Integration Service
 Real Twitter API integration using provided credentials
 """
 
+import asyncio
 import uuid
 import logging
 from typing import Dict, List, Optional, Any
@@ -22,12 +23,23 @@ class TwitterService:
         self.api_key = os.environ.get('TWITTER_API_KEY', '57zInvI1CUTkc3i4aGN87kn1k')
         self.api_secret = os.environ.get('TWITTER_API_SECRET', 'GJkQNYE7VoZjv8dovZXgvGGoaopJIYzdzzNBXgPVGqkRfTXWtk')
         self.base_url = "https://api.twitter.com/2"
-        self.bearer_token = None
+        self._bearer_token = None
+        self._bearer_token_requested = False
+        self._bearer_token_lock = asyncio.Lock()
         self.api_available = bool(self.api_key and self.api_secret)
-        
-        # Initialize bearer token for API access
-        if self.api_available:
-            self._get_bearer_token()
+
+    async def get_bearer_token(self) -> Optional[str]:
+        """
+        Bearer token, fetched once on first API use. The blocking request runs in a
+        thread, and concurrent first callers wait for the one fetch under the lock.
+        """
+        if self._bearer_token_requested or not self.api_available:
+            return self._bearer_token
+        async with self._bearer_token_lock:
+            if not self._bearer_token_requested:
+                await asyncio.to_thread(self._get_bearer_token)
+                self._bearer_token_requested = True
+        return self._bearer_token
     
     def _get_bearer_token(self):
         """Get Bearer token for Twitter API v2"""
@@ -47,11 +59,12 @@ class TwitterService:
             response = requests.post(
                 'https://api.twitter.com/oauth2/token',
                 headers=headers,
-                data=data
+                data=data,
+                timeout=10
             )
             
             if response.status_code == 200:
-                self.bearer_token = response.json().get('access_token')
+                self._bearer_token = response.json().get('access_token')
                 logger.info("Twitter Bearer token obtained successfully")
             else:
                 logger.error(f"Failed to get Twitter Bearer token: {response.text}")
@@ -386,14 +399,15 @@ class TwitterService:
             if collection is None:
                 return {"success": False, "error": "Database unavailable"}
             
-            if not self.bearer_token:
+            bearer_token = await self.get_bearer_token()
+            if not bearer_token:
                 return {
                     "success": False, 
                     "error": "Twitter API not available - no bearer token"
                 }
             
             headers = {
-                'Authorization': f'Bearer {self.bearer_token}',
+                'Authorization': f'Bearer {bearer_token}',
                 'Content-Type': 'application/json'
             }
             
@@ -0,0 +1,105 @@
+"""
+Usage Metering Service
+Enforces plan limits (AI credits, websites, emails, storage) per workspace and billing period
+"""
+
+import logging
+from typing import Any, Dict, List, Optional
+
+from core.cache import get_cache
+from core.config import settings
+from core.database import get_database_async
+from core.metering import METRIC_LIMIT_KEYS, QuotaExceeded, get_usage_meter, plan_limit
+from core.timestamps import to_datetime
+
+logger = logging.getLogger(__name__)
+
+# Workspaces whose subscription has no bundles are metered as the free plan
+DEFAULT_BUNDLES = ["free_starter"]
+
+
+class UsageMeteringService:
+    """
+    Quota checks for one workspace: its bundles' limits come from the in-memory plan
+    catalog, its bundles and billing anchor from a short-lived cache of the workspace's
+    subscription, and its usage from the shared UsageMeter.
+    """
+
+    def __init__(self):
+        self.service_name = "usage_metering"
+        self.collection_name = "usage_counters"
+        self.meter = get_usage_meter()
+        self.plans = get_cache("workspace_plans", settings.WORKSPACE_PLAN_TTL_SECONDS, ("workspaces",),
+                               max_entries=10000)
+
+    async def _get_db(self):
+        """Get database connection"""
+        try:
+            return await get_database_async()
+        except Exception as e:
+            logger.error(f"Database connection error: {e}")
+            return None
+
+    async def get_workspace_plan(self, workspace_id: str) -> Dict[str, Any]:
+        """Bundles and billing anchor of the workspace's subscription"""
+        return await self.plans.get(workspace_id, lambda: self._load_workspace_plan(workspace_id))
+
+    async def _load_workspace_plan(self, workspace_id: str) -> Dict[str, Any]:
+        db = await self._get_db()
+        workspace = None
+        if db is not None:
+            workspace = await db.workspaces.find_one({"_id": workspace_id}, {"subscription": 1})
+        subscription = (workspace or {}).get("subscription") or {}
+        return {
+            "bundles": list(subscription.get("bundles") or DEFAULT_BUNDLES),
+            "anchor": to_datetime(subscription.get("current_period_start")),
+        }
+
+    async def consume(self, workspace_id: str, metric: str, amount: int = 1) -> Dict[str, Any]:
+        """Reserve ``amount`` of ``metric`` for the workspace if its plan allows it"""
+        try:
+            plan = await self.get_workspace_plan(workspace_id)
+            limit = plan_limit(plan["bundles"], metric)
+            reservation = await self.meter.reserve(workspace_id, metric, amount, limit, plan["anchor"])
+            return {"success": True, **reservation}
+        except QuotaExceeded as e:
+            return {"success": False, "error": str(e), "quota_exceeded": True,
+                    "metric": metric, "limit": e.limit, "used": e.used}
+        except Exception as e:
+            logger.error(f"Usage metering error: {e}")
+            return {"success": False, "error": str(e)}
+
+    async def refund(self, workspace_id: str, metric: str, amount: int = 1) -> None:
+        """Return a reservation made by ``consume`` when the metered operation failed"""
+        try:
+            plan = await self.get_workspace_plan(workspace_id)
+            await self.meter.release(workspace_id, metric, amount, plan["anchor"])
+        except Exception as e:
+            logger.error(f"Usage refund error: {e}")
+
+    async def get_usage_summary(self, workspace_id: str, metrics: Optional[List[str]] = None) -> Dict[str, Any]:
+        """Usage, limit and remaining allowance per metric for the current period"""
+        try:
+            plan = await self.get_workspace_plan(workspace_id)
+            usage = await self.meter.get_period_usage(workspace_id, plan["anchor"])
+            summary = {}
+            for metric in metrics or METRIC_LIMIT_KEYS:
+                limit = plan_limit(plan["bundles"], metric)
+                used = usage.get(metric, 0)
+                summary[metric] = {"used": used, "limit": limit,
+                                   "remaining": None if limit is None else max(limit - used, 0)}
+            return {"success": True, "workspace_id": workspace_id, "bundles": plan["bundles"], "usage": summary}
+        except Exception as e:
+            logger.error(f"Usage summary error: {e}")
+            return {"success": False, "error": str(e)}
+
+
+# Service instance
+_service_instance = None
+
+def get_usage_metering_service():
+    """Get service instance"""
+    global _service_instance
+    if _service_instance is None:
+        _service_instance = UsageMeteringService()
+    return _service_instance
@@ -0,0 +1,318 @@
+"""
+Vendor Payout Service
+Scheduled batch payouts: one aggregation of vendor earnings, rate-limited concurrent Stripe transfers
+"""
+
+import asyncio
+import logging
+import statistics
+import time
+import uuid
+from datetime import datetime
+from typing import Any, Dict, List, Optional
+
+import stripe
+from pymongo import ASCENDING, IndexModel, UpdateOne
+
+from core.config import settings
+from core.database import get_motor_database
+from core.indexes import declare_indexes
+from core.stripe_gateway import get_stripe_gateway
+
+logger = logging.getLogger(__name__)
+
+declare_indexes(
+    "escrow",
+    IndexModel([("payout_run_id", ASCENDING), ("workspace_id", ASCENDING)]),
+)
+declare_indexes(
+    "payout_items",
+    IndexModel([("run_id", ASCENDING), ("status", ASCENDING)]),
+)
+declare_indexes(
+    "payout_runs",
+    IndexModel([("status", ASCENDING), ("created_at", ASCENDING)]),
+)
+
+# Runs in these states were interrupted and are picked up again by the next run
+UNFINISHED_STATUSES = ("planning", "running")
+
+
+class _RateLimiter:
+    """Spaces call starts at least ``1 / rate`` seconds apart across every worker"""
+
+    def __init__(self, rate: float):
+        self.interval = 1.0 / rate if rate else 0.0
+        self._next = 0.0
+        self._lock = asyncio.Lock()
+
+    async def wait(self) -> None:
+        if not self.interval:
+            return
+        async with self._lock:
+            now = time.monotonic()
+            delay = self._next - now
+            self._next = max(now, self._next) + self.interval
+        if delay > 0:
+            await asyncio.sleep(delay)
+
+
+class VendorPayoutService:
+    """
+    Pays every vendor workspace its net escrow earnings in one run.
+
+    A run first claims the eligible escrow transactions (fee collected, not yet in a run)
+    by stamping them with its id, then sums them per workspace in one aggregation into
+    ``payout_items``. Because claiming and planning only ever add the same stamps and
+    items, a run interrupted at any point is finished by simply running it again.
+
+    Transfers go out from ``concurrency`` workers under a shared request rate, each with
+    the idempotency key ``payout-<item>`` and the run as its transfer group. Item outcomes
+    are checkpointed in batches of ``checkpoint_every``. Only a definite decline releases an
+    item's transactions to the next run; an ambiguous failure (connection error, timeout,
+    Stripe 5xx) leaves the item pending and the run unfinished, and a resumed run first
+    settles its items from the transfers already in its group, since Stripe forgets
+    idempotency keys after 24 hours.
+    """
+
+    def __init__(self, db=None, gateway=None, concurrency: Optional[int] = None,
+                 rate_per_second: Optional[float] = None, checkpoint_every: Optional[int] = None):
+        self.service_name = "vendor_payouts"
+        self.collection_name = "payout_runs"
+        # Every method awaits its queries, so this must be the Motor handle
+        self.db = db if db is not None else get_motor_database()
+        self.gateway = gateway or get_stripe_gateway()
+        self.concurrency = concurrency or settings.PAYOUT_CONCURRENCY
+        self.rate_per_second = rate_per_second if rate_per_second is not None else settings.PAYOUT_RATE_PER_SECOND
+        self.checkpoint_every = checkpoint_every or settings.PAYOUT_CHECKPOINT_EVERY
+
+    async def run_payouts(self, cutoff: Optional[datetime] = None) -> Dict[str, Any]:
+        """Resume an interrupted run, or pay out everything earned up to ``cutoff``"""
+        try:
+            run = await self.db.payout_runs.find_one({"status": {"$in": list(UNFINISHED_STATUSES)}})
+            if run is None:
+                run = {
+                    "_id": str(uuid.uuid4()),
+                    "status": "planning",
+                    "cutoff": cutoff or datetime.utcnow(),
+                    "created_at": datetime.utcnow()
+                }
+                await self.db.payout_runs.insert_one(run)
+            else:
+                logger.info(f"Resuming payout run {run['_id']} ({run['status']})")
+
+            # A run that was already sending may have transfers its items do not record
+            resumed = run["status"] == "running"
+            if run["status"] == "planning":
+                await self._plan(run)
+            report = await self._execute(run, resumed)
+            return {"success": True, "run_id": run["_id"], **report}
+
+        except Exception as e:
+            logger.error(f"Payout run error: {e}")
+            return {"success": False, "error": str(e)}
+
+    async def _plan(self, run: Dict[str, Any]) -> None:
+        run_id = run["_id"]
+        await self.db.escrow.update_many(
+            {"fee_collected": True, "payout_run_id": {"$exists": False}, "created_at": {"$lte": run["cutoff"]}},
+            {"$set": {"payout_run_id": run_id, "payout_status": "scheduled"}}
+        )
+
+        # Net earnings per vendor workspace and its Connect account, in one pipeline
+        rows = await self.db.escrow.aggregate([
+            {"$match": {"payout_run_id": run_id}},
+            {"$group": {
+                "_id": "$workspace_id",
+                "amount": {"$sum": {"$round": [{"$multiply": ["$net_amount", 100]}, 0]}},
+                "transaction_ids": {"$push": "$id"}
+            }},
+            {"$lookup": {"from": "workspaces", "localField": "_id", "foreignField": "_id", "as": "workspace"}},
+            {"$project": {
+                "amount": 1,
+                "transaction_ids": 1,
+                "destination": {"$first": "$workspace.stripe_account_id"}
+            }}
+        ], allowDiskUse=True).to_list(length=None)
+
+        now = datetime.utcnow()
+        # Nothing is sent while planning, so a re-plan rewrites items from everything claimed so far
+        items = [
+            UpdateOne(
+                {"_id": f"{run_id}|{row['_id']}"},
+                {"$set": {
+                    "destination": row.get("destination"),
+                    "amount": int(row["amount"]),
+                    "transaction_ids": row["transaction_ids"],
+                    # Vendors without a Connect account keep their earnings for a later run
+                    "status": "pending" if row.get("destination") and row["amount"] > 0 else "skipped"
+                }, "$setOnInsert": {
+                    "run_id": run_id,
+                    "workspace_id": row["_id"],
+                    "created_at": now
+                }},
+                upsert=True
+            )
+            for row in rows
+        ]
+        if items:
+            await self.db.payout_items.bulk_write(items, ordered=False)
+        await self.db.payout_runs.update_one({"_id": run_id}, {"$set": {"status": "running", "planned_at": now}})
+        run["status"] = "running"
+
+    async def _execute(self, run: Dict[str, Any], resumed: bool = False) -> Dict[str, Any]:
+        run_id = run["_id"]
+        items = await self.db.payout_items.find({"run_id": run_id, "status": "pending"}).to_list(length=None)
+        if resumed and items:
+            made = await self._existing_transfers(run_id)
+            settled = [{"item": item, "status": "paid", "transfer_id": made[item["workspace_id"]]}
+                       for item in items if item["workspace_id"] in made]
+            await self._checkpoint(settled)
+            items = [item for item in items if item["workspace_id"] not in made]
+        queue: asyncio.Queue = asyncio.Queue()
+        for item in items:
+            queue.put_nowait(item)
+
+        limiter = _RateLimiter(self.rate_per_second)
+        outcomes: List[Dict[str, Any]] = []
+        latencies: List[float] = []
+
+        async def worker() -> None:
+            while not queue.empty():
+                item = queue.get_nowait()
+                await limiter.wait()
+                start = time.perf_counter()
+                outcomes.append(await self._transfer(run_id, item))
+                latencies.append((time.perf_counter() - start) * 1000)
+                if len(outcomes) >= self.checkpoint_every:
+                    await self._checkpoint(outcomes)
+
+        start = time.perf_counter()
+        workers = [asyncio.create_task(worker()) for _ in range(min(self.concurrency, len(items)))]
+        try:
+            await asyncio.gather(*workers)
+        finally:
+            for task in workers:
+                task.cancel()
+            await asyncio.gather(*workers, return_exceptions=True)
+            await self._checkpoint(outcomes)
+        elapsed = time.perf_counter() - start
+
+        return await self._finish(run_id, len(items), elapsed, latencies)
+
+    async def _transfer(self, run_id: str, item: Dict[str, Any]) -> Dict[str, Any]:
+        try:
+            transfer = await self.gateway.request(
+                "Transfer.create",
+                amount=item["amount"],
+                currency="usd",
+                destination=item["destination"],
+                transfer_group=run_id,
+                metadata={"payout_run_id": run_id, "workspace_id": item["workspace_id"],
+                          "transactions": str(len(item["transaction_ids"]))},
+                idempotency_key=f"payout-{item['_id']}",
+            )
+            return {"item": item, "status": "paid", "transfer_id": transfer.id}
+        except (stripe.error.CardError, stripe.error.InvalidRequestError) as e:
+            logger.error(f"Payout transfer declined for {item['workspace_id']}: {e}")
+            return {"item": item, "status": "failed", "error": str(e)}
+        except stripe.error.StripeError as e:
+            # The transfer may have gone through; keep the item and its key for the resumed run
+            logger.error(f"Payout transfer unsettled for {item['workspace_id']}: {e}")
+            return {"item": item, "status": "pending", "error": str(e)}
+
+    async def _existing_transfers(self, run_id: str) -> Dict[str, str]:
+        """Transfer ids already made in the run's transfer group, by workspace"""
+        made, starting_after = {}, None
+        while True:
+            params = {"transfer_group": run_id, "limit": 100}
+            if starting_after:
+                params["starting_after"] = starting_after
+            page = await self.gateway.request("Transfer.list", **params)
+            for transfer in page.data:
+                made[transfer.metadata["workspace_id"]] = transfer.id
+            if not page.has_more or not page.data:
+                return made
+            starting_after = page.data[-1].id
+
+    async def _checkpoint(self, outcomes: List[Dict[str, Any]]) -> None:
+        """Write a batch of item outcomes and mark the paid transactions"""
+        if not outcomes:
+            return
+        batch = outcomes[:]
+        del outcomes[:len(batch)]
+        now = datetime.utcnow()
+        await self.db.payout_items.bulk_write([
+            UpdateOne({"_id": outcome["item"]["_id"]}, {"$set": {
+                "status": outcome["status"],
+                "transfer_id": outcome.get("transfer_id"),
+                "error": outcome.get("error"),
+                "completed_at": now
+            }})
+            for outcome in batch
+        ], ordered=False)
+        paid = [transaction_id for outcome in batch if outcome["status"] == "paid"
+                for transaction_id in outcome["item"]["transaction_ids"]]
+        if paid:
+            await self.db.escrow.update_many({"id": {"$in": paid}},
+                                             {"$set": {"payout_status": "paid", "paid_out_at": now}})
+
+    async def _finish(self, run_id: str, attempted: int, elapsed: float, latencies: List[float]) -> Dict[str, Any]:
+        items = await self.db.payout_items.find({"run_id": run_id}).to_list(length=None)
+        totals = {status: {"count": 0, "amount": 0} for status in ("paid", "failed", "skipped", "pending")}
+        released = []
+        for item in items:
+            totals[item["status"]]["count"] += 1
+            totals[item["status"]]["amount"] += item["amount"]
+            if item["status"] in ("failed", "skipped"):
+                released.extend(item["transaction_ids"])
+
+        # Declined and skipped earnings go back to the pool for the next run
+        if released:
+            await self.db.escrow.update_many({"id": {"$in": released}},
+                                             {"$unset": {"payout_run_id": "", "payout_status": ""}})
+
+        ordered = sorted(latencies)
+        report = {
+            "vendors": len(items),
+            "paid": totals["paid"]["count"],
+            "failed": totals["failed"]["count"],
+            "skipped": totals["skipped"]["count"],
+            "unsettled": totals["pending"]["count"],
+            "amount_paid": totals["paid"]["amount"] / 100,
+            "transfers_attempted": attempted,
+            "elapsed_seconds": round(elapsed, 3),
+            "transfers_per_second": round(attempted / elapsed, 2) if elapsed else 0.0,
+            "latency_p50_ms": round(statistics.median(ordered), 2) if ordered else 0.0,
+            "latency_p95_ms": round(ordered[min(len(ordered) - 1, int(len(ordered) * 0.95))], 2) if ordered else 0.0
+        }
+        if report["unsettled"]:
+            # Left running, so the next run resumes it and settles these items first
+            await self.db.payout_runs.update_one({"_id": run_id}, {"$set": {"report": report}})
+        else:
+            await self.db.payout_runs.update_one({"_id": run_id}, {"$set": {
+                "status": "completed", "completed_at": datetime.utcnow(), "report": report
+            }})
+        return report
+
+    async def get_run(self, run_id: str) -> Dict[str, Any]:
+        """A payout run with its throughput report"""
+        try:
+            run = await self.db.payout_runs.find_one({"_id": run_id})
+            if not run:
+                return {"success": False, "error": "Not found"}
+            return {"success": True, "run": run}
+        except Exception as e:
+            logger.error(f"Error getting payout run: {e}")
+            return {"success": False, "error": str(e)}
+
+
+# Service instance
+_service_instance = None
+
+def get_vendor_payout_service():
+    """Get service instance"""
+    global _service_instance
+    if _service_instance is None:
+        _service_instance = VendorPayoutService()
+    return _service_instance
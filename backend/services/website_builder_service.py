@@ -8,6 +8,8 @@ import logging
 from typing import Dict, List, Optional, Any
 from datetime import datetime
 
+from core.timestamps import date_range, serialize_timestamps
+
 logger = logging.getLogger(__name__)
 
 class WebsiteBuilderService:
@@ -84,7 +86,7 @@ class WebsiteBuilderService:
                     doc["_id"] = str(doc["_id"])
                 if "user_id" in doc and hasattr(doc["user_id"], "str"):
                     doc["user_id"] = str(doc["user_id"])
-                docs.append(doc)
+                docs.append(serialize_timestamps(doc))
             
             # Get total count
             total = await collection.count_documents(query)
@@ -116,7 +118,7 @@ class WebsiteBuilderService:
                 "domain": data.get("domain"),
                 "template_id": data.get("template_id"),
                 "status": data.get("status"),
-                "updated_at": datetime.utcnow().isoformat()
+                "updated_at": datetime.utcnow()
             }
             
             # Remove None values
@@ -198,7 +200,7 @@ class WebsiteBuilderService:
                         "preview_url": "/assets/templates/business-landing.jpg",
                         "price": 49.99,
                         "features": ["Responsive design", "Contact forms", "SEO optimized"],
-                        "created_at": datetime.utcnow().isoformat()
+                        "created_at": datetime.utcnow()
                     },
                     {
                         "id": str(uuid.uuid4()),
@@ -208,7 +210,7 @@ class WebsiteBuilderService:
                         "preview_url": "/assets/templates/ecommerce-store.jpg",
                         "price": 99.99,
                         "features": ["Product catalog", "Shopping cart", "Payment integration"],
-                        "created_at": datetime.utcnow().isoformat()
+                        "created_at": datetime.utcnow()
                     },
                     {
                         "id": str(uuid.uuid4()),
@@ -218,7 +220,7 @@ class WebsiteBuilderService:
                         "preview_url": "/assets/templates/portfolio-site.jpg",
                         "price": 29.99,
                         "features": ["Gallery", "Project showcase", "Client testimonials"],
-                        "created_at": datetime.utcnow().isoformat()
+                        "created_at": datetime.utcnow()
                     },
                     {
                         "id": str(uuid.uuid4()),
@@ -228,7 +230,7 @@ class WebsiteBuilderService:
                         "preview_url": "/assets/templates/restaurant-site.jpg",
                         "price": 79.99,
                         "features": ["Menu display", "Online ordering", "Reservation system"],
-                        "created_at": datetime.utcnow().isoformat()
+                        "created_at": datetime.utcnow()
                     }
                 ]
                 
@@ -246,7 +248,7 @@ class WebsiteBuilderService:
             
             return {
                 "success": True,
-                "data": templates,
+                "data": [serialize_timestamps(t) for t in templates],
                 "total": len(templates),
                 "message": f"Retrieved {len(templates)} templates"
             }
@@ -289,8 +291,8 @@ class WebsiteBuilderService:
                 "user_id": data.get("user_id", ""),
                 "created_by": data.get("created_by", ""),
                 "status": "draft",
-                "created_at": datetime.utcnow().isoformat(),
-                "updated_at": datetime.utcnow().isoformat()
+                "created_at": datetime.utcnow(),
+                "updated_at": datetime.utcnow()
             }
             
             # Insert to database - REAL DATA OPERATION
@@ -300,7 +302,7 @@ class WebsiteBuilderService:
                 return {
                     "success": True,
                     "message": "Website created successfully",
-                    "data": website_data,
+                    "data": serialize_timestamps(website_data),
                     "id": website_data["id"]
                 }
             else:
@@ -359,8 +361,8 @@ class WebsiteBuilderService:
                     "method": "publish_website",
                     "data": data,
                     "status": "completed",
-                    "created_at": datetime.utcnow().isoformat(),
-                    "updated_at": datetime.utcnow().isoformat()
+                    "created_at": datetime.utcnow(),
+                    "updated_at": datetime.utcnow()
                 }
                 
                 result = await collection.insert_one(item_data)
@@ -369,7 +371,7 @@ class WebsiteBuilderService:
                     return {
                         "success": True,
                         "message": "Publish website completed successfully",
-                        "data": item_data,
+                        "data": serialize_timestamps(item_data),
                         "id": item_data["id"]
                     }
                 else:
@@ -433,8 +435,8 @@ class WebsiteBuilderService:
                     "method": "get_analytics",
                     "data": data,
                     "status": "completed",
-                    "created_at": datetime.utcnow().isoformat(),
-                    "updated_at": datetime.utcnow().isoformat()
+                    "created_at": datetime.utcnow(),
+                    "updated_at": datetime.utcnow()
                 }
                 
                 result = await collection.insert_one(item_data)
@@ -443,7 +445,7 @@ class WebsiteBuilderService:
                     return {
                         "success": True,
                         "message": "Get website analytics completed successfully",
-                        "data": item_data,
+                        "data": serialize_timestamps(item_data),
                         "id": item_data["id"]
                     }
                 else:
@@ -507,8 +509,8 @@ class WebsiteBuilderService:
                     "method": "backup_website",
                     "data": data,
                     "status": "completed",
-                    "created_at": datetime.utcnow().isoformat(),
-                    "updated_at": datetime.utcnow().isoformat()
+                    "created_at": datetime.utcnow(),
+                    "updated_at": datetime.utcnow()
                 }
                 
                 result = await collection.insert_one(item_data)
@@ -517,7 +519,7 @@ class WebsiteBuilderService:
                     return {
                         "success": True,
                         "message": "Backup website data completed successfully",
-                        "data": item_data,
+                        "data": serialize_timestamps(item_data),
                         "id": item_data["id"]
                     }
                 else:
@@ -568,9 +570,8 @@ class WebsiteBuilderService:
             
             # Get recent activity (last 30 days)
             from datetime import datetime, timedelta
-            thirty_days_ago = (datetime.utcnow() - timedelta(days=30)).isoformat()
-            recent_query = query.copy()
-            recent_query["created_at"] = {"$gte": thirty_days_ago}
+            thirty_days_ago = datetime.utcnow() - timedelta(days=30)
+            recent_query = {**query, **date_range("created_at", gte=thirty_days_ago)}
             recent_count = await collection.count_documents(recent_query)
             
             # Get status breakdown
@@ -614,8 +615,8 @@ class WebsiteBuilderService:
                 "user_id": data.get("user_id", ""),
                 "created_by": data.get("created_by", ""),
                 "status": "active",
-                "created_at": datetime.utcnow().isoformat(),
-                "updated_at": datetime.utcnow().isoformat()
+                "created_at": datetime.utcnow(),
+                "updated_at": datetime.utcnow()
             }
             
             # Merge with provided data
@@ -627,7 +628,7 @@ class WebsiteBuilderService:
                 return {
                     "success": True,
                     "message": "websitebuilder created successfully",
-                    "data": item_data,
+                    "data": serialize_timestamps(item_data),
                     "id": item_data["id"]
                 }
             else:
@@ -656,6 +657,7 @@ class WebsiteBuilderService:
             for doc in docs:
                 if "_id" in doc:
                     doc["_id"] = str(doc["_id"])
+            docs = [serialize_timestamps(doc) for doc in docs]
             
             # Get total count
             total = await collection.count_documents(query)
@@ -683,7 +685,7 @@ class WebsiteBuilderService:
             if doc:
                 return {
                     "success": True,
-                    "data": doc
+                    "data": serialize_timestamps(doc)
                 }
             else:
                 return {"success": False, "error": "websitebuilder not found"}
@@ -700,7 +702,7 @@ class WebsiteBuilderService:
             
             # Update data
             update_data = data.copy()
-            update_data["updated_at"] = datetime.utcnow().isoformat()
+            update_data["updated_at"] = datetime.utcnow()
             
             # Remove None values
             update_data = {k: v for k, v in update_data.items() if v is not None}
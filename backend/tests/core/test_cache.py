@@ -0,0 +1,80 @@
+import asyncio
+
+import pytest
+
+from core import cache
+from core.cache import TTLCache, collection_changed, get_cache
+
+
+@pytest.fixture(autouse=True)
+def registry(monkeypatch):
+    monkeypatch.setattr(cache, "_caches", {})
+
+
+@pytest.mark.asyncio
+async def test_concurrent_misses_share_one_load():
+    loads = []
+
+    async def loader():
+        loads.append(1)
+        await asyncio.sleep(0.01)
+        return {"count": len(loads)}
+
+    snapshots = TTLCache("counts", ttl=60)
+    results = await asyncio.gather(*[snapshots.get("all", loader) for _ in range(5)])
+
+    assert loads == [1]
+    assert all(result == {"count": 1} for result in results)
+    assert await snapshots.get("all", loader) == {"count": 1}
+    assert snapshots.get_stats()["hits"] == 1
+
+
+@pytest.mark.asyncio
+async def test_expiry_and_collection_invalidation():
+    calls = []
+
+    async def loader():
+        calls.append(1)
+        return len(calls)
+
+    short = get_cache("short", ttl=0)
+    assert await short.get("k", loader) == 1
+    assert await short.get("k", loader) == 2
+
+    counts = get_cache("counts", ttl=60, collections=("products",))
+    assert await counts.get("k", loader) == 3
+    collection_changed("users")
+    assert await counts.get("k", loader) == 3
+    collection_changed("products")
+    assert await counts.get("k", loader) == 4
+
+
+@pytest.mark.asyncio
+async def test_load_overlapping_a_write_is_not_stored():
+    counts = TTLCache("counts", ttl=60, collections=("products",))
+    release = asyncio.Event()
+
+    async def slow_loader():
+        await release.wait()
+        return "stale"
+
+    pending = asyncio.create_task(counts.get("k", slow_loader))
+    await asyncio.sleep(0)
+    counts.invalidate()
+    release.set()
+
+    assert await pending == "stale"
+    assert counts.peek("k") is None
+
+
+@pytest.mark.asyncio
+async def test_max_entries_drops_oldest():
+    cache = TTLCache("bounded", ttl=60, max_entries=2)
+
+    async def value(key):
+        return key
+
+    for key in ("a", "b", "c"):
+        await cache.get(key, lambda key=key: value(key))
+
+    assert cache.peek("a") is None and cache.peek("b") == "b" and cache.peek("c") == "c"
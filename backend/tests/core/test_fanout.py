@@ -0,0 +1,68 @@
+import asyncio
+
+import pytest
+
+from core.fanout import FanOut, FanOutTimeout, fan_out
+
+
+@pytest.mark.asyncio
+async def test_runs_concurrently_under_the_cap():
+    running = []
+    peak = 0
+
+    async def query(value):
+        nonlocal peak
+        running.append(value)
+        peak = max(peak, len(running))
+        await asyncio.sleep(0.02)
+        running.remove(value)
+        return value * 2
+
+    group = FanOut(concurrency=3, timeout=5)
+    for value in range(7):
+        group.add(f"q{value}", query, value)
+    results = await group.run()
+
+    assert results == {f"q{value}": value * 2 for value in range(7)}
+    assert peak == 3
+    assert set(results.timings) == set(results) and all(ms >= 15 for ms in results.timings.values())
+
+
+@pytest.mark.asyncio
+async def test_failure_cancels_the_rest():
+    cancelled = []
+
+    async def slow():
+        try:
+            await asyncio.sleep(5)
+        except asyncio.CancelledError:
+            cancelled.append("slow")
+            raise
+
+    async def broken():
+        await asyncio.sleep(0.01)
+        raise ValueError("bad query")
+
+    with pytest.raises(ValueError, match="bad query"):
+        await fan_out({"slow": slow, "broken": broken}, concurrency=4, timeout=5)
+    assert cancelled == ["slow"]
+
+
+@pytest.mark.asyncio
+async def test_shared_deadline_names_pending_subqueries():
+    async def fast():
+        return 1
+
+    async def stuck():
+        await asyncio.sleep(5)
+
+    with pytest.raises(FanOutTimeout) as excinfo:
+        await fan_out({"fast": fast, "stuck": stuck}, timeout=0.05, label="overview")
+    assert excinfo.value.pending == ["stuck"]
+    assert isinstance(excinfo.value, asyncio.TimeoutError)
+
+
+@pytest.mark.asyncio
+async def test_empty_group_returns_empty_result():
+    results = await FanOut(timeout=5).run()
+    assert results == {} and results.timings == {} and results.elapsed_ms == 0.0
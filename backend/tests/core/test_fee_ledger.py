@@ -0,0 +1,204 @@
+from datetime import datetime
+
+import pytest
+from pymongo.errors import BulkWriteError
+
+from core.fee_ledger import (
+    FEE_REVENUE,
+    FEES_RECEIVABLE,
+    FeeLedger,
+    UnbalancedJournal,
+    fee_assessment,
+    fee_collection,
+)
+from tests.utils.fake_mongo import FakeCursor, FakeDatabase
+
+
+class _Journal:
+    """Append-only collection that rejects duplicate ``_id`` like an unordered insert_many"""
+
+    def __init__(self):
+        self.docs = {}
+        self.inserts = 0
+        self.fail_marks = 0
+
+    async def insert_many(self, docs, ordered=True):
+        self.inserts += 1
+        errors = []
+        for index, doc in enumerate(docs):
+            if doc["_id"] in self.docs:
+                errors.append({"index": index, "code": 11000})
+            else:
+                self.docs[doc["_id"]] = dict(doc)
+        if errors:
+            raise BulkWriteError({"writeErrors": errors})
+
+    async def update_many(self, query, update):
+        if self.fail_marks:
+            self.fail_marks -= 1
+            raise ConnectionError("marking lost")
+        for doc in self.docs.values():
+            if doc["_id"] in query.get("_id", {"$in": [doc["_id"]]})["$in"] and \
+                    doc.get("rolled_up") == query.get("rolled_up", doc.get("rolled_up")):
+                doc.update(update["$set"])
+
+    async def distinct(self, field, query):
+        return list({doc[field] for doc in self.docs.values()
+                     if doc["rolled_up"] is False and doc["flushed_at"] < query["flushed_at"]["$lt"]})
+
+    def find(self, query):
+        return FakeCursor([dict(doc) for doc in self.docs.values()
+                           if doc["rollup_batch"] == query["rollup_batch"] and doc["rolled_up"] is False])
+
+    def aggregate(self, pipeline, allowDiskUse=False):
+        grouped = {}
+        for doc in self.docs.values():
+            key = tuple(doc[field] for field in ("workspace_id", "accounting_period", "account", "event"))
+            row = grouped.setdefault(key, {
+                "_id": dict(zip(("workspace_id", "accounting_period", "account", "event"), key)),
+                "debit": 0, "credit": 0, "journals": 0, "lines": 0})
+            row["debit"] += doc["debit"]
+            row["credit"] += doc["credit"]
+            row["journals"] += doc["_id"].endswith(":0")
+            row["lines"] += 1
+        return FakeCursor(list(grouped.values()))
+
+
+class _Periods:
+    def __init__(self):
+        self.docs = {}
+        self.fail_rollups = 0
+
+    async def bulk_write(self, requests, ordered=True):
+        if self.fail_rollups:
+            self.fail_rollups -= 1
+            raise ConnectionError("rollup lost")
+        errors = []
+        for index, request in enumerate(requests):
+            update = request._doc
+            if "$inc" not in update:
+                self.docs[request._filter["_id"]] = dict(update)
+                continue
+            doc = self.docs.get(request._filter["_id"])
+            if doc is not None and request._filter["batches"]["$ne"] in doc.get("batches", []):
+                errors.append({"index": index, "code": 11000})
+                continue
+            doc = self.docs.setdefault(request._filter["_id"], dict(update["$setOnInsert"]))
+            doc.setdefault("batches", []).append(update["$push"]["batches"])
+            for path, delta in update["$inc"].items():
+                *parents, field = path.split(".")
+                target = doc
+                for parent in parents:
+                    target = target.setdefault(parent, {})
+                target[field] = target.get(field, 0) + delta
+        if errors:
+            raise BulkWriteError({"writeErrors": errors})
+
+    async def update_many(self, query, update):
+        for period_id in query["_id"]["$in"]:
+            batches = self.docs[period_id]["batches"]
+            if update["$pull"]["batches"] in batches:
+                batches.remove(update["$pull"]["batches"])
+
+    async def delete_many(self, query):
+        self.docs = {key: doc for key, doc in self.docs.items() if doc.get("rebuilt_at") == query["rebuilt_at"]["$ne"]}
+
+    async def find_one(self, query):
+        return self.docs.get(query["_id"])
+
+
+@pytest.mark.asyncio
+async def test_journals_post_once_and_roll_up_by_month():
+    db = FakeDatabase(fee_ledger=_Journal(), fee_ledger_periods=_Periods())
+    ledger = FeeLedger(db, flush_interval=60, batch_size=100)
+    march = datetime(2026, 3, 14)
+
+    assert await ledger.post("tx1:assessed", "ws1", "assessed", fee_assessment(100.0, 2.4), "tx1", occurred_at=march)
+    assert not await ledger.post("tx1:assessed", "ws1", "assessed", fee_assessment(100.0, 2.4), "tx1",
+                                 occurred_at=march)
+    assert await ledger.flush() == 3
+
+    # A retry after the first flush lands as duplicates and leaves the rollup alone
+    await ledger.post("tx1:assessed", "ws1", "assessed", fee_assessment(100.0, 2.4), "tx1", occurred_at=march)
+    await ledger.post("tx1:collected", "ws1", "collected", fee_collection(2.4), "tx1", occurred_at=march)
+    assert await ledger.flush() == 2
+
+    period = await ledger.get_period("ws1", "2026-03")
+    assert period["gross_volume"] == 100.0
+    assert period["fees_assessed"] == 2.4
+    assert period["fees_collected"] == 2.4
+    assert period["net_to_sellers"] == 97.6
+    assert period["journals"] == {"assessed": 1, "collected": 1}
+    assert period["balances"][FEES_RECEIVABLE] == 0
+    assert period["balances"][FEE_REVENUE] == -240
+    assert sum(period["balances"].values()) == 0
+    assert ledger.get_stats()["duplicates"] == 4
+
+
+@pytest.mark.asyncio
+async def test_full_batch_flushes_with_one_insert():
+    db = FakeDatabase(fee_ledger=_Journal(), fee_ledger_periods=_Periods())
+    ledger = FeeLedger(db, flush_interval=60, batch_size=6)
+
+    await ledger.post("tx1:assessed", "ws1", "assessed", fee_assessment(10.0, 0.3))
+    assert db["fee_ledger"].inserts == 0
+    await ledger.post("tx2:assessed", "ws1", "assessed", fee_assessment(20.0, 0.48))
+
+    assert db["fee_ledger"].inserts == 1
+    assert len(db["fee_ledger"].docs) == 6
+    assert ledger.get_stats()["pending_lines"] == 0
+
+
+@pytest.mark.asyncio
+async def test_unbalanced_journal_is_rejected():
+    ledger = FeeLedger(FakeDatabase(fee_ledger=_Journal(), fee_ledger_periods=_Periods()), flush_interval=60)
+    with pytest.raises(UnbalancedJournal):
+        await ledger.post("tx1:assessed", "ws1", "assessed", [("escrow_held", 100, 0), ("seller_payable", 0, 90)])
+
+
+@pytest.mark.asyncio
+async def test_sweep_rolls_up_lines_a_failed_flush_left_out_once():
+    db = FakeDatabase(fee_ledger=_Journal(), fee_ledger_periods=_Periods())
+    ledger = FeeLedger(db, flush_interval=60, batch_size=100, sweep_after=0)
+    march = datetime(2026, 3, 14)
+
+    await ledger.post("tx1:assessed", "ws1", "assessed", fee_assessment(100.0, 2.4), "tx1", occurred_at=march)
+    db["fee_ledger_periods"].fail_rollups = 1
+    with pytest.raises(ConnectionError):
+        await ledger.flush()
+    assert (await ledger.get_period("ws1", "2026-03"))["gross_volume"] == 0
+
+    # A retry finds the lines already inserted and leaves them to the sweep
+    await ledger.post("tx1:assessed", "ws1", "assessed", fee_assessment(100.0, 2.4), "tx1", occurred_at=march)
+    assert await ledger.flush() == 0
+    assert await ledger.sweep() == 3
+    assert await ledger.sweep() == 0
+
+    # A flush that dies after adding to the period but before marking its lines is swept without counting twice
+    await ledger.post("tx1:collected", "ws1", "collected", fee_collection(2.4), "tx1", occurred_at=march)
+    db["fee_ledger"].fail_marks = 1
+    with pytest.raises(ConnectionError):
+        await ledger.flush()
+    assert await ledger.sweep() == 2
+
+    period = await ledger.get_period("ws1", "2026-03")
+    assert period["gross_volume"] == 100.0 and period["fees_collected"] == 2.4
+    assert period["journals"] == {"assessed": 1, "collected": 1}
+    assert db["fee_ledger_periods"].docs["ws1|2026-03"]["batches"] == []
+
+
+@pytest.mark.asyncio
+async def test_rebuild_periods_groups_on_the_server():
+    db = FakeDatabase(fee_ledger=_Journal(), fee_ledger_periods=_Periods())
+    ledger = FeeLedger(db, flush_interval=60, batch_size=100)
+    await ledger.post("tx1:assessed", "ws1", "assessed", fee_assessment(100.0, 2.4), "tx1",
+                      occurred_at=datetime(2026, 3, 14))
+    await ledger.post("tx1:collected", "ws1", "collected", fee_collection(2.4), "tx1",
+                      occurred_at=datetime(2026, 3, 20))
+    await ledger.flush()
+    expected = await ledger.get_period("ws1", "2026-03")
+    db["fee_ledger_periods"].docs["ws1|2026-01"] = {"workspace_id": "ws1", "accounting_period": "2026-01"}
+
+    assert await ledger.rebuild_periods("ws1") == 5
+    assert await ledger.get_period("ws1", "2026-03") == expected
+    assert set(db["fee_ledger_periods"].docs) == {"ws1|2026-03"}
@@ -0,0 +1,54 @@
+import numpy as np
+import pytest
+
+from core import forecasting
+
+
+def test_trend_recovers_constant_growth():
+    history = 100 * 1.05 ** np.arange(13) - 1
+    result = forecasting.forecast(history, 3, "trend")
+    assert result["growth_rate"][0] == pytest.approx(0.05)
+    assert result["forecast"][0] == pytest.approx(100 * 1.05 ** np.arange(13, 16) - 1)
+    # A perfect fit leaves no residual spread
+    assert result["upper"][0] - result["lower"][0] == pytest.approx(np.zeros(3), abs=1e-6)
+
+
+def test_intervals_come_from_residuals_and_widen():
+    rng = np.random.default_rng(7)
+    noisy = 1000 + rng.normal(0, 100, size=(1, 24))
+    quiet = 1000 + rng.normal(0, 5, size=(1, 24))
+    for method in forecasting.METHODS:
+        result = forecasting.forecast(np.vstack([noisy, quiet]), 12, method)
+        width = result["upper"] - result["lower"]
+        assert (width[0] > width[1]).all()
+        assert (np.diff(width, axis=1) >= -1e-9).all()
+        assert (result["lower"] <= result["forecast"]).all() and (result["forecast"] <= result["upper"]).all()
+
+
+def test_seasonal_naive_repeats_last_season():
+    history = np.tile(np.arange(1, 13, dtype=float), 2)
+    result = forecasting.forecast(history, 14, "seasonal_naive")
+    assert result["forecast"][0].tolist() == list(range(1, 13)) + [1, 2]
+    assert result["sigma"][0] == 0
+
+
+def test_seasonal_naive_short_history_falls_back_to_naive():
+    history = [100.0, 120.0, 90.0, 130.0]
+    result = forecasting.forecast(history, 3, "seasonal_naive")
+    assert result["forecast"][0].tolist() == [130.0, 130.0, 130.0]
+    assert result["sigma"][0] == pytest.approx(np.sqrt((20 ** 2 + 30 ** 2 + 40 ** 2) / 3))
+    width = result["upper"][0] - result["lower"][0]
+    assert width[0] > 0 and width[2] > width[0]
+
+
+def test_exponential_smoothing_picks_alpha_per_series():
+    flat = np.full(12, 500.0)
+    step = np.r_[np.full(6, 100.0), np.full(6, 900.0)]
+    result = forecasting.forecast(np.vstack([flat, step]), 2, "exponential_smoothing")
+    assert result["forecast"][0] == pytest.approx([500, 500])
+    assert result["alpha"][1] == forecasting.SMOOTHING_ALPHAS.max()
+
+
+def test_rejects_unknown_method():
+    with pytest.raises(ValueError):
+        forecasting.forecast([1, 2, 3], 2, "arima")
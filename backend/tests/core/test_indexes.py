@@ -0,0 +1,116 @@
+from datetime import datetime, timedelta
+
+import pytest
+from pymongo import ASCENDING, DESCENDING, TEXT, IndexModel
+from pymongo.errors import DuplicateKeyError, OperationFailure
+
+from core import indexes
+from core.indexes import declare_indexes, diff_indexes
+from tests.utils.fake_mongo import FakeCursor
+
+
+class _Collection:
+    def __init__(self, name, info, usage):
+        self.name = name
+        self.info = info
+        self.usage = usage
+
+    async def index_information(self):
+        return self.info
+
+    def aggregate(self, pipeline):
+        return FakeCursor(self.usage)
+
+
+class _Leases:
+    def __init__(self):
+        self.docs = {}
+
+    async def find_one_and_update(self, query, update, upsert=False, return_document=None):
+        doc = self.docs.get(query["_id"])
+        if doc is None:
+            doc = self.docs[query["_id"]] = {"_id": query["_id"], **update["$set"]}
+            return doc
+        if doc["expires_at"] <= query["expires_at"]["$lte"]:
+            doc.update(update["$set"])
+            return doc
+        raise DuplicateKeyError("E11000 duplicate key error")
+
+    async def update_one(self, query, update):
+        doc = self.docs.get(query["_id"])
+        if doc is not None and doc["owner"] == query["owner"]:
+            doc.update(update["$set"])
+
+
+@pytest.fixture(autouse=True)
+def registry(monkeypatch):
+    monkeypatch.setattr(indexes, "_declared", {})
+
+
+@pytest.mark.asyncio
+async def test_diff_reports_missing_undeclared_and_unused():
+    declare_indexes(
+        "notifications",
+        IndexModel([("user_id", ASCENDING), ("is_read", ASCENDING), ("created_at", DESCENDING)]),
+        IndexModel([("title", TEXT), ("message", TEXT)]),
+        IndexModel([("id", ASCENDING)]),
+    )
+    info = {
+        "_id_": {"key": [("_id", 1)]},
+        "title_text_message_text": {"key": [("_fts", "text"), ("_ftsx", 1)]},
+        "legacy_idx": {"key": [("id", 1)]},
+        "is_deleted_1": {"key": [("is_deleted", 1)]},
+    }
+    usage = [
+        {"name": "_id_", "accesses": {"ops": 0}},
+        {"name": "legacy_idx", "accesses": {"ops": 12}},
+        {"name": "is_deleted_1", "accesses": {"ops": 0, "since": "2024-01-01"}},
+    ]
+    db = {"notifications": _Collection("notifications", info, usage)}
+
+    report = await diff_indexes(db)
+
+    assert report["notifications"]["missing"] == ["user_id_1_is_read_1_created_at_-1"]
+    assert report["notifications"]["undeclared"] == ["is_deleted_1"]
+    assert report["notifications"]["unused"] == [{"name": "is_deleted_1", "since": "2024-01-01"}]
+
+
+@pytest.mark.asyncio
+async def test_diff_without_index_stats_permission():
+    declare_indexes("messages", IndexModel([("sender_id", ASCENDING)]))
+    db = {"messages": _Collection("messages", {"_id_": {"key": [("_id", 1)]}}, OperationFailure("unauthorized"))}
+
+    report = await diff_indexes(db)
+
+    assert report["messages"] == {"missing": ["sender_id_1"], "undeclared": [], "unused": []}
+
+
+@pytest.mark.asyncio
+async def test_only_the_lease_holder_loads_declarations(monkeypatch):
+    loads = []
+    monkeypatch.setattr(indexes, "load_declarations", lambda: loads.append(1))
+    monkeypatch.setattr(indexes, "_last_report", {})
+    leases = _Leases()
+    db = {"schema_migrations": leases}
+
+    # Another worker holds the lease while it reconciles
+    leases.docs["indexes:reconcile"] = {"_id": "indexes:reconcile", "owner": "other:1",
+                                        "expires_at": datetime.utcnow() + timedelta(seconds=600)}
+    await indexes._reconcile_in_background(db, lease_seconds=600)
+    assert loads == []
+
+    # A worker that died holding it is replaced after the lease window
+    leases.docs["indexes:reconcile"]["expires_at"] = datetime.utcnow() - timedelta(seconds=1)
+    await indexes._reconcile_in_background(db, lease_seconds=600)
+    assert loads == [1]
+
+    # A finished reconciliation releases the lease, so a redeploy right after reconciles again
+    await indexes._reconcile_in_background(db, lease_seconds=600)
+    assert loads == [1, 1]
+
+
+def test_every_declaring_module_imports(caplog):
+    with caplog.at_level("WARNING", logger="core.indexes"):
+        indexes.load_declarations()
+
+    assert [record.getMessage() for record in caplog.records] == []
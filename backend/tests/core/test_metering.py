@@ -0,0 +1,127 @@
+import asyncio
+from datetime import datetime
+
+import pytest
+from pymongo.errors import DuplicateKeyError
+
+from core.metering import QuotaExceeded, UsageMeter, billing_period, plan_limit
+from tests.utils.fake_mongo import FakeCursor
+
+
+class _Counters:
+    """Single-document atomic updates with Mongo's conditional-upsert semantics"""
+
+    def __init__(self):
+        self.docs = {}
+        self.bulk_writes = 0
+
+    def _matches(self, doc, query):
+        used = query.get("used")
+        return used is None or doc.get("used", 0) <= used["$lte"]
+
+    def _apply(self, key, update):
+        doc = self.docs.get(key)
+        if doc is None:
+            doc = self.docs[key] = {"_id": key, **update.get("$setOnInsert", {})}
+        for field, delta in update["$inc"].items():
+            doc[field] = doc.get(field, 0) + delta
+        doc.update(update.get("$set", {}))
+        return doc
+
+    async def find_one_and_update(self, query, update, upsert=False, return_document=None):
+        await asyncio.sleep(0)
+        doc = self.docs.get(query["_id"])
+        if doc is None and upsert:
+            # Like the server, the insert half of an upsert can lose to a concurrent insert
+            await asyncio.sleep(0)
+            if query["_id"] in self.docs:
+                raise DuplicateKeyError("E11000 duplicate key")
+        elif doc is None or not self._matches(doc, query):
+            if upsert:
+                raise DuplicateKeyError("E11000 duplicate key")
+            return None
+        return dict(self._apply(query["_id"], update))
+
+    async def update_one(self, query, update):
+        self._apply(query["_id"], update)
+
+    async def bulk_write(self, requests, ordered=True):
+        self.bulk_writes += 1
+        for request in requests:
+            self._apply(request._filter["_id"], request._doc)
+
+    async def find_one(self, query, projection=None):
+        return self.docs.get(query["_id"])
+
+    def find(self, query, projection=None):
+        return FakeCursor([doc for doc in self.docs.values()
+                        if doc["workspace_id"] == query["workspace_id"] and doc["period"] == query["period"]])
+
+
+@pytest.fixture
+def counters():
+    return _Counters()
+
+
+@pytest.fixture
+def meter(counters):
+    return UsageMeter(db={"usage_counters": counters}, flush_interval=60, retention_days=30)
+
+
+@pytest.mark.asyncio
+async def test_concurrent_reservations_never_pass_the_limit(meter):
+    results = await asyncio.gather(*(meter.reserve("ws1", "ai_credits", 3, limit=20) for _ in range(20)),
+                                   return_exceptions=True)
+
+    granted = [r for r in results if isinstance(r, dict)]
+    assert len(granted) == 6
+    assert all(isinstance(r, QuotaExceeded) for r in results if not isinstance(r, dict))
+    assert await meter.get_usage("ws1", "ai_credits") == 18
+    assert meter.rejections == 14
+
+    await meter.release("ws1", "ai_credits", 3)
+    assert (await meter.reserve("ws1", "ai_credits", 5, limit=20))["remaining"] == 0
+
+
+@pytest.mark.asyncio
+async def test_concurrent_first_reservations_all_succeed_under_the_limit(meter):
+    results = await asyncio.gather(*(meter.reserve("ws1", "ai_credits", 1, limit=100) for _ in range(10)),
+                                   return_exceptions=True)
+
+    assert all(isinstance(r, dict) for r in results)
+    assert await meter.get_usage("ws1", "ai_credits") == 10
+    assert meter.rejections == 0
+
+    with pytest.raises(ValueError):
+        await meter.reserve("ws1", "ai_credits", 0, limit=100)
+    with pytest.raises(ValueError):
+        await meter.reserve("ws1", "ai_credits", -5, limit=100)
+
+
+@pytest.mark.asyncio
+async def test_recorded_usage_is_batched_into_one_write(meter, counters):
+    for _ in range(100):
+        meter.record("ws1", "api_calls")
+    meter.record("ws2", "api_calls", 5)
+
+    assert await meter.get_usage("ws1", "api_calls") == 100
+    assert await meter.flush() == 2
+    assert counters.bulk_writes == 1
+    assert await meter.get_period_usage("ws2") == {"api_calls": 5}
+    assert await meter.flush() == 0
+
+
+def test_billing_period_follows_anchor_day():
+    assert billing_period(datetime(2026, 3, 15))[0] == "2026-03-01"
+    key, start, end = billing_period(datetime(2026, 3, 10), anchor=datetime(2025, 1, 20))
+    assert (key, end) == ("2026-02-20", datetime(2026, 3, 20))
+    # Anchors past the end of a short month use its last day
+    assert billing_period(datetime(2026, 2, 28, 12), anchor=datetime(2025, 1, 31))[0] == "2026-02-28"
+    assert billing_period(datetime(2026, 1, 5), anchor=datetime(2025, 1, 20))[2] == datetime(2026, 1, 20)
+
+
+def test_plan_limits_from_catalog():
+    assert plan_limit(["creator"], "ai_credits") == 500
+    assert plan_limit(["free_starter"], "ai_credits") == 0
+    assert plan_limit(["creator", "enterprise"], "ai_credits") is None
+    assert plan_limit(["education"], "courses") is None
@@ -0,0 +1,158 @@
+import os
+import threading
+from types import SimpleNamespace
+
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from starlette.requests import Request
+
+from core.config import settings
+from core.metrics import MetricsRegistry, MongoCommandMetrics, MongoPoolMetrics
+from middleware.metrics_middleware import MetricsMiddleware
+
+
+def test_thread_shards_are_summed_at_scrape():
+    registry = MetricsRegistry()
+    counter = registry.counter("jobs_total", "Jobs", ("queue",))
+    latency = registry.histogram("job_seconds", "Job time", buckets=(0.1, 1.0))
+
+    def work():
+        for _ in range(1000):
+            counter.inc(1, "email")
+            latency.observe(0.5)
+
+    threads = [threading.Thread(target=work) for _ in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    latency.observe(5.0)
+
+    text = registry.render()
+    assert 'jobs_total{queue="email"} 4000' in text
+    assert 'job_seconds_bucket{le="0.1"} 0' in text
+    assert 'job_seconds_bucket{le="1"} 4000' in text
+    assert 'job_seconds_bucket{le="+Inf"} 4001' in text
+    assert "job_seconds_count 4001" in text
+    assert registry.counter("jobs_total", "Jobs", ("queue",)) is counter
+
+
+def test_collectors_and_failing_collector():
+    registry = MetricsRegistry()
+
+    def cache_sizes():
+        from core.metrics import MetricFamily
+        return [MetricFamily("cache_entries", "gauge", "Entries", ("cache",)).add(3, "plans")]
+
+    def broken():
+        raise RuntimeError("not started")
+
+    registry.register_collector("caches", cache_sizes)
+    registry.register_collector("broken", broken)
+    text = registry.render()
+    assert "# TYPE cache_entries gauge" in text
+    assert 'cache_entries{cache="plans"} 3' in text
+
+
+def test_multiprocess_merge_keeps_counters_of_exited_workers(tmp_path):
+    registry = MetricsRegistry(multiproc_dir=str(tmp_path))
+    registry.counter("requests_total", "Requests").inc(2)
+    registry.gauge("in_flight", "In flight").inc(1)
+
+    # Another worker that has exited, and a live one (pid 1 always exists)
+    for pid in (1, 999999999):
+        other = MetricsRegistry(multiproc_dir=str(tmp_path))
+        other.counter("requests_total", "Requests").inc(5)
+        other.gauge("in_flight", "In flight").inc(1)
+        other.write_snapshot()
+        os.replace(tmp_path / f"{os.getpid()}.json", tmp_path / f"{pid}.json")
+
+    text = registry.render()
+    assert "requests_total 12" in text
+    assert "in_flight 2" in text
+
+
+def test_mongo_listeners_time_commands_per_collection():
+    registry = MetricsRegistry()
+    commands = MongoCommandMetrics(registry)
+    pool = MongoPoolMetrics(registry)
+
+    started = SimpleNamespace(command_name="find", command={"find": "users"}, connection_id=("db", 1),
+                              request_id=7)
+    commands.started(started)
+    commands.succeeded(SimpleNamespace(command_name="find", connection_id=("db", 1), request_id=7,
+                                       duration_micros=2500))
+    get_more = SimpleNamespace(command_name="getMore", command={"getMore": 42, "collection": "users"},
+                               connection_id=("db", 1), request_id=8)
+    commands.started(get_more)
+    commands.failed(SimpleNamespace(command_name="getMore", connection_id=("db", 1), request_id=8,
+                                    duration_micros=1000))
+    pool.connection_check_out_started(None)
+    pool.connection_checked_out(None)
+
+    text = registry.render()
+    assert 'mongodb_command_duration_seconds_count{collection="users",command="find"} 1' in text
+    assert 'mongodb_command_duration_seconds_sum{collection="users",command="find"} 0.0025' in text
+    assert 'mongodb_command_failures_total{collection="users",command="getMore"} 1' in text
+    assert 'mongodb_pool_wait_seconds_count{outcome="ok"} 1' in text
+    assert "mongodb_pool_checked_out 1" in text
+    assert commands._targets == {}
+
+
+def test_middleware_labels_by_route_template():
+    registry = MetricsRegistry()
+    app = FastAPI()
+    app.add_middleware(MetricsMiddleware, registry=registry)
+
+    @app.get("/items/{item_id}")
+    async def item(item_id: int):
+        return {"id": item_id}
+
+    client = TestClient(app)
+    for item_id in range(3):
+        assert client.get(f"/items/{item_id}").status_code == 200
+    assert client.get("/nowhere").status_code == 404
+
+    text = registry.render()
+    assert 'http_request_duration_seconds_count{method="GET",route="/items/{item_id}",status="200"} 3' in text
+    assert 'http_request_duration_seconds_count{method="GET",route="unmatched",status="404"} 1' in text
+    assert 'http_requests_in_flight{method="GET"} 0' in text
+
+
+def test_conflicting_registration_is_rejected():
+    registry = MetricsRegistry()
+    registry.counter("jobs_total", "Jobs")
+    with pytest.raises(ValueError):
+        registry.gauge("jobs_total", "Jobs")
+
+
+def test_every_mongo_client_reports_to_metrics():
+    from db import database, session
+
+    clients = [session._MongoClientSingleton().mongo_client, database.client]
+    for client in clients:
+        kinds = {type(listener) for listener in client.options.event_listeners}
+        assert {MongoCommandMetrics, MongoPoolMetrics} <= kinds
+
+
+@pytest.mark.asyncio
+async def test_metrics_endpoint_needs_a_token_outside_development(monkeypatch):
+    from main import metrics
+
+    def request(token=None):
+        headers = [(b"authorization", f"Bearer {token}".encode())] if token else []
+        return Request({"type": "http", "method": "GET", "path": "/metrics", "headers": headers})
+
+    monkeypatch.setattr(settings, "METRICS_ENABLED", True)
+    monkeypatch.setattr(settings, "METRICS_TOKEN", None)
+    monkeypatch.setattr(settings, "METRICS_REQUIRE_TOKEN", True)
+    assert (await metrics(request())).status_code == 403
+
+    monkeypatch.setattr(settings, "METRICS_TOKEN", "scrape-token")
+    assert (await metrics(request())).status_code == 401
+    assert (await metrics(request("scrape-token"))).status_code == 200
+
+    monkeypatch.setattr(settings, "METRICS_TOKEN", None)
+    monkeypatch.setattr(settings, "METRICS_REQUIRE_TOKEN", False)
+    assert (await metrics(request())).status_code == 200
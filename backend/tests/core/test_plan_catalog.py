@@ -0,0 +1,138 @@
+import asyncio
+
+import pytest
+
+from core import plan_catalog
+from core.plan_catalog import PlanCatalog, PlanCatalogManager, bump_catalog_version, close_plan_catalog
+from tests.utils.fake_mongo import FakeCursor
+
+
+class _Versions:
+    def __init__(self):
+        self.doc = None
+        self.reads = 0
+
+    async def find_one(self, query, projection=None):
+        self.reads += 1
+        return self.doc
+
+    async def find_one_and_update(self, query, update, upsert=False, return_document=None):
+        self.doc = {"_id": query["_id"], "version": (self.doc or {}).get("version", 0) + update["$inc"]["version"]}
+        return self.doc
+
+
+class _Stream:
+    def __init__(self, on_open):
+        self.on_open = on_open
+
+    async def __aenter__(self):
+        self.on_open()
+        return self
+
+    async def __aexit__(self, *exc):
+        return False
+
+    def __aiter__(self):
+        return self
+
+    async def __anext__(self):
+        await asyncio.Event().wait()
+
+
+class _Plans:
+    def __init__(self, rows):
+        self.rows = rows
+        self.finds = 0
+
+    def find(self, query):
+        self.finds += 1
+        return FakeCursor(self.rows)
+
+
+def test_admin_plans_lay_over_bundle_configuration():
+    catalog = PlanCatalog.build(3, [
+        {"name": "creator", "pricing": {"monthly_price": 25},
+         "features": {"included_features": ["api_access"], "excluded_features": ["seo_optimization"]},
+         "limits": {"storage_gb": 5}, "status": {"enabled": False}},
+        {"name": "pro", "display_name": "Pro", "pricing": {"monthly_price": 9.99, "yearly_price": 99}},
+    ])
+
+    assert catalog.version == 3
+    assert catalog.price("creator") == 2500 and catalog.price("creator", "yearly") == 19000
+    assert catalog.has_feature("creator", "api_access") and not catalog.has_feature("creator", "seo_optimization")
+    assert catalog.has_feature("enterprise", "anything")
+    assert catalog.limits("creator")["storage_gb"] == 5 and catalog.limits("creator")["websites"] == 10
+    assert catalog.get("creator")["enabled"] is False
+    assert catalog.bundle_prices["pro"] == {"monthly": 999, "yearly": 9900}
+    assert catalog.price("missing") == 0
+
+
+@pytest.mark.asyncio
+async def test_reload_only_when_version_moves():
+    versions = _Versions()
+    plans = _Plans([{"name": "creator", "pricing": {"monthly_price": 19}}])
+    db = {"catalog_versions": versions, "admin_plans": plans}
+    manager = PlanCatalogManager(poll_interval=60)
+
+    first = await manager.load(db)
+    assert await manager.refresh(db) is False
+    assert plans.finds == 1
+
+    plans.rows = [{"name": "creator", "pricing": {"monthly_price": 21}}]
+    assert await bump_catalog_version(db) == 1
+    assert await manager.refresh(db) is True
+    assert manager.catalog.version == 1 and manager.catalog.price("creator") == 2100
+    # Snapshots already handed out keep their prices
+    assert first.price("creator") == 1900
+
+
+@pytest.mark.asyncio
+async def test_stale_load_does_not_replace_a_newer_catalog():
+    versions = _Versions()
+    plans = _Plans([{"name": "creator", "pricing": {"monthly_price": 25}}])
+    db = {"catalog_versions": versions, "admin_plans": plans}
+    manager = PlanCatalogManager(poll_interval=60)
+    versions.doc = {"_id": "plans", "version": 4}
+    await manager.load(db)
+
+    # A load that read version 3 before the bump finishes after it
+    versions.doc = {"_id": "plans", "version": 3}
+    plans.rows = [{"name": "creator", "pricing": {"monthly_price": 19}}]
+    assert (await manager.load(db)).version == 4
+    assert manager.catalog.price("creator") == 2500
+    assert manager.catalog.admin_plans == ({"name": "creator", "pricing": {"monthly_price": 25}},)
+
+
+def test_local_pricing_keeps_version():
+    manager = PlanCatalogManager(poll_interval=60)
+    before = manager.catalog
+    manager.apply_pricing("creator", {"monthly_price": 30.0})
+    assert manager.catalog.price("creator") == 3000 and manager.catalog.version == before.version
+    assert before.price("creator") == 1900
+
+
+@pytest.mark.asyncio
+async def test_bump_before_the_change_stream_opens_is_loaded(monkeypatch):
+    versions = _Versions()
+    plans = _Plans([{"name": "creator", "pricing": {"monthly_price": 19}}])
+
+    def bump_while_opening():
+        versions.doc = {"_id": "plans", "version": 1}
+        plans.rows = [{"name": "creator", "pricing": {"monthly_price": 21}}]
+
+    versions.watch = lambda pipeline: _Stream(bump_while_opening)
+    db = {"catalog_versions": versions, "admin_plans": plans}
+    manager = PlanCatalogManager(poll_interval=60)
+    monkeypatch.setattr(plan_catalog, "_manager", manager)
+
+    assert (await manager.start(db)).version == 0
+    for _ in range(10):
+        await asyncio.sleep(0)
+    assert manager.mode == "change_stream"
+    assert manager.catalog.version == 1 and manager.catalog.price("creator") == 2100
+
+    # Services that resolved the manager keep a working instance after close
+    await close_plan_catalog()
+    assert plan_catalog.get_plan_catalog_manager() is manager and manager.catalog.version == 1
+    assert (await manager.start(db)).version == 1
+    await manager.stop()
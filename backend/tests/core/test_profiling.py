@@ -0,0 +1,178 @@
+import asyncio
+import time
+from types import SimpleNamespace
+
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from pydantic import BaseModel
+from starlette.middleware.base import BaseHTTPMiddleware
+
+from core.profiling import (
+    ProfilingCommandListener,
+    RequestProfile,
+    RequestProfiler,
+    _current,
+    install_serialization_timer,
+    sign_profile_token,
+    verify_profile_token,
+)
+from middleware.profiling_middleware import ProfilingMiddleware
+
+
+class Item(BaseModel):
+    id: int
+    name: str
+
+
+def busy_work(seconds):
+    end = time.perf_counter() + seconds
+    while time.perf_counter() < end:
+        pass
+
+
+def _app(profiler):
+    install_serialization_timer()
+    app = FastAPI()
+
+    @app.get("/items/{item_id}", response_model=list[Item])
+    async def items(item_id: int):
+        busy_work(0.1)
+        return [{"id": item_id, "name": f"item {n}"} for n in range(200)]
+
+    async def passthrough(request, call_next):
+        return await call_next(request)
+
+    # Runs the endpoint in a task of its own, like the production middleware does
+    app.add_middleware(BaseHTTPMiddleware, dispatch=passthrough)
+    app.add_middleware(ProfilingMiddleware, profiler=profiler)
+    return app
+
+
+def test_signed_token_expires():
+    token = sign_profile_token(int(time.time()) + 60, secret="s")
+    assert verify_profile_token(token, secret="s")
+    assert not verify_profile_token(token, secret="other")
+    assert not verify_profile_token(token, secret="s", now=time.time() + 120)
+    assert not verify_profile_token("garbage", secret="s")
+
+
+def test_header_profiles_request_with_call_tree_and_serialization():
+    profiler = RequestProfiler(sample_rate=0, buffer_size=2, interval=0.001, explain_limit=0)
+    client = TestClient(_app(profiler))
+
+    assert "x-profile-id" not in client.get("/items/1").headers
+    assert profiler.recent() == []
+
+    response = client.get("/items/2", headers={"X-Profile": sign_profile_token(int(time.time()) + 60)})
+    profile = profiler.get(response.headers["x-profile-id"])
+
+    assert profile["route"] == "/items/{item_id}" and profile["status"] == 200
+    assert profile["reason"] == "header"
+    assert profile["serialization_ms"] > 0
+
+    def functions(node):
+        yield node["function"]
+        for child in node["children"]:
+            yield from functions(child)
+
+    assert "busy_work" in set(functions(profile["profile"]))
+    assert profile["profile"]["seconds"] <= profile["duration_ms"] / 1000 * 1.5
+
+    for _ in range(2):
+        client.get("/items/3", headers={"X-Profile": sign_profile_token(int(time.time()) + 60)})
+    assert len(profiler.recent()) == 2
+    assert profiler.get(profile["id"]) is None
+
+
+def test_sampling_rate():
+    profiler = RequestProfiler(sample_rate=1.0, buffer_size=5, interval=0.001, explain_limit=0)
+    client = TestClient(_app(profiler))
+    client.get("/items/1")
+    assert [profile["reason"] for profile in profiler.recent()] == ["sample"]
+
+
+class _FakeDatabase:
+    def __init__(self, calls):
+        self.calls = calls
+
+    async def command(self, spec):
+        self.calls.append(spec)
+        return {"queryPlanner": {"winningPlan": {"stage": "COLLSCAN"}},
+                "executionStats": {"totalDocsExamined": 5000, "totalKeysExamined": 0, "nReturned": 3}}
+
+
+@pytest.mark.asyncio
+async def test_commands_are_captured_and_explained():
+    listener = ProfilingCommandListener()
+    profile = RequestProfile("GET", "/api/health", "header")
+
+    def event(name, command, request_id, **extra):
+        return SimpleNamespace(command_name=name, command=command, database_name="mewayz",
+                               connection_id=("db", 1), request_id=request_id, **extra)
+
+    listener.started(event("find", {"find": "users"}, 1))  # not profiled
+    token = _current.set(profile)
+    try:
+        listener.started(event("find", {"find": "users", "filter": {"status": "active"}, "lsid": {"id": 1},
+                                        "$db": "mewayz"}, 2))
+        listener.succeeded(event("find", None, 2, duration_micros=4200,
+                                 reply={"cursor": {"firstBatch": [{}, {}, {}]}}))
+        listener.started(event("insert", {"insert": "logs", "documents": [{}]}, 3))
+        listener.succeeded(event("insert", None, 3, duration_micros=800, reply={"n": 1}))
+    finally:
+        _current.reset(token)
+
+    assert [command["collection"] for command in profile.commands] == ["users", "logs"]
+    assert profile.commands[0]["duration_ms"] == 4.2 and profile.commands[0]["returned"] == 3
+
+    calls = []
+    profiler = RequestProfiler(explain_limit=5)
+    await profiler.explain(profile, client={"mewayz": _FakeDatabase(calls)})
+
+    assert calls == [{"explain": {"find": "users", "filter": {"status": "active"}}, "verbosity": "executionStats"}]
+    assert profile.commands[0]["docs_examined"] == 5000
+    assert profile.commands[0]["plan"] == "COLLSCAN"
+    assert "docs_examined" not in profile.commands[1]
+
+
+@pytest.mark.asyncio
+async def test_aggregates_are_explained_without_running_them():
+    profile = RequestProfile("GET", "/api/v1/analytics/products", "header")
+    profile.add_command("mewayz", "aggregate", "orders", {"aggregate": "orders", "pipeline": [{"$match": {}}]})
+    profile.commands[0]["duration_ms"] = 50.0
+
+    calls = []
+    await RequestProfiler(explain_limit=5).explain(profile, client={"mewayz": _FakeDatabase(calls)})
+
+    assert [call["verbosity"] for call in calls] == ["queryPlanner"]
+    assert profile.commands[0]["plan"] == "COLLSCAN"
+
+
+@pytest.mark.asyncio
+async def test_profiles_are_served_by_every_worker(tmp_path):
+    worker = RequestProfiler(sample_rate=0, buffer_size=2, explain_limit=0, profile_dir=str(tmp_path))
+    other = RequestProfiler(sample_rate=0, buffer_size=2, explain_limit=0, profile_dir=str(tmp_path))
+    ids = []
+    for n in range(3):
+        profile, token = worker.begin("GET", f"/items/{n}", "header")
+        worker.end(profile, token, 200, "/items/{item_id}")
+        await asyncio.gather(*worker._explains)
+        ids.append(profile.id)
+        await asyncio.sleep(0.01)
+    await worker.stop()
+
+    assert other.get(ids[2])["path"] == "/items/2"
+    assert [summary["id"] for summary in other.recent()] == [ids[2], ids[1]]
+    assert "commands" not in other.recent()[0]
+    assert other.get(ids[0]) is None and other.get("../profiles") is None
+    assert other.clear() == 2 and other.recent() == []
+
+
+def test_every_mongo_client_reports_to_the_profiler():
+    from core import database as core_database
+    from db import database, session
+
+    clients = [session._MongoClientSingleton().mongo_client, database.client, core_database.get_database().client]
+    for client in clients:
+        assert any(isinstance(listener, ProfilingCommandListener) for listener in client.options.event_listeners)
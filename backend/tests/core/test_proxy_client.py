@@ -0,0 +1,103 @@
+import asyncio
+from typing import AsyncIterator, Generator
+
+import pytest
+
+from core.proxy_client import ProxyClient, ProxyResponseTooLarge, ProxyStreamingResponse
+from tests.utils.upstream_stub import UpstreamStub
+
+
+@pytest.fixture
+def upstream() -> Generator[UpstreamStub, None, None]:
+    with UpstreamStub() as server:
+        yield server
+
+
+async def _read(client: ProxyClient, method: str, url: str, **kwargs) -> bytes:
+    upstream = await client.open(method, url, headers={}, **kwargs)
+    return b"".join([chunk async for chunk in upstream.iter_body()])
+
+
+@pytest.mark.asyncio
+async def test_connections_are_reused(upstream: UpstreamStub) -> None:
+    client = ProxyClient(http2=False, per_host_limit=2)
+    try:
+        for _ in range(10):
+            assert len(await _read(client, "GET", f"{upstream.url}/bytes/1024")) == 1024
+        assert len(upstream.connections) == 1
+
+        bodies = await asyncio.gather(*[_read(client, "GET", f"{upstream.url}/bytes/64") for _ in range(20)])
+        assert all(len(body) == 64 for body in bodies)
+        assert len(upstream.connections) <= 2
+    finally:
+        await client.close()
+
+
+@pytest.mark.asyncio
+async def test_request_body_streams_through(upstream: UpstreamStub) -> None:
+    async def body() -> AsyncIterator[bytes]:
+        for part in (b'{"a": ', b"1}"):
+            yield part
+
+    client = ProxyClient(http2=False)
+    try:
+        assert await _read(client, "POST", f"{upstream.url}/echo", content=body()) == b'{"a": 1}'
+    finally:
+        await client.close()
+
+
+@pytest.mark.asyncio
+async def test_response_size_cap(upstream: UpstreamStub) -> None:
+    client = ProxyClient(http2=False, max_response_bytes=1000, per_host_limit=1)
+    try:
+        with pytest.raises(ProxyResponseTooLarge):
+            await client.open("GET", f"{upstream.url}/bytes/5000", headers={})
+        with pytest.raises(ProxyResponseTooLarge):
+            await _read(client, "GET", f"{upstream.url}/stream/50000")
+        # Both failures released their per-host slot
+        assert len(await _read(client, "GET", f"{upstream.url}/bytes/10")) == 10
+    finally:
+        await client.close()
+
+
+@pytest.mark.asyncio
+async def test_slot_released_when_client_disconnects(upstream: UpstreamStub) -> None:
+    async def disconnected() -> dict:
+        return {"type": "http.disconnect"}
+
+    async def broken_send(message: dict) -> None:
+        if message["type"] == "http.response.body":
+            raise OSError("client went away")
+
+    async def idle_send(message: dict) -> None:
+        await asyncio.sleep(0)
+
+    client = ProxyClient(http2=False, per_host_limit=1)
+    try:
+        response = ProxyStreamingResponse(await client.open("GET", f"{upstream.url}/stream/50000", headers={}))
+        with pytest.raises(Exception, match="client went away|unhandled errors"):
+            await response({"type": "http"}, lambda: asyncio.sleep(3600), broken_send)
+
+        response = ProxyStreamingResponse(await client.open("GET", f"{upstream.url}/stream/50000", headers={}))
+        await response({"type": "http"}, disconnected, idle_send)
+
+        assert client.get_stats()["active"] == 0
+        assert len(await asyncio.wait_for(_read(client, "GET", f"{upstream.url}/bytes/10"), 5)) == 10
+    finally:
+        await client.close()
+
+
+@pytest.mark.asyncio
+async def test_idle_hosts_are_dropped(upstream: UpstreamStub) -> None:
+    client = ProxyClient(http2=False, per_host_limit=1)
+    try:
+        first = await client.open("GET", f"{upstream.url}/bytes/10", headers={})
+        waiting = asyncio.create_task(_read(client, "GET", f"{upstream.url}/bytes/10"))
+        await asyncio.sleep(0.05)
+        assert client.get_stats() == {"requests": 1, "hosts": 1, "active": 1}
+
+        await first.aclose()
+        assert len(await asyncio.wait_for(waiting, 5)) == 10
+        assert client.get_stats() == {"requests": 2, "hosts": 0, "active": 0}
+    finally:
+        await client.close()
@@ -0,0 +1,88 @@
+from datetime import datetime, timezone
+from decimal import Decimal
+from typing import List
+
+import orjson
+from bson import ObjectId
+from bson.decimal128 import Decimal128
+from fastapi import FastAPI
+from fastapi.encoders import jsonable_encoder
+from fastapi.testclient import TestClient
+
+from core.responses import ModelResponse, ORJSONResponse, dumps
+from models.biolinks import BioLinkButton, BioLinkPage
+from models.ecommerce import Product
+
+
+def _products(count):
+    return [Product(name=f"Product {n}", description="d", price=n + 0.99, tags=["a", "b"],
+                    created_at=datetime(2024, 5, 1, 12, 30, 0, 1500))
+            for n in range(count)]
+
+
+def _page():
+    return BioLinkPage(user_id="u1", slug="me", title="Me",
+                       buttons=[BioLinkButton(title=f"Link {n}", url=f"https://example.com/{n}") for n in range(3)])
+
+
+def test_model_responses_match_response_model_serialization():
+    products, page = _products(3), _page()
+    app = FastAPI()
+
+    @app.get("/encoded/products", response_model=List[Product])
+    async def encoded_products():
+        return products
+
+    @app.get("/fast/products", response_model=List[Product])
+    async def fast_products():
+        return ModelResponse(products)
+
+    @app.get("/encoded/page", response_model=BioLinkPage)
+    async def encoded_page():
+        return page
+
+    @app.get("/fast/page", response_model=BioLinkPage)
+    async def fast_page():
+        return ModelResponse(page)
+
+    client = TestClient(app)
+    for path in ("products", "page"):
+        encoded, fast = client.get(f"/encoded/{path}"), client.get(f"/fast/{path}")
+        assert fast.headers["content-type"] == "application/json"
+        assert fast.json() == encoded.json()
+    assert client.get("/fast/products").json()[0]["_id"] == str(products[0].id)
+
+
+def test_raw_documents_encode_like_jsonable_encoder():
+    oid = ObjectId()
+    document = {
+        "_id": oid,
+        "created_at": datetime(2024, 5, 1, 12, 30),
+        "paid_at": datetime(2024, 5, 2, tzinfo=timezone.utc),
+        "amount": Decimal("12.50"),
+        "units": Decimal("3"),
+        "tags": {"x"},
+        "nested": [{"product": _products(1)[0]}],
+        7: "non-string key",
+    }
+    expected = jsonable_encoder(document, custom_encoder={ObjectId: str})
+    assert orjson.loads(dumps(document)) == {str(key): value for key, value in expected.items()}
+    assert orjson.loads(dumps({"fee": Decimal128("1.25")})) == {"fee": 1.25}
+
+
+def test_default_response_class_encodes_dashboard_payloads():
+    app = FastAPI(default_response_class=ORJSONResponse)
+
+    @app.get("/dashboard")
+    async def dashboard():
+        return ORJSONResponse({"total": 2, "recent_bio_pages": [_page()], "generated_at": datetime(2024, 1, 1)})
+
+    @app.get("/plain")
+    async def plain():
+        return {"ok": True}
+
+    client = TestClient(app)
+    body = client.get("/dashboard").json()
+    assert body["recent_bio_pages"][0]["buttons"][2]["url"] == "https://example.com/2"
+    assert body["generated_at"] == "2024-01-01T00:00:00"
+    assert client.get("/plain").json() == {"ok": True}
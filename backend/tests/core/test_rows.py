@@ -0,0 +1,61 @@
+from datetime import datetime
+
+import pytest
+from bson import ObjectId
+
+from core.responses import dumps
+from core.rows import parse_fields
+from crud.notifications import NOTIFICATION_ROWS
+from crud.products import PRODUCT_ROWS, ProductCRUD
+from crud.users import USER_ROWS
+from tests.utils.fake_mongo import FakeCursor
+
+
+class _Collection:
+    def __init__(self, documents):
+        self.documents = documents
+        self.calls = {}
+
+    def find(self, query, projection=None):
+        self.calls.update(query=query, projection=projection)
+        fields = {name for name, included in (projection or {}).items() if included}
+        return FakeCursor([{k: v for k, v in doc.items() if k in fields} for doc in self.documents], self.calls)
+
+
+def _product(n):
+    return {"_id": ObjectId(), "name": f"Product {n}", "description": "long " * 100, "price": 10 + n,
+            "vendor_id": "u1", "tags": ["a"], "created_at": datetime(2024, 5, n + 1), "stock": 3}
+
+
+@pytest.mark.asyncio
+async def test_user_product_rows_project_and_validate_once():
+    documents = [_product(n) for n in range(3)]
+    crud = ProductCRUD.__new__(ProductCRUD)
+    crud.collection = _Collection(documents)
+
+    rows = await crud.get_user_product_rows("u1", fields=["name", "_id", "price"], limit=2)
+
+    assert crud.collection.calls["projection"] == {"_id": 1, "name": 1, "price": 1}
+    assert crud.collection.calls["sort"] == [("created_at", -1)] and crud.collection.calls["limit"] == 2
+    assert rows[0] == {"_id": str(documents[0]["_id"]), "name": "Product 0", "price": 10.0}
+
+    raw = await crud.get_user_product_rows("u1", fields=["_id", "created_at"], raw=True)
+    assert raw[0]["_id"] == documents[0]["_id"]
+    assert dumps(raw[:1]) == f'[{{"_id":"{documents[0]["_id"]}","created_at":"2024-05-01T00:00:00"}}]'.encode()
+
+
+def test_selections_reject_unknown_and_secret_fields():
+    with pytest.raises(ValueError):
+        PRODUCT_ROWS.select(["name", "nope"])
+    with pytest.raises(ValueError):
+        USER_ROWS.select(["email", "hashed_password"])
+    assert USER_ROWS.select().projection == {"_id": 1, "full_name": 1, "email": 1, "is_active": 1}
+    assert PRODUCT_ROWS.select(["price", "name"]) is PRODUCT_ROWS.select(["name", "price"])
+    assert NOTIFICATION_ROWS.select(["id"]).projection == {"id": 1, "_id": 0}
+    assert parse_fields(" name, price ,") == ["name", "price"] and parse_fields("") is None
+
+
+def test_rows_coerce_stored_strings():
+    rows = NOTIFICATION_ROWS.select(["id", "created_at", "is_read"]).rows(
+        [{"id": "n1", "created_at": "2024-03-01T10:15:30", "is_read": False}, {"id": "n2"}])
+    assert rows == [{"id": "n1", "created_at": datetime(2024, 3, 1, 10, 15, 30), "is_read": False}, {"id": "n2"}]
@@ -0,0 +1,46 @@
+import subprocess
+import sys
+from pathlib import Path
+
+import pytest
+
+from core import services
+from core.services import get_service, register_service, reset_services, service_dependency
+
+
+@pytest.fixture(autouse=True)
+def registry(monkeypatch):
+    monkeypatch.setattr(services, "_factories", {})
+    monkeypatch.setattr(services, "_instances", {})
+
+
+def test_service_is_built_once_on_first_use():
+    built = []
+    register_service("reports", lambda: built.append(object()) or built[-1])
+    dependency = service_dependency("reports")
+
+    assert built == []
+    first = dependency()
+    assert dependency() is first and get_service("reports") is first
+    assert len(built) == 1
+
+    reset_services("reports")
+    assert dependency() is not first
+    assert len(built) == 2
+
+
+def test_unknown_service_fails_on_use():
+    dependency = service_dependency("no_such_service")
+    with pytest.raises(ModuleNotFoundError):
+        dependency()
+
+
+def test_bundle_routers_do_not_import_services():
+    backend_dir = Path(__file__).resolve().parents[2]
+    probe = (
+        "import sys, api.bundle_services, api.comprehensive_bundle_services; "
+        "print(sorted(m for m in sys.modules if m.startswith('services.')))"
+    )
+    completed = subprocess.run([sys.executable, "-c", probe], cwd=str(backend_dir),
+                               capture_output=True, text=True, check=True)
+    assert completed.stdout.strip() == "[]"
@@ -0,0 +1,80 @@
+import asyncio
+from typing import Generator
+
+import pytest
+import stripe
+
+from core.stripe_gateway import StripeGateway
+from tests.utils.fake_stripe import FakeStripeServer
+
+
+@pytest.fixture
+def fake_stripe() -> Generator[FakeStripeServer, None, None]:
+    saved = (stripe.api_key, stripe.api_base, stripe.default_http_client, stripe.max_network_retries)
+    with FakeStripeServer() as server:
+        yield server
+    stripe.api_key, stripe.api_base, stripe.default_http_client, stripe.max_network_retries = saved
+
+
+@pytest.fixture
+def gateway(fake_stripe: FakeStripeServer) -> Generator[StripeGateway, None, None]:
+    gateway = StripeGateway(api_key="sk_test_fake", api_base=fake_stripe.url, timeout=5, max_retries=2, max_workers=4)
+    gateway.configure()
+    yield gateway
+    gateway.close()
+
+
+@pytest.mark.asyncio
+async def test_subscription_flow(gateway: StripeGateway, fake_stripe: FakeStripeServer) -> None:
+    customer = await gateway.request("Customer.create", email="buyer@example.com", metadata={"bundles": "creator"})
+    retrieved = await gateway.request("Customer.retrieve", customer.id)
+    assert retrieved.metadata["bundles"] == "creator"
+
+    price = await gateway.request(
+        "Price.create", currency="usd", unit_amount=1900, recurring={"interval": "month"},
+        product_data={"name": "MEWAYZ V2 - Creator Bundle(s)"},
+    )
+    subscription = await gateway.request(
+        "Subscription.create", customer=customer.id, items=[{"price": price.id}],
+        expand=["latest_invoice.payment_intent"],
+    )
+    assert subscription.status == "active"
+    assert subscription.latest_invoice.payment_intent.status == "succeeded"
+
+    metrics = gateway.get_metrics()["operations"]
+    assert metrics["Customer.create"]["count"] == 1
+    assert metrics["Subscription.create"]["errors"] == 0
+
+
+@pytest.mark.asyncio
+async def test_retries_retryable_failures(gateway: StripeGateway, fake_stripe: FakeStripeServer) -> None:
+    fake_stripe.fail_next(1)
+    customer = await gateway.request("Customer.create", email="retry@example.com")
+    assert customer.id.startswith("cus_")
+    assert fake_stripe.count("POST", "/v1/customers") == 2
+    assert len(fake_stripe.objects["customers"]) == 1
+
+
+@pytest.mark.asyncio
+async def test_calls_run_concurrently(fake_stripe: FakeStripeServer, gateway: StripeGateway) -> None:
+    fake_stripe.latency = 0.2
+    loop = asyncio.get_running_loop()
+    start = loop.time()
+    await asyncio.gather(*(gateway.request("Customer.create", email=f"c{i}@example.com") for i in range(4)))
+    assert loop.time() - start < 0.6
+
+
+@pytest.mark.asyncio
+async def test_errors_are_counted(gateway: StripeGateway) -> None:
+    with pytest.raises(stripe.error.InvalidRequestError):
+        await gateway.request("Customer.retrieve", "cus_missing")
+    assert gateway.get_metrics()["operations"]["Customer.retrieve"]["errors"] == 1
+
+
+@pytest.mark.asyncio
+async def test_gateway_is_reusable_after_close(gateway: StripeGateway) -> None:
+    # Modules keep the instance they resolved at import; a later lifespan must still work
+    await gateway.request("Customer.create", email="first@example.com")
+    gateway.close()
+    customer = await gateway.request("Customer.create", email="second@example.com")
+    assert customer.email == "second@example.com"
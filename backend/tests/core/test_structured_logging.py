@@ -0,0 +1,160 @@
+import io
+import json
+import logging
+import os
+import time
+
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from core.config import settings
+from core.structured_logging import (
+    JSONFormatter,
+    SamplingFilter,
+    bind_request_id,
+    configure_logging,
+    process_log_file,
+    reset_request_id,
+    shutdown_logging,
+)
+from middleware.production_middleware import RequestLoggingMiddleware
+
+
+class _SlowHandler(logging.Handler):
+    def __init__(self, delay):
+        super().__init__()
+        self.delay = delay
+        self.lines = []
+
+    def emit(self, record):
+        time.sleep(self.delay)
+        self.lines.append(self.format(record))
+
+
+@pytest.fixture
+def pipeline():
+    root = logging.getLogger()
+    saved_handlers, saved_level = root.handlers[:], root.level
+    stream = io.StringIO()
+    handler = logging.StreamHandler(stream)
+    handler.setFormatter(JSONFormatter())
+
+    def start(**options):
+        configure_logging(level="INFO", handlers=options.pop("handlers", [handler]), **options)
+        return stream
+
+    yield start
+    shutdown_logging()
+    root.handlers[:] = saved_handlers
+    root.setLevel(saved_level)
+
+
+def _records(stream):
+    return [json.loads(line) for line in stream.getvalue().splitlines()]
+
+
+def test_json_records_carry_request_id_extra_fields_and_traceback(pipeline):
+    stream = pipeline()
+    logger = logging.getLogger("tests.logging")
+
+    token = bind_request_id("req-1")
+    try:
+        logger.info("charged %s", "cus_1", extra={"amount": 12.5})
+        try:
+            raise ValueError("boom")
+        except ValueError:
+            logger.exception("charge failed")
+    finally:
+        reset_request_id(token)
+    logger.info("outside")
+    shutdown_logging()
+
+    charged, failed, outside = _records(stream)
+    assert charged["message"] == "charged cus_1" and charged["amount"] == 12.5
+    assert charged["request_id"] == failed["request_id"] == "req-1"
+    assert failed["level"] == "ERROR" and "ValueError: boom" in failed["exception"]
+    assert "request_id" not in outside
+
+
+def test_sampling_keeps_whole_requests_and_all_warnings():
+    sampler = SamplingFilter(0.5)
+
+    def record(level, request_id):
+        entry = logging.LogRecord("x", level, "", 0, "m", None, None)
+        entry.request_id = request_id
+        return entry
+
+    kept = [request_id for request_id in (f"r{n}" for n in range(1000))
+            if sampler.filter(record(logging.INFO, request_id))]
+    assert 400 < len(kept) < 600
+    assert all(sampler.filter(record(logging.DEBUG, request_id)) for request_id in kept)
+    assert all(sampler.filter(record(logging.WARNING, f"r{n}")) for n in range(1000))
+    assert sampler.filter(record(logging.INFO, None))
+
+
+def test_slow_handler_does_not_block_the_caller(pipeline):
+    slow = _SlowHandler(delay=0.02)
+    pipeline(handlers=[slow])
+    logger = logging.getLogger("tests.logging")
+
+    start = time.perf_counter()
+    for n in range(20):
+        logger.info("line %d", n)
+    elapsed = time.perf_counter() - start
+    shutdown_logging()
+
+    assert elapsed < 0.02 * 20 / 4
+    assert slow.lines == [f"line {n}" for n in range(20)]
+
+
+def test_request_logging_middleware_correlates_one_record_per_request(pipeline):
+    stream = pipeline()
+    app = FastAPI()
+
+    @app.get("/items")
+    async def items():
+        logging.getLogger("tests.handler").info("loading items")
+        return []
+
+    app.add_middleware(RequestLoggingMiddleware)
+    client = TestClient(app)
+    supplied = client.get("/items", headers={"X-Request-ID": "abc"})
+    generated = client.get("/items")
+    shutdown_logging()
+
+    assert supplied.headers["x-request-id"] == "abc"
+    records = [record for record in _records(stream) if record["logger"] != "httpx"]
+    assert [(record["message"], record["request_id"]) for record in records] == [
+        ("loading items", "abc"),
+        ("request", "abc"),
+        ("loading items", generated.headers["x-request-id"]),
+        ("request", generated.headers["x-request-id"]),
+    ]
+    assert records[1]["status"] == 200 and records[1]["path"] == "/items"
+
+
+def test_workers_rotate_their_own_log_files(tmp_path, monkeypatch):
+    root = logging.getLogger()
+    saved_handlers, saved_level = root.handlers[:], root.level
+    monkeypatch.setattr(settings, "LOG_WORKERS", 4)
+    try:
+        listener = configure_logging(level="INFO", log_file=str(tmp_path / "mewayz.log"))
+        logging.getLogger("tests.logging").info("from this worker")
+        shutdown_logging()
+    finally:
+        root.handlers[:] = saved_handlers
+        root.setLevel(saved_level)
+
+    files = [handler.baseFilename for handler in listener.handlers if isinstance(handler, logging.FileHandler)]
+    assert files == [str(tmp_path / f"mewayz.{os.getpid()}.log")]
+    assert "from this worker" in (tmp_path / f"mewayz.{os.getpid()}.log").read_text()
+    assert process_log_file("mewayz.log", shared=False) == "mewayz.log" and process_log_file(None, shared=True) is None
+
+
+def test_importing_the_apps_leaves_logging_to_their_startup():
+    import main  # noqa: F401
+    import server  # noqa: F401
+    from core import structured_logging
+
+    assert structured_logging._listener is None
@@ -0,0 +1,134 @@
+from datetime import datetime
+from types import SimpleNamespace
+
+import pytest
+
+from core.timestamps import (
+    MIGRATIONS_COLLECTION,
+    TimestampBackfill,
+    date_range,
+    normalize_timestamps,
+    serialize_timestamps,
+    to_datetime,
+)
+from tests.utils.fake_mongo import FakeCursor, FakeDatabase
+
+
+def _matches(doc, query):
+    for key, condition in query.items():
+        if key == "$or":
+            if not any(_matches(doc, part) for part in condition):
+                return False
+        elif key == "$and":
+            if not all(_matches(doc, part) for part in condition):
+                return False
+        elif isinstance(condition, dict):
+            value = doc.get(key)
+            if condition.get("$type") == "string" and not isinstance(value, str):
+                return False
+            if "$gt" in condition and not value > condition["$gt"]:
+                return False
+        elif doc.get(key) != condition:
+            return False
+    return True
+
+
+class _Collection:
+    def __init__(self, docs=()):
+        self.docs = {doc["_id"]: doc for doc in docs}
+        self.bulk_writes = 0
+
+    def find(self, query, projection=None):
+        rows = sorted((doc for doc in self.docs.values() if _matches(doc, query)), key=lambda doc: doc["_id"])
+        return FakeCursor([dict(doc) for doc in rows])
+
+    async def bulk_write(self, operations, ordered=True):
+        self.bulk_writes += 1
+        modified = 0
+        for operation in operations:
+            doc = self.docs.get(operation._filter["_id"])
+            if doc is not None and _matches(doc, operation._filter):
+                doc.update(operation._doc["$set"])
+                modified += 1
+        return SimpleNamespace(modified_count=modified)
+
+    async def find_one(self, query):
+        doc = self.docs.get(query["_id"])
+        return dict(doc) if doc else None
+
+    async def update_one(self, query, update, upsert=False):
+        doc = self.docs.setdefault(query["_id"], {"_id": query["_id"]})
+        doc.update(update.get("$set", {}))
+        for field, amount in update.get("$inc", {}).items():
+            doc[field] = doc.get(field, 0) + amount
+
+    async def delete_one(self, query):
+        self.docs.pop(query["_id"], None)
+
+
+def test_to_datetime_parses_iso_strings_as_naive_utc() -> None:
+    assert to_datetime("2024-03-01T10:15:30.123456") == datetime(2024, 3, 1, 10, 15, 30, 123456)
+    assert to_datetime("2024-03-01T10:15:30Z") == datetime(2024, 3, 1, 10, 15, 30)
+    assert to_datetime("2024-03-01T12:15:30+02:00") == datetime(2024, 3, 1, 10, 15, 30)
+    assert to_datetime("not a date") == "not a date"
+    assert to_datetime(None) is None
+
+
+def test_normalize_and_serialize_round_trip() -> None:
+    doc = normalize_timestamps({"created_at": "2024-03-01T10:15:30", "name": "x"})
+    assert doc["created_at"] == datetime(2024, 3, 1, 10, 15, 30)
+    assert serialize_timestamps(doc) == {"created_at": "2024-03-01T10:15:30", "name": "x"}
+
+
+def test_date_range_matches_both_storage_forms() -> None:
+    since = datetime(2024, 1, 1)
+    assert date_range("created_at") == {}
+    assert date_range("created_at", gte=since) == {"$or": [
+        {"created_at": {"$type": "date", "$gte": since}},
+        {"created_at": {"$type": "string", "$gte": "2024-01-01T00:00:00"}},
+    ]}
+
+
+@pytest.fixture
+def db():
+    orders = _Collection([
+        {"_id": 1, "created_at": "2024-03-01T10:00:00", "updated_at": datetime(2024, 3, 2)},
+        {"_id": 2, "created_at": datetime(2024, 3, 1), "updated_at": datetime(2024, 3, 2)},
+        {"_id": 3, "created_at": "2024-03-03T10:00:00Z", "updated_at": "2024-03-04T12:00:00+02:00"},
+        {"_id": 4, "created_at": "not a date"},
+        {"_id": 5, "created_at": "2024-03-05T00:00:00"},
+    ])
+    return FakeDatabase(_Collection, orders=orders)
+
+
+@pytest.mark.asyncio
+async def test_backfill_converts_string_dates_and_checkpoints(db) -> None:
+    result = await TimestampBackfill(db, "orders", batch_size=2, pause=0).run()
+
+    assert result == {"collection": "orders", "converted": 3, "batches": 2, "done": True}
+    orders = db.orders.docs
+    assert orders[1]["created_at"] == datetime(2024, 3, 1, 10) and orders[1]["updated_at"] == datetime(2024, 3, 2)
+    assert orders[3] == {"_id": 3, "created_at": datetime(2024, 3, 3, 10), "updated_at": datetime(2024, 3, 4, 10)}
+    assert orders[4]["created_at"] == "not a date"
+    assert orders[5]["created_at"] == datetime(2024, 3, 5)
+
+    checkpoint = db[MIGRATIONS_COLLECTION].docs["timestamps:orders"]
+    assert checkpoint["last_id"] == 5 and checkpoint["done"] is True and checkpoint["converted"] == 3
+
+
+@pytest.mark.asyncio
+async def test_backfill_resumes_after_the_last_checkpoint(db) -> None:
+    first = await TimestampBackfill(db, "orders", batch_size=1, pause=0).run(max_batches=1)
+    assert first == {"collection": "orders", "converted": 1, "batches": 1, "done": False}
+    assert db[MIGRATIONS_COLLECTION].docs["timestamps:orders"]["last_id"] == 1
+
+    # A string written behind the checkpoint is left for a reset run
+    db.orders.docs[1]["created_at"] = "2024-03-01T11:00:00"
+    rest = await TimestampBackfill(db, "orders", batch_size=10, pause=0).run()
+    assert rest["converted"] == 2 and rest["done"] is True
+    assert db.orders.docs[1]["created_at"] == "2024-03-01T11:00:00"
+    assert db[MIGRATIONS_COLLECTION].docs["timestamps:orders"]["converted"] == 3
+
+    backfill = TimestampBackfill(db, "orders", pause=0)
+    await backfill.reset()
+    assert (await backfill.run())["converted"] == 1
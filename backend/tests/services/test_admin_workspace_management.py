@@ -0,0 +1,76 @@
+"""
+Tests for the single-query admin workspace listings
+"""
+
+from datetime import datetime, timedelta
+
+import pytest
+
+from services.admin_workspace_management_service import AdminWorkspaceManagementService
+from tests.utils.fake_mongo import FakeCursor, FakeDatabase
+
+
+class _Workspaces:
+    def __init__(self, rows, total):
+        self.rows = rows
+        self.total = total
+        self.pipelines = []
+        self.counts = []
+
+    def aggregate(self, pipeline):
+        self.pipelines.append(pipeline)
+        return FakeCursor(self.rows)
+
+    async def count_documents(self, query):
+        self.counts.append(query)
+        return self.total
+
+
+def _service(rows, total=0):
+    service = AdminWorkspaceManagementService()
+    service.db = FakeDatabase(workspaces=_Workspaces(rows, total))
+    return service
+
+
+@pytest.mark.asyncio
+async def test_listing_is_one_aggregation_with_counts():
+    rows = [
+        {"_id": "w1", "created_at": datetime.utcnow() - timedelta(days=3),
+         "subscription": {"status": "active", "bundles": ["creator"], "pricing": {"total_amount": 19}},
+         "recent_admin_actions": [{"count": 4}]},
+        {"_id": "w2", "created_at": (datetime.utcnow() - timedelta(days=10)).isoformat(),
+         "recent_admin_actions": []},
+    ]
+    service = _service(rows, total=120)
+
+    result = await service.get_all_workspaces(limit=2, offset=0, filters={"status": "active"})
+
+    pipeline = service.db.workspaces.pipelines[0]
+    assert [next(iter(stage)) for stage in pipeline] == ["$match", "$sort", "$skip", "$limit", "$lookup"]
+    assert pipeline[3] == {"$limit": 2}
+    assert service.db.workspaces.counts == [{"subscription.status": "active"}]
+    assert result["pagination"] == {"total_count": 120, "limit": 2, "offset": 0, "has_more": True}
+    first, second = result["workspaces"]
+    assert first["admin_analytics"]["recent_admin_actions"] == 4
+    assert first["admin_analytics"]["subscription_age_days"] == 3
+    assert second["admin_analytics"]["recent_admin_actions"] == 0
+    assert second["admin_analytics"]["subscription_age_days"] == 10
+    assert "recent_admin_actions" not in first
+
+
+@pytest.mark.asyncio
+async def test_prefix_search_is_anchored_and_escaped():
+    service = _service([])
+
+    result = await service.search_workspaces({
+        "workspace_name": "Acme (EU)", "owner_email": "Ops+", "search_mode": "prefix"
+    })
+
+    match = service.db.workspaces.pipelines[0][0]["$match"]
+    assert result["success"] and result["total_found"] == 0
+    assert match["name"] == {"$regex": r"^Acme\ \(EU\)"}
+    assert match["owner_email_lower"] == {"$regex": r"^ops\+"} and "owner_email" not in match
+    assert service.db.workspaces.counts == []
+
+    await service.search_workspaces({"owner_email": "Ops"})
+    assert service.db.workspaces.pipelines[1][0]["$match"] == {"owner_email": {"$regex": "Ops", "$options": "i"}}
@@ -0,0 +1,57 @@
+"""
+Tests for AI content generation charged to workspace credits
+"""
+
+import pytest
+
+from services import ai_content_generation_service
+from services.ai_content_generation_service import AiContentGenerationService
+from services.repository_service import RepositoryService
+
+
+class _Metering:
+    def __init__(self):
+        self.consumed = []
+
+    async def consume(self, workspace_id, metric, amount=1):
+        self.consumed.append((workspace_id, metric, amount))
+        return {"success": True}
+
+    async def refund(self, workspace_id, metric, amount=1):
+        self.consumed.remove((workspace_id, metric, amount))
+
+
+@pytest.fixture
+def metering(monkeypatch):
+    metering = _Metering()
+    created = []
+
+    async def create_item(self, data):
+        created.append(data)
+        return {"success": True, "id": "item-1"}
+
+    monkeypatch.setattr(ai_content_generation_service, "get_usage_metering_service", lambda: metering)
+    monkeypatch.setattr(RepositoryService, "create_item", create_item)
+    metering.created = created
+    return metering
+
+
+@pytest.mark.asyncio
+async def test_generation_without_a_workspace_is_refused(metering):
+    service = AiContentGenerationService()
+
+    result = await service.create_item({"prompt": "Write a product blurb"})
+
+    assert not result["success"] and "workspace_id" in result["error"]
+    assert metering.created == [] and metering.consumed == []
+
+
+@pytest.mark.asyncio
+async def test_generation_is_charged_to_the_workspace(metering):
+    service = AiContentGenerationService()
+
+    result = await service.create_item({"workspace_id": "ws1", "prompt": "Write a product blurb", "credits": 0})
+
+    assert result["success"]
+    assert metering.consumed == [("ws1", "ai_credits", 1)]
+    assert metering.created == [{"workspace_id": "ws1", "prompt": "Write a product blurb"}]
@@ -0,0 +1,50 @@
+"""
+Tests for the cached bundle count snapshot
+"""
+
+import pytest
+
+from core import cache
+from core.cache import collection_changed
+from services.bundle_service import BundleService
+from tests.utils.fake_mongo import FakeCursor, FakeDatabase
+
+
+class _Products:
+    def __init__(self):
+        self.pipelines = []
+
+    def aggregate(self, pipeline):
+        self.pipelines.append(pipeline)
+        if any("$lookup" in stage for stage in pipeline):
+            return FakeCursor([{"_id": "creator", "count": 2}])
+        return FakeCursor([{"_id": "creator", "count": 5}, {"_id": "ecommerce", "count": 3}, {"_id": None, "count": 1}])
+
+
+class _Users:
+    async def estimated_document_count(self):
+        return 7
+
+
+@pytest.fixture(autouse=True)
+def caches(monkeypatch):
+    monkeypatch.setattr(cache, "_caches", {})
+
+
+@pytest.mark.asyncio
+async def test_active_bundles_and_analytics_share_one_snapshot():
+    db = FakeDatabase(products=_Products(), users=_Users())
+    service = BundleService(db)
+
+    bundles = await service.get_active_bundles()
+    analytics = await service.get_bundle_analytics()
+
+    assert len(db.products.pipelines) == 2
+    assert bundles["creator"]["products_count"] == 5 and bundles["creator"]["users_count"] == 2
+    assert bundles["education"]["products_count"] == 0
+    assert analytics["bundle_statistics"]["creator"] == {"users": 2, "products": 5, "revenue": 38}
+    assert analytics["total_products"] == 9 and analytics["total_users"] == 7
+
+    collection_changed("products")
+    await service.get_active_bundles()
+    assert len(db.products.pipelines) == 4
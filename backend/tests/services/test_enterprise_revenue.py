@@ -0,0 +1,231 @@
+"""
+Tests for enterprise revenue read from monthly aggregate buckets
+"""
+
+from datetime import datetime
+
+import pytest
+
+from services import enterprise_revenue_service
+from services.enterprise_revenue_service import EnterpriseRevenueService, _add_months, _month_start
+from tests.utils.fake_mongo import FakeCursor, FakeDatabase
+
+
+class _Aggregates:
+    def __init__(self):
+        self.docs = {}
+        self.reads = 0
+
+    async def update_one(self, query, update, upsert=False):
+        doc = self.docs.setdefault(query["_id"], {"_id": query["_id"], **update["$setOnInsert"]})
+        doc.update(update["$set"])
+        for field, delta in update["$inc"].items():
+            doc[field] = doc.get(field, 0) + delta
+
+    def aggregate(self, pipeline, allowDiskUse=False):
+        self.reads += 1
+        match = pipeline[0]["$match"]
+        grouped = {}
+        if "workspace_id" not in match:
+            window = match["period_start"]
+            for doc in self.docs.values():
+                if window["$gte"] <= doc["period_start"] <= window["$lte"]:
+                    row = grouped.setdefault((doc["workspace_id"], doc["period_start"]), {
+                        "_id": {"workspace_id": doc["workspace_id"], "period_start": doc["period_start"]},
+                        "amount": 0})
+                    row["amount"] += doc["total_revenue"]
+            return FakeCursor(list(grouped.values()))
+        for doc in self.docs.values():
+            if doc["workspace_id"] == match["workspace_id"] and doc["period_start"] in match["period_start"]["$in"]:
+                row = grouped.setdefault((doc["period_start"], doc["source"]), {
+                    "_id": {"period_start": doc["period_start"], "source": doc["source"]}, "amount": 0, "count": 0})
+                row["amount"] += doc["total_revenue"]
+                row["count"] += doc["transaction_count"]
+        return FakeCursor(list(grouped.values()))
+
+    async def delete_many(self, query):
+        def stale(doc):
+            return (doc["workspace_id"] == query.get("workspace_id", doc["workspace_id"])
+                    and doc.get("rebuilt_at") != query["rebuilt_at"]["$ne"]
+                    and not doc.get("last_updated", datetime.min) >= query["last_updated"]["$not"]["$gte"])
+        self.docs = {key: doc for key, doc in self.docs.items() if not stale(doc)}
+
+    async def bulk_write(self, requests, ordered=True):
+        for request in requests:
+            self.docs[request._filter["_id"]] = request._doc
+
+
+class _Tracking:
+    def __init__(self):
+        self.docs = []
+
+    async def insert_one(self, doc):
+        self.docs.append(doc)
+
+    def aggregate(self, pipeline, allowDiskUse=False):
+        grouped = {}
+        if "$match" in pipeline[0] and "$or" in pipeline[0]["$match"]:
+            match = pipeline[0]["$match"]
+            window = match["$or"][0]["occurred_at"]
+            docs = [dict(doc, occurred_at=doc.get("occurred_at", doc.get("tracked_at"))) for doc in self.docs
+                    if doc["workspace_id"] == match["workspace_id"] and doc["source"] == match.get("source", doc["source"])]
+            docs = [doc for doc in docs if window["$gte"] <= doc["occurred_at"] < window["$lt"]]
+            if "$limit" in pipeline[-1]:
+                docs.sort(key=lambda doc: doc["occurred_at"], reverse=True)
+                return FakeCursor(docs[:pipeline[-1]["$limit"]])
+            for doc in docs:
+                row = grouped.setdefault(doc["source"], {"_id": doc["source"], "amount": 0, "count": 0})
+                row["amount"] += doc["amount"]
+                row["count"] += 1
+            return FakeCursor(list(grouped.values()))
+        for doc in self.docs:
+            key = (doc["workspace_id"], doc["source"], doc["occurred_at"].year, doc["occurred_at"].month)
+            row = grouped.setdefault(key, {"_id": dict(zip(("workspace_id", "source", "year", "month"), key)),
+                                           "total_revenue": 0, "transaction_count": 0})
+            row["total_revenue"] += doc["amount"]
+            row["transaction_count"] += 1
+        return FakeCursor(list(grouped.values()))
+
+
+class _Projections:
+    def __init__(self):
+        self.docs = {}
+
+    async def find_one(self, query):
+        return self.docs.get(query["_id"])
+
+    async def bulk_write(self, requests, ordered=True):
+        for request in requests:
+            self.docs[request._filter["_id"]] = request._doc
+
+
+@pytest.fixture
+def service(monkeypatch):
+    db = FakeDatabase(enterprise_revenue_aggregates=_Aggregates(),
+                      enterprise_revenue_tracking=_Tracking(),
+                      enterprise_revenue_projections=_Projections())
+    monkeypatch.setattr(enterprise_revenue_service, "get_motor_database", lambda: db)
+    return EnterpriseRevenueService()
+
+
+@pytest.mark.asyncio
+async def test_tracked_revenue_feeds_trends_and_projections_in_one_read(service):
+    this_month = _month_start(datetime.utcnow())
+    last_month = _add_months(this_month, -1)
+    for source, amount, occurred_at in [("ecommerce", 100, this_month), ("courses", 50, this_month),
+                                        ("ecommerce", 80, last_month)]:
+        result = await service.track_revenue_transaction({
+            "workspace_id": "ws1", "source": source, "amount": amount, "occurred_at": occurred_at.isoformat()
+        })
+        assert result["success"]
+
+    aggregates = service.db.enterprise_revenue_aggregates
+    analytics = await service.get_revenue_analytics("ws1", "month")
+    assert aggregates.reads == 1
+    assert [point["total_revenue"] for point in analytics["trend_data"][:3]] == [150, 80, 0]
+    assert analytics["trend_data"][0]["revenue_breakdown"]["ecommerce"]["transaction_count"] == 1
+    assert analytics["growth_metrics"]["growth_amount"] == 70
+
+    projections = await service.get_revenue_projections("ws1", 3)
+    assert aggregates.reads == 2
+    assert len(projections["historical_data"]) == 13
+    assert projections["historical_data"][-1] == {"month": this_month.strftime("%Y-%m"), "revenue": 150}
+    assert projections["projections"][0]["month"] == _add_months(this_month, 1).strftime("%Y-%m")
+    first = projections["projections"][0]
+    assert first["revenue_range"]["lower"] <= first["projected_revenue"] <= first["revenue_range"]["upper"]
+
+
+@pytest.mark.asyncio
+async def test_nightly_batch_serves_projections_for_every_workspace(service):
+    this_month = _month_start(datetime.utcnow())
+    for workspace_id, amounts in [("ws1", (100, 110, 121)), ("ws2", (50, 50, 50))]:
+        for i, amount in enumerate(amounts):
+            await service.track_revenue_transaction({
+                "workspace_id": workspace_id, "source": "ecommerce", "amount": amount,
+                "occurred_at": _add_months(this_month, i - 2).isoformat()
+            })
+
+    result = await service.precompute_revenue_projections(months_ahead=6)
+    assert result == {"success": True, "workspaces": 2, "method": "trend"}
+
+    aggregates = service.db.enterprise_revenue_aggregates
+    reads = aggregates.reads
+    projections = await service.get_revenue_projections("ws2", 3)
+    assert aggregates.reads == reads
+    assert len(projections["projections"]) == 3
+    assert projections["historical_data"][-1] == {"month": this_month.strftime("%Y-%m"), "revenue": 50.0}
+
+    # A horizon the batch did not cover is forecast live
+    await service.get_revenue_projections("ws2", 9)
+    assert aggregates.reads == reads + 1
+
+
+@pytest.mark.asyncio
+async def test_custom_range_counts_partial_months_by_occurred_at(service):
+    for day, amount in [(datetime(2024, 1, 10), 1), (datetime(2024, 1, 20), 2), (datetime(2024, 2, 5), 4),
+                        (datetime(2024, 3, 5), 8), (datetime(2024, 3, 10, 12), 16), (datetime(2024, 3, 20), 32)]:
+        await service.track_revenue_transaction({
+            "workspace_id": "ws1", "source": "ecommerce", "amount": amount, "occurred_at": day.isoformat()
+        })
+
+    result = await service.calculate_workspace_revenue("ws1", "custom", "2024-01-15", "2024-03-10")
+
+    # February comes from its bucket; January 15-31 and March 1-10 from the transactions
+    assert service.db.enterprise_revenue_aggregates.reads == 1
+    assert result["total_revenue"] == 30
+    assert result["revenue_breakdown"]["ecommerce"]["transaction_count"] == 4
+
+
+@pytest.mark.asyncio
+async def test_source_transactions_list_legacy_records_they_count(service):
+    start, end = datetime(2024, 3, 5), datetime(2024, 3, 20)
+    tracking = service.db.enterprise_revenue_tracking
+    tracking.docs = [
+        {"_id": "t1", "workspace_id": "ws1", "source": "courses", "amount": 5, "occurred_at": datetime(2024, 3, 8)},
+        # Tracked before occurred_at existed
+        {"_id": "t0", "workspace_id": "ws1", "source": "courses", "amount": 7, "tracked_at": datetime(2024, 3, 12)},
+    ]
+    service._parse_period = lambda period, start_date=None, end_date=None: (start, end)
+
+    result = await service.get_revenue_sources_breakdown("ws1", "custom")
+
+    courses = result["detailed_breakdown"]["courses"]
+    assert (courses["total_amount"], courses["transaction_count"]) == (12, 2)
+    assert [(t["id"], t["date"]) for t in courses["transactions"]] == [("t0", "2024-03-12T00:00:00"),
+                                                                      ("t1", "2024-03-08T00:00:00")]
+
+
+@pytest.mark.asyncio
+async def test_rebuild_restores_buckets_from_transactions(service):
+    for amount in (10, 20):
+        await service.track_revenue_transaction({"workspace_id": "ws1", "source": "templates", "amount": amount})
+    aggregates = service.db.enterprise_revenue_aggregates
+    expected = dict(aggregates.docs)
+    aggregates.docs = {"stale": {"workspace_id": "ws1", "source": "templates", "period_start": None,
+                                 "total_revenue": 999, "transaction_count": 9}}
+
+    result = await service.rebuild_revenue_aggregates("ws1")
+
+    assert result == {"success": True, "buckets": 1, "workspace_id": "ws1"}
+    [bucket_id] = expected
+    assert aggregates.docs[bucket_id]["total_revenue"] == 30
+    assert aggregates.docs[bucket_id]["transaction_count"] == 2
+    assert "stale" not in aggregates.docs
+
+
+@pytest.mark.asyncio
+async def test_rebuild_keeps_buckets_tracked_while_it_runs(service):
+    aggregates = service.db.enterprise_revenue_aggregates
+    tracking = service.db.enterprise_revenue_tracking
+    rebuild_read = tracking.aggregate
+
+    def aggregate_then_track(pipeline, allowDiskUse=False):
+        cursor = rebuild_read(pipeline, allowDiskUse)
+        aggregates.docs["live"] = {"workspace_id": "ws1", "source": "courses", "period_start": None,
+                                   "total_revenue": 5, "transaction_count": 1, "last_updated": datetime.utcnow()}
+        return cursor
+
+    tracking.aggregate = aggregate_then_track
+    await service.rebuild_revenue_aggregates("ws1")
+
+    assert "live" in aggregates.docs
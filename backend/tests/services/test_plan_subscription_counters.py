@@ -0,0 +1,153 @@
+"""
+Tests for incremental plan subscription counters and the cached plan catalog
+"""
+
+import asyncio
+from types import SimpleNamespace
+
+import pytest
+
+from core import cache
+from core.plan_catalog import PlanCatalogManager
+from services.admin_plan_management_service import AdminPlanManagementService
+from services.enhanced_subscription_service import EnhancedSubscriptionService
+from services.plan_subscription_counter_service import ALL_PLANS, PlanSubscriptionCounterService
+from tests.utils.fake_mongo import FakeCursor, FakeDatabase
+
+
+class _Collection:
+    """Keyed documents supporting the ``$inc``/``$set``/``$setOnInsert`` upserts the counters use"""
+
+    def __init__(self):
+        self.docs = {}
+        self.finds = 0
+
+    async def bulk_write(self, requests, ordered=True):
+        for request in requests:
+            doc = self.docs.get(request._filter["_id"])
+            if doc is None:
+                doc = self.docs[request._filter["_id"]] = {"_id": request._filter["_id"],
+                                                           **request._doc.get("$setOnInsert", {})}
+            for field, delta in request._doc.get("$inc", {}).items():
+                doc[field] = doc.get(field, 0) + delta
+            doc.update(request._doc.get("$set", {}))
+
+    def find(self, query=None):
+        self.finds += 1
+        return FakeCursor(list(self.docs.values()))
+
+    async def insert_one(self, doc):
+        self.docs[doc["_id"]] = doc
+
+    async def find_one(self, query, projection=None):
+        return self.docs.get(query["_id"])
+
+    async def find_one_and_update(self, query, update, upsert=False, return_document=None):
+        doc = self.docs.setdefault(query["_id"], {"_id": query["_id"]})
+        for field, delta in update.get("$inc", {}).items():
+            doc[field] = doc.get(field, 0) + delta
+        doc.update(update.get("$set", {}))
+        return doc
+
+
+class _Subscriptions:
+    def __init__(self, doc):
+        self.doc = doc
+
+    async def find_one(self, query):
+        return dict(self.doc) if self.doc["status"] in query["status"]["$in"] else None
+
+    async def update_one(self, query, update):
+        matched = all(self.doc.get(field) == value for field, value in query.items())
+        if matched:
+            self.doc.update(update["$set"])
+        return SimpleNamespace(modified_count=int(matched))
+
+
+class _Gateway:
+    async def request(self, operation, subscription_id, **params):
+        await asyncio.sleep(0)
+        return SimpleNamespace(id=subscription_id, status="active", metadata={})
+
+
+class _Counters:
+    def __init__(self):
+        self.calls = []
+
+    async def record_modified(self, *args):
+        self.calls.append(("modified", args))
+
+    async def record_canceled(self, *args):
+        self.calls.append(("canceled", args))
+
+
+@pytest.fixture(autouse=True)
+def caches(monkeypatch):
+    monkeypatch.setattr(cache, "_caches", {})
+
+
+@pytest.mark.asyncio
+async def test_counters_follow_create_modify_and_cancel():
+    db = FakeDatabase(_Collection)
+    counters = PlanSubscriptionCounterService(db)
+
+    await counters.record_created(["creator", "ecommerce"], 50)
+    await counters.record_created(["creator"], 20)
+    await counters.record_modified(["creator", "ecommerce"], 50, ["creator", "business"], 70)
+    await counters.record_canceled(["creator"], 20)
+
+    current = await counters.get_counters()
+    assert current[ALL_PLANS] == {"active_subscriptions": 1, "active_revenue": 70}
+    assert current["creator"] == {"active_subscriptions": 1, "active_revenue": 70}
+    assert current["ecommerce"] == {"active_subscriptions": 0, "active_revenue": 0}
+    assert current["business"] == {"active_subscriptions": 1, "active_revenue": 70}
+    assert sum(bucket["subscription_count"] for bucket in await counters.get_monthly()) == 3
+
+
+@pytest.mark.asyncio
+async def test_all_plans_reads_catalog_once_and_counters_per_request():
+    db = FakeDatabase(_Collection)
+    db.admin_plans.docs = {"creator": {"name": "creator", "status": {"enabled": True}},
+                           "business": {"name": "business", "status": {"enabled": False}}}
+    service = AdminPlanManagementService()
+    service.db = db
+    service.counters = PlanSubscriptionCounterService(db)
+    service.plan_catalog = PlanCatalogManager(poll_interval=60)
+    await service.counters.record_created(["creator"], 30)
+
+    first = await service.get_all_plans()
+    await service.counters.record_created(["creator"], 30)
+    second = await service.get_all_plans()
+
+    assert db.admin_plans.finds == 1
+    assert db.plan_subscription_counters.finds == 2
+    assert first["plans"]["creator"]["subscription_count"] == 1
+    assert second["plans"]["creator"]["subscription_count"] == 2
+    assert second["plans"]["business"]["subscription_count"] == 0
+    assert second["analytics"]["total_active_subscriptions"] == 2
+    assert second["analytics"]["total_revenue"] == 60
+
+    await service._log_plan_change("business", "status_update", {}, "admin", "test")
+    await service.get_all_plans()
+    assert db.admin_plans.finds == 2
+
+
+@pytest.mark.asyncio
+async def test_concurrent_subscription_changes_adjust_counters_once():
+    subscriptions = _Subscriptions({"user_id": "u1", "stripe_subscription_id": "sub_1", "status": "active",
+                                    "bundles": ["creator"], "final_cost": 20, "billing_cycle": "monthly"})
+    service = EnhancedSubscriptionService.__new__(EnhancedSubscriptionService)
+    service.gateway = _Gateway()
+    service.plan_counters = _Counters()
+    service.bundle_manager = SimpleNamespace(deactivate_bundle=None)
+
+    async def get_db():
+        return FakeDatabase(subscriptions=subscriptions)
+
+    service._get_db = get_db
+
+    results = await asyncio.gather(service.cancel_subscription("u1"), service.cancel_subscription("u1"))
+
+    assert all(result["success"] for result in results)
+    assert service.plan_counters.calls == [("canceled", (["creator"], 20))]
+    assert subscriptions.doc["status"] == "cancel_at_period_end"
@@ -0,0 +1,150 @@
+"""
+Tests for the repository-backed document services
+"""
+
+from datetime import datetime
+
+import pytest
+from bson import ObjectId
+
+from core.indexes import declared_indexes
+from core.repository import AsyncRepository
+from tests.utils.fake_mongo import FakeCursor
+from services.crm_service import CrmService
+from services.repository_service import RepositoryService
+
+
+def _matches(doc, query):
+    for field, condition in query.items():
+        value = doc.get(field)
+        if isinstance(condition, dict):
+            if "$gt" in condition and not value > condition["$gt"]:
+                return False
+            if "$lt" in condition and not value < condition["$lt"]:
+                return False
+        elif value != condition:
+            return False
+    return True
+
+
+def _run(stages, docs):
+    """The pipeline stages AsyncRepository sends, evaluated over in-memory documents"""
+    for stage in stages:
+        (name, spec), = stage.items()
+        if name == "$match":
+            docs = [doc for doc in docs if _matches(doc, spec)]
+        elif name == "$sort":
+            (field, order), = spec.items()
+            docs = sorted(docs, key=lambda doc: doc[field], reverse=order < 0)
+        elif name == "$skip":
+            docs = docs[spec:]
+        elif name == "$limit":
+            docs = docs[:spec]
+        elif name == "$project":
+            docs = [{k: v for k, v in doc.items() if spec.get(k)} for doc in docs]
+        elif name == "$count":
+            docs = [{spec: len(docs)}] if docs else []
+        elif name == "$group":
+            key = spec["_id"].lstrip("$")
+            counts = {}
+            for doc in docs:
+                counts[doc.get(key)] = counts.get(doc.get(key), 0) + 1
+            docs = [{"_id": value, "count": count} for value, count in counts.items()]
+        elif name == "$facet":
+            docs = [{output: _run(pipeline, docs) for output, pipeline in spec.items()}]
+    return docs
+
+
+class _SortingCursor(FakeCursor):
+    def sort(self, keys=None, direction=None):
+        self.rows = sorted(self.rows, key=lambda doc: doc[keys], reverse=direction < 0)
+        return super().sort(keys, direction)
+
+
+class _Collection:
+    def __init__(self, docs):
+        self.docs = docs
+        self.pipelines = []
+
+    def aggregate(self, pipeline):
+        self.pipelines.append(pipeline)
+        return FakeCursor(_run(pipeline, self.docs))
+
+    def find(self, query, projection=None):
+        docs = [doc for doc in self.docs if _matches(doc, query)]
+        return _SortingCursor(docs)
+
+
+@pytest.fixture
+def repository():
+    docs = [{"_id": ObjectId(), "id": str(n), "user_id": "u1" if n < 7 else "u2",
+             "status": "active" if n % 3 else "draft", "name": f"Item {n}"} for n in range(10)]
+    repository = AsyncRepository("crm_test")
+    repository._collection = _Collection(docs)
+    return repository
+
+
+def test_entity_methods_are_declared():
+    service = CrmService()
+    assert service.create_crm == service.create_item
+    assert service.list_crms == service.list_items
+    assert {"id_unique", "user_id__id"} <= {index.document["name"] for index in declared_indexes()["crm"]}
+
+
+def test_sanitize_renders_native_datetimes():
+    created = datetime(2024, 5, 1, 12, 30)
+    doc = RepositoryService._sanitize_doc({"_id": "x", "id": "1", "created_at": created, "name": "A"})
+    assert doc == {"id": "1", "created_at": "2024-05-01T12:30:00", "name": "A"}
+
+
+def test_projection_from_fields():
+    assert AsyncRepository.projection(None) is None
+    assert AsyncRepository.projection(["id", "name"]) == {"id": 1, "name": 1}
+
+
+@pytest.mark.asyncio
+async def test_invalid_cursor_is_rejected(monkeypatch):
+    repository = AsyncRepository("crm_test")
+
+    async def collection():
+        return object()
+
+    monkeypatch.setattr(repository, "collection", collection)
+    with pytest.raises(ValueError):
+        await repository.page({}, cursor="not-an-object-id")
+
+
+@pytest.mark.asyncio
+async def test_page_returns_items_and_total_from_one_facet(repository):
+    page = await repository.page({"user_id": "u1"}, limit=3, offset=3, fields=["name"])
+
+    assert len(repository._collection.pipelines) == 1
+    assert page["total"] == 7
+    assert [item["name"] for item in page["items"]] == ["Item 3", "Item 4", "Item 5"]
+    assert set(page["items"][0]) == {"_id", "name"}
+    assert page["next_cursor"] == str(page["items"][-1]["_id"])
+
+    last = await repository.page({"user_id": "u1"}, limit=3, offset=6)
+    assert [item["id"] for item in last["items"]] == ["6"] and last["next_cursor"] is None
+
+
+@pytest.mark.asyncio
+async def test_cursor_paging_walks_every_page_once(repository):
+    seen, cursor = [], None
+    while True:
+        page = await repository.page({"user_id": "u1"}, limit=3, cursor=cursor)
+        seen += [item["id"] for item in page["items"]]
+        cursor = page["next_cursor"]
+        if cursor is None:
+            break
+    assert seen == [str(n) for n in range(7)]
+
+    newest = await repository.page({}, limit=4, cursor=str(ObjectId()), descending=True)
+    assert newest["total"] is None
+    assert [item["id"] for item in newest["items"]] == ["9", "8", "7", "6"]
+
+
+@pytest.mark.asyncio
+async def test_stats_counts_total_and_status_buckets(repository):
+    assert await repository.stats({"user_id": "u1"}) == {"total": 7, "by_status": {"draft": 3, "active": 4}}
+    assert await repository.stats({"user_id": "nobody"}) == {"total": 0, "by_status": {}}
@@ -0,0 +1,73 @@
+from typing import Generator
+
+import pytest
+import stripe
+
+from core.plan_catalog import PlanCatalogManager
+from core.stripe_gateway import StripeGateway
+from services.stripe_price_catalog_service import (
+    StripePriceCatalogService,
+    calculate_checkout_pricing,
+    catalog_key,
+)
+from tests.utils.fake_stripe import FakeStripeServer
+
+
+@pytest.fixture
+def catalog(monkeypatch: pytest.MonkeyPatch) -> Generator[StripePriceCatalogService, None, None]:
+    saved = (stripe.api_key, stripe.api_base, stripe.default_http_client, stripe.max_network_retries)
+    with FakeStripeServer() as server:
+        gateway = StripeGateway(api_key="sk_test_fake", api_base=server.url, timeout=5, max_workers=4)
+        gateway.configure()
+        service = StripePriceCatalogService()
+        service.gateway = gateway
+        service.plans = PlanCatalogManager()
+        service.server = server
+
+        async def no_collection():
+            return None
+
+        monkeypatch.setattr(service, "_get_collection_async", no_collection)
+        yield service
+        gateway.close()
+    stripe.api_key, stripe.api_base, stripe.default_http_client, stripe.max_network_retries = saved
+
+
+def test_checkout_pricing_discount_tiers() -> None:
+    assert calculate_checkout_pricing(["creator"], "monthly")["discounted_amount"] == 1900
+    two = calculate_checkout_pricing(["creator", "ecommerce"], "monthly")
+    assert two["discount_rate"] == 0.20
+    assert two["discounted_amount"] == int(4300 * 0.8)
+    assert calculate_checkout_pricing(["creator", "ecommerce", "business", "education"], "yearly")["discount_rate"] == 0.40
+
+
+def test_catalog_key_ignores_bundle_order() -> None:
+    assert catalog_key(["ecommerce", "creator"], "monthly", 0.2) == catalog_key(["creator", "ecommerce"], "monthly", 0.2)
+    assert catalog_key(["creator"], "monthly", 0) != catalog_key(["creator"], "yearly", 0)
+
+
+@pytest.mark.asyncio
+async def test_price_reused_across_checkouts(catalog: StripePriceCatalogService) -> None:
+    first = await catalog.get_price_id(["creator", "ecommerce"], "monthly")
+    second = await catalog.get_price_id(["ecommerce", "creator"], "monthly")
+    assert first["price_id"] == second["price_id"]
+    assert second["cached"] is True
+    assert catalog.server.count("POST", "/v1/prices") == 1
+
+
+@pytest.mark.asyncio
+async def test_repeated_bundle_is_priced_once(catalog: StripePriceCatalogService) -> None:
+    single = await catalog.get_price_id(["creator"], "monthly")
+    repeated = await catalog.get_price_id(["creator", "creator"], "monthly")
+    assert repeated["price_id"] == single["price_id"]
+    assert (repeated["discounted_amount"], repeated["bundle_count"], repeated["discount_rate"]) == (1900, 1, 0)
+    assert calculate_checkout_pricing(["creator", "creator"], "monthly") == calculate_checkout_pricing(["creator"], "monthly")
+
+
+@pytest.mark.asyncio
+async def test_invalidate_on_plan_pricing_change(catalog: StripePriceCatalogService) -> None:
+    first = await catalog.get_price_id(["creator"], "monthly")
+    await catalog.invalidate("creator", {"monthly_price": 25.0})
+    second = await catalog.get_price_id(["creator"], "monthly")
+    assert second["discounted_amount"] == 2500
+    assert second["price_id"] != first["price_id"]
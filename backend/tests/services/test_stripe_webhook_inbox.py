@@ -0,0 +1,265 @@
+"""
+Tests for the Stripe webhook inbox: ingestion, per-customer ordering, retries and replay
+"""
+
+import asyncio
+from datetime import datetime, timedelta
+from types import SimpleNamespace
+
+import pytest
+from pymongo.errors import DuplicateKeyError
+
+from services import stripe_webhook_inbox_service
+from services.stripe_webhook_inbox_service import StripeWebhookInboxService, event_customer
+from tests.utils.fake_mongo import FakeCursor, FakeDatabase
+
+
+def _matches(doc, query):
+    for field, condition in query.items():
+        if field == "$or":
+            if not any(_matches(doc, option) for option in condition):
+                return False
+            continue
+        value = doc.get(field)
+        if isinstance(condition, dict):
+            for op, operand in condition.items():
+                if op == "$in" and value not in operand:
+                    return False
+                if op == "$lte" and not (value is not None and value <= operand):
+                    return False
+                if op == "$lt" and not (value is not None and value < operand):
+                    return False
+                if op == "$gt" and not (value is not None and value > operand):
+                    return False
+        elif value != condition:
+            return False
+    return True
+
+
+class _Collection:
+    """Documents keyed by ``_id``, in insertion order"""
+
+    def __init__(self):
+        self.docs = {}
+
+    def _apply(self, doc, update):
+        doc.update(update.get("$set", {}))
+        for field, delta in update.get("$inc", {}).items():
+            doc[field] = doc.get(field, 0) + delta
+        for field in update.get("$unset", {}):
+            doc.pop(field, None)
+
+    async def insert_one(self, doc):
+        if doc["_id"] in self.docs:
+            raise DuplicateKeyError("E11000 duplicate key")
+        self.docs[doc["_id"]] = dict(doc)
+
+    async def find_one(self, query):
+        return next((dict(doc) for doc in self.docs.values() if _matches(doc, query)), None)
+
+    def find(self, query, projection=None):
+        return FakeCursor([dict(doc) for doc in self.docs.values() if _matches(doc, query)])
+
+    async def distinct(self, field, query):
+        return list({doc[field] for doc in self.docs.values() if _matches(doc, query)})
+
+    async def find_one_and_update(self, query, update, upsert=False, return_document=None):
+        for doc in self.docs.values():
+            if _matches(doc, query):
+                before = dict(doc)
+                self._apply(doc, update)
+                return dict(doc) if return_document else before
+        return None
+
+    async def update_one(self, query, update):
+        for doc in self.docs.values():
+            if _matches(doc, query):
+                self._apply(doc, update)
+                return SimpleNamespace(modified_count=1)
+        return SimpleNamespace(modified_count=0)
+
+    async def update_many(self, query, update):
+        matched = [doc for doc in self.docs.values() if _matches(doc, query)]
+        for doc in matched:
+            self._apply(doc, update)
+        return SimpleNamespace(modified_count=len(matched))
+
+    async def replace_one(self, query, doc, upsert=False):
+        self.docs[query["_id"]] = dict(doc)
+
+    async def delete_many(self, query):
+        self.docs = {key: doc for key, doc in self.docs.items() if not _matches(doc, query)}
+
+    async def delete_one(self, query):
+        await self.delete_many(query)
+
+
+def _event(event_id, customer, created):
+    return {"id": event_id, "type": "invoice.paid", "created": created,
+            "data": {"object": {"object": "invoice", "customer": customer}}}
+
+
+@pytest.fixture
+def db(monkeypatch):
+    database = FakeDatabase(_Collection)
+
+    async def get_database():
+        return database
+
+    monkeypatch.setattr(stripe_webhook_inbox_service, "get_database_async", get_database)
+    return database
+
+
+@pytest.fixture
+def inbox(db):
+    service = StripeWebhookInboxService(partitions=2, max_attempts=2, base_delay=60)
+    service._queues = [asyncio.Queue() for _ in range(service.partitions)]
+    return service
+
+
+def _drain(inbox):
+    event_ids = []
+    for queue in inbox._queues:
+        while not queue.empty():
+            event_ids.append(queue.get_nowait())
+    return sorted(event_ids)
+
+
+def _finish(inbox, event_id):
+    inbox._in_flight = {item for item in inbox._in_flight if item[1] != event_id}
+
+
+def test_event_customer_uses_object_customer():
+    event = {"data": {"object": {"object": "subscription", "id": "sub_1", "customer": "cus_1"}}}
+    assert event_customer(event) == "cus_1"
+
+
+def test_event_customer_for_customer_objects_and_missing():
+    assert event_customer({"data": {"object": {"object": "customer", "id": "cus_2"}}}) == "cus_2"
+    assert event_customer({"data": {"object": {"customer": {"id": "cus_3"}}}}) == "cus_3"
+    assert event_customer({"data": {"object": {"object": "price", "id": "price_1"}}}) == "_none"
+
+
+def test_backoff_is_exponential_and_capped():
+    inbox = StripeWebhookInboxService(base_delay=2.0, max_delay=60.0)
+    assert [inbox._backoff(n) for n in range(1, 7)] == [2.0, 4.0, 8.0, 16.0, 32.0, 60.0]
+
+
+@pytest.mark.asyncio
+async def test_enqueue_ignores_redelivered_events(inbox, db):
+    assert await inbox.enqueue(_event("evt_1", "cus_1", 1)) is True
+    assert await inbox.enqueue(_event("evt_1", "cus_1", 1)) is False
+    record = db.stripe_webhook_events.docs["evt_1"]
+    assert len(db.stripe_webhook_events.docs) == 1
+    assert record["status"] == "pending" and record["customer"] == "cus_1"
+
+
+@pytest.mark.asyncio
+async def test_one_event_per_customer_in_flight_and_backoff_blocks_the_customer(inbox, db):
+    for event in (_event("evt_1", "cus_1", 1), _event("evt_2", "cus_1", 2), _event("evt_3", "cus_2", 3)):
+        await inbox.enqueue(event)
+
+    assert await inbox._dispatch_batch(db) == 2
+    assert _drain(inbox) == ["evt_1", "evt_3"]
+    # evt_2 waits while evt_1 of the same customer is in flight
+    assert await inbox._dispatch_batch(db) == 0
+
+    async def fail(obj):
+        raise RuntimeError("downstream unavailable")
+
+    inbox.handlers = {"invoice.paid": fail}
+    assert await inbox.process_event("evt_1") is False
+    _finish(inbox, "evt_1")
+    # evt_1 is now pending on backoff, which still blocks evt_2
+    assert await inbox._dispatch_batch(db) == 0
+
+    db.stripe_webhook_events.docs["evt_1"]["next_attempt_at"] = datetime.utcnow() - timedelta(seconds=1)
+    assert await inbox._dispatch_batch(db) == 1
+    assert _drain(inbox) == ["evt_1"]
+
+
+@pytest.mark.asyncio
+async def test_failures_retry_then_dead_letter(inbox, db):
+    handled = []
+
+    async def fail(obj):
+        handled.append(obj["customer"])
+        raise RuntimeError("boom")
+
+    inbox.handlers = {"invoice.paid": fail}
+    await inbox.enqueue(_event("evt_1", "cus_1", 1))
+    events = db.stripe_webhook_events.docs
+
+    assert await inbox.process_event("evt_1") is False
+    assert events["evt_1"]["status"] == "pending" and events["evt_1"]["attempts"] == 1
+    assert events["evt_1"]["next_attempt_at"] > datetime.utcnow() + timedelta(seconds=50)
+    assert inbox.retried == 1
+
+    assert await inbox.process_event("evt_1") is False
+    assert events["evt_1"]["status"] == "dead" and events["evt_1"]["attempts"] == 2
+    assert db.stripe_webhook_dead_letters.docs["evt_1"]["last_error"] == "boom"
+    assert inbox.dead_lettered == 1 and handled == ["cus_1", "cus_1"]
+
+    async def succeed(obj):
+        handled.append("ok")
+
+    inbox.handlers = {"invoice.paid": succeed}
+    assert await inbox.requeue(dead_letters=True) == 1
+    assert events["evt_1"]["status"] == "pending" and events["evt_1"]["attempts"] == 0
+    assert db.stripe_webhook_dead_letters.docs == {}
+    assert await inbox.process_event("evt_1") is True
+    assert events["evt_1"]["status"] == "processed" and inbox.processed == 1
+
+
+@pytest.mark.asyncio
+async def test_new_leader_recovers_events_left_processing(inbox, db):
+    await inbox.enqueue(_event("evt_1", "cus_1", 1))
+    await inbox.enqueue(_event("evt_2", "cus_2", 2))
+    assert await inbox._dispatch_batch(db) == 2
+
+    # The old leader crashed with both events claimed; another worker takes over
+    successor = StripeWebhookInboxService(partitions=1)
+    successor._queues = [asyncio.Queue()]
+    db.stripe_webhook_leases.docs["processor"] = {"_id": "processor", "owner": inbox.worker_id,
+                                                  "expires_at": datetime.utcnow() - timedelta(seconds=1)}
+    assert await successor._acquire_lease(db) is True
+    for doc in db.stripe_webhook_events.docs.values():
+        doc["lease_until"] = datetime.utcnow() - timedelta(seconds=1)
+    await successor._recover_stale(db)
+
+    assert {doc["status"] for doc in db.stripe_webhook_events.docs.values()} == {"pending"}
+    assert await successor._dispatch_batch(db) == 2
+
+
+@pytest.mark.asyncio
+async def test_new_leader_leaves_events_the_old_leader_is_still_handling(inbox, db):
+    await inbox.enqueue(_event("evt_1", "cus_1", 1))
+    assert await inbox._dispatch_batch(db) == 1
+    await inbox.enqueue(_event("evt_2", "cus_1", 2))
+
+    # Leadership moves while the old leader is still inside evt_1's handler
+    successor = StripeWebhookInboxService(partitions=1)
+    successor._queues = [asyncio.Queue()]
+    await successor._recover_stale(db)
+
+    assert db.stripe_webhook_events.docs["evt_1"]["status"] == "processing"
+    # Neither evt_1 again nor the customer's next event is dispatched
+    assert await successor._dispatch_batch(db) == 0
+
+    assert await inbox.process_event("evt_1") is True
+    assert "lease_until" not in db.stripe_webhook_events.docs["evt_1"]
+    assert await successor._dispatch_batch(db) == 1
+    assert _drain(successor) == ["evt_2"]
+
+
+@pytest.mark.asyncio
+async def test_requeue_by_id_replays_processed_events(inbox, db):
+    inbox.handlers = {}
+    await inbox.enqueue(_event("evt_1", "cus_1", 1))
+    await inbox.enqueue(_event("evt_2", "cus_1", 2))
+    assert await inbox.process_event("evt_1") is True
+    assert await inbox.requeue() == 0
+
+    assert await inbox.requeue(["evt_1"]) == 1
+    assert db.stripe_webhook_events.docs["evt_1"]["status"] == "pending"
+    assert db.stripe_webhook_events.docs["evt_2"]["status"] == "pending"
@@ -0,0 +1,169 @@
+"""
+Tests for template seller statistics read from daily sales rollups
+"""
+
+from datetime import datetime, timedelta
+
+import pytest
+from pymongo.errors import DuplicateKeyError
+
+from api.api_v1.endpoints import stripe_webhooks
+from services import template_marketplace_access_service, template_sales_service
+from services.template_marketplace_access_service import TemplateMarketplaceAccessService
+from services.template_sales_service import TemplateSalesService
+from tests.utils.fake_mongo import FakeCursor, FakeDatabase
+
+
+class _Sales:
+    def __init__(self):
+        self.docs = {}
+
+    async def insert_one(self, doc):
+        if doc["_id"] in self.docs:
+            raise DuplicateKeyError("E11000 duplicate key")
+        self.docs[doc["_id"]] = dict(doc, pending_rollups=list(doc["pending_rollups"]))
+
+    async def find_one(self, query, projection=None):
+        return self.docs.get(query["_id"])
+
+    async def find_one_and_update(self, query, update, return_document=None):
+        doc = self.docs.get(query["_id"])
+        if not doc or not doc["pending_rollups"] or doc["rollup_lease_until"] > query["rollup_lease_until"]["$lte"]:
+            return None
+        doc.update(update["$set"])
+        return dict(doc)
+
+    async def update_one(self, query, update):
+        self.docs[query["_id"]]["pending_rollups"].remove(update["$pull"]["pending_rollups"])
+
+
+class _Daily:
+    def __init__(self, templates):
+        self.docs = {}
+        self.templates = templates
+        self.aggregations = 0
+
+    async def update_one(self, query, update, upsert=False):
+        doc = self.docs.setdefault(query["_id"], dict(update["$setOnInsert"]))
+        for field, delta in update["$inc"].items():
+            doc[field] = doc.get(field, 0) + delta
+
+    def aggregate(self, pipeline):
+        self.aggregations += 1
+        match = pipeline[0]["$match"]
+        docs = [doc for doc in self.docs.values()
+                if doc["seller_id"] == match["seller_id"] and doc["workspace_id"] == match["workspace_id"]
+                and match["day"]["$gte"] <= doc["day"] <= match["day"]["$lte"]]
+        totals = {field: sum(doc.get(field, 0) for doc in docs)
+                  for field in ("sales", "views", "revenue", "seller_earnings")}
+        by_template = {}
+        for doc in docs:
+            row = by_template.setdefault(doc["template_id"], {"_id": doc["template_id"], "sales": 0, "revenue": 0})
+            row["sales"] += doc.get("sales", 0)
+            row["revenue"] += doc.get("revenue", 0)
+        top = sorted((row for row in by_template.values() if row["sales"]),
+                     key=lambda row: (-row["sales"], -row["revenue"]))
+        for row in top:
+            template = self.templates.docs.get(row["_id"], {})
+            row.update(title=template.get("title"), rating=template.get("rating"))
+        return FakeCursor([{"totals": [totals] if docs else [], "top_templates": top}])
+
+
+class _Templates:
+    def __init__(self):
+        self.docs = {"t1": {"id": "t1", "title": "Portfolio", "rating": 4.6},
+                     "t2": {"id": "t2", "title": "Storefront", "rating": 4.9}}
+        self.failures = 0
+
+    async def update_one(self, query, update):
+        if self.failures:
+            self.failures -= 1
+            raise ConnectionError("connection reset")
+        doc = self.docs[query["id"]]
+        for field, delta in update["$inc"].items():
+            doc[field] = doc.get(field, 0) + delta
+        doc.update(update["$max"])
+
+
+@pytest.fixture
+def db():
+    templates = _Templates()
+    return FakeDatabase(template=templates, template_sales=_Sales(), template_sales_daily=_Daily(templates))
+
+
+@pytest.mark.asyncio
+async def test_sales_and_views_roll_up_into_seller_statistics(db, monkeypatch):
+    sales = TemplateSalesService(db)
+    now = datetime.utcnow()
+    for sale_id, template_id, amount in [("s1", "t1", 20.0), ("s2", "t2", 50.0), ("s3", "t2", 50.0)]:
+        assert (await sales.record_sale({"sale_id": sale_id, "template_id": template_id, "seller_id": "u1",
+                                         "workspace_id": "ws1", "amount": amount, "occurred_at": now}))["success"]
+    retried = await sales.record_sale({"sale_id": "s3", "template_id": "t2", "seller_id": "u1",
+                                       "workspace_id": "ws1", "amount": 50.0, "occurred_at": now})
+    assert retried["duplicate"]
+    for _ in range(30):
+        await sales.record_view("t2", "u1", "ws1")
+
+    assert db.template.docs["t2"]["sales_count"] == 2
+    assert len(db.template_sales_daily.docs) == 2
+
+    monkeypatch.setattr(template_marketplace_access_service, "get_motor_database", lambda: db)
+    monkeypatch.setattr(template_marketplace_access_service, "get_template_sales_service", lambda: sales)
+    access = TemplateMarketplaceAccessService()
+
+    async def seller_record(user_id, workspace_id):
+        return {"status": "active", "enabled_at": now, "quality_metrics": {
+            "approved_templates": 2, "pending_templates": 0, "rejected_templates": 0, "average_rating": 4.7}}
+
+    monkeypatch.setattr(access, "_get_seller_record", seller_record)
+    result = await access.get_seller_statistics("u1", "ws1", "week")
+
+    stats = result["statistics"]
+    assert db.template_sales_daily.aggregations == 1
+    assert stats["templates"]["total_sales"] == 3
+    assert stats["revenue"]["total_revenue"] == 120.0
+    assert stats["revenue"]["net_earnings"] == 102.0
+    assert stats["performance"]["conversion_rate"] == 0.1
+    assert [(t["title"], t["sales"]) for t in stats["top_templates"]] == [("Storefront", 2), ("Portfolio", 1)]
+
+
+@pytest.mark.asyncio
+async def test_purchase_webhook_records_sales_per_workspace(db, monkeypatch):
+    sales = TemplateSalesService(db)
+    monkeypatch.setattr(template_sales_service, "_service_instance", sales)
+    now = datetime.utcnow()
+    for intent_id, workspace_id in [("pi_1", "ws1"), ("pi_2", "ws2"), ("pi_2", "ws2")]:
+        await stripe_webhooks.handle_payment_intent_succeeded({
+            "id": intent_id, "amount_received": 2000, "currency": "usd",
+            "metadata": {"template_id": "t1", "seller_id": "u1", "workspace_id": workspace_id}
+        })
+    await stripe_webhooks.handle_payment_intent_succeeded({"id": "pi_3", "amount_received": 500, "metadata": {}})
+
+    assert sorted(db.template_sales.docs) == ["pi_1", "pi_2"]
+    assert db.template.docs["t1"]["sales_count"] == 2
+    # The same seller, template and day in two workspaces are two buckets
+    assert len(db.template_sales_daily.docs) == 2
+    stats = await sales.get_seller_stats("u1", "ws2", now, now)
+    assert (stats["sales"], stats["revenue"]) == (1, 20.0)
+
+
+@pytest.mark.asyncio
+async def test_redelivery_finishes_a_sale_whose_rollups_failed(db):
+    sales = TemplateSalesService(db)
+    sale = {"sale_id": "pi_1", "template_id": "t1", "seller_id": "u1", "workspace_id": "ws1",
+            "amount": 20.0, "occurred_at": datetime.utcnow()}
+    db.template.failures = 1
+
+    assert not (await sales.record_sale(sale))["success"]
+    assert db.template_sales.docs["pi_1"]["pending_rollups"] == ["template"]
+    # The failed delivery still holds the sale, so an immediate redelivery is retried later
+    assert not (await sales.record_sale(sale))["success"]
+
+    db.template_sales.docs["pi_1"]["rollup_lease_until"] -= timedelta(minutes=5)
+    retried = await sales.record_sale(sale)
+    assert retried["success"] and retried["duplicate"]
+    assert (await sales.record_sale(sale))["duplicate"]
+
+    assert db.template_sales.docs["pi_1"]["pending_rollups"] == []
+    assert db.template.docs["t1"]["sales_count"] == 1
+    assert [doc["sales"] for doc in db.template_sales_daily.docs.values()] == [1]
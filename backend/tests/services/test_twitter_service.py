@@ -0,0 +1,49 @@
+"""
+Tests for the Twitter service bearer token fetch
+"""
+
+import asyncio
+import time
+
+import pytest
+
+from services import twitter_service
+from services.twitter_service import TwitterService
+
+
+class _Response:
+    status_code = 200
+    text = ""
+
+    def json(self):
+        return {"access_token": "token-1"}
+
+
+@pytest.mark.asyncio
+async def test_bearer_token_is_fetched_once_off_the_event_loop(monkeypatch):
+    posts = []
+
+    def post(*args, **kwargs):
+        posts.append(kwargs)
+        time.sleep(0.2)
+        return _Response()
+
+    monkeypatch.setattr(twitter_service.requests, "post", post)
+    service = TwitterService()
+
+    ticks = 0
+
+    async def ticker():
+        nonlocal ticks
+        while True:
+            await asyncio.sleep(0.01)
+            ticks += 1
+
+    ticking = asyncio.create_task(ticker())
+    tokens = await asyncio.gather(*(service.get_bearer_token() for _ in range(5)))
+    ticking.cancel()
+
+    assert tokens == ["token-1"] * 5 and len(posts) == 1
+    # The loop kept running while the request was in flight
+    assert ticks >= 5
+    assert await service.get_bearer_token() == "token-1" and len(posts) == 1
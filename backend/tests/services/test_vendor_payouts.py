@@ -0,0 +1,259 @@
+"""
+Tests for batched vendor payouts against the local fake Stripe
+"""
+
+import asyncio
+import time
+from datetime import datetime
+from typing import Generator
+
+import pytest
+import stripe
+
+from core.stripe_gateway import StripeGateway
+from services.vendor_payout_service import VendorPayoutService, _RateLimiter
+from tests.utils.fake_stripe import FakeStripeServer
+from tests.utils.fake_mongo import FakeCursor, FakeDatabase
+
+
+def _matches(doc, query):
+    for field, condition in query.items():
+        value = doc.get(field)
+        if isinstance(condition, dict):
+            if "$exists" in condition and (field in doc) != condition["$exists"]:
+                return False
+            if "$lte" in condition and not value <= condition["$lte"]:
+                return False
+            if "$in" in condition and value not in condition["$in"]:
+                return False
+        elif value != condition:
+            return False
+    return True
+
+
+class _Collection:
+    def __init__(self, key="_id"):
+        self.key = key
+        self.docs = {}
+
+    def _apply(self, doc, update):
+        doc.update(update.get("$set", {}))
+        for field in update.get("$unset", {}):
+            doc.pop(field, None)
+
+    async def insert_one(self, doc):
+        self.docs[doc[self.key]] = dict(doc)
+
+    async def find_one(self, query):
+        return next((dict(doc) for doc in self.docs.values() if _matches(doc, query)), None)
+
+    def find(self, query):
+        return FakeCursor([dict(doc) for doc in self.docs.values() if _matches(doc, query)])
+
+    async def update_one(self, query, update):
+        for doc in self.docs.values():
+            if _matches(doc, query):
+                self._apply(doc, update)
+                return
+
+    async def update_many(self, query, update):
+        for doc in self.docs.values():
+            if _matches(doc, query):
+                self._apply(doc, update)
+
+    async def bulk_write(self, requests, ordered=True):
+        for request in requests:
+            key = request._filter["_id"]
+            update = request._doc
+            if key not in self.docs:
+                if not request._upsert:
+                    continue
+                self.docs[key] = {"_id": key, **update.get("$setOnInsert", {})}
+            self._apply(self.docs[key], update)
+
+
+class _Escrow(_Collection):
+    def __init__(self, workspaces):
+        super().__init__(key="id")
+        self.workspaces = workspaces
+        self.aggregations = 0
+
+    def aggregate(self, pipeline, allowDiskUse=False):
+        self.aggregations += 1
+        grouped = {}
+        for doc in self.docs.values():
+            if _matches(doc, pipeline[0]["$match"]):
+                row = grouped.setdefault(doc["workspace_id"], {"_id": doc["workspace_id"], "amount": 0,
+                                                               "transaction_ids": []})
+                row["amount"] += round(doc["net_amount"] * 100)
+                row["transaction_ids"].append(doc["id"])
+        for row in grouped.values():
+            row["destination"] = self.workspaces.docs.get(row["_id"], {}).get("stripe_account_id")
+        return FakeCursor(list(grouped.values()))
+
+
+@pytest.fixture
+def fake_stripe() -> Generator[FakeStripeServer, None, None]:
+    saved = (stripe.api_key, stripe.api_base, stripe.default_http_client, stripe.max_network_retries)
+    with FakeStripeServer() as server:
+        yield server
+    stripe.api_key, stripe.api_base, stripe.default_http_client, stripe.max_network_retries = saved
+
+
+@pytest.fixture
+def gateway(fake_stripe: FakeStripeServer) -> Generator[StripeGateway, None, None]:
+    gateway = StripeGateway(api_key="sk_test_fake", api_base=fake_stripe.url, timeout=5, max_retries=2, max_workers=4)
+    gateway.configure()
+    yield gateway
+    gateway.close()
+
+
+def _database() -> FakeDatabase:
+    workspaces = _Collection()
+    return FakeDatabase(workspaces=workspaces, escrow=_Escrow(workspaces), payout_items=_Collection(),
+                        payout_runs=_Collection())
+
+
+def _seed(db: FakeDatabase, vendors: int, per_vendor: int = 3) -> None:
+    for v in range(vendors):
+        if v != vendors - 1:
+            db.workspaces.docs[f"ws{v}"] = {"_id": f"ws{v}", "stripe_account_id": f"acct_{v}"}
+        for t in range(per_vendor):
+            db.escrow.docs[f"tx{v}-{t}"] = {"id": f"tx{v}-{t}", "workspace_id": f"ws{v}", "net_amount": 9.76,
+                                            "fee_collected": True, "created_at": datetime(2026, 1, 1)}
+
+
+@pytest.mark.asyncio
+async def test_run_pays_each_vendor_once_from_one_aggregation(gateway, fake_stripe):
+    db = _database()
+    _seed(db, vendors=6)
+    payouts = VendorPayoutService(db, gateway, concurrency=3, rate_per_second=0, checkpoint_every=2)
+
+    report = await payouts.run_payouts()
+
+    assert report["success"]
+    assert (report["paid"], report["skipped"], report["failed"]) == (5, 1, 0)
+    assert report["amount_paid"] == pytest.approx(5 * 3 * 9.76)
+    assert report["transfers_per_second"] > 0
+    assert db.escrow.aggregations == 1
+    transfers = fake_stripe.objects["transfers"].values()
+    assert sorted(t["destination"] for t in transfers) == [f"acct_{v}" for v in range(5)]
+    assert all(t["amount"] == 2928 for t in transfers)
+
+    # The vendor without a Connect account keeps its earnings for the next run
+    assert "payout_run_id" not in db.escrow.docs["tx5-0"]
+    assert db.escrow.docs["tx0-0"]["payout_status"] == "paid"
+
+    second = await payouts.run_payouts()
+    assert (second["paid"], second["skipped"]) == (0, 1)
+    assert len(fake_stripe.objects["transfers"]) == 5
+
+
+@pytest.mark.asyncio
+async def test_interrupted_run_resumes_without_double_paying(gateway, fake_stripe):
+    db = _database()
+    _seed(db, vendors=5)
+    payouts = VendorPayoutService(db, gateway, concurrency=1, rate_per_second=0, checkpoint_every=1)
+
+    real_request = gateway.request
+    calls = []
+
+    async def crash_on_third(operation, *args, **kwargs):
+        calls.append(kwargs["idempotency_key"])
+        if len(calls) == 3:
+            raise RuntimeError("worker killed")
+        return await real_request(operation, *args, **kwargs)
+
+    payouts.gateway.request = crash_on_third
+    crashed = await payouts.run_payouts()
+    assert not crashed["success"]
+    assert len(fake_stripe.objects["transfers"]) == 2
+
+    # Lose one checkpoint too, as if the process died before writing it
+    paid_item = next(item for item in db.payout_items.docs.values() if item["status"] == "paid")
+    paid_item["status"] = "pending"
+
+    payouts.gateway.request = real_request
+    resumed = await payouts.run_payouts()
+
+    assert resumed["paid"] == 4
+    # The item whose checkpoint was lost is settled from the run's transfer group, not re-sent
+    assert resumed["transfers_attempted"] == 2
+    assert len(fake_stripe.objects["transfers"]) == 4
+    assert len(db.payout_runs.docs) == 1
+
+
+@pytest.mark.asyncio
+async def test_ambiguous_failure_stays_claimed_and_is_not_paid_twice(gateway, fake_stripe):
+    db = _database()
+    _seed(db, vendors=3)
+    payouts = VendorPayoutService(db, gateway, concurrency=1, rate_per_second=0, checkpoint_every=1)
+
+    real_request = gateway.request
+
+    async def lost_response(operation, *args, **kwargs):
+        result = await real_request(operation, *args, **kwargs)
+        if kwargs.get("destination") == "acct_0":
+            raise stripe.error.APIConnectionError("read timed out")
+        return result
+
+    payouts.gateway.request = lost_response
+    first = await payouts.run_payouts()
+    assert (first["paid"], first["unsettled"]) == (1, 1)
+    assert db.escrow.docs["tx0-0"]["payout_run_id"] == first["run_id"]
+    assert db.payout_runs.docs[first["run_id"]]["status"] == "running"
+
+    # Stripe has forgotten the idempotency key by the time the run is resumed
+    fake_stripe.idempotency_keys.clear()
+    payouts.gateway.request = real_request
+    resumed = await payouts.run_payouts()
+
+    assert resumed["run_id"] == first["run_id"]
+    assert (resumed["paid"], resumed["unsettled"], resumed["transfers_attempted"]) == (2, 0, 0)
+    assert len(fake_stripe.objects["transfers"]) == 2
+    assert db.escrow.docs["tx0-0"]["payout_status"] == "paid"
+
+
+@pytest.mark.asyncio
+async def test_declined_transfer_releases_its_transactions(gateway, fake_stripe):
+    db = _database()
+    _seed(db, vendors=2)
+    payouts = VendorPayoutService(db, gateway, concurrency=1, rate_per_second=0)
+
+    async def decline(operation, *args, **kwargs):
+        raise stripe.error.InvalidRequestError("No such destination", "destination")
+
+    payouts.gateway.request = decline
+    report = await payouts.run_payouts()
+
+    assert (report["failed"], report["unsettled"]) == (1, 0)
+    assert "payout_run_id" not in db.escrow.docs["tx0-0"]
+    assert db.payout_runs.docs[report["run_id"]]["status"] == "completed"
+
+
+@pytest.mark.asyncio
+async def test_replan_adds_transactions_claimed_after_the_first_pass(gateway, fake_stripe):
+    db = _database()
+    _seed(db, vendors=2)
+    # The first planning pass wrote the item from one transaction, then the process died
+    db.payout_runs.docs["run1"] = {"_id": "run1", "status": "planning", "cutoff": datetime(2026, 2, 1)}
+    db.escrow.docs["tx0-0"].update(payout_run_id="run1", payout_status="scheduled")
+    db.payout_items.docs["run1|ws0"] = {"_id": "run1|ws0", "run_id": "run1", "workspace_id": "ws0",
+                                        "destination": "acct_0", "amount": 976, "transaction_ids": ["tx0-0"],
+                                        "status": "pending"}
+    payouts = VendorPayoutService(db, gateway, concurrency=1, rate_per_second=0)
+
+    report = await payouts.run_payouts()
+
+    assert report["run_id"] == "run1" and report["paid"] == 1
+    assert sorted(db.payout_items.docs["run1|ws0"]["transaction_ids"]) == ["tx0-0", "tx0-1", "tx0-2"]
+    [transfer] = fake_stripe.objects["transfers"].values()
+    assert transfer["amount"] == 2928
+
+
+@pytest.mark.asyncio
+async def test_rate_limit_is_shared_by_all_workers():
+    limiter = _RateLimiter(50)
+    start = time.monotonic()
+    await asyncio.gather(*(limiter.wait() for _ in range(6)))
+    assert time.monotonic() - start >= 5 / 50 * 0.9
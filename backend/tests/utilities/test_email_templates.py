@@ -0,0 +1,41 @@
+import os
+from pathlib import Path
+
+from utilities.email_templates import EmailTemplateRegistry
+
+
+def test_template_compiled_once(tmp_path: Path) -> None:
+    (tmp_path / "hello.html").write_text("Hello {{ name }}")
+    registry = EmailTemplateRegistry(str(tmp_path))
+    template = registry.get("hello.html")
+    assert registry.get("hello.html") is template
+    assert registry.render("hello.html", {"name": "Ada"}) == "Hello Ada"
+
+
+def test_render_many(tmp_path: Path) -> None:
+    (tmp_path / "hello.html").write_text("Hello {{ name }}")
+    registry = EmailTemplateRegistry(str(tmp_path))
+    rendered = registry.render_many("hello.html", [{"name": "Ada"}, {"name": "Alan"}])
+    assert rendered == ["Hello Ada", "Hello Alan"]
+
+
+def test_auto_reload_on_mtime_change(tmp_path: Path) -> None:
+    path = tmp_path / "hello.html"
+    path.write_text("Hello {{ name }}")
+    registry = EmailTemplateRegistry(str(tmp_path), auto_reload=True)
+    assert registry.render("hello.html", {"name": "Ada"}) == "Hello Ada"
+    path.write_text("Bye {{ name }}")
+    stat = path.stat()
+    os.utime(path, (stat.st_atime, stat.st_mtime + 10))
+    assert registry.render("hello.html", {"name": "Ada"}) == "Bye Ada"
+
+
+def test_no_reload_when_disabled(tmp_path: Path) -> None:
+    path = tmp_path / "hello.html"
+    path.write_text("Hello {{ name }}")
+    registry = EmailTemplateRegistry(str(tmp_path))
+    registry.warm()
+    path.write_text("Bye {{ name }}")
+    stat = path.stat()
+    os.utime(path, (stat.st_atime, stat.st_mtime + 10))
+    assert registry.render("hello.html", {"name": "Ada"}) == "Hello Ada"
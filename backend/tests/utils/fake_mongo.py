@@ -0,0 +1,73 @@
+"""
+In-memory stand-ins for Motor cursors and databases.
+
+Collections stay test-specific, since each test fakes only the operations the code
+under test uses; the cursor and database plumbing around them is shared here.
+"""
+
+from typing import Any, Callable, Dict, List, Optional
+
+
+class FakeCursor:
+    """
+    Motor cursor over a fixed list of rows. ``sort``/``skip``/``limit`` chain like the
+    real cursor and are recorded in ``calls``; skip and limit slice the rows, sort
+    leaves the order to the test. Rows may be an exception, raised on iteration.
+    """
+
+    def __init__(self, rows: Any, calls: Optional[Dict[str, Any]] = None):
+        self.rows = rows
+        self.calls = calls if calls is not None else {}
+
+    def sort(self, keys: Any = None, direction: Any = None) -> "FakeCursor":
+        self.calls["sort"] = keys if direction is None else [(keys, direction)]
+        return self
+
+    def skip(self, count: int) -> "FakeCursor":
+        self.calls["skip"] = count
+        self.rows = self.rows[count:]
+        return self
+
+    def limit(self, count: int) -> "FakeCursor":
+        self.calls["limit"] = count
+        if count:
+            self.rows = self.rows[:count]
+        return self
+
+    def _rows(self) -> List[Any]:
+        if isinstance(self.rows, Exception):
+            raise self.rows
+        return self.rows
+
+    async def to_list(self, length: Optional[int] = None) -> List[Any]:
+        return self._rows()
+
+    def __aiter__(self):
+        return self._iterate()
+
+    async def _iterate(self):
+        for row in self._rows():
+            yield row
+
+
+class FakeDatabase:
+    """
+    Collections by attribute (``db.users``) or by name (``db["users"]``). Names not
+    passed in are created with ``factory`` on first use, or raise KeyError without one.
+    """
+
+    def __init__(self, factory: Optional[Callable[[], Any]] = None, **collections: Any):
+        self.collections: Dict[str, Any] = dict(collections)
+        self.factory = factory
+
+    def __getitem__(self, name: str) -> Any:
+        if name not in self.collections:
+            if self.factory is None:
+                raise KeyError(name)
+            self.collections[name] = self.factory()
+        return self.collections[name]
+
+    def __getattr__(self, name: str) -> Any:
+        if name.startswith("_") or name in ("collections", "factory"):
+            raise AttributeError(name)
+        return self[name]
@@ -0,0 +1,222 @@
+"""
+Local fake Stripe API for tests.
+
+Speaks enough of the Stripe REST protocol (form-encoded requests, JSON objects)
+for the SDK to create, retrieve, modify, list and delete resources without
+network access. Point the SDK at it with ``StripeGateway(api_base=server.url)``.
+"""
+
+import json
+import threading
+import time
+import uuid
+from collections import defaultdict
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Dict, List, Optional, Tuple
+from urllib.parse import parse_qsl, urlparse
+
+RESOURCES = {
+    "customers": ("cus", "customer"),
+    "prices": ("price", "price"),
+    "products": ("prod", "product"),
+    "subscriptions": ("sub", "subscription"),
+    "payment_intents": ("pi", "payment_intent"),
+    "payment_methods": ("pm", "payment_method"),
+    "transfers": ("tr", "transfer"),
+    "accounts": ("acct", "account"),
+    "account_links": ("acctlink", "account_link"),
+    "coupons": ("coupon", "coupon"),
+    "invoices": ("in", "invoice"),
+}
+
+
+def _decode_form(pairs: List[Tuple[str, str]]) -> Dict[str, Any]:
+    """Turn ``items[0][price]=x`` style keys back into nested dicts and lists"""
+    result: Dict[str, Any] = {}
+    for key, value in pairs:
+        parts = key.replace("]", "").split("[")
+        node = result
+        for part in parts[:-1]:
+            node = node.setdefault(part, {})
+        node[parts[-1]] = value
+
+    def listify(node: Any) -> Any:
+        if isinstance(node, dict):
+            node = {k: listify(v) for k, v in node.items()}
+            if node and all(k.isdigit() for k in node):
+                return [node[k] for k in sorted(node, key=int)]
+        return node
+
+    return listify(result)
+
+
+class FakeStripeServer:
+    """In-memory Stripe API served on a background thread"""
+
+    def __init__(self, latency: float = 0.0):
+        self.latency = latency
+        self.objects: Dict[str, Dict[str, Dict[str, Any]]] = defaultdict(dict)
+        self.requests: List[Tuple[str, str]] = []
+        self.idempotency_keys: Dict[str, Dict[str, Any]] = {}
+        self._failures: List[int] = []
+        self._lock = threading.Lock()
+        self._server = ThreadingHTTPServer(("127.0.0.1", 0), self._handler())
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+
+    @property
+    def url(self) -> str:
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def start(self) -> "FakeStripeServer":
+        self._thread.start()
+        return self
+
+    def stop(self) -> None:
+        self._server.shutdown()
+        self._server.server_close()
+
+    def __enter__(self) -> "FakeStripeServer":
+        return self.start()
+
+    def __exit__(self, *exc: Any) -> None:
+        self.stop()
+
+    def fail_next(self, count: int = 1, status: int = 500) -> None:
+        """Answer the next ``count`` requests with a retryable error"""
+        with self._lock:
+            self._failures.extend([status] * count)
+
+    def count(self, method: str, path_prefix: str) -> int:
+        return sum(1 for m, p in self.requests if m == method and p.startswith(path_prefix))
+
+    def _create(self, resource: str, params: Dict[str, Any]) -> Dict[str, Any]:
+        prefix, object_name = RESOURCES[resource]
+        obj = {"id": params.pop("id", None) or f"{prefix}_{uuid.uuid4().hex[:14]}", "object": object_name}
+        obj.setdefault("metadata", {})
+        obj.update(params)
+        if "amount" in obj:
+            obj["amount"] = int(obj["amount"])
+        if "unit_amount" in obj:
+            obj["unit_amount"] = int(obj["unit_amount"])
+        if resource == "subscriptions":
+            now = int(time.time())
+            obj.update({
+                "status": "active",
+                "current_period_start": now,
+                "current_period_end": now + 30 * 24 * 3600,
+                "cancel_at_period_end": False,
+                "latest_invoice": {
+                    "id": f"in_{uuid.uuid4().hex[:14]}",
+                    "object": "invoice",
+                    "payment_intent": {
+                        "id": f"pi_{uuid.uuid4().hex[:14]}",
+                        "object": "payment_intent",
+                        "status": "succeeded",
+                        "client_secret": f"pi_secret_{uuid.uuid4().hex[:10]}",
+                    },
+                },
+            })
+        if resource == "payment_intents":
+            obj.setdefault("currency", "usd")
+            obj.update({"status": "succeeded", "client_secret": f"pi_secret_{uuid.uuid4().hex[:10]}"})
+        if resource == "account_links":
+            obj["url"] = f"https://connect.example.test/{obj['id']}"
+        self.objects[resource][obj["id"]] = obj
+        return obj
+
+    def _dispatch(self, method: str, path: str, params: Dict[str, Any]) -> Tuple[int, Dict[str, Any]]:
+        parts = [p for p in path.split("/") if p][1:]  # strip "v1"
+        if parts and parts[0] == "billing_portal":
+            return 200, {"id": f"bps_{uuid.uuid4().hex[:14]}", "object": "billing_portal.session",
+                         "url": "https://billing.example.test/session"}
+        if not parts or parts[0] not in RESOURCES:
+            return 404, {"error": {"type": "invalid_request_error", "message": f"Unknown path {path}"}}
+
+        resource = parts[0]
+        store = self.objects[resource]
+        if len(parts) == 1:
+            if method == "POST":
+                return 200, self._create(resource, params)
+            limit = int(params.pop("limit", 10))
+            matches = [o for o in store.values()
+                       if all(str(o.get(k)) == str(v) for k, v in params.items() if k != "status" or v != "all")]
+            return 200, {"object": "list", "data": matches[:limit], "has_more": len(matches) > limit,
+                         "url": f"/v1/{resource}"}
+
+        obj = store.get(parts[1])
+        if resource == "payment_methods" and obj is None:
+            obj = store[parts[1]] = {"id": parts[1], "object": "payment_method", "metadata": {},
+                                     "card": {"brand": "visa", "last4": "4242", "exp_month": 12, "exp_year": 2030},
+                                     "billing_details": {}}
+        if obj is None:
+            return 404, {"error": {"type": "invalid_request_error", "message": f"No such {resource}: {parts[1]}"}}
+        if len(parts) == 3 and parts[2] == "attach":
+            obj["customer"] = params.get("customer")
+            return 200, obj
+        if method == "DELETE":
+            obj["status"] = "canceled"
+            return 200, obj
+        if method == "POST":
+            metadata = params.pop("metadata", None)
+            obj.update(params)
+            if metadata:
+                obj["metadata"].update(metadata)
+            if "cancel_at_period_end" in params:
+                obj["cancel_at_period_end"] = params["cancel_at_period_end"] == "true"
+        return 200, obj
+
+    def _handler(self):
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def log_message(self, *args: Any) -> None:
+                pass
+
+            def _respond(self, status: int, body: Dict[str, Any], retry: Optional[bool] = None) -> None:
+                payload = json.dumps(body).encode()
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(payload)))
+                self.send_header("Request-Id", f"req_{uuid.uuid4().hex[:14]}")
+                if retry is not None:
+                    self.send_header("Stripe-Should-Retry", "true" if retry else "false")
+                self.end_headers()
+                self.wfile.write(payload)
+
+            def _handle(self, method: str) -> None:
+                parsed = urlparse(self.path)
+                length = int(self.headers.get("Content-Length") or 0)
+                body = self.rfile.read(length).decode() if length else ""
+                params = _decode_form(parse_qsl(parsed.query) + parse_qsl(body))
+                params.pop("expand", None)
+
+                with server._lock:
+                    server.requests.append((method, parsed.path))
+                    failure = server._failures.pop(0) if server._failures else None
+                if server.latency:
+                    time.sleep(server.latency)
+                if failure:
+                    self._respond(failure, {"error": {"type": "api_error", "message": "injected failure"}}, retry=True)
+                    return
+
+                key = self.headers.get("Idempotency-Key")
+                with server._lock:
+                    if method == "POST" and key and key in server.idempotency_keys:
+                        status, response = 200, server.idempotency_keys[key]
+                    else:
+                        status, response = server._dispatch(method, parsed.path, params)
+                        if method == "POST" and key and status == 200:
+                            server.idempotency_keys[key] = response
+                self._respond(status, response)
+
+            def do_GET(self) -> None:
+                self._handle("GET")
+
+            def do_POST(self) -> None:
+                self._handle("POST")
+
+            def do_DELETE(self) -> None:
+                self._handle("DELETE")
+
+        return Handler
@@ -0,0 +1,104 @@
+"""
+Local upstream HTTP server for proxy tests and benchmarks.
+
+``GET /bytes/<n>`` returns ``n`` bytes, ``POST /echo`` returns the request body and
+``GET /stream/<n>`` sends ``n`` bytes chunked without a Content-Length.
+Every distinct client connection is recorded in ``connections``.
+"""
+
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Set, Tuple
+
+
+class UpstreamStub:
+    """Keep-alive HTTP/1.1 server on a background thread"""
+
+    def __init__(self, latency: float = 0.0):
+        self.latency = latency
+        self.connections: Set[Tuple[str, int]] = set()
+        self._lock = threading.Lock()
+        self._server = ThreadingHTTPServer(("127.0.0.1", 0), self._handler())
+        self._server.daemon_threads = True
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+
+    @property
+    def url(self) -> str:
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def start(self) -> "UpstreamStub":
+        self._thread.start()
+        return self
+
+    def stop(self) -> None:
+        self._server.shutdown()
+        self._server.server_close()
+
+    def __enter__(self) -> "UpstreamStub":
+        return self.start()
+
+    def __exit__(self, *exc: Any) -> None:
+        self.stop()
+
+    def _handler(self):
+        stub = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def log_message(self, *args: Any) -> None:
+                pass
+
+            def handle(self) -> None:
+                try:
+                    super().handle()
+                except (BrokenPipeError, ConnectionResetError):
+                    pass  # the proxy closed an oversized response early
+
+            def _track(self) -> None:
+                with stub._lock:
+                    stub.connections.add(self.client_address)
+                if stub.latency:
+                    time.sleep(stub.latency)
+
+            def do_GET(self) -> None:
+                self._track()
+                parts = [p for p in self.path.split("/") if p]
+                size = int(parts[1]) if len(parts) > 1 and parts[1].isdigit() else 0
+                body = b"x" * size
+                self.send_response(200)
+                self.send_header("Content-Type", "application/octet-stream")
+                if parts and parts[0] == "stream":
+                    self.send_header("Transfer-Encoding", "chunked")
+                    self.end_headers()
+                    for start in range(0, size, 16384):
+                        chunk = body[start:start + 16384]
+                        self.wfile.write(b"%x\r\n%s\r\n" % (len(chunk), chunk))
+                    self.wfile.write(b"0\r\n\r\n")
+                    return
+                self.send_header("Content-Length", str(size))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def do_POST(self) -> None:
+                self._track()
+                if self.headers.get("Transfer-Encoding", "").lower() == "chunked":
+                    body = b""
+                    while True:
+                        length = int(self.rfile.readline().strip(), 16)
+                        if length == 0:
+                            self.rfile.readline()
+                            break
+                        body += self.rfile.read(length)
+                        self.rfile.readline()
+                else:
+                    body = self.rfile.read(int(self.headers.get("Content-Length") or 0))
+                self.send_response(200)
+                self.send_header("Content-Type", self.headers.get("Content-Type") or "application/octet-stream")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+        return Handler
@@ -1,26 +1,15 @@
 import logging
-from pathlib import Path
-from typing import Any, Dict
+from typing import Any, Dict, Iterable, List, Optional, Tuple
 
 import emails
-from emails.template import JinjaTemplate
+from emails.backend.smtp import SMTPBackend
 
 from core.config import settings
 from schemas import EmailContent, EmailValidation
+from utilities.email_templates import get_email_templates
 
 
-def send_email(
-    email_to: str,
-    subject_template: str = "",
-    html_template: str = "",
-    environment: Dict[str, Any] = {},
-) -> None:
-    assert settings.EMAILS_ENABLED, "no provided configuration for email variables"
-    message = emails.Message(
-        subject=JinjaTemplate(subject_template),
-        html=JinjaTemplate(html_template),
-        mail_from=(settings.EMAILS_FROM_NAME, settings.EMAILS_FROM_EMAIL),
-    )
+def _smtp_options() -> Dict[str, Any]:
     smtp_options = {"host": settings.SMTP_HOST, "port": settings.SMTP_PORT}
     if settings.SMTP_TLS:
         # https://python-emails.readthedocs.io/en/latest/
@@ -29,36 +18,86 @@ def send_email(
         smtp_options["user"] = settings.SMTP_USER
     if settings.SMTP_PASSWORD:
         smtp_options["password"] = settings.SMTP_PASSWORD
+    return smtp_options
+
+
+def _common_environment(environment: Optional[Dict[str, Any]]) -> Dict[str, Any]:
     # Add common template environment elements
+    environment = dict(environment or {})
     environment["server_host"] = settings.SERVER_HOST
     environment["server_name"] = settings.SERVER_NAME
     environment["server_bot"] = settings.SERVER_BOT
-    response = message.send(to=email_to, render=environment, smtp=smtp_options)
+    return environment
+
+
+def send_email(
+    email_to: str,
+    subject_template: str = "",
+    html_template: str = "",
+    environment: Optional[Dict[str, Any]] = None,
+    template_name: Optional[str] = None,
+) -> None:
+    """Send one message, `template_name` selects a compiled template from the registry"""
+    assert settings.EMAILS_ENABLED, "no provided configuration for email variables"
+    templates = get_email_templates()
+    environment = _common_environment(environment)
+    html_source = templates.get(template_name) if template_name else templates.from_string(html_template)
+    message = emails.Message(
+        subject=templates.from_string(subject_template).render(**environment),
+        html=html_source.render(**environment),
+        mail_from=(settings.EMAILS_FROM_NAME, settings.EMAILS_FROM_EMAIL),
+    )
+    response = message.send(to=email_to, smtp=_smtp_options())
     logging.info(f"send email result: {response}")
 
 
+def send_bulk_email(
+    recipients: Iterable[Tuple[str, Dict[str, Any]]],
+    subject_template: str,
+    template_name: str,
+) -> List[Any]:
+    """Render one template for many (email_to, environment) pairs over a single SMTP connection"""
+    assert settings.EMAILS_ENABLED, "no provided configuration for email variables"
+    templates = get_email_templates()
+    recipients = [(email_to, _common_environment(environment)) for email_to, environment in recipients]
+    contexts = [environment for _, environment in recipients]
+    subjects = templates.from_string(subject_template)
+    bodies = templates.render_many(template_name, contexts)
+
+    smtp = SMTPBackend(**_smtp_options())
+    responses = []
+    try:
+        for (email_to, environment), html in zip(recipients, bodies):
+            message = emails.Message(
+                subject=subjects.render(**environment),
+                html=html,
+                mail_from=(settings.EMAILS_FROM_NAME, settings.EMAILS_FROM_EMAIL),
+            )
+            responses.append(message.send(to=email_to, smtp=smtp))
+    finally:
+        smtp.close()
+    logging.info(f"send bulk email results: {len(responses)} messages for {template_name}")
+    return responses
+
+
 def send_email_validation_email(data: EmailValidation) -> None:
     subject = f"{settings.PROJECT_NAME} - {data.subject}"
     server_host = settings.SERVER_HOST
     link = f"{server_host}?token={data.token}"
-    with open(Path(settings.EMAIL_TEMPLATES_DIR) / "confirm_email.html") as f:
-        template_str = f.read()
     send_email(
         email_to=data.email,
         subject_template=subject,
-        html_template=template_str,
+        template_name="confirm_email.html",
         environment={"link": link},
     )
 
 
 def send_web_contact_email(data: EmailContent) -> None:
     subject = f"{settings.PROJECT_NAME} - {data.subject}"
-    with open(Path(settings.EMAIL_TEMPLATES_DIR) / "web_contact_email.html") as f:
-        template_str = f.read()
     send_email(
         email_to=settings.EMAILS_TO_EMAIL,
         subject_template=subject,
-        html_template=template_str,
+        template_name="web_contact_email.html",
         environment={"content": data.content, "email": data.email},
     )
 
@@ -66,12 +105,10 @@ def send_web_contact_email(data: EmailContent) -> None:
 def send_test_email(email_to: str) -> None:
     project_name = settings.PROJECT_NAME
     subject = f"{project_name} - Test email"
-    with open(Path(settings.EMAIL_TEMPLATES_DIR) / "test_email.html") as f:
-        template_str = f.read()
     send_email(
         email_to=email_to,
         subject_template=subject,
-        html_template=template_str,
+        template_name="test_email.html",
         environment={"project_name": settings.PROJECT_NAME, "email": email_to},
     )
 
@@ -79,14 +116,12 @@ def send_test_email(email_to: str) -> None:
 def send_magic_login_email(email_to: str, token: str) -> None:
     project_name = settings.PROJECT_NAME
     subject = f"Your {project_name} magic login"
-    with open(Path(settings.EMAIL_TEMPLATES_DIR) / "magic_login.html") as f:
-        template_str = f.read()
     server_host = settings.SERVER_HOST
     link = f"{server_host}?magic={token}"
     send_email(
         email_to=email_to,
         subject_template=subject,
-        html_template=template_str,
+        template_name="magic_login.html",
         environment={
             "project_name": settings.PROJECT_NAME,
             "valid_minutes": int(settings.ACCESS_TOKEN_EXPIRE_SECONDS / 60),
@@ -98,14 +133,12 @@ def send_magic_login_email(email_to: str, token: str) -> None:
 def send_reset_password_email(email_to: str, email: str, token: str) -> None:
     project_name = settings.PROJECT_NAME
     subject = f"{project_name} - Password recovery for user {email}"
-    with open(Path(settings.EMAIL_TEMPLATES_DIR) / "reset_password.html") as f:
-        template_str = f.read()
     server_host = settings.SERVER_HOST
     link = f"{server_host}/reset-password?token={token}"
     send_email(
         email_to=email_to,
         subject_template=subject,
-        html_template=template_str,
+        template_name="reset_password.html",
         environment={
             "project_name": settings.PROJECT_NAME,
             "username": email,
@@ -119,13 +152,11 @@ def send_reset_password_email(email_to: str, email: str, token: str) -> None:
 def send_new_account_email(email_to: str, username: str, password: str) -> None:
     project_name = settings.PROJECT_NAME
     subject = f"{project_name} - New account for user {username}"
-    with open(Path(settings.EMAIL_TEMPLATES_DIR) / "new_account.html") as f:
-        template_str = f.read()
     link = settings.SERVER_HOST
     send_email(
         email_to=email_to,
         subject_template=subject,
-        html_template=template_str,
+        template_name="new_account.html",
         environment={
             "project_name": settings.PROJECT_NAME,
             "username": username,
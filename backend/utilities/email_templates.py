@@ -0,0 +1,123 @@
+"""
+Email template registry for MEWAYZ V2
+Loads and compiles Jinja email templates once and reuses them for every message
+"""
+
+import logging
+import os
+import threading
+from functools import lru_cache
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from jinja2 import Environment, Template
+
+from core.config import settings
+
+logger = logging.getLogger(__name__)
+
+
+class EmailTemplateRegistry:
+    """Cache of compiled email templates keyed by file name.
+
+    Templates are compiled on first use (or eagerly through ``warm``). When
+    ``auto_reload`` is enabled the file mtime is checked on every lookup and the
+    template is recompiled after an edit, which is what we want in development.
+    """
+
+    def __init__(self, template_dir: str, auto_reload: bool = False):
+        self.template_dir = Path(template_dir)
+        self.auto_reload = auto_reload
+        self._environment = Environment()
+        self._templates: Dict[str, Tuple[float, Template]] = {}
+        self._lock = threading.Lock()
+        self.compiles = 0
+
+    def _load(self, name: str) -> Tuple[float, Template]:
+        path = self.template_dir / name
+        mtime = os.stat(path).st_mtime
+        with open(path) as f:
+            source = f.read()
+        return mtime, self._environment.from_string(source)
+
+    def get(self, name: str) -> Template:
+        """Return the compiled template, compiling or reloading it if needed"""
+        cached = self._templates.get(name)
+        if cached is not None:
+            if not self.auto_reload:
+                return cached[1]
+            try:
+                if os.stat(self.template_dir / name).st_mtime == cached[0]:
+                    return cached[1]
+            except OSError:
+                return cached[1]
+
+        with self._lock:
+            cached = self._templates.get(name)
+            if cached is None or self.auto_reload:
+                loaded = self._load(name)
+                if cached is None or loaded[0] != cached[0]:
+                    logger.info(f"Compiled email template {name}")
+                    cached = loaded
+                    self._templates[name] = cached
+                    self.compiles += 1
+            return cached[1]
+
+    def from_string(self, source: str) -> Template:
+        """Compile an inline template such as a subject line, cached by source"""
+        return _compile_inline(self._environment, source)
+
+    def render(self, name: str, context: Dict[str, Any]) -> str:
+        return self.get(name).render(**context)
+
+    def render_many(self, name: str, contexts: Iterable[Dict[str, Any]]) -> List[str]:
+        """Render one template against many contexts, compiling it only once"""
+        template = self.get(name)
+        return [template.render(**context) for context in contexts]
+
+    def warm(self) -> int:
+        """Compile every template in the directory, returns the number loaded"""
+        if not self.template_dir.is_dir():
+            logger.warning(f"Email template directory not found: {self.template_dir}")
+            return 0
+        loaded = 0
+        for path in sorted(self.template_dir.glob("*.html")):
+            try:
+                self.get(path.name)
+                loaded += 1
+            except Exception as e:
+                logger.error(f"Error compiling email template {path.name}: {e}")
+        return loaded
+
+    def get_stats(self) -> Dict[str, Any]:
+        inline = _compile_inline.cache_info()
+        return {
+            "templates": len(self._templates),
+            "compiles": self.compiles,
+            "inline_hits": inline.hits,
+            "inline_misses": inline.misses,
+        }
+
+    def clear(self) -> None:
+        with self._lock:
+            self._templates.clear()
+        _compile_inline.cache_clear()
+
+
+@lru_cache(maxsize=256)
+def _compile_inline(environment: Environment, source: str) -> Template:
+    return environment.from_string(source)
+
+
+_registry: Optional[EmailTemplateRegistry] = None
+
+
+def get_email_templates() -> EmailTemplateRegistry:
+    """Get registry instance"""
+    global _registry
+    if _registry is None:
+        _registry = EmailTemplateRegistry(
+            settings.EMAIL_TEMPLATES_DIR,
+            auto_reload=settings.EMAIL_TEMPLATES_AUTO_RELOAD,
+        )
+    return _registry